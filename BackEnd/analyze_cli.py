@@ -0,0 +1,278 @@
+"""
+ابزار خط فرمان تحلیل دسته‌ای آفلاین (بدون FastAPI و سربار HTTP)
+
+ورودی CSV / JSONL / Parquet با ستون‌های LandingPageInput به صورت تکه‌تکه خوانده
+می‌شود، تکه‌ها روی process pool با ارزیاب برداری تحلیل می‌شوند و امتیازات، شناسه
+قوانین فعال و CF ترکیبی به صورت ستونی (به ترتیب ورودی) نوشته می‌شوند.
+
+    cd BackEnd
+    python analyze_cli.py pages.csv -o results.parquet --workers 8
+    python analyze_cli.py pages.jsonl -o results.csv --chunk-size 20000
+    python analyze_cli.py pages.csv                  # JSONL روی stdout
+    python analyze_cli.py pages.csv --rules rules.yaml -o results.csv
+
+Parquet به pyarrow نیاز دارد (pip install pyarrow). آمار توان عملیاتی روی stderr
+چاپ می‌شود؛ سطرهای نامعتبر رد می‌شوند و ستون row شماره سطر ورودی (از صفر) است.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from expert_system import KnowledgeSnapshot, LandingPageInput, VectorizedEvaluator
+from rule_files import RuleFileError
+
+OUTPUT_COLUMNS = ("row", "visibility_score", "clickability_score", "overall_certainty", "activated_rules")
+MAX_REPORTED_ERRORS = 10
+
+
+# ==================== Readers ====================
+
+def _format_of(path: str) -> str:
+    """تشخیص قالب فایل از پسوند"""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if suffix in (".parquet", ".pq"):
+        return "parquet"
+    raise SystemExit(f"قالب فایل پشتیبانی نمی‌شود: {path} (csv, jsonl, parquet)")
+
+
+def _require_pyarrow():
+    """وارد کردن تنبل pyarrow (وابستگی اختیاری فقط برای Parquet)"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("برای خواندن/نوشتن Parquet نصب pyarrow لازم است: pip install pyarrow")
+    return pyarrow
+
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[List[Dict]]:
+    """خواندن تدریجی ورودی به صورت تکه‌هایی از سطرهای dict"""
+    fmt = _format_of(path)
+
+    if fmt == "parquet":
+        pa = _require_pyarrow()
+        for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pylist()
+        return
+
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            # سلول خالی یعنی مقدار پیش‌فرض مدل
+            rows = ({k: v for k, v in row.items() if v not in ("", None)} for row in csv.DictReader(f))
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+# ==================== Writers ====================
+
+class CsvWriter:
+    """خروجی CSV (شناسه قوانین با فاصله جدا می‌شوند)"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(OUTPUT_COLUMNS)
+
+    def write(self, columns: Dict[str, list]):
+        columns = {**columns, "activated_rules": [" ".join(ids) for ids in columns["activated_rules"]]}
+        self._writer.writerows(zip(*(columns[name] for name in OUTPUT_COLUMNS)))
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlWriter:
+    """خروجی JSONL (یک شیء در هر خط)"""
+
+    def __init__(self, path: str):
+        self._file = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+
+    def write(self, columns: Dict[str, list]):
+        self._file.writelines(
+            json.dumps(dict(zip(OUTPUT_COLUMNS, values)), ensure_ascii=False) + "\n"
+            for values in zip(*(columns[name] for name in OUTPUT_COLUMNS))
+        )
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class ParquetWriter:
+    """خروجی Parquet ستونی (activated_rules به صورت list<string>)"""
+
+    def __init__(self, path: str):
+        pa = self._pa = _require_pyarrow()
+        self._schema = pa.schema([
+            ("row", pa.int64()),
+            ("visibility_score", pa.int16()),
+            ("clickability_score", pa.int16()),
+            ("overall_certainty", pa.float64()),
+            ("activated_rules", pa.list_(pa.string())),
+        ])
+        self._writer = pa.parquet.ParquetWriter(path, self._schema)
+
+    def write(self, columns: Dict[str, list]):
+        self._writer.write_table(self._pa.table(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def open_writer(path: str):
+    """انتخاب نویسنده از روی پسوند خروجی ("-" یعنی JSONL روی stdout)"""
+    if path == "-":
+        return JsonlWriter(path)
+    return {"csv": CsvWriter, "jsonl": JsonlWriter, "parquet": ParquetWriter}[_format_of(path)](path)
+
+
+# ==================== Workers ====================
+
+_evaluator: Optional[VectorizedEvaluator] = None
+_rules_path: Optional[str] = None
+
+
+def _init_worker(rules_path: Optional[str]):
+    """تنظیم فایل‌های دانش هر فرایند (None: دانش پیش‌فرض داخلی)"""
+    global _rules_path
+    _rules_path = rules_path
+
+
+def _get_evaluator() -> VectorizedEvaluator:
+    """ساخت تنبل ارزیاب در هر فرایند (پایگاه دانش یک بار در هر worker کامپایل می‌شود)"""
+    global _evaluator
+    if _evaluator is None:
+        _evaluator = KnowledgeSnapshot.load(_rules_path).ve
+    return _evaluator
+
+
+def analyze_chunk(start: int, rows: List[Dict]) -> Tuple[Dict[str, list], List[Tuple[int, str]]]:
+    """اعتبارسنجی و تحلیل برداری یک تکه؛ خروجی ستونی و لیست خطاها (شماره سطر، پیام)"""
+    row_numbers, records, errors = [], [], []
+
+    for offset, row in enumerate(rows):
+        try:
+            records.append(LandingPageInput.model_validate(row).model_dump())
+            row_numbers.append(start + offset)
+        except ValidationError as e:
+            errors.append((start + offset, "; ".join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+            )))
+
+    if not records:
+        return {name: [] for name in OUTPUT_COLUMNS}, errors
+
+    evaluated = _get_evaluator().evaluate(records)
+    patterns = [evaluated["patterns"][i] for i in evaluated["pattern_index"]]
+
+    return {
+        "row": row_numbers,
+        "visibility_score": evaluated["visibility_score"],
+        "clickability_score": evaluated["clickability_score"],
+        "overall_certainty": [p["overall_certainty"] for p in patterns],
+        "activated_rules": [p["activated_rules"] for p in patterns],
+    }, errors
+
+
+def run(input_path: str, output_path: str, workers: int, chunk_size: int,
+        rules_path: Optional[str] = None) -> Dict:
+    """اجرای خط لوله خواندن → تحلیل موازی → نوشتن به ترتیب ورودی"""
+    global _evaluator
+    # فایل‌های دانش پیش از شروع یک بار بررسی می‌شوند تا خطا در workerها تکرار نشود
+    try:
+        snapshot = KnowledgeSnapshot.load(rules_path)
+    except RuleFileError as e:
+        raise SystemExit(f"فایل دانش نامعتبر: {e}")
+    _init_worker(rules_path)
+    _evaluator = snapshot.ve  # اجرای inline (و workerهای fork) همین را استفاده می‌کنند
+
+    writer = open_writer(output_path)
+    executor = ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(rules_path,)
+    ) if workers > 0 else None
+    # حداکثر تکه‌های در جریان، تا حافظه مستقل از حجم ورودی بماند
+    pending = deque()
+    max_pending = max(1, workers) * 2
+    stats = {"rows": 0, "analyzed": 0, "invalid": 0}
+    reported = 0
+
+    def drain(future_or_result):
+        nonlocal reported
+        columns, errors = future_or_result.result() if executor else future_or_result
+        writer.write(columns)
+        stats["analyzed"] += len(columns["row"])
+        stats["invalid"] += len(errors)
+        for row, message in errors:
+            if reported < MAX_REPORTED_ERRORS:
+                print(f"سطر {row} نامعتبر: {message}", file=sys.stderr)
+                reported += 1
+
+    start_time = time.perf_counter()
+    try:
+        for rows in read_chunks(input_path, chunk_size):
+            start = stats["rows"]
+            stats["rows"] += len(rows)
+            if executor is None:
+                drain(analyze_chunk(start, rows))
+                continue
+            pending.append(executor.submit(analyze_chunk, start, rows))
+            if len(pending) >= max_pending:
+                drain(pending.popleft())
+
+        while pending:
+            drain(pending.popleft())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        writer.close()
+
+    elapsed = time.perf_counter() - start_time
+    stats["seconds"] = round(elapsed, 3)
+    stats["rows_per_second"] = round(stats["rows"] / elapsed, 1) if elapsed else 0.0
+    stats["workers"] = workers
+    stats["kb_version"] = snapshot.version
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="فایل ورودی (.csv, .jsonl, .parquet)")
+    parser.add_argument("-o", "--output", default="-", help="فایل خروجی (.csv, .jsonl, .parquet)؛ پیش‌فرض stdout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="تعداد فرایندها (0 = اجرا در همین فرایند)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="تعداد سطر هر تکه")
+    parser.add_argument("--rules", help="فایل یا پوشه YAML/JSON قوانین و آستانه‌ها (پیش‌فرض: دانش داخلی)")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size باید مثبت باشد")
+
+    stats = run(args.input, args.output, args.workers, args.chunk_size, args.rules)
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+بنچمارک جدول تصمیم بازه‌ای: درستی در برابر موتور مرجع و زمان در برابر آن
+
+1. ساختار جدول (بلوک‌ها و تعداد خانه‌ها) و زمان ساخت؛
+2. بررسی همه خانه‌های همه بلوک‌ها (و دو طرف آستانه‌های حاصل‌ضربی) با infer_staged
+   مرجع، برای ورودی پیش‌فرض و چند ورودی پایه تصادفی؛
+3. برابری بایت‌به‌بایت analyze_json و برابری analyze با سرویس بدون جدول، برای همه
+   ترکیب‌های include؛
+4. زمان ie.infer در برابر table.classify و analyze_json مرجع در برابر جدول.
+
+    python benchmarks/bench_decision_table.py
+    python benchmarks/bench_decision_table.py --bases 20 --samples 2000
+"""
+
+import argparse
+import itertools
+import sys
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from decision_table import DecisionTable
+from expert_system import RESPONSE_SECTIONS, ExpertSystemService, LandingPageInput
+from synthetic import random_inputs
+
+
+def per_item(fn, items, repeat: int = 5) -> float:
+    """بهترین زمان هر آیتم (میکروثانیه)"""
+    return min(timeit.repeat(lambda: [fn(x) for x in items], number=1, repeat=repeat)) / len(items) * 1e6
+
+
+def include_sets():
+    sections = sorted(RESPONSE_SECTIONS)
+    return [None] + [frozenset(c) for r in range(len(sections) + 1) for c in itertools.combinations(sections, r)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bases", type=int, default=5, help="ورودی‌های پایه تصادفی برای بررسی خانه‌ها")
+    parser.add_argument("--samples", type=int, default=500, help="ورودی‌های تصادفی برای برابری و زمان‌سنجی")
+    args = parser.parse_args()
+
+    service = ExpertSystemService()
+    reference = ExpertSystemService()
+    reference.snapshot.table = None
+    engine = service.snapshot.ie
+
+    start = time.perf_counter()
+    table = DecisionTable(engine)
+    build_ms = (time.perf_counter() - start) * 1000
+    stats = table.stats()
+    print(f"decision table: {stats['fields']} fields, {len(stats['blocks'])} blocks, "
+          f"{stats['cells']} cells, built in {build_ms:.1f} ms")
+    for block in sorted(stats["blocks"], key=lambda b: -b["cells"]):
+        print(f"  {block['cells']:>6} cells  cross={block['cross_terms']}  {', '.join(block['fields'])}")
+
+    # ---------- بررسی خانه‌ها ----------
+    bases = [LandingPageInput().model_dump()]
+    bases += [LandingPageInput(**x).model_dump() for x in random_inputs(args.bases, seed=11, engine=engine)]
+    start = time.perf_counter()
+    checked, mismatches = table.verify(bases)
+    print(f"\nverify: {checked:,} points over {len(bases)} bases, {len(mismatches)} mismatches "
+          f"({time.perf_counter() - start:.1f} s)")
+    for mismatch in mismatches[:5]:
+        print(f"  {mismatch}")
+    assert not mismatches
+
+    # ---------- برابری پاسخ‌ها ----------
+    inputs = [LandingPageInput(**x).model_dump() for x in random_inputs(args.samples, seed=5, engine=engine)]
+    assert all(table.classify(x) is not None for x in inputs)
+    compared = 0
+    for include in include_sets():
+        for x in inputs:
+            assert service.analyze_json(x, include) == reference.analyze_json(x, include), (x, include)
+            compared += 1
+        for x in inputs[:100]:
+            assert service.analyze(x, include) == reference.analyze(x, include), (x, include)
+    print(f"responses: {compared:,} analyze_json byte-identical across {len(include_sets())} include sets")
+
+    # ---------- زمان‌سنجی ----------
+    print(f"\nper call ({len(inputs)} inputs)")
+    rows = [
+        ("ie.infer", engine.infer),
+        ("table.classify", table.classify),
+        ("table.infer", table.infer),
+    ]
+    for name, fn in rows:
+        print(f"  {name:<32} {per_item(fn, inputs):8.2f} µs")
+    for include in (None, frozenset({"summary"})):
+        label = "analyze_json [" + ("all" if include is None else ",".join(sorted(include))) + "]"
+        before = per_item(lambda x: reference.analyze_json(x, include), inputs)
+        after = per_item(lambda x: service.analyze_json(x, include), inputs)
+        print(f"  {label:<24} reference {before:8.2f} µs  table {after:8.2f} µs  x{before / after:4.1f}")
+
+
+if __name__ == "__main__":
+    main()
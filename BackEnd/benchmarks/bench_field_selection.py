@@ -0,0 +1,54 @@
+"""
+بنچمارک انتخاب بخش‌های پاسخ (include): زمان CPU و تخصیص حافظه هر درخواست
+برای پاسخ کامل در برابر فقط امتیازات.
+
+    python benchmarks/bench_field_selection.py
+"""
+
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main import LandingPageInput, expert_service, render_json
+
+CASES = {
+    "full": None,
+    "summary only": frozenset({"summary"}),
+    "scores only": frozenset(),
+}
+
+
+def allocations(fn, repeat: int = 1000) -> float:
+    """میانگین بایت‌های تخصیص‌یافته به ازای هر فراخوانی"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    total = 0
+    for _ in range(repeat):
+        snapshot_start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        total += tracemalloc.get_traced_memory()[1] - snapshot_start
+    tracemalloc.stop()
+    return total / repeat
+
+
+def main():
+    # ورودی با تعداد زیادی قانون فعال (بدترین حالت برای توضیحات)
+    inputs = LandingPageInput(cta_position_y=950, cta_width=150, cta_height=40, contrast_ratio=2.0,
+                              whitespace_around_cta=20, scroll_depth=30, cta_click_rate=1.0,
+                              number_of_ctas=3, cta_text_length=32, similar_color_elements=4,
+                              cta_mobile_width=120, has_loading_animation=0).model_dump()
+    number = 20_000
+
+    print(f"{'case':<14} {'µs/request':>11} {'peak bytes/request':>20} {'response bytes':>15}")
+    for name, include in CASES.items():
+        fn = lambda: render_json(expert_service.analyze(inputs, include))
+        seconds = min(timeit.repeat(fn, number=number, repeat=3))
+        print(f"{name:<14} {seconds / number * 1e6:11.2f} {allocations(fn):20.0f} {len(fn()):15d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+بنچمارک پرسش هدف‌دار (زنجیره عقب‌رو): درستی و صرفه‌جویی در برابر تحلیل کامل
+
+برای پایگاه دانش پیش‌فرض و پایگاه‌های مصنوعی بزرگ‌تر، هر هدف (یک دسته، یک قانون،
+چند قانون) با تحلیل کامل مقایسه می‌شود: قوانین فعال زیرمجموعه هدف، امتیاز دسته‌های
+هدف و برچسب‌های کیفی لازم باید یکسان باشند (مسیر کامپایل‌شده و مسیر مرحله‌ای، و
+ورودی‌های ناقص). سپس زمان هر درخواست ie.infer در برابر GoalPlan.infer گزارش می‌شود.
+
+    python benchmarks/bench_goals.py
+    python benchmarks/bench_goals.py --sizes 100,1000,5000
+"""
+
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from goals import GoalPlan
+from inference import InferenceEngine, KnowledgeBase
+from synthetic import random_inputs, synthetic_rules
+
+
+def per_request(infer, inputs, budget: float = 0.3) -> float:
+    """بهترین میانگین زمان هر درخواست (میکروثانیه)"""
+    timer = timeit.Timer(lambda: [infer(x) for x in inputs])
+    number = max(1, int(budget / max(timer.timeit(1), 1e-6)))
+    return min(timer.repeat(3, number)) / number / len(inputs) * 1e6
+
+
+def goals_for(engine: InferenceEngine, rng: random.Random):
+    """(نام، دسته‌ها، شناسه‌ها) اهداف نمونه"""
+    ids = [rule.id for rule in engine.kb.rules]
+    return [
+        ("category=clickability", {"clickability"}, ()),
+        ("category=visibility", {"visibility"}, ()),
+        ("1 rule", (), rng.sample(ids, 1)),
+        ("5 rules", (), rng.sample(ids, min(5, len(ids)))),
+    ]
+
+
+def check(engine: InferenceEngine, plan: GoalPlan, inputs) -> int:
+    """تعداد ناهمخوانی‌های هدف با تحلیل کامل"""
+    selected = sum(plan.bits)
+    mismatches = 0
+    for x in inputs:
+        try:
+            full = engine.infer(x)
+        except Exception:
+            continue  # ورودی ناقص که تحلیل کامل هم نمی‌پذیرد
+        reference = (
+            full.mask & selected,
+            [getattr(full, f"{name}_score") for name in plan.scores],
+            {name: full.qualitative_inputs()[name] for name in plan.labels},
+        )
+        for goal in (plan.infer(x), plan.infer_staged(x)):
+            actual = (goal.mask, [getattr(goal, f"{name}_score") for name in plan.scores], plan.qualitative(goal))
+            mismatches += actual != reference
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,5000", help="اندازه پایگاه‌های مصنوعی (جداشده با کاما)")
+    parser.add_argument("--samples", type=int, default=300)
+    args = parser.parse_args()
+
+    engines = [("default", InferenceEngine(KnowledgeBase()))]
+    for size in [int(part) for part in args.sizes.split(",") if part]:
+        engines.append((f"synthetic {size}", InferenceEngine(KnowledgeBase(synthetic_rules(size, seed=size)))))
+
+    rng = random.Random(5)
+    print(f"{'knowledge':<16} {'goal':<22} {'rules':>11} {'labels':>7} {'full µs':>9} {'goal µs':>9} {'speedup':>8}")
+    for knowledge, engine in engines:
+        inputs = random_inputs(args.samples, seed=9, engine=engine)
+        # ورودی‌های ناقص: مسیر خطای کامپایل‌شده و برگشت به مسیر مرحله‌ای
+        partial = [{k: v for k, v in x.items() if rng.random() < 0.8} for x in inputs[:50]]
+        full_micros = per_request(engine.infer, inputs)
+        for name, categories, rule_ids in goals_for(engine, rng):
+            plan = GoalPlan(engine, categories, rule_ids)
+            mismatches = check(engine, plan, inputs + partial)
+            assert not mismatches, f"{knowledge} {name}: {mismatches} mismatches"
+            goal_micros = per_request(plan.infer, inputs)
+            print(f"{knowledge:<16} {name:<22} {len(plan.rules):>5}/{len(engine.kb.rules):<5} "
+                  f"{len(plan.labels):>3}/{len(engine.converter.labels):<3} "
+                  f"{full_micros:9.2f} {goal_micros:9.2f} {full_micros / goal_micros:7.1f}x")
+    print(f"\nall goals match the full analysis ({args.samples} inputs + 50 partial per goal)")
+
+
+if __name__ == "__main__":
+    main()
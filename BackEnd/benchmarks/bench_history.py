@@ -0,0 +1,213 @@
+"""
+بنچمارک تاریخچه تحلیل‌ها: هزینه ثبت در مسیر درخواست، توان نویسنده و زمان پرس‌وجو
+
+1. ورودی‌های تصادفی با HistoryStore واقعی ثبت و نوشته می‌شوند؛ هر صفحه هر فیلتر
+   (زمان، قانون، بازه امتیاز، ترکیب‌ها) تا آخر با cursor خوانده و با فیلتر و مرتب‌سازی
+   کامل در حافظه مقایسه می‌شود؛
+2. زمان record (مسیر درخواست) و توان thread نویسنده؛
+3. یک جدول بزرگ مستقیماً با SQL ساخته می‌شود و زمان صفحه اول و صفحه‌های عمیق هر
+   فیلتر گزارش می‌شود؛ طرح اجرای هر پرس‌وجو نباید کل جدول را پیمایش کند.
+
+    python benchmarks/bench_history.py
+    python benchmarks/bench_history.py --rows 20000000   # ده‌ها میلیون سطر (چند دقیقه ساخت)
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from history import HistoryStore
+from inference import InferenceEngine, KnowledgeBase
+from synthetic import production_inputs, random_inputs
+
+RULE_IDS = [rule.id for rule in KnowledgeBase().rules]
+
+
+def result(engine: InferenceEngine, inputs):
+    """نتیجه تاریخچه یک ورودی (همان شکلی که مسیر درخواست از استنتاج پاسخ می‌سازد)"""
+    inference = engine.infer(inputs)
+    activations = inference.activations
+    return (engine.version, inference.visibility_score, inference.clickability_score,
+            activations.certainty, activations.ids)
+
+
+def all_pages(store: HistoryStore, limit: int, **filters):
+    items, cursor = [], None
+    while True:
+        page = store.query(limit=limit, cursor=cursor, **filters)
+        items += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def expected(rows, since=None, until=None, rule_id=None, score="visibility", min_score=None, max_score=None):
+    low = 0 if min_score is None else min_score
+    high = 100 if max_score is None else max_score
+    selected = [
+        row for row in rows
+        if (since is None or row["timestamp"] >= since) and (until is None or row["timestamp"] < until)
+        and (rule_id is None or rule_id in row["activated_rules"])
+        and low <= row[f"{score}_score"] <= high
+    ]
+    return sorted(selected, key=lambda row: (row["timestamp"], row["id"]), reverse=True)
+
+
+def check(path: str, n: int):
+    """همه صفحه‌های همه فیلترها در برابر فیلتر کامل در حافظه"""
+    engine = InferenceEngine(KnowledgeBase())
+    store = HistoryStore(path, result, batch_size=256, flush_seconds=0.01)
+    inputs = random_inputs(n // 2, seed=1, engine=engine) + production_inputs(n - n // 2, seed=1)
+    for i, x in enumerate(inputs):
+        # هر سومی مانند پاسخ کش‌شده: نتیجه در thread نویسنده با موتور پاسخ
+        store.record("bench", x, engine if i % 3 == 0 else result(engine, x))
+        if i % 700 == 0:
+            time.sleep(0.002)  # چند دسته و زمان‌های تکراری/نزدیک
+    assert store.flush(30), "writer did not drain"
+    rows = all_pages(store, 1000)
+    assert len(rows) == n and store.written == n, (len(rows), store.written)
+    for row in rows:
+        stored = (row["kb_version"], row["visibility_score"], row["clickability_score"],
+                  row["overall_certainty"], tuple(row["activated_rules"]))
+        assert stored == result(engine, row["inputs"]), row
+
+    stamps = sorted(row["timestamp"] for row in rows)
+    middle = (stamps[n // 4], stamps[3 * n // 4])
+    rng = random.Random(2)
+    cases = [
+        {},
+        {"since": middle[0]},
+        {"since": middle[0], "until": middle[1]},
+        {"rule_id": "C1"},
+        {"rule_id": rng.choice(RULE_IDS), "until": middle[1]},
+        {"min_score": 60, "max_score": 85},
+        {"score": "clickability", "max_score": 70},
+        {"score": "clickability", "min_score": 90, "since": middle[0]},
+        {"rule_id": "V2", "min_score": 50, "max_score": 80},
+        {"min_score": 101},
+    ]
+    for filters in cases:
+        reference = expected(rows, **filters)
+        for limit in (7, 100):
+            actual = all_pages(store, limit, **filters)
+            assert [r["id"] for r in actual] == [r["id"] for r in reference], f"{filters} limit={limit}"
+    store.close()
+    print(f"correctness: {n} records, {len(cases)} filters x 2 page sizes match a full in-memory scan")
+
+
+def record_cost(path: str, n: int):
+    """زمان record در مسیر درخواست و توان نویسنده"""
+    engine = InferenceEngine(KnowledgeBase())
+    store = HistoryStore(path, result, max_queue=n)
+    records = [(x, result(engine, x)) for x in production_inputs(n, seed=4)]
+    start = time.perf_counter()
+    for x, computed in records:
+        store.record("bench", x, computed)
+    recorded = time.perf_counter() - start
+    store.flush(120)
+    drained = time.perf_counter() - start
+    print(f"record(): {recorded / n * 1e6:.2f} µs/request on the request path; "
+          f"writer drained {n:,} records in {drained:.2f} s ({n / drained:,.0f} rows/s, {store.batches} batches)")
+    assert recorded / n < 20e-6, "recording must stay off the request's critical path"
+    store.close()
+
+
+def build(path: str, rows: int):
+    """جدول بزرگ با SQL (بدون Python در حلقه): زمان‌ها یکنواخت در 90 روز، امتیازها و قوانین تصادفی"""
+    store = HistoryStore(path, result)
+    conn = store._connection()
+    start = time.perf_counter()
+    conn.execute("BEGIN")
+    conn.execute(f"""
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {rows})
+        INSERT INTO analyses
+        SELECT i, 1700000000 + i * (90 * 86400.0 / {rows}), 'analyze', 'v1',
+               abs(random() % 101), abs(random() % 101), 0.8, '', '{{}}'
+        FROM n
+    """)
+    # قوانین فعال: هر قانون در حدود 1/(3 + اندیس) تحلیل‌ها
+    for k, rule_id in enumerate(RULE_IDS):
+        conn.execute(
+            f"INSERT INTO analysis_rules SELECT ?, ts, id FROM analyses WHERE abs(random() % {3 + k}) = 0",
+            (rule_id,),
+        )
+    conn.execute("COMMIT")
+    print(f"built {rows:,} rows in {time.perf_counter() - start:.1f} s "
+          f"({os.path.getsize(path) / 1e6:,.0f} MB)")
+    return store
+
+
+def timed(store: HistoryStore, pages: int, **filters):
+    """(زمان صفحه اول، میانگین صفحه‌های بعدی) به میلی‌ثانیه"""
+    start = time.perf_counter()
+    page = store.query(**filters)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(pages):
+        if page["next_cursor"] is None:
+            break
+        page = store.query(cursor=page["next_cursor"], **filters)
+    return first * 1000, (time.perf_counter() - start) / pages * 1000
+
+
+def plans(store: HistoryStore):
+    """
+    طرح اجرای پرس‌وجوها: هر جدول با جستجو یا پیمایش مرتب شاخص خوانده می‌شود؛ مرتب‌سازی
+    موقت فقط روی خروجی زیرپرس‌وجوهای بازه امتیاز (هر کدام حداکثر limit سطر) مجاز است
+    """
+    conn = store._connection()
+    captured = []
+    conn.set_trace_callback(captured.append)
+    store.query()
+    store.query(since=1.0, until=2.0, cursor="1.5:10")
+    store.query(rule_id="C1", min_score=10, cursor="1.5:10")
+    store.query(min_score=10, max_score=12, cursor="1.5:10")
+    conn.set_trace_callback(None)
+    for sql in captured:
+        if not sql.startswith("SELECT") or "MAX(id)" in sql:
+            continue
+        steps = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+        for step in steps:
+            assert not step.startswith("SCAN ") or "USING INDEX" in step or step.startswith("SCAN (subquery"), steps
+        assert "UNION ALL" in sql or not any("TEMP B-TREE" in step for step in steps), steps
+        print(f"  plan: {' | '.join(dict.fromkeys(steps))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="اندازه جدول بزرگ")
+    parser.add_argument("--check", type=int, default=3000, help="رکوردهای بررسی درستی")
+    parser.add_argument("--records", type=int, default=50_000, help="رکوردهای سنجش ثبت")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        check(os.path.join(directory, "check.db"), args.check)
+        record_cost(os.path.join(directory, "record.db"), args.records)
+
+        store = build(os.path.join(directory, "large.db"), args.rows)
+        day = 86400.0
+        cases = [
+            ("latest", {}),
+            ("time range (1 day)", {"since": 1700000000 + 40 * day, "until": 1700000000 + 41 * day}),
+            ("rule C1", {"rule_id": "C1"}),
+            ("rule (rarest)", {"rule_id": RULE_IDS[-1], "since": 1700000000 + 10 * day}),
+            ("score band 40-60", {"min_score": 40, "max_score": 60}),
+            ("clickability 0-100", {"score": "clickability", "min_score": 0, "max_score": 100}),
+            ("rule + band", {"rule_id": "V2", "min_score": 90}),
+        ]
+        print(f"\n{'query':<22} {'first page ms':>14} {'next pages ms':>14}   (limit 100)")
+        for name, filters in cases:
+            first, following = timed(store, 20, **filters)
+            print(f"{name:<22} {first:14.2f} {following:14.2f}")
+            assert first < 250 and following < 250, f"{name}: page should not scale with table size"
+        plans(store)
+
+
+if __name__ == "__main__":
+    main()
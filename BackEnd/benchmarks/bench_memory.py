@@ -0,0 +1,119 @@
+"""
+بنچمارک حافظه و تخصیص مسیر داغ استنتاج (tracemalloc): نتیجه dict قبلی
+(full_data، لیست ActivatedRule و dict نتایج) در برابر Inference فشرده (bitmask
+قوانین، برچسب‌های کدشده و الگوهای فعال‌سازی مشترک)، برای یک درخواست و برای
+نگهداری نتایج یک دسته 100 هزارتایی.
+
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --batch 20000
+"""
+
+import argparse
+import gc
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from expert_system import ActivatedRule, ExpertSystemService, LandingPageInput
+from synthetic import random_inputs
+
+POOL = 1_000
+
+
+def legacy_forward_chaining(ie, inputs):
+    """پیاده‌سازی قبلی forward_chaining: چند dict و یک ActivatedRule برای هر قانون فعال"""
+    qualitative_inputs = ie.converter.convert_inputs(inputs)
+    full_data = {**inputs, **qualitative_inputs}
+    activated_rules = [ActivatedRule(rule=rule, certainty=rule.certainty) for rule in ie.kb.evaluate(full_data)]
+    activated_rules.sort(key=lambda x: x.rule.priority, reverse=True)
+    return {
+        "activated_rules": activated_rules,
+        "visibility_score": ie._calculate_visibility_score(inputs),
+        "clickability_score": ie._calculate_clickability_score(inputs),
+        "overall_certainty": ie._calculate_combined_certainty(activated_rules),
+        "recommendations": ie._generate_recommendations(activated_rules),
+        "qualitative_inputs": qualitative_inputs,
+    }
+
+
+def legacy_analyze_json(service, inputs):
+    """پاسخ کامل قبلی: نتایج dict و قطعات JSON قوانین برای هر درخواست"""
+    encoder = service.snapshot.encoder
+    results = legacy_forward_chaining(service.ie, inputs)
+    return encoder.encode({
+        "visibility_score": results["visibility_score"],
+        "clickability_score": results["clickability_score"],
+        "overall_certainty": results["overall_certainty"],
+        "activated_rules": encoder.rules(results["activated_rules"]),
+        "recommendations": encoder.texts(results["recommendations"]),
+        "qualitative_inputs": results["qualitative_inputs"],
+        "detailed_explanation": service.ef.generate_explanation(results, inputs),
+        "summary": service._create_summary(results),
+    })
+
+
+def per_call(fn, items) -> dict:
+    """زمان، اوج حافظه گذرا و حافظه ماندگار نتیجه هر فراخوانی"""
+    micros = min(timeit.repeat(lambda: [fn(x) for x in items], number=1, repeat=5)) / len(items) * 1e6
+
+    gc.collect()
+    tracemalloc.start()
+    transient = 0
+    kept = []
+    for x in items:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        kept.append(fn(x))
+        transient = max(transient, tracemalloc.get_traced_memory()[1] - before)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {"us": micros, "peak": transient, "retained": retained / len(items)}
+
+
+def retained_batch(fn, pool, size: int) -> tuple:
+    """حافظه نگهداری نتایج size ورودی (ورودی‌ها از یک pool مشترک)"""
+    gc.collect()
+    tracemalloc.start()
+    results = [fn(pool[i % len(pool)]) for i in range(size)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=100_000)
+    args = parser.parse_args()
+
+    service = ExpertSystemService()
+    ie = service.ie
+    pool = [LandingPageInput(**x).model_dump() for x in random_inputs(POOL, seed=1, engine=ie)]
+    assert all(legacy_analyze_json(service, x) == service.analyze_json(x) for x in pool)
+    for x in pool:  # الگوهای فعال‌سازی و قطعات JSON مشترک پیش از اندازه‌گیری ساخته شوند
+        service.analyze_json(x)
+
+    print(f"per request ({POOL} inputs; transient = worst-case peak during one call)")
+    print(f"  {'path':<34} {'time':>10} {'transient':>12} {'retained':>12}")
+    rows = (
+        ("forward_chaining (dict, before)", lambda x: legacy_forward_chaining(ie, x)),
+        ("infer (Inference)", ie.infer),
+        ("analyze_json (before)", lambda x: legacy_analyze_json(service, x)),
+        ("analyze_json", service.analyze_json),
+    )
+    for name, fn in rows:
+        r = per_call(fn, pool)
+        print(f"  {name:<34} {r['us']:8.2f}µs {r['peak']:10,.0f} B {r['retained']:10,.0f} B")
+
+    print(f"\nbatch of {args.batch:,} results held in memory")
+    print(f"  {'path':<34} {'retained':>12} {'peak':>12}")
+    for name, fn in rows[:2]:
+        current, peak = retained_batch(fn, pool, args.batch)
+        print(f"  {name:<34} {current / 2**20:9.1f} MiB {peak / 2**20:9.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
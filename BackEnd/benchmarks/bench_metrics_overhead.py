@@ -0,0 +1,49 @@
+"""
+بنچمارک سربار سنجه‌ها: analyze با سرویس بدون ابزارگذاری در برابر سرویس با
+زمان‌سنج مراحل و شمارنده قوانین، و هزینه هر زمان‌سنج به تنهایی.
+
+    python benchmarks/bench_metrics_overhead.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from expert_system import ExpertSystemService, LandingPageInput
+from metrics import Metrics
+from synthetic import random_inputs
+
+
+def per_call(fn, number: int) -> float:
+    """بهترین زمان هر فراخوانی (میکروثانیه)"""
+    return min(timeit.repeat(fn, number=number, repeat=7)) / number * 1e6
+
+
+def main():
+    plain = ExpertSystemService()
+    instrumented = ExpertSystemService(Metrics(enabled=True))
+    inputs = [LandingPageInput(**x).model_dump() for x in random_inputs(1000, seed=1, engine=plain.ie)]
+    assert [plain.analyze(x) for x in inputs] == [instrumented.analyze(x) for x in inputs]
+
+    # اجرای یک در میان تا نوسان بار ماشین روی هر دو حالت یکسان اثر کند
+    best = {"disabled": float("inf"), "enabled": float("inf")}
+    for _ in range(15):
+        for name, service in (("disabled", plain), ("enabled", instrumented)):
+            seconds = timeit.timeit(lambda: [service.analyze(x) for x in inputs], number=1)
+            best[name] = min(best[name], seconds / len(inputs) * 1e6)
+    for name, micros in best.items():
+        print(f"{name:<10} {micros:8.2f} µs/analyze")
+    print(f"{'overhead':<10} {best['enabled'] - best['disabled']:8.2f} µs "
+          f"({(best['enabled'] / best['disabled'] - 1) * 100:.1f}%)")
+
+    metrics = Metrics(enabled=True)
+    noop = lambda: None
+    timed = metrics.timed("noop", noop)
+    base, wrapped = per_call(noop, 200_000), per_call(timed, 200_000)
+    print(f"{'per stage':<10} {wrapped - base:8.3f} µs (timer + histogram)")
+
+
+if __name__ == "__main__":
+    main()
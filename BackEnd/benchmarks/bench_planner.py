@@ -0,0 +1,105 @@
+"""
+بنچمارک برنامه‌ریز ارزیابی: گزاره‌های مشترک و ترتیب تطبیقی جمله‌ها
+
+برای پایگاه دانش پیش‌فرض و پایگاه‌های مصنوعی، روی دو توزیع ورودی (پخش یکنواخت با
+ورودی‌های مرزی، و ترافیک شبیه تولید متمرکز روی مقادیر معمول) سه kernel مقایسه می‌شوند:
+
+- base: compile_inference بدون برنامه‌ریز (ترتیب نوشته‌شده در پایگاه دانش)؛
+- cold: برنامه‌ریز بدون آمار (فقط مدل هزینه)؛
+- adapted: برنامه‌ریز پس از نمونه‌برداری و بازبینی ترتیب روی همان توزیع.
+
+نتیجه هر سه (bitmask، امتیازها و برچسب‌های فشرده) باید با مسیر مرحله‌ای یکسان باشد.
+
+    python benchmarks/bench_planner.py
+    python benchmarks/bench_planner.py --sizes 100,1000 --samples 2000
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from facts import compile_inference
+from inference import InferenceEngine, KnowledgeBase
+from planner import SAMPLE_EVERY, EvaluationPlanner
+from synthetic import production_inputs, random_inputs, synthetic_rules
+
+
+def result(inference) -> tuple:
+    return inference.mask, inference.visibility_score, inference.clickability_score, inference.labels
+
+
+def per_request(kernels, inputs, rounds: int = 9):
+    """بهترین زمان هر درخواست (میکروثانیه) برای هر kernel با اجرای یک‌درمیان"""
+    best = {name: float("inf") for name in kernels}
+    for _ in range(rounds):
+        for name, kernel in kernels.items():
+            elapsed = timeit.timeit(lambda: [kernel(x) for x in inputs], number=1)
+            best[name] = min(best[name], elapsed / len(inputs) * 1e6)
+    return best
+
+
+def adapt(engine: InferenceEngine, inputs, sample_every: int, replan_every: int) -> EvaluationPlanner:
+    """برنامه‌ریز تازه روی موتور که با ترافیک inputs آمار جمع کرده و ترتیب را بازبینی کرده است"""
+    planner = EvaluationPlanner(engine, sample_every, replan_every)
+    engine.planner, engine._kernel = planner, planner.compile()
+    while planner.replans < 3:
+        for x in inputs:
+            engine.infer(x)
+    with planner._lock:  # انتظار برای بازبینی در جریان (thread پس‌زمینه)
+        return planner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000", help="اندازه پایگاه‌های مصنوعی (جداشده با کاما)")
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--sample-every", type=int, default=8)
+    parser.add_argument("--replan-every", type=int, default=256)
+    parser.add_argument("--show-plan", action="store_true", help="چاپ برنامه نهایی پایگاه پیش‌فرض")
+    args = parser.parse_args()
+
+    knowledge = [("default", KnowledgeBase)]
+    for size in [int(part) for part in args.sizes.split(",") if part]:
+        knowledge.append((f"synthetic {size}", lambda size=size: KnowledgeBase(synthetic_rules(size, seed=size))))
+
+    print(f"{'knowledge':<16} {'inputs':<11} {'shared':>7} {'base µs':>9} {'cold µs':>9} {'adapted µs':>11} {'speedup':>8}")
+    for name, make_kb in knowledge:
+        for distribution in ("uniform", "production"):
+            engine = InferenceEngine(make_kb())
+            if distribution == "uniform":
+                inputs = random_inputs(args.samples, seed=3, engine=engine)
+            else:
+                inputs = production_inputs(args.samples, seed=3)
+
+            base = compile_inference(engine, engine.ordered_rules)
+            cold = EvaluationPlanner(engine, sample_every=0).compile()
+            planner = adapt(engine, inputs, args.sample_every, args.replan_every)
+            # زمان‌سنجی kernel تطبیق‌یافته بدون هزینه نمونه‌برداری، همان ترتیب نهایی
+            adapted = EvaluationPlanner(engine, sample_every=0)
+            adapted.true_counts, adapted.seen = list(planner.true_counts), planner.seen
+            # هزینه نمونه‌برداری با تنظیمات پیش‌فرض سرویس
+            sampling = EvaluationPlanner(engine)
+            sampling.true_counts, sampling.seen = list(planner.true_counts), planner.seen
+            kernels = {"base": base, "cold": cold, "adapted": adapted.compile(), "sampling": sampling.compile()}
+
+            for x in inputs:
+                expected = result(engine.infer_staged(x))
+                for kernel_name, kernel in kernels.items():
+                    assert result(kernel(x)) == expected, f"{name} {distribution} {kernel_name}: {x}"
+
+            timings = per_request(kernels, inputs)
+            print(f"{name:<16} {distribution:<11} {len(adapted.current.shared):>7} {timings['base']:9.2f} "
+                  f"{timings['cold']:9.2f} {timings['adapted']:11.2f} {timings['base'] / timings['adapted']:7.2f}x"
+                  f"   (sampling every {SAMPLE_EVERY}: {timings['sampling']:.2f} µs)")
+            if args.show_plan and name == "default" and distribution == "production":
+                print(json.dumps(planner.plan(), ensure_ascii=False, indent=2))
+
+    print(f"\nall kernels match the staged path ({args.samples} inputs per knowledge base and distribution)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+بنچمارک ارزیابی قوانین: حلقه lambda به ازای هر قانون (با try/except) در برابر
+تابع کامپایل‌شده کل مجموعه قوانین و ماسک NumPy.
+
+    python benchmarks/bench_rule_evaluation.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from main import LandingPageInput, expert_service
+
+
+def lambda_loop(rules, full_data):
+    """پیاده‌سازی قبلی forward_chaining: یک lambda و یک try/except برای هر قانون"""
+    activated = []
+    for rule, condition in rules:
+        try:
+            if condition(full_data):
+                activated.append(rule)
+        except:
+            continue
+    return activated
+
+
+def main():
+    kb = expert_service.kb
+    inputs = LandingPageInput(cta_position_y=900, cta_width=150, contrast_ratio=2.5,
+                              scroll_depth=40, cta_text_length=30).model_dump()
+    full_data = {**inputs, **expert_service.ie.converter.convert_inputs(inputs)}
+
+    # lambda های معادل شرط‌ها، همانند پیاده‌سازی قبلی
+    lambdas = [(rule, eval("lambda d: " + rule.condition.to_source("d", {}))) for rule in kb.rules]
+    assert lambda_loop(lambdas, full_data) == kb.evaluate(full_data)
+
+    number = 100_000
+    for name, fn in (
+        ("lambda loop", lambda: lambda_loop(lambdas, full_data)),
+        ("interpreted AST", lambda: [r for r in kb.rules if r.condition(full_data)]),
+        ("compiled", lambda: kb.evaluate(full_data)),
+    ):
+        seconds = min(timeit.repeat(fn, number=number, repeat=5))
+        print(f"{name:<16} {seconds / number * 1e6:8.2f} µs/request")
+
+    batch = 10_000
+    columns = {k: np.full(batch, v) for k, v in full_data.items()}
+    masks = expert_service.ve.rule_masks
+    seconds = min(timeit.repeat(lambda: masks(columns), number=20, repeat=5))
+    print(f"{'numpy masks':<16} {seconds / 20 / batch * 1e6:8.3f} µs/record (N={batch})")
+
+
+if __name__ == "__main__":
+    main()
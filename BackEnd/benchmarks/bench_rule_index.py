@@ -0,0 +1,51 @@
+"""
+بنچمارک مقیاس‌پذیری شاخص قوانین: زمان ارزیابی هر درخواست با تابع کامپایل‌شده
+(آزمون خطی همه قوانین) در برابر RuleIndex (فقط قوانین نامزد)، برای پایگاه دانش
+با 100 تا 30000 قانون.
+
+- segmented: قوانین تخصصی هر بخش (برچسب کیفی + بازه باریک) — هدف اصلی شاخص
+- random: آستانه‌های یک‌طرفه تصادفی (بدترین حالت؛ نیمی از قوانین نامزد می‌شوند)
+
+    python benchmarks/bench_rule_index.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from conditions import compile_rules
+from expert_system import InferenceEngine, KnowledgeBase
+from rule_index import RuleIndex
+from synthetic import random_inputs, segmented_rules, synthetic_rules
+
+SIZES = (16, 64, 100, 1_000, 10_000, 30_000)
+
+
+def per_request(evaluate, facts, budget: float = 0.3) -> float:
+    """بهترین میانگین زمان هر درخواست (میکروثانیه)"""
+    timer = timeit.Timer(lambda: [evaluate(d) for d in facts])
+    number = max(1, int(budget / max(timer.timeit(1), 1e-6)))
+    return min(timer.repeat(3, number)) / number / len(facts) * 1e6
+
+
+def main():
+    engine = InferenceEngine(KnowledgeBase())
+    facts = [{**x, **engine.converter.convert_inputs(x)} for x in random_inputs(200, seed=11, engine=engine)]
+
+    print(f"{'rules':<14} {'size':>7} {'linear µs':>11} {'index µs':>10} {'speedup':>8} {'candidates':>11}")
+    for name, generate in (("segmented", segmented_rules), ("random", synthetic_rules)):
+        for size in SIZES:
+            rules = generate(size, seed=size, engine=engine)
+            linear, index = compile_rules(rules), RuleIndex(rules)
+            assert all(linear(d) == index.evaluate(d) for d in facts)
+
+            linear_us, index_us = per_request(linear, facts), per_request(index.evaluate, facts)
+            candidates = sum(len(index.candidates(d)) for d in facts) / len(facts)
+            print(f"{name:<14} {size:>7} {linear_us:>11.2f} {index_us:>10.2f} "
+                  f"{linear_us / index_us:>7.1f}x {candidates:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
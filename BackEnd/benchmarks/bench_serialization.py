@@ -0,0 +1,95 @@
+"""
+بنچمارک سریال‌سازی پاسخ: مسیر پیش‌فرض FastAPI (اعتبارسنجی response_model +
+jsonable_encoder + JSONResponse) در برابر json استاندارد، orjson و ResponseEncoder
+با قطعات از پیش سریال‌شده قوانین؛ به همراه اندازه پاسخ UTF-8 در برابر escape \\u
+و زمان کامل درخواست HTTP.
+
+    python benchmarks/bench_serialization.py
+"""
+
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("EXPERT_CACHE_MAX_BYTES", "0")
+os.environ.setdefault("EXPERT_EXECUTOR", "inline")
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+import expert_system
+from expert_system import AnalysisResponse, ExpertSystemService, LandingPageInput
+from synthetic import random_inputs
+
+POOL = 500
+
+
+def per_item(fn, items, repeat: int = 7) -> float:
+    """بهترین زمان هر آیتم (میکروثانیه)"""
+    return min(timeit.repeat(lambda: [fn(x) for x in items], number=1, repeat=repeat)) / len(items) * 1e6
+
+
+def stdlib_json(content) -> bytes:
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fastapi_default(content) -> bytes:
+    model = AnalysisResponse.model_validate(content)
+    return JSONResponse(jsonable_encoder(model, exclude_none=True)).body
+
+
+def main():
+    service = ExpertSystemService()
+    snapshot = service.snapshot
+    inputs = [LandingPageInput(**x).model_dump() for x in random_inputs(POOL, seed=1, engine=service.ie)]
+    pairs = [(snapshot.ie.infer(x), x) for x in inputs]
+    responses = [service._build_response(inference, x) for inference, x in pairs]
+    assert all(service.analyze_json(x) == stdlib_json(r) for x, r in zip(inputs, responses))
+
+    encoder = snapshot.encoder
+    rows = [
+        ("fastapi response_model", lambda p: fastapi_default(service._build_response(*p))),
+        ("json (stdlib)", lambda p: stdlib_json(service._build_response(*p))),
+    ]
+    if expert_system.orjson is not None:
+        rows.append(("orjson", lambda p: expert_system.orjson.dumps(service._build_response(*p))))
+    rows.append(("ResponseEncoder", lambda p: encoder.encode(service._build_response(*p, None, encoder))))
+
+    print(f"build + serialize per response ({POOL} responses, orjson={'yes' if expert_system.orjson else 'no'})")
+    baseline = None
+    for name, fn in rows:
+        micros = per_item(fn, pairs)
+        baseline = baseline or micros
+        print(f"  {name:<24} {micros:8.2f} µs  x{baseline / micros:5.1f}")
+
+    utf8 = sum(len(stdlib_json(r)) for r in responses) / len(responses)
+    escaped = sum(len(json.dumps(r, separators=(",", ":")).encode()) for r in responses) / len(responses)
+    print(f"\nresponse size: {utf8:,.0f} B UTF-8 vs {escaped:,.0f} B \\u-escaped ({utf8 / escaped:.0%})")
+
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError:
+        print("\nhttp: skipped (httpx not installed)")
+        return
+
+    import main as app_module
+
+    # بازسازی endpoint پیشین: خروجی dict با اعتبارسنجی response_model و JSONResponse پیش‌فرض
+    @app_module.app.post("/bench/analyze-model", response_model=AnalysisResponse,
+                         response_model_exclude_none=True, response_class=JSONResponse)
+    async def analyze_model(input_data: LandingPageInput):
+        return app_module.expert_service.analyze(input_data.model_dump())
+
+    client = TestClient(app_module.app)
+    print("\nPOST per request (no cache, inline executor)")
+    for name, path in (("response_model + json", "/bench/analyze-model"), ("analyze_json", "/api/analyze")):
+        micros = per_item(lambda x: client.post(path, json=x), inputs[:200], repeat=5)
+        print(f"  {name:<24} {micros:8.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+بودجه راه‌اندازی سرد: زمان وارد کردن ماژول‌ها و زمان از اجرای سرور تا اولین پاسخ
+
+هر اندازه‌گیری در یک فرایند تازه پایتون (بدون کش ماژول) چند بار تکرار و میانه
+گزارش می‌شود:
+
+- وارد کردن هسته استنتاج (inference) و سرویس (expert_system) که نباید FastAPI،
+  Pydantic یا NumPy را وارد کنند؛
+- وارد کردن main (فقط تعریف‌ها؛ برنامه با create_app و دانش در lifespan ساخته می‌شود)؛
+- ساخت سرویس و اولین تحلیل در همان فرایند؛
+- از اجرای uvicorn main:app تا اولین پاسخ 200 از /api/analyze.
+
+با --check اگر هر مقدار از بودجه‌اش بیشتر باشد یا هسته وابستگی سنگینی وارد کند،
+کد خروج 1 است (برای CI).
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --check --repeat 7
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+# بودجه‌ها (میلی‌ثانیه)؛ FastAPI به تنهایی چند صد میلی‌ثانیه از main را می‌گیرد
+BUDGETS_MS = {
+    "import inference": 80,
+    "import expert_system": 150,
+    "import main": 1000,
+    "service + first analysis": 60,
+    "uvicorn to first response": 2500,
+}
+
+# ورودی پیش‌فرض LandingPageInput (بدون وارد کردن Pydantic در فرایند آزمون)
+INPUTS = {
+    "cta_position_y": 500, "cta_width": 200, "cta_height": 50, "contrast_ratio": 4.5,
+    "whitespace_around_cta": 40, "scroll_depth": 60, "cta_click_rate": 3.5, "number_of_ctas": 1,
+    "cta_text_length": 15, "time_to_cta": 8, "clickable_elements_before_cta": 3, "content_word_count": 300,
+    "similar_color_elements": 0, "largest_other_element_size": 8000, "cta_mobile_width": 200,
+    "cta_mobile_height": 48, "has_loading_animation": 1,
+}
+
+# ماژول‌هایی که هسته نباید وارد کند
+HEAVY_MODULES = ("fastapi", "starlette", "pydantic", "numpy", "yaml")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+result = {{"ms": elapsed * 1000, "heavy": [m for m in {heavy!r} if m in sys.modules]}}
+if {first_analysis!r}:
+    start = time.perf_counter()
+    service = {module}.ExpertSystemService()
+    service.analyze_json({inputs!r})
+    result["analysis_ms"] = (time.perf_counter() - start) * 1000
+print(json.dumps(result))
+"""
+
+
+def probe(module: str, first_analysis: bool = False) -> dict:
+    code = PROBE.format(module=module, heavy=HEAVY_MODULES, first_analysis=first_analysis, inputs=INPUTS)
+    output = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def first_response_ms() -> float:
+    """از اجرای uvicorn main:app تا اولین پاسخ 200 از /api/analyze"""
+    import http.client
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    env = dict(os.environ, EXPERT_RULES_POLL="0", EXPERT_CACHE_MAX_BYTES="0")
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env,
+    )
+    try:
+        while time.perf_counter() - start < 30:
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+                conn.request("POST", "/api/analyze", body="{}", headers={"Content-Type": "application/json"})
+                if conn.getresponse().status == 200:
+                    return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError("سرور در 30 ثانیه پاسخ نداد")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="کد خروج 1 در صورت عبور از بودجه")
+    args = parser.parse_args()
+
+    samples = {name: [] for name in BUDGETS_MS}
+    heavy = {}
+    for _ in range(args.repeat):
+        for module in ("inference", "expert_system"):
+            result = probe(module, first_analysis=module == "expert_system")
+            samples[f"import {module}"].append(result["ms"])
+            heavy[module] = result["heavy"]
+            if "analysis_ms" in result:
+                samples["service + first analysis"].append(result["analysis_ms"])
+        samples["import main"].append(probe("main")["ms"])
+        samples["uvicorn to first response"].append(first_response_ms())
+
+    failed = []
+    print(f"cold start (median of {args.repeat} fresh processes)")
+    print(f"  {'step':<28} {'median':>10} {'max':>10} {'budget':>10}")
+    for name, values in samples.items():
+        median = statistics.median(values)
+        status = "ok" if median <= BUDGETS_MS[name] else "OVER"
+        if status != "ok":
+            failed.append(name)
+        print(f"  {name:<28} {median:8.1f}ms {max(values):8.1f}ms {BUDGETS_MS[name]:8d}ms  {status}")
+
+    for module, modules in heavy.items():
+        if modules:
+            failed.append(f"{module} imports {', '.join(modules)}")
+            print(f"  {module} imports heavy modules: {', '.join(modules)}")
+
+    if args.check and failed:
+        sys.exit(f"over budget: {'; '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+بنچمارک تحلیل Monte Carlo: درستی در برابر موتور اسکالر، تکرارپذیری و زمان
+
+1. نمونه‌های یک seed دوباره ساخته و تک‌تک با ie.infer تحلیل می‌شوند؛ احتمال قوانین،
+   خلاصه امتیازها، توزیع CF و احتمال برچسب‌ها باید با simulate یکسان باشد؛
+2. یک seed همیشه همان پاسخ را می‌دهد؛
+3. زمان simulate برای 10k تا 1M نمونه (هدف: 100k نمونه روی یک هسته زیر یک ثانیه).
+
+    python benchmarks/bench_uncertainty.py
+    python benchmarks/bench_uncertainty.py --sizes 100000 --check-samples 5000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from expert_system import ExpertSystemService, LandingPageInput
+from inference import InferenceEngine
+from uncertainty import DEFAULT_PERCENTILES, _summary
+
+# فیلدهای analytics نویزی و چند فیلد طراحی با خطای اندازه‌گیری
+DISTRIBUTIONS = {
+    "scroll_depth": {"mean": 55, "stddev": 15, "min": 0, "max": 100},
+    "cta_click_rate": {"mean": 3.0, "stddev": 1.0, "min": 0},
+    "time_to_cta": {"samples": [3, 4, 6, 6, 8, 9, 12, 15, 20]},
+    "contrast_ratio": {"mean": 4.2, "stddev": 0.8, "min": 1},
+    "cta_width": {"mean": 190, "stddev": 25},
+    "cta_position_y": {"mean": 650, "stddev": 150, "min": 0},
+}
+
+
+def expected(engine: InferenceEngine, cols, n: int) -> dict:
+    """همان خروجی simulate با تحلیل اسکالر تک‌تک نمونه‌ها"""
+    names = list(cols)
+    visibility, clickability, certainty = [], [], []
+    fired = dict.fromkeys((rule.id for rule in engine.ordered_rules), 0)
+    labels = {}
+    for row in zip(*(cols[name].tolist() for name in names)):
+        inference = engine.infer(dict(zip(names, row)))
+        visibility.append(inference.visibility_score)
+        clickability.append(inference.clickability_score)
+        activations = inference.activations
+        certainty.append(activations.certainty)
+        for rule_id in activations.ids:
+            fired[rule_id] += 1
+        for name, value in inference.qualitative_inputs().items():
+            counts = labels.setdefault(name, {})
+            counts[value] = counts.get(value, 0) + 1
+
+    certainty = np.array(certainty)
+    values, counts = np.unique(certainty, return_counts=True)
+    return {
+        "visibility_score": _summary(np.array(visibility), list(DEFAULT_PERCENTILES), 2),
+        "clickability_score": _summary(np.array(clickability), list(DEFAULT_PERCENTILES), 2),
+        "overall_certainty": {
+            **_summary(certainty, list(DEFAULT_PERCENTILES), 4),
+            "distribution": [{"value": v, "probability": round(c / n, 4)}
+                             for v, c in zip(values.tolist(), counts.tolist())],
+        },
+        "rule_probabilities": {rule_id: round(count / n, 4) for rule_id, count in fired.items()},
+        "qualitative": {
+            name: {value: round(count / n, 4) for value, count in counts.items()} for name, counts in labels.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="تعداد نمونه‌ها (جداشده با کاما)")
+    parser.add_argument("--check-samples", type=int, default=3000, help="نمونه‌های بررسی با موتور اسکالر")
+    args = parser.parse_args()
+
+    service = ExpertSystemService()
+    snapshot = service.snapshot
+    inputs = LandingPageInput().model_dump()
+
+    # ---------- درستی ----------
+    n = args.check_samples
+    result = service.uncertainty(inputs, DISTRIBUTIONS, n, seed=11)
+    specs = {name: {**spec, "integer": isinstance(inputs[name], int)} for name, spec in DISTRIBUTIONS.items()}
+    reference = expected(snapshot.ie, snapshot.uncertainty.columns(inputs, specs, n, 11), n)
+    for section, value in reference.items():
+        if section == "qualitative":
+            value = {name: dict(sorted(counts.items())) for name, counts in value.items()}
+            actual = {name: dict(sorted(counts.items())) for name, counts in result[section].items()}
+        else:
+            actual = result[section]
+        assert actual == value, f"{section}: {actual} != {value}"
+    print(f"scalar check: {n} samples, simulate matches ie.infer per sample")
+
+    assert service.uncertainty(inputs, DISTRIBUTIONS, n, seed=11) == result
+    assert service.uncertainty(inputs, DISTRIBUTIONS, n, seed=12) != result
+    print("seeding: same seed -> identical result, different seed -> different result")
+
+    # ---------- زمان ----------
+    print(f"\nsimulate ({len(DISTRIBUTIONS)} noisy fields, {len(snapshot.kb.rules)} rules)")
+    for size in [int(part) for part in args.sizes.split(",") if part]:
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            service.uncertainty(inputs, DISTRIBUTIONS, size, seed=1)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(f"  {size:>9,} samples {best * 1000:9.1f} ms  {best / size * 1e9:7.1f} ns/sample")
+        if size == 100_000:
+            assert best < 1.0, "100k samples should take well under a second"
+
+
+if __name__ == "__main__":
+    main()
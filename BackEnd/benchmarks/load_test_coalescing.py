@@ -0,0 +1,148 @@
+"""
+تست بار: اثر single-flight و micro-batching بر توان عملیاتی /api/analyze
+
+serve.py با یک worker و کش نتایج خاموش اجرا می‌شود تا فقط ادغام درخواست‌ها سنجیده
+شود. دو سناریو:
+
+- identical: همه کلاینت‌ها یک payload یکسان می‌فرستند (انتشار کمپین)؛
+- distinct: payload ها تصادفی و متفاوت‌اند.
+
+برای هر سناریو چهار پیکربندی مقایسه می‌شود: بدون ادغام، فقط single-flight، فقط
+micro-batching و هر دو. شمارنده‌های /api/cache/stats (coalesced و batched) پس از
+هر اجرا گزارش می‌شوند.
+
+روی ماشین کم‌هسته، کلاینت‌ها و پردازش HTTP بیشتر زمان CPU را می‌گیرند و اثر ادغام
+در توان کل پنهان می‌ماند؛ با --in-process همان مسیر cached_analysis بدون شبکه با
+چند درخواست همزمان در event loop همین فرایند سنجیده می‌شود (هزینه سمت سرور).
+
+    python benchmarks/load_test_coalescing.py --clients 4 --connections 16 --duration 10
+    python benchmarks/load_test_coalescing.py --window-ms 2 --scenarios distinct
+    python benchmarks/load_test_coalescing.py --in-process --connections 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from load_test_health import connect, request
+from load_test_workers import free_port, measure, start_server, stop_server
+from synthetic import random_inputs
+
+SCENARIOS = ("identical", "distinct")
+
+
+def configurations(window_ms: str):
+    """(نام، متغیرهای محیطی) هر پیکربندی"""
+    return [
+        ("off", {"EXPERT_SINGLE_FLIGHT": "0", "EXPERT_BATCH_WINDOW_MS": "0"}),
+        ("single-flight", {"EXPERT_SINGLE_FLIGHT": "1", "EXPERT_BATCH_WINDOW_MS": "0"}),
+        ("micro-batch", {"EXPERT_SINGLE_FLIGHT": "0", "EXPERT_BATCH_WINDOW_MS": window_ms}),
+        ("both", {"EXPERT_SINGLE_FLIGHT": "1", "EXPERT_BATCH_WINDOW_MS": window_ms}),
+    ]
+
+
+def counters(url: str) -> dict:
+    conn = connect(url)
+    conn.request("GET", "/api/cache/stats")
+    stats = json.loads(conn.getresponse().read())
+    return {"coalesced": stats["single_flight"]["coalesced"],
+            "average_batch": stats["micro_batch"]["average_batch"]}
+
+
+def measure_in_process(payloads: list, concurrency: int, duration: float, settings: dict) -> dict:
+    """درخواست‌های همزمان cached_analysis در event loop همین فرایند (بدون HTTP و با کش خاموش)"""
+    import main as app_module
+    from expert_system import LandingPageInput
+
+    app_module.result_cache.max_bytes = 0
+    app_module.single_flight.enabled = settings["EXPERT_SINGLE_FLIGHT"] != "0"
+    app_module.micro_batcher.window = float(settings["EXPERT_BATCH_WINDOW_MS"]) / 1000
+    inputs = [LandingPageInput(**json.loads(payload)).model_dump() for payload in payloads]
+
+    async def run(seconds: float) -> int:
+        done = 0
+        deadline = time.perf_counter() + seconds
+
+        async def requester(offset: int):
+            nonlocal done
+            i = offset
+            while time.perf_counter() < deadline:
+                await app_module.cached_analysis("analyze", app_module._analyze_json, inputs[i % len(inputs)], None)
+                done += 1
+                i += concurrency
+
+        await asyncio.gather(*(requester(k) for k in range(concurrency)))
+        return done
+
+    asyncio.run(run(min(0.5, duration)))  # گرم شدن
+    before = app_module.single_flight.coalesced, app_module.micro_batcher.batches, app_module.micro_batcher.batched
+    done = asyncio.run(run(duration))
+    batches = app_module.micro_batcher.batches - before[1]
+    return {
+        "rps": round(done / duration, 1),
+        "coalesced": app_module.single_flight.coalesced - before[0],
+        "average_batch": round((app_module.micro_batcher.batched - before[2]) / batches, 2) if batches else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=4, help="فرایندهای کلاینت")
+    parser.add_argument("--connections", type=int, default=16, help="اتصال‌های همزمان هر فرایند کلاینت")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--window-ms", default="1", help="پنجره micro-batching (میلی‌ثانیه)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--in-process", action="store_true",
+                        help="سنجش سمت سرور بدون HTTP (همزمانی = clients x connections)")
+    args = parser.parse_args()
+
+    payloads = {
+        "identical": [json.dumps(random_inputs(1, seed=3)[0])] * max(1, args.clients),
+        "distinct": [json.dumps(x) for x in random_inputs(4096, seed=7)],
+    }
+
+    mode = "in-process" if args.in_process else "http"
+    print(f"cpus={os.cpu_count()} clients={args.clients}x{args.connections} "
+          f"duration={args.duration}s window={args.window_ms}ms cache=off mode={mode}")
+    for scenario in args.scenarios.split(","):
+        if scenario not in payloads:
+            sys.exit(f"سناریوی ناشناخته: {scenario}")
+        print(f"\n{scenario}")
+        if args.in_process:
+            print(f"  {'config':<14} {'req/s':>9} {'gain':>7} {'coalesced':>10} {'avg batch':>10}")
+        else:
+            print(f"  {'config':<14} {'req/s':>9} {'gain':>7} {'p50':>9} {'p99':>9} {'coalesced':>10} {'avg batch':>10}")
+        baseline = None
+        for name, settings in configurations(args.window_ms):
+            if args.in_process:
+                result = measure_in_process(payloads[scenario], args.clients * args.connections,
+                                            args.duration, settings)
+                baseline = baseline or result["rps"]
+                print(f"  {name:<14} {result['rps']:9.1f} {result['rps'] / baseline:6.2f}x "
+                      f"{result['coalesced']:>10} {result['average_batch']:>10}")
+                continue
+
+            port = free_port()
+            process, _ = start_server(1, port, cache=False, settings=settings)
+            try:
+                url = f"http://127.0.0.1:{port}"
+                request(connect(url), "POST", "/api/analyze", payloads[scenario][0])
+                measure(url, payloads[scenario], args.clients, args.connections, min(1.0, args.duration))  # گرم شدن
+                result = measure(url, payloads[scenario], args.clients, args.connections, args.duration)
+                seen = counters(url)
+            finally:
+                stop_server(process)
+            baseline = baseline or result["rps"]
+            print(f"  {name:<14} {result['rps']:9.1f} {result['rps'] / baseline:6.2f}x "
+                  f"{result['p50_ms']:7.2f}ms {result['p99_ms']:7.2f}ms "
+                  f"{seen['coalesced']:>10} {seen['average_batch']:>10}")
+
+
+if __name__ == "__main__":
+    main()
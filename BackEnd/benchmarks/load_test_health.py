@@ -0,0 +1,99 @@
+"""
+تست بار: تأخیر /api/health هنگام اشباع سرور با درخواست‌های /api/analyze
+
+ابتدا تأخیر health بدون بار اندازه‌گیری می‌شود، سپس همزمان با ارسال پیوسته
+درخواست‌های analyze از چند نخ. اگر تحلیل event loop را مسدود کند، p99 سلامت
+به شدت بالا می‌رود؛ با اجرای تحلیل روی pool باید تقریباً ثابت بماند.
+
+    uvicorn main:app --port 8000                       # EXPERT_EXECUTOR=thread|process|inline
+    python benchmarks/load_test_health.py --url http://127.0.0.1:8000 --concurrency 32
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlparse
+
+PAYLOAD = json.dumps({
+    "cta_position_y": 950, "cta_width": 150, "cta_height": 40, "contrast_ratio": 2.0,
+    "whitespace_around_cta": 20, "scroll_depth": 30, "cta_click_rate": 1.0, "number_of_ctas": 3,
+    "cta_text_length": 32, "time_to_cta": 15, "clickable_elements_before_cta": 9,
+    "content_word_count": 900, "similar_color_elements": 4, "largest_other_element_size": 20000,
+    "cta_mobile_width": 120, "cta_mobile_height": 30, "has_loading_animation": 0,
+})
+
+
+def connect(url: str) -> http.client.HTTPConnection:
+    parsed = urlparse(url)
+    return http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+
+
+def request(conn: http.client.HTTPConnection, method: str, path: str, body: str = None) -> float:
+    """ارسال درخواست و برگرداندن زمان پاسخ (ثانیه)"""
+    start = time.perf_counter()
+    conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    response.read()
+    if response.status != 200:
+        raise RuntimeError(f"{method} {path} -> {response.status}")
+    return time.perf_counter() - start
+
+
+def probe_health(url: str, duration: float, interval: float) -> list:
+    """اندازه‌گیری دوره‌ای تأخیر /api/health"""
+    conn = connect(url)
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        latencies.append(request(conn, "GET", "/api/health"))
+        time.sleep(interval)
+    return latencies
+
+
+def analyze_worker(url: str, stop: threading.Event, counter: list):
+    conn = connect(url)
+    while not stop.is_set():
+        request(conn, "POST", "/api/analyze", PAYLOAD)
+        counter[0] += 1
+
+
+def percentiles(latencies: list) -> dict:
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {"p50_ms": round(pick(0.50), 2), "p99_ms": round(pick(0.99), 2),
+            "mean_ms": round(statistics.mean(ordered) * 1000, 2), "samples": len(ordered)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--interval", type=float, default=0.01)
+    args = parser.parse_args()
+
+    idle = probe_health(args.url, args.duration / 2, args.interval)
+
+    stop = threading.Event()
+    counter = [0]
+    workers = [threading.Thread(target=analyze_worker, args=(args.url, stop, counter), daemon=True)
+               for _ in range(args.concurrency)]
+    for worker in workers:
+        worker.start()
+    time.sleep(1.0)  # گرم شدن
+    counter[0] = 0
+    loaded = probe_health(args.url, args.duration, args.interval)
+    stop.set()
+
+    print(json.dumps({
+        "health_idle": percentiles(idle),
+        "health_under_load": percentiles(loaded),
+        "analyze_throughput_rps": round(counter[0] / args.duration, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+تست بار: توان عملیاتی /api/analyze بر حسب تعداد worker های serve.py
+
+برای هر تعداد worker، serve.py روی یک پورت آزاد اجرا می‌شود، زمان تا اولین پاسخ
+/api/health (راه‌اندازی با دانش پیش‌ساخته) ثبت می‌شود و سپس چند فرایند کلاینت
+(هر کدام چند اتصال keep-alive همزمان) به مدت ثابت درخواست analyze می‌فرستند. کلاینت‌ها
+فرایند جداگانه‌اند تا خود مولد بار گلوگاه نشود؛ روی ماشین چند هسته‌ای تعداد
+هسته‌ها باید از workers + clients بیشتر باشد تا مقیاس‌پذیری دیده شود.
+
+به صورت پیش‌فرض کش نتایج خاموش است و ورودی‌ها تصادفی‌اند (سنجش محاسبه)؛ با
+--cache کش مشترک SQLite روشن و ورودی‌ها از یک مجموعه کوچک تکراری انتخاب می‌شوند.
+
+    python benchmarks/load_test_workers.py --workers 1,2,4,8 --clients 8 --duration 10
+    python benchmarks/load_test_workers.py --workers 1,4 --cache
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from load_test_health import connect, percentiles, request
+from synthetic import random_inputs
+
+BACKEND = Path(__file__).resolve().parent.parent
+STARTUP_TIMEOUT = 60.0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, cache: bool, settings: Optional[Dict[str, str]] = None):
+    """اجرای serve.py و انتظار تا اولین پاسخ سالم؛ (فرایند، ثانیه تا آماده شدن)"""
+    env = dict(os.environ, EXPERT_RULES_POLL="0", **(settings or {}))
+    if cache:
+        env["EXPERT_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="expert-cache-"), "cache.sqlite")
+    else:
+        env["EXPERT_CACHE_MAX_BYTES"] = "0"
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port),
+         "--no-access-log", "--log-level", "warning"],
+        cwd=BACKEND, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    while time.perf_counter() - start < STARTUP_TIMEOUT:
+        if process.poll() is not None:
+            raise RuntimeError(f"serve.py خارج شد با کد {process.returncode}")
+        try:
+            request(connect(url), "GET", "/api/health")
+            return process, time.perf_counter() - start
+        except (OSError, RuntimeError):
+            time.sleep(0.05)
+    stop_server(process)
+    raise RuntimeError("serve.py در زمان مقرر آماده نشد")
+
+
+def stop_server(process: subprocess.Popen):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def client(url: str, payloads: list, connections: int, duration: float, queue):
+    """یک فرایند کلاینت: هر اتصال keep-alive در یک thread تا پایان مدت درخواست می‌فرستد"""
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    def run(offset: int):
+        conn = connect(url)
+        i = offset
+        while time.perf_counter() < deadline:
+            latencies.append(request(conn, "POST", "/api/analyze", payloads[i % len(payloads)]))
+            i += connections
+
+    threads = [threading.Thread(target=run, args=(k,)) for k in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.put(latencies)
+
+
+def measure(url: str, payloads: list, clients: int, connections: int, duration: float) -> dict:
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    processes = [
+        context.Process(target=client, args=(url, payloads[k::clients], connections, duration, queue))
+        for k in range(clients)
+    ]
+    for process in processes:
+        process.start()
+    latencies = [latency for _ in processes for latency in queue.get()]
+    for process in processes:
+        process.join()
+    return {"rps": round(len(latencies) / duration, 1), **percentiles(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="تعداد worker ها (جداشده با کاما)")
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 1, help="فرایندهای کلاینت")
+    parser.add_argument("--connections", type=int, default=4, help="اتصال‌های هر فرایند کلاینت")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--cache", action="store_true", help="کش مشترک روشن و ورودی‌های تکراری")
+    args = parser.parse_args()
+
+    pool = 64 if args.cache else 4096
+    payloads = [json.dumps(x) for x in random_inputs(pool, seed=7)]
+    payloads = payloads * max(1, args.clients)
+
+    print(f"cpus={os.cpu_count()} clients={args.clients}x{args.connections} "
+          f"duration={args.duration}s cache={'shared' if args.cache else 'off'}")
+    print(f"  {'workers':>7} {'startup':>9} {'req/s':>9} {'speedup':>8} {'p50':>9} {'p99':>9}")
+    baseline = None
+    for workers in [int(part) for part in args.workers.split(",")]:
+        port = free_port()
+        process, startup = start_server(workers, port, args.cache)
+        try:
+            url = f"http://127.0.0.1:{port}"
+            measure(url, payloads, args.clients, args.connections, min(2.0, args.duration))  # گرم شدن
+            result = measure(url, payloads, args.clients, args.connections, args.duration)
+        finally:
+            stop_server(process)
+        baseline = baseline or result["rps"]
+        print(f"  {workers:>7} {startup * 1000:7.0f}ms {result['rps']:9.1f} {result['rps'] / baseline:7.2f}x "
+              f"{result['p50_ms']:7.2f}ms {result['p99_ms']:7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""
+مجموعه بنچمارک سیستم خبره: هر مرحله ExpertSystemService.analyze، سرویس کامل،
+لایه HTTP (کلاینت ASGI محلی) و مقیاس‌پذیری با پایگاه دانش بزرگ‌شده.
+
+نتایج به صورت JSON ذخیره می‌شوند تا اجراها قابل مقایسه باشند؛ با --baseline
+میانه هر بنچمارک با اجرای مرجع مقایسه و افت بیش از آستانه گزارش می‌شود
+(کد خروج 1).
+
+    python benchmarks/run_suite.py                                  # همه
+    python benchmarks/run_suite.py -k stage --repeat 7
+    python benchmarks/run_suite.py --quick -o before.json
+    python benchmarks/run_suite.py --baseline before.json --threshold 0.15
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# لایه HTTP بدون کش و بدون pool سنجیده می‌شود تا فقط هزینه خود درخواست دیده شود
+os.environ.setdefault("EXPERT_CACHE_MAX_BYTES", "0")
+os.environ.setdefault("EXPERT_EXECUTOR", "inline")
+
+import numpy as np
+
+from expert_system import ExpertSystemService, InferenceEngine, KnowledgeBase, VectorizedEvaluator, render_json
+from synthetic import random_inputs, synthetic_rules
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+SCALING_SIZES = (100, 1_000, 10_000)
+INPUT_POOL = 1_000
+BATCH_SIZE = 1_000
+
+# نام ← (تابع آماده‌سازی که (fn, تعداد آیتم در هر فراخوانی) برمی‌گرداند، برچسب‌ها)
+BENCHMARKS: Dict[str, Tuple[Callable[[], Tuple[Callable, int]], Tuple[str, ...]]] = {}
+
+
+def benchmark(name: str, *tags: str):
+    """ثبت یک بنچمارک؛ تابع آماده‌سازی خارج از زمان‌سنجی اجرا می‌شود"""
+    def register(setup):
+        BENCHMARKS[name] = (setup, tags)
+        return setup
+    return register
+
+
+# ==================== Shared Fixtures ====================
+
+_service = None
+
+
+def service() -> ExpertSystemService:
+    global _service
+    if _service is None:
+        _service = ExpertSystemService()
+    return _service
+
+
+def cycling(items: List) -> Callable:
+    """تابعی که در هر فراخوانی آیتم بعدی را (به صورت چرخشی) برمی‌گرداند"""
+    return itertools.cycle(items).__next__
+
+
+def inputs_pool() -> List[Dict]:
+    return random_inputs(INPUT_POOL, seed=1, engine=service().ie)
+
+
+# ==================== Stage Benchmarks ====================
+
+@benchmark("stage.convert_inputs", "stage")
+def _():
+    converter = service().ie.converter
+    nxt = cycling(inputs_pool())
+    return lambda: converter.convert_inputs(nxt()), 1
+
+
+@benchmark("stage.evaluate_rules", "stage")
+def _():
+    ie = service().ie
+    nxt = cycling([{**x, **ie.converter.convert_inputs(x)} for x in inputs_pool()])
+    return lambda: ie.kb.evaluate(nxt()), 1
+
+
+@benchmark("stage.scores", "stage")
+def _():
+    ie = service().ie
+    nxt = cycling(inputs_pool())
+
+    def run():
+        inputs = nxt()
+        return ie._calculate_visibility_score(inputs), ie._calculate_clickability_score(inputs)
+    return run, 1
+
+
+@benchmark("stage.certainty_and_recommendations", "stage")
+def _():
+    ie = service().ie
+    nxt = cycling([ie.forward_chaining(x)["activated_rules"] for x in inputs_pool()])
+
+    def run():
+        activated = nxt()
+        return ie._calculate_combined_certainty(activated), ie._generate_recommendations(activated)
+    return run, 1
+
+
+@benchmark("stage.explanation", "stage")
+def _():
+    svc = service()
+    nxt = cycling([(svc.ie.forward_chaining(x), x) for x in inputs_pool()])
+    return lambda: svc.ef.generate_explanation(*nxt()), 1
+
+
+@benchmark("stage.summary", "stage")
+def _():
+    svc = service()
+    nxt = cycling([svc.ie.forward_chaining(x) for x in inputs_pool()])
+    return lambda: svc._create_summary(nxt()), 1
+
+
+@benchmark("stage.serialize", "stage")
+def _():
+    svc = service()
+    nxt = cycling([svc.analyze(x) for x in inputs_pool()])
+    return lambda: render_json(nxt()), 1
+
+
+# ==================== Service Benchmarks ====================
+
+@benchmark("service.forward_chaining", "service")
+def _():
+    ie = service().ie
+    nxt = cycling(inputs_pool())
+    return lambda: ie.forward_chaining(nxt()), 1
+
+
+@benchmark("service.infer", "service")
+def _():
+    ie = service().ie
+    nxt = cycling(inputs_pool())
+    return lambda: ie.infer(nxt()), 1
+
+
+@benchmark("service.analyze", "service")
+def _():
+    svc = service()
+    nxt = cycling(inputs_pool())
+    return lambda: svc.analyze(nxt()), 1
+
+
+@benchmark("service.analyze_json", "service")
+def _():
+    svc = service()
+    nxt = cycling(inputs_pool())
+    return lambda: svc.analyze_json(nxt()), 1
+
+
+@benchmark("service.analyze_batch", "service")
+def _():
+    svc = service()
+    batch = random_inputs(BATCH_SIZE, seed=2, engine=svc.ie)
+    return lambda: svc.analyze_batch(batch), BATCH_SIZE
+
+
+# همه فیلدهای عددی LandingPageInput قابل تغییر در یک بازه گسترده (بدترین حالت جستجو)
+OPTIMIZE_FIELDS = {
+    "cta_position_y": {"min": 0, "max": 2000, "unit_cost": 0.001},
+    "cta_width": {"min": 50, "max": 500, "unit_cost": 0.01},
+    "cta_height": {"min": 20, "max": 120, "unit_cost": 0.01},
+    "contrast_ratio": {"min": 1, "max": 21, "unit_cost": 0.1},
+    "whitespace_around_cta": {"min": 0, "max": 200},
+    "number_of_ctas": {"min": 1, "max": 10},
+    "cta_text_length": {"min": 1, "max": 60},
+    "clickable_elements_before_cta": {"min": 0, "max": 20},
+    "similar_color_elements": {"min": 0, "max": 10},
+    "largest_other_element_size": {"min": 0, "max": 50000, "unit_cost": 0.0001},
+    "cta_mobile_width": {"min": 50, "max": 400},
+    "cta_mobile_height": {"min": 20, "max": 100},
+    "has_loading_animation": {"min": 0, "max": 1},
+}
+
+
+@benchmark("service.optimize", "service")
+def _():
+    svc = service()
+    nxt = cycling(inputs_pool()[:50])
+    return lambda: svc.optimize(nxt(), OPTIMIZE_FIELDS), 1
+
+
+@benchmark("service.sensitivity", "service")
+def _():
+    svc = service()
+    nxt = cycling(inputs_pool())
+    return lambda: svc.sensitivity(nxt()), 1
+
+
+@benchmark("service.uncertainty_100k", "service")
+def _():
+    svc = service()
+    inputs = inputs_pool()[0]
+    distributions = {
+        "scroll_depth": {"mean": 55, "stddev": 15, "min": 0, "max": 100},
+        "cta_click_rate": {"mean": 3.0, "stddev": 1.0, "min": 0},
+        "time_to_cta": {"samples": [3, 6, 8, 12, 20]},
+    }
+    return lambda: svc.uncertainty(inputs, distributions, 100_000, seed=1), 1
+
+
+@benchmark("service.query_clickability", "service")
+def _():
+    svc = service()
+    nxt = cycling(inputs_pool())
+    goal = frozenset({"clickability"})
+    return lambda: svc.query(nxt(), goal), 1
+
+
+# ==================== HTTP Benchmarks ====================
+
+def _client():
+    """کلاینت ASGI محلی (نیازمند httpx)"""
+    from fastapi.testclient import TestClient
+    import main
+    return TestClient(main.app)
+
+
+def _http_post(path: str, payloads: List) -> Callable:
+    client = _client()
+    nxt = cycling(payloads)
+
+    def run():
+        response = client.post(path, json=nxt())
+        assert response.status_code == 200, response.text
+    return run
+
+
+@benchmark("http.analyze", "http")
+def _():
+    return _http_post("/api/analyze", inputs_pool()), 1
+
+
+@benchmark("http.analyze_simple", "http")
+def _():
+    return _http_post("/api/analyze/simple", inputs_pool()), 1
+
+
+@benchmark("http.analyze_batch", "http")
+def _():
+    pool = inputs_pool()
+    payloads = [{"items": pool[i:i + 100]} for i in range(0, len(pool), 100)]
+    return _http_post("/api/analyze/batch", payloads), 100
+
+
+@benchmark("http.optimize", "http")
+def _():
+    payloads = [{"inputs": x, "fields": OPTIMIZE_FIELDS} for x in inputs_pool()[:50]]
+    return _http_post("/api/optimize", payloads), 1
+
+
+# ==================== Scaling Benchmarks ====================
+
+def _scaled_engine(size: int) -> InferenceEngine:
+    return InferenceEngine(KnowledgeBase(synthetic_rules(size, seed=size)))
+
+
+def register_scaling(size: int):
+    """بنچمارک‌های کامپایل، استنتاج تکی و دسته‌ای برای پایگاه دانش با size قانون"""
+    tags = ("scaling", f"{size}_rules")
+
+    @benchmark(f"scaling.{size}_rules.compile", *tags)
+    def _():
+        rules = synthetic_rules(size, seed=size)
+        return lambda: KnowledgeBase(rules), 1
+
+    @benchmark(f"scaling.{size}_rules.forward_chaining", *tags)
+    def _():
+        engine = _scaled_engine(size)
+        nxt = cycling(random_inputs(INPUT_POOL, seed=3, engine=engine))
+        return lambda: engine.forward_chaining(nxt()), 1
+
+    @benchmark(f"scaling.{size}_rules.batch", *tags)
+    def _():
+        engine = _scaled_engine(size)
+        evaluator = VectorizedEvaluator(engine)
+        batch = random_inputs(BATCH_SIZE, seed=4, engine=engine)
+        return lambda: evaluator.evaluate(batch), BATCH_SIZE
+
+
+for _size in SCALING_SIZES:
+    register_scaling(_size)
+
+
+# ==================== Runner ====================
+
+def measure(fn: Callable, items: int, repeat: int, min_time: float) -> Dict:
+    """زمان‌سنجی با تعداد تکرار خودکار؛ آمار بر حسب میکروثانیه به ازای هر فراخوانی"""
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+
+    per_call = [t / number * 1e6 for t in timer.repeat(repeat, number)]
+    median = statistics.median(per_call)
+    return {
+        "median_us": round(median, 3),
+        "min_us": round(min(per_call), 3),
+        "stdev_us": round(statistics.stdev(per_call), 3) if len(per_call) > 1 else 0.0,
+        "per_item_us": round(median / items, 4),
+        "items_per_call": items,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def environment() -> Dict:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).resolve().parent, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "kb_version": service().version,
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """مقایسه میانه‌ها با اجرای مرجع؛ نسبت بیش از 1+threshold یعنی افت"""
+    rows = []
+    for name, result in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if not reference or "median_us" not in result or "median_us" not in reference:
+            continue
+        ratio = result["median_us"] / reference["median_us"]
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({"name": name, "baseline_us": reference["median_us"],
+                     "current_us": result["median_us"], "ratio": round(ratio, 3), "status": status})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--filter", default="", help="فقط بنچمارک‌هایی که نام یا برچسبشان شامل این متن است")
+    parser.add_argument("--quick", action="store_true", help="بدون مقیاس 10000 قانون، با زمان کمتر")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="حداقل زمان هر اندازه‌گیری (ثانیه)")
+    parser.add_argument("-o", "--output", help="مسیر JSON نتایج (پیش‌فرض benchmarks/results/<زمان>.json)")
+    parser.add_argument("--baseline", help="JSON اجرای مرجع برای تشخیص افت کارایی")
+    parser.add_argument("--threshold", type=float, default=0.15, help="آستانه نسبی افت (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.min_time = min(args.min_time, 0.05)
+        args.repeat = min(args.repeat, 3)
+
+    results = {}
+    for name, (setup, tags) in BENCHMARKS.items():
+        if args.filter and args.filter not in name and args.filter not in tags:
+            continue
+        if args.quick and "10000_rules" in tags:
+            continue
+
+        try:
+            fn, items = setup()
+        except ImportError as e:
+            results[name] = {"skipped": f"وابستگی موجود نیست: {e.name}"}
+            print(f"{name:<44} skipped ({e.name} not installed)")
+            continue
+
+        results[name] = measure(fn, items, args.repeat, args.min_time)
+        r = results[name]
+        print(f"{name:<44} {r['median_us']:>12.2f} µs/call {r['per_item_us']:>10.3f} µs/item")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    report = {"environment": environment(), "results": results}
+
+    exit_code = 0
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        report["comparison"] = {"baseline": args.baseline, "threshold": args.threshold,
+                                "rows": compare(results, baseline, args.threshold)}
+        print()
+        for row in report["comparison"]["rows"]:
+            print(f"{row['name']:<44} {row['baseline_us']:>12.2f} → {row['current_us']:>12.2f} "
+                  f"x{row['ratio']:<6} {row['status']}")
+        if any(row["status"] == "regression" for row in report["comparison"]["rows"]):
+            exit_code = 1
+
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nresults: {output}")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+تولیدکننده‌های داده مصنوعی برای بنچمارک‌ها
+
+ورودی‌ها در کل بازه واقعی هر فیلد پخش می‌شوند و بخشی از آن‌ها عمداً روی
+آستانه‌های شرط‌های پایگاه دانش (و ±1) می‌افتند تا همه شاخه‌ها پوشش داده شوند؛
+production_inputs ترافیکی شبیه تولید (متمرکز روی مقادیر معمول) می‌سازد.
+پایگاه دانش بزرگ‌شده از شرط‌های تصادفی روی فیلدهای کمی و برچسب‌های کیفی ساخته
+می‌شود (برای بنچمارک مقیاس‌پذیری با 100، 1000 و 10000 قانون)؛ segmented_rules
+قوانین تخصصی «هر بخش» (برچسب کیفی + باند باریک عددی) را شبیه‌سازی می‌کند.
+"""
+
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from conditions import And, Cascade, Compare, Const, F, Field, Mul, Or
+from expert_system import InferenceEngine, KnowledgeBase, Rule
+
+# بازه واقعی هر فیلد ورودی: (حداقل، حداکثر)
+FIELD_RANGES = {
+    "cta_position_y": (0, 2000),
+    "cta_width": (40, 400),
+    "cta_height": (20, 100),
+    "contrast_ratio": (1.0, 21.0),
+    "whitespace_around_cta": (0, 120),
+    "scroll_depth": (0, 100),
+    "cta_click_rate": (0.0, 15.0),
+    "number_of_ctas": (1, 6),
+    "cta_text_length": (1, 50),
+    "time_to_cta": (0, 40),
+    "clickable_elements_before_cta": (0, 20),
+    "content_word_count": (50, 3000),
+    "similar_color_elements": (0, 8),
+    "largest_other_element_size": (1000, 60000),
+    "cta_mobile_width": (60, 400),
+    "cta_mobile_height": (20, 80),
+    "has_loading_animation": (0, 1),
+}
+
+CATEGORIES = ("visibility", "clickability", "composite")
+
+
+def _walk(node):
+    """پیمایش گره‌های شرط و عبارت"""
+    yield node
+    if isinstance(node, (And, Or)):
+        for term in node.terms:
+            yield from _walk(term)
+    elif isinstance(node, (Compare, Mul)):
+        yield from _walk(node.left)
+        yield from _walk(node.right)
+    elif isinstance(node, Cascade):
+        for condition, _ in node.cases:
+            yield from _walk(condition)
+
+
+def thresholds(engine: InferenceEngine) -> Dict[str, List[float]]:
+    """آستانه‌های عددی هر فیلد در قوانین، برچسب‌های کیفی و مؤلفه‌های امتیاز"""
+    roots = [rule.condition for rule in engine.kb.rules]
+    roots += list(engine.converter.labels.values())
+    roots += list(engine.visibility_components.values()) + list(engine.clickability_components.values())
+
+    found = {}
+    for root in roots:
+        for node in _walk(root):
+            if (isinstance(node, Compare) and isinstance(node.left, Field)
+                    and isinstance(node.right, Const) and node.left.name in FIELD_RANGES):
+                found.setdefault(node.left.name, set()).add(node.right.value)
+    return {name: sorted(values) for name, values in found.items()}
+
+
+def random_inputs(n: int, seed: int = 0, boundary_share: float = 0.3,
+                  engine: InferenceEngine = None) -> List[Dict]:
+    """n ورودی کامل LandingPageInput؛ سهم boundary_share از مقادیر روی آستانه‌ها"""
+    rng = random.Random(seed)
+    breaks = thresholds(engine or InferenceEngine(KnowledgeBase()))
+    records = []
+
+    for _ in range(n):
+        record = {}
+        for name, (low, high) in FIELD_RANGES.items():
+            is_float = isinstance(low, float)
+            if name in breaks and rng.random() < boundary_share:
+                step = 0.01 if is_float else 1
+                value = rng.choice(breaks[name]) + rng.choice((-step, 0, step))
+                value = min(max(value, low), high)
+            else:
+                value = rng.uniform(low, high) if is_float else rng.randint(low, high)
+            record[name] = round(value, 2) if is_float else int(value)
+        records.append(record)
+
+    return records
+
+
+def production_inputs(n: int, seed: int = 0, spread: float = 0.25) -> List[Dict]:
+    """
+    n ورودی شبیه ترافیک واقعی: بیشتر صفحه‌ها نزدیک مقادیر معمول (پیش‌فرض‌های
+    LandingPageInput) با انحراف نسبی spread و بریده‌شده به بازه هر فیلد؛ بیشتر قوانین فعال نمی‌شوند
+    """
+    from expert_system import LandingPageInput
+
+    rng = random.Random(seed)
+    typical = LandingPageInput().model_dump()
+    records = []
+    for _ in range(n):
+        record = {}
+        for name, (low, high) in FIELD_RANGES.items():
+            center = typical[name]
+            value = rng.gauss(center, abs(center) * spread or (high - low) * spread / 10)
+            value = min(max(value, low), high)
+            record[name] = round(value, 2) if isinstance(low, float) else int(round(value))
+        records.append(record)
+    return records
+
+
+def label_values(engine: InferenceEngine) -> Dict[str, List[str]]:
+    """مقادیر ممکن هر برچسب کیفی"""
+    return {
+        name: sorted({then for _, then in label.cases} | {label.default})
+        for name, label in engine.converter.labels.items()
+    }
+
+
+def synthetic_rules(n: int, seed: int = 0, engine: InferenceEngine = None) -> List[Rule]:
+    """n قانون تصادفی (1 تا 3 شرط عطفی روی فیلدهای کمی یا برچسب‌های کیفی)"""
+    rng = random.Random(seed)
+    labels = label_values(engine or InferenceEngine(KnowledgeBase()))
+    fields = list(FIELD_RANGES)
+    rules = []
+
+    for i in range(n):
+        terms = []
+        for _ in range(rng.randint(1, 3)):
+            if rng.random() < 0.25:
+                label = rng.choice(list(labels))
+                terms.append(F(label) == rng.choice(labels[label]))
+            else:
+                name = rng.choice(fields)
+                low, high = FIELD_RANGES[name]
+                threshold = round(rng.uniform(low, high), 2) if isinstance(low, float) else rng.randint(low, high)
+                terms.append(F(name) < threshold if rng.random() < 0.5 else F(name) > threshold)
+
+        condition = terms[0]
+        for term in terms[1:]:
+            condition = condition & term
+
+        rules.append(Rule(
+            id=f"S{i}",
+            priority=rng.randint(1, 10),
+            certainty=round(rng.uniform(0.5, 0.99), 2),
+            condition=condition,
+            conclusion=f"نتیجه مصنوعی {i}",
+            explanation=f"توضیح مصنوعی {i}",
+            category=rng.choice(CATEGORIES),
+        ))
+
+    return rules
+
+
+def segmented_rules(n: int, seed: int = 0, engine: InferenceEngine = None) -> List[Rule]:
+    """
+    n قانون تخصصی «هر بخش» (مشابه قوانین هر صنعت/دستگاه): برابری با یک برچسب کیفی،
+    یکی از باندهای باریک یک فیلد کمی و گاهی یک آستانه اضافه
+
+    با بزرگ شدن پایگاه دانش بخش‌ها ریزتر می‌شوند (n/20 باند در هر فیلد)، پس هر
+    درخواست تقریباً با تعداد ثابتی از قوانین منطبق است.
+    """
+    rng = random.Random(seed)
+    labels = label_values(engine or InferenceEngine(KnowledgeBase()))
+    fields = list(FIELD_RANGES)
+    bands = max(10, n // 20)
+    rules = []
+
+    for i in range(n):
+        label = rng.choice(list(labels))
+        name = rng.choice(fields)
+        low, high = FIELD_RANGES[name]
+        width = (high - low) / bands
+        start = low + rng.randrange(bands) * width
+        condition = (F(label) == rng.choice(labels[label])) & (F(name) > start) & (F(name) <= start + width)
+
+        if rng.random() < 0.5:
+            other = rng.choice(fields)
+            other_low, other_high = FIELD_RANGES[other]
+            condition = condition & (F(other) < rng.uniform(other_low, other_high))
+
+        rules.append(Rule(
+            id=f"G{i}",
+            priority=rng.randint(1, 10),
+            certainty=round(rng.uniform(0.5, 0.99), 2),
+            condition=condition,
+            conclusion=f"نتیجه بخش {i}",
+            explanation=f"توضیح بخش {i}",
+            category=rng.choice(CATEGORIES),
+        ))
+
+    return rules
@@ -0,0 +1,202 @@
+"""
+شاخص نقاط شکست دانش: مقادیری از هر فیلد که در آن امتیازها، قوانین یا برچسب‌های کیفی تغییر می‌کنند
+
+همه شرط‌ها مقایسه‌اند، پس خروجی سیستم نسبت به هر فیلد تکه‌ای ثابت است و فقط در
+آستانه مقایسه‌ها عوض می‌شود. آستانه‌ها یک بار هنگام ساخت snapshot دانش از شرط
+قوانین، تبدیل‌های کیفی و اجزای دو امتیاز استخراج می‌شوند و برای هر فیلد نقاط
+آزمون ثابت (آستانه و یک گام دو طرف آن) آماده می‌شود.
+
+مقایسه‌های حاصل‌ضربی (مثل مساحت CTA در برابر بزرگ‌ترین عنصر دیگر) آستانه ثابت
+ندارند؛ آستانه آن‌ها برای هر ورودی با مقدار فعلی بقیه فیلدها حل می‌شود.
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from conditions import And, Cascade, Compare, Condition, Const, Field, Mul, Or
+
+# گام پیش‌فرض فیلدهای اعشاری
+FLOAT_STEP = 0.01
+
+
+def _compares(node):
+    """همه مقایسه‌های یک شرط یا Cascade"""
+    if isinstance(node, Compare):
+        yield node
+    elif isinstance(node, (And, Or)):
+        for term in node.terms:
+            yield from _compares(term)
+    elif isinstance(node, Cascade):
+        for condition, _ in node.cases:
+            yield from _compares(condition)
+
+
+def _monomial(expr) -> Optional[Tuple[float, List[Field]]]:
+    """نمایش عبارت به صورت ضریب × حاصل‌ضرب فیلدها (None برای عبارت غیرعددی)"""
+    if isinstance(expr, Field):
+        return 1.0, [expr]
+    if isinstance(expr, Const):
+        if isinstance(expr.value, bool) or not isinstance(expr.value, (int, float)):
+            return None
+        return float(expr.value), []
+    if isinstance(expr, Mul):
+        left, right = _monomial(expr.left), _monomial(expr.right)
+        if left is None or right is None:
+            return None
+        return left[0] * right[0], left[1] + right[1]
+    return None
+
+
+def step_points(thresholds: Iterable[float], step, integer: bool) -> set:
+    """هر آستانه و یک گام دو طرف آن (برای فیلد صحیح: اعداد صحیح اطراف آستانه)"""
+    points = set()
+    for threshold in thresholds:
+        if integer:
+            points.update((math.floor(threshold) - step, math.floor(threshold),
+                           math.ceil(threshold), math.ceil(threshold) + step))
+        else:
+            points.update(round(float(p), 10) for p in (threshold - step, threshold, threshold + step))
+    return points
+
+
+class BreakpointIndex:
+    """
+    آستانه‌ها، وابستگی‌ها و نقاط آزمون هر فیلد برای یک موتور استنتاج
+
+    steps: نام فیلد ← کوچک‌ترین گام (عدد صحیح یعنی فیلد صحیح)؛ فیلد ناشناخته FLOAT_STEP.
+    """
+
+    def __init__(self, engine, evaluator, steps: Dict[str, float]):
+        self.evaluator = evaluator
+        self.steps = steps
+
+        roots = [(("rule", rule.id), rule.condition) for rule in engine.kb.rules
+                 if isinstance(rule.condition, Condition)]
+        roots += [(("label", name), label) for name, label in engine.converter.labels.items()]
+        roots += [(("visibility", key), component) for key, component in engine.visibility_components.items()]
+        roots += [(("clickability", key), component) for key, component in engine.clickability_components.items()]
+
+        self.thresholds: Dict[str, set] = {}
+        self.products: List[Tuple[Tuple, Tuple]] = []
+        self.affects: Dict[str, List[str]] = {}  # فیلد ← قوانین، برچسب‌ها و اجزای امتیاز وابسته
+        for (kind, name), root in roots:
+            for field in sorted(root.fields()):
+                label = f"{kind}:{name}"
+                if label not in self.affects.setdefault(field, []):
+                    self.affects[field].append(label)
+
+            for compare in _compares(root):
+                left, right = _monomial(compare.left), _monomial(compare.right)
+                if left is None or right is None:
+                    continue
+                if len(left[1]) + len(right[1]) == 1 and (left[0] if left[1] else right[0]):
+                    # فیلد (یا مضرب ثابت آن) در برابر ثابت
+                    (coef, fields), other = (left, right) if left[1] else (right, left)
+                    self.thresholds.setdefault(fields[0].name, set()).add(other[0] / coef)
+                elif len(left[1]) + len(right[1]) > 1:
+                    self.products.append((left, right))
+
+        self.probes: Dict[str, Tuple] = {
+            name: tuple(sorted(step_points(thresholds, *self.step(name))))
+            for name, thresholds in self.thresholds.items()
+        }
+
+    def step(self, name: str) -> Tuple[float, bool]:
+        """گام فیلد و صحیح بودن آن"""
+        step = self.steps.get(name, FLOAT_STEP)
+        return step, isinstance(step, int)
+
+    def derived(self, inputs: Dict) -> Dict[str, set]:
+        """آستانه هر فیلد در مقایسه‌های حاصل‌ضربی، با مقدار فعلی بقیه فیلدها"""
+        def value(field: Field):
+            return inputs.get(field.name, field.default)
+
+        derived = {}
+        for left, right in self.products:
+            names = [f.name for f in left[1] + right[1]]
+            for side, other in ((left, right), (right, left)):
+                for position, field in enumerate(side[1]):
+                    if names.count(field.name) != 1:
+                        continue
+                    try:
+                        rest = side[0] * math.prod(value(f) for j, f in enumerate(side[1]) if j != position)
+                        target = other[0] * math.prod(value(f) for f in other[1])
+                    except TypeError:
+                        continue
+                    if rest:
+                        derived.setdefault(field.name, set()).add(target / rest)
+        return derived
+
+    def fields(self) -> List[str]:
+        """فیلدهایی که حداقل یک نقطه شکست دارند"""
+        products = {f.name for left, right in self.products for f in left[1] + right[1]}
+        return sorted(set(self.thresholds) | products)
+
+    # ==================== Sensitivity ====================
+
+    def sensitivity(self, inputs: Dict, fields: Optional[List[str]] = None) -> Dict:
+        """
+        جدول حساسیت تک‌فیلدی: با تغییر فقط یک فیلد و ثابت ماندن بقیه، در هر بازه
+        بین نقاط شکست امتیازها و قوانین فعال چه می‌شوند
+
+        برای هر فیلد، نقاط آزمون از پیش آماده (به همراه آستانه‌های حاصل‌ضربی این
+        ورودی) در یک ارزیابی برداری سنجیده و نقاط پیاپی با نتیجه یکسان در یک بازه
+        ادغام می‌شوند؛ from/to برابر None یعنی بازه بی‌کران.
+        """
+        derived = self.derived(inputs)
+        fields = self.fields() if fields is None else fields
+
+        rows, owners = [inputs], []
+        for name in fields:
+            values = set(self.probes.get(name, ())) | step_points(derived.get(name, ()), *self.step(name))
+            values.add(inputs[name])
+            for value in sorted(values):
+                rows.append({**inputs, name: value})
+                owners.append((name, value))
+
+        evaluated = self.evaluator.evaluate(rows)
+        visibility, clickability = evaluated["visibility_score"], evaluated["clickability_score"]
+        patterns, pattern_index = evaluated["patterns"], evaluated["pattern_index"]
+        qualitative = evaluated["qualitative_inputs"]
+        current_rules = patterns[pattern_index[0]]["activated_rules"]
+
+        tables = {}
+        for k, (name, value) in enumerate(owners, start=1):
+            outcome = (visibility[k], clickability[k], pattern_index[k], tuple(qualitative[k].values()))
+            table = tables.setdefault(name, {"current": inputs[name], "affects": self.affects.get(name, []),
+                                             "ranges": []})
+            ranges = table["ranges"]
+            if ranges and ranges[-1]["_outcome"] == outcome:
+                ranges[-1]["to"] = value
+                ranges[-1]["current"] = ranges[-1]["current"] or value == inputs[name]
+                continue
+
+            rules = patterns[pattern_index[k]]["activated_rules"]
+            ranges.append({
+                "_outcome": outcome,
+                "from": value,
+                "to": value,
+                "current": value == inputs[name],
+                "visibility_score": visibility[k],
+                "clickability_score": clickability[k],
+                "visibility_delta": visibility[k] - visibility[0],
+                "clickability_delta": clickability[k] - clickability[0],
+                "activated": [rule for rule in rules if rule not in current_rules],
+                "deactivated": [rule for rule in current_rules if rule not in rules],
+                "qualitative": {label: text for label, text in qualitative[k].items()
+                                if text != qualitative[0][label]},
+            })
+
+        for table in tables.values():
+            ranges = table["ranges"]
+            ranges[0]["from"] = None
+            ranges[-1]["to"] = None
+            for entry in ranges:
+                del entry["_outcome"]
+
+        return {
+            "visibility_score": visibility[0],
+            "clickability_score": clickability[0],
+            "activated_rules": current_rules,
+            "fields": tables,
+        }
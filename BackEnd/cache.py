@@ -0,0 +1,365 @@
+"""
+کش نتایج تحلیل با کلید محتوایی (content-addressed)
+
+کلید از هش canonical ورودی اعتبارسنجی‌شده به همراه نسخه پایگاه دانش ساخته
+می‌شود و مقدار، بایت‌های پاسخ سریال‌شده است؛ بنابراین پاسخ کش‌شده دقیقاً
+همان بایت‌های پاسخ تازه است. حذف به صورت LRU، انقضای TTL و سقف حجم (بایت).
+
+ResultCache در حافظه همین فرایند است؛ SharedResultCache همان کش را روی یک فایل
+SQLite بین چند فرایند worker (serve.py) به اشتراک می‌گذارد. نوشتن‌های کش مشترک (put،
+به‌روزرسانی LRU، حذف منقضی و نسخه قدیمی) در یک thread جداگانه انجام می‌شوند تا
+event loop هرگز منتظر قفل نوشتن SQLite نماند.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+# سربار تقریبی هر مدخل (کلید، tuple، گره OrderedDict)
+ENTRY_OVERHEAD = 200
+
+
+def canonical_key(namespace: str, version: str, data: Dict) -> str:
+    """هش canonical (کلیدهای مرتب، بدون فاصله) داده به همراه فضای نام و نسخه"""
+    payload = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    digest = hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{namespace}:{version}:{digest}"
+
+
+class ResultCache:
+    """کش LRU/TTL محدود به حجم برای بایت‌های پاسخ"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 3600):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.version = None
+        self._entries = OrderedDict()  # key -> (body, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def ensure_version(self, version: str):
+        """پاک‌سازی خودکار کش هنگام تغییر نسخه پایگاه دانش"""
+        if version != self.version:
+            with self._lock:
+                if version != self.version:
+                    if self._entries:
+                        self.invalidations += 1
+                    self._entries.clear()
+                    self._bytes = 0
+                    self.version = version
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            body, expires_at, size = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: str, body: bytes):
+        size = len(body) + len(key) + ENTRY_OVERHEAD
+        if not self.enabled or size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+
+            self._entries[key] = (body, time.monotonic() + self.ttl_seconds, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "version": self.version,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# ==================== Shared Cache ====================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_used ON entries(used);
+CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO totals VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries
+    BEGIN UPDATE totals SET bytes = bytes + new.size; END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries
+    BEGIN UPDATE totals SET bytes = bytes + new.size - old.size; END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries
+    BEGIN UPDATE totals SET bytes = bytes - old.size; END;
+"""
+
+# زمان آخرین استفاده (برای LRU) حداکثر یک بار در این فاصله به‌روز می‌شود تا hit ها نوشتن نداشته باشند
+TOUCH_SECONDS = 1.0
+# انتظار قفل خواندن (event loop؛ خواندن WAL منتظر نویسنده نمی‌ماند و قفل مشغول یعنی miss)
+READ_TIMEOUT = 0.05
+# انتظار قفل نوشتن در thread نویسنده
+WRITE_TIMEOUT = 5.0
+# سقف نوشتن‌های در انتظار؛ بیش از آن نوشتن کنار گذاشته و در skipped شمرده می‌شود
+MAX_PENDING_WRITES = 1024
+
+
+class SharedResultCache:
+    """
+    کش LRU/TTL محدود به حجم مشترک بین فرایندهای worker روی یک فایل SQLite (WAL)
+
+    همان رابط ResultCache را دارد؛ مدخل‌ها و حجم کل در فایل مشترک‌اند (روی
+    /dev/shm در حافظه می‌ماند) و شمارنده‌های hit/miss مربوط به همین فرایند است.
+    اتصال‌ها به ازای هر thread و فرایند به صورت تنبل باز می‌شوند، پس ساخت شیء
+    پیش از fork بی‌خطر است. خطای SQLite (مثلاً قفل طولانی) کش را دور می‌زند و
+    فقط در errors شمرده می‌شود.
+
+    get فقط می‌خواند (با READ_TIMEOUT)؛ همه نوشتن‌ها به thread نویسنده همین فرایند
+    سپرده می‌شوند و فراخوان منتظر آن‌ها نمی‌ماند. put بلافاصله پس از بازگشت دیده
+    نمی‌شود (flush برای انتظار).
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.version = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._writer_pid = None
+        self._pending = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.errors = 0
+        self.skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _connection(self, writer: bool = False) -> sqlite3.Connection:
+        """
+        اتصال thread جاری (پس از fork اتصال جدید ساخته می‌شود)
+
+        اتصال خواندن جدول‌ها را فقط اگر هنوز وجود ندارند می‌سازد تا بیرون از thread
+        نویسنده به قفل نوشتن نیاز نباشد.
+        """
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            timeout = WRITE_TIMEOUT if writer else READ_TIMEOUT
+            conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None, check_same_thread=False)
+            if writer or conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'totals'").fetchone()[0] == 0:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = pid
+        return self._local.conn
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    # ==================== Writer ====================
+
+    def _submit(self, write: Callable, *args) -> bool:
+        """سپردن یک نوشتن به thread نویسنده این فرایند؛ False اگر صف نوشتن پر است"""
+        with self._lock:
+            if self._writer_pid != os.getpid():
+                # پس از fork thread نویسنده والد وجود ندارد
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-cache")
+                self._writer_pid = os.getpid()
+                self._pending = 0
+            if self._pending >= MAX_PENDING_WRITES:
+                self.skipped += 1
+                return False
+            self._pending += 1
+        self._writer.submit(self._write, write, args)
+        return True
+
+    def _write(self, write: Callable, args):
+        try:
+            write(self._connection(writer=True), *args)
+        except sqlite3.Error:
+            self._count("errors")
+        finally:
+            self._count("_pending", -1)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """انتظار برای نوشتن‌های در انتظار این فرایند؛ True اگر پیش از timeout تمام شدند"""
+        if self._writer_pid != os.getpid():
+            return True
+        future = self._writer.submit(lambda: None)
+        try:
+            future.result(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    # ==================== Cache ====================
+
+    def ensure_version(self, version: str):
+        """حذف مدخل‌های نسخه‌های دیگر پایگاه دانش هنگام تغییر نسخه در این فرایند"""
+        if version != self.version:
+            with self._lock:
+                if version == self.version:
+                    return
+                self.version = version
+            self._submit(self._invalidate, version)
+
+    def _invalidate(self, conn: sqlite3.Connection, version: str):
+        if conn.execute("DELETE FROM entries WHERE version != ?", (version,)).rowcount:
+            self._count("invalidations")
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            row = self._connection().execute(
+                "SELECT body, expires, used FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error:
+            self._count("errors")
+            return None
+        if row is None:
+            self._count("misses")
+            return None
+
+        body, expires, used = row
+        now = time.time()
+        if now >= expires:
+            self._submit(self._expire, key, expires)
+            self._count("expirations")
+            self._count("misses")
+            return None
+
+        if now - used >= TOUCH_SECONDS:
+            self._submit(self._touch, key, now)
+        self._count("hits")
+        return body
+
+    @staticmethod
+    def _expire(conn: sqlite3.Connection, key: str, expires: float):
+        conn.execute("DELETE FROM entries WHERE key = ? AND expires = ?", (key, expires))
+
+    @staticmethod
+    def _touch(conn: sqlite3.Connection, key: str, now: float):
+        conn.execute("UPDATE entries SET used = ? WHERE key = ?", (now, key))
+
+    def put(self, key: str, body: bytes):
+        size = len(body) + len(key) + ENTRY_OVERHEAD
+        if not self.enabled or size > self.max_bytes:
+            return
+        self._submit(self._put, key, body, size, time.time())
+
+    def _put(self, conn: sqlite3.Connection, key: str, body: bytes, size: int, now: float):
+        version = key.rsplit(":", 2)[1] if key.count(":") >= 2 else ""  # namespace:version:digest
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                "version = excluded.version, body = excluded.body, size = excluded.size, "
+                "expires = excluded.expires, used = excluded.used",
+                (key, version, body, size, now + self.ttl_seconds, now),
+            )
+            evicted = 0
+            while conn.execute("SELECT bytes FROM totals").fetchone()[0] > self.max_bytes:
+                evicted += conn.execute(
+                    "DELETE FROM entries WHERE key = (SELECT key FROM entries ORDER BY used LIMIT 1)"
+                ).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if evicted:
+            self._count("evictions", evicted)
+
+    def clear(self):
+        self._submit(lambda conn: conn.execute("DELETE FROM entries"))
+
+    def stats(self) -> Dict:
+        try:
+            conn = self._connection()
+            entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            size = conn.execute("SELECT bytes FROM totals").fetchone()[0]
+        except sqlite3.Error:
+            self._count("errors")
+            entries = size = 0
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "version": self.version,
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "path": self.path,
+                "pid": os.getpid(),
+                "errors": self.errors,
+                "pending_writes": self._pending,
+                "skipped": self.skipped,
+            }
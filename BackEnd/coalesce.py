@@ -0,0 +1,152 @@
+"""
+ادغام درخواست‌های همزمان: single-flight برای ورودی‌های یکسان و micro-batching برای ورودی‌های متفاوت
+
+هنگام انتشار یک کمپین، کلاینت‌های زیادی همزمان همان معیارهای صفحه را می‌فرستند.
+SingleFlight برای هر کلید canonical فقط یک محاسبه در جریان نگه می‌دارد و همه
+درخواست‌های همزمان با همان کلید نتیجه همان محاسبه را می‌گیرند. MicroBatcher
+درخواست‌های متفاوتی را که در یک پنجره کوتاه می‌رسند در یک کار pool گروه می‌کند
+تا هزینه انتقال به pool (و در process pool، pickle) یک بار پرداخت شود.
+
+هر دو فقط در event loop همین فرایند کار می‌کنند (قفل لازم ندارند)؛ لغو یک
+درخواست منتظر، محاسبه مشترک را لغو نمی‌کند.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, List, Set, Tuple
+
+
+class SingleFlight:
+    """یک محاسبه در جریان به ازای هر کلید؛ درخواست‌های همزمان همان کلید منتظر آن می‌مانند"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+        self.flights = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable]):
+        if not self.enabled:
+            return await compute()
+
+        shared = self._calls.get(key)
+        if shared is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                # لغو درخواست اول محاسبه را نیمه‌کاره گذاشت؛ منتظران خودشان دوباره محاسبه می‌کنند
+                if shared.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.run(key, compute)
+                raise
+
+        # درخواست اول خودش محاسبه می‌کند (بدون task جداگانه) و نتیجه را با منتظران به اشتراک می‌گذارد
+        shared = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.flights += 1
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            shared.cancel()
+            raise
+        except BaseException as e:
+            shared.set_exception(e)
+            shared.exception()  # خطا به منتظران می‌رسد؛ هشدار «retrieve نشده» لازم نیست
+            raise
+        else:
+            shared.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is shared:
+                del self._calls[key]
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._calls),
+            "flights": self.flights,
+            "coalesced": self.coalesced,
+        }
+
+
+class MicroBatcher:
+    """
+    گروه‌بندی درخواست‌های همزمان (با کلید گروه یکسان) در یک فراخوانی dispatch
+
+    وقتی دسته‌ای در حال اجراست، اولین درخواست هر گروه یک پنجره window ثانیه‌ای باز
+    می‌کند و درخواست‌های بعدی تا پایان پنجره یا رسیدن به max_size به همان دسته اضافه
+    می‌شوند؛ در حالت بیکار دسته در همان دور event loop ارسال می‌شود تا درخواست تنها
+    منتظر پنجره نماند. dispatch(group, items) لیست نتایج را به ترتیب items برمی‌گرداند.
+    window برابر 0 یعنی بدون دسته‌بندی.
+    """
+
+    def __init__(self, dispatch: Callable[[Hashable, List], Awaitable[List]], window: float = 0.001,
+                 max_size: int = 64):
+        self.dispatch = dispatch
+        self.window = window
+        self.max_size = max_size
+        self._pending: Dict[Hashable, List[Tuple[object, asyncio.Future]]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        # فقط دسته‌های بیش از یک درخواست؛ dispatches همه ارسال‌ها به dispatch است
+        self.dispatches = 0
+        self.batches = 0
+        self.batched = 0
+        self.largest = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_size > 1
+
+    async def submit(self, group: Hashable, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.get(group)
+        if batch is None:
+            batch = self._pending[group] = []
+            if self._tasks:
+                loop.call_later(self.window, self._flush, group, batch)
+            else:
+                loop.call_soon(self._flush, group, batch)  # بیکار: فقط درخواست‌های همین دور event loop
+        batch.append((item, future))
+        if len(batch) >= self.max_size:
+            self._flush(group, batch)
+        return await future
+
+    def _flush(self, group: Hashable, batch: List):
+        if self._pending.get(group) is not batch:
+            return  # پیش‌تر با رسیدن به max_size ارسال شده است
+        del self._pending[group]
+
+        self.dispatches += 1
+        if len(batch) > 1:
+            self.batches += 1
+            self.batched += len(batch)
+        self.largest = max(self.largest, len(batch))
+        task = asyncio.ensure_future(self._run(group, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, group: Hashable, batch: List):
+        try:
+            results = await self.dispatch(group, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window * 1000,
+            "max_size": self.max_size,
+            "dispatches": self.dispatches,
+            "batches": self.batches,
+            "batched_requests": self.batched,
+            "largest_batch": self.largest,
+            "average_batch": round(self.batched / self.batches, 2) if self.batches else 0.0,
+        }
@@ -0,0 +1,504 @@
+"""
+شرط‌های اعلانی قوانین سیستم خبره
+
+به جای lambda های مبهم، هر شرط یک درخت کوچک (AST) است که می‌توان
+فیلدهای مورد استفاده‌اش را بررسی کرد، آن را از داده (dict/JSON) ساخت،
+و کل مجموعه قوانین را به یک تابع پایتون تخصصی یا عبارت ماسک NumPy کامپایل کرد.
+
+    (F("cta_position_y") > 800) & (F("scroll_depth") < 50)
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Tuple
+
+MISSING = object()
+_CONFLICT = object()
+
+OPERATORS = ("<", "<=", ">", ">=", "==", "!=")
+
+
+# ==================== Expressions ====================
+
+class Expr:
+    """عبارت مقداری (فیلد، ثابت یا حاصل‌ضرب)"""
+
+    def __lt__(self, other): return Compare("<", self, _wrap(other))
+    def __le__(self, other): return Compare("<=", self, _wrap(other))
+    def __gt__(self, other): return Compare(">", self, _wrap(other))
+    def __ge__(self, other): return Compare(">=", self, _wrap(other))
+    def __eq__(self, other): return Compare("==", self, _wrap(other))
+    def __ne__(self, other): return Compare("!=", self, _wrap(other))
+    def __mul__(self, other): return Mul(self, _wrap(other))
+
+    def __hash__(self):
+        return hash(self.key())
+
+
+@dataclass(frozen=True, eq=False)
+class Field(Expr):
+    """ارجاع به یک فیلد از داده‌ها (کمی یا کیفی)"""
+    name: str
+    default: Any = MISSING
+
+    def key(self) -> tuple:
+        return ("field", self.name, self.default)
+
+    def fields(self) -> FrozenSet[str]:
+        return frozenset((self.name,))
+
+    def evaluate(self, d: Dict):
+        if self.default is MISSING:
+            return d[self.name]
+        return d.get(self.name, self.default)
+
+    def to_source(self, var: str, names: Dict[str, str]) -> str:
+        if self.name in names:
+            return names[self.name]
+        if self.default is MISSING:
+            return f"{var}[{self.name!r}]"
+        return f"{var}.get({self.name!r}, {self.default!r})"
+
+    def to_dict(self) -> Dict:
+        if self.default is MISSING:
+            return {"field": self.name}
+        return {"field": self.name, "default": self.default}
+
+
+@dataclass(frozen=True, eq=False)
+class Const(Expr):
+    """مقدار ثابت"""
+    value: Any
+
+    def key(self) -> tuple:
+        return ("const", self.value)
+
+    def fields(self) -> FrozenSet[str]:
+        return frozenset()
+
+    def evaluate(self, d: Dict):
+        return self.value
+
+    def to_source(self, var: str, names: Dict[str, str]) -> str:
+        return repr(self.value)
+
+    def to_dict(self) -> Dict:
+        return {"const": self.value}
+
+
+@dataclass(frozen=True, eq=False)
+class Mul(Expr):
+    """حاصل‌ضرب دو عبارت (مثلاً مساحت CTA)"""
+    left: Expr
+    right: Expr
+
+    def key(self) -> tuple:
+        return ("mul", self.left.key(), self.right.key())
+
+    def fields(self) -> FrozenSet[str]:
+        return self.left.fields() | self.right.fields()
+
+    def evaluate(self, d: Dict):
+        return self.left.evaluate(d) * self.right.evaluate(d)
+
+    def to_source(self, var: str, names: Dict[str, str]) -> str:
+        return f"({self.left.to_source(var, names)} * {self.right.to_source(var, names)})"
+
+    def to_dict(self) -> Dict:
+        return {"mul": [self.left.to_dict(), self.right.to_dict()]}
+
+
+def F(name: str, default: Any = MISSING) -> Field:
+    """میانبر ساخت Field"""
+    return Field(name, default)
+
+
+def _wrap(value) -> Expr:
+    return value if isinstance(value, Expr) else Const(value)
+
+
+# ==================== Conditions ====================
+
+class Condition:
+    """شرط بولی قابل ارزیابی، بازرسی و کامپایل"""
+
+    def __and__(self, other): return And(_terms(self, And) + _terms(other, And))
+    def __or__(self, other): return Or(_terms(self, Or) + _terms(other, Or))
+
+    def __call__(self, d: Dict) -> bool:
+        """ارزیابی تفسیری (سازگار با condition قدیمی lambda)"""
+        return self.evaluate(d)
+
+    def __eq__(self, other):
+        return isinstance(other, Condition) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def to_numpy_source(self, var: str) -> str:
+        """عبارت ماسک NumPy (عملگرهای & و | به جای and و or)"""
+        return self.to_source(var, {}, numpy=True)
+
+
+@dataclass(frozen=True, eq=False)
+class Compare(Condition):
+    """مقایسه دو عبارت"""
+    op: str
+    left: Expr
+    right: Expr
+
+    def __post_init__(self):
+        if self.op not in OPERATORS:
+            raise ValueError(f"عملگر نامعتبر: {self.op}")
+
+    def key(self) -> tuple:
+        return ("cmp", self.op, self.left.key(), self.right.key())
+
+    def fields(self) -> FrozenSet[str]:
+        return self.left.fields() | self.right.fields()
+
+    def evaluate(self, d: Dict) -> bool:
+        left, right = self.left.evaluate(d), self.right.evaluate(d)
+        if self.op == "<":
+            return left < right
+        if self.op == "<=":
+            return left <= right
+        if self.op == ">":
+            return left > right
+        if self.op == ">=":
+            return left >= right
+        if self.op == "==":
+            return left == right
+        return left != right
+
+    def to_source(self, var: str, names: Dict[str, str], numpy: bool = False) -> str:
+        return f"({self.left.to_source(var, names)} {self.op} {self.right.to_source(var, names)})"
+
+    def to_dict(self) -> Dict:
+        if isinstance(self.left, Field) and isinstance(self.right, Const):
+            return {**self.left.to_dict(), "op": self.op, "value": self.right.value}
+        return {"op": self.op, "left": self.left.to_dict(), "right": self.right.to_dict()}
+
+
+@dataclass(frozen=True, eq=False)
+class And(Condition):
+    """ترکیب عطفی شرط‌ها"""
+    terms: Tuple[Condition, ...]
+
+    def key(self) -> tuple:
+        return ("and",) + tuple(t.key() for t in self.terms)
+
+    def fields(self) -> FrozenSet[str]:
+        return frozenset().union(*(t.fields() for t in self.terms))
+
+    def evaluate(self, d: Dict) -> bool:
+        return all(t.evaluate(d) for t in self.terms)
+
+    def to_source(self, var: str, names: Dict[str, str], numpy: bool = False) -> str:
+        joiner = " & " if numpy else " and "
+        return "(" + joiner.join(t.to_source(var, names, numpy) for t in self.terms) + ")"
+
+    def to_dict(self) -> Dict:
+        return {"all": [t.to_dict() for t in self.terms]}
+
+
+@dataclass(frozen=True, eq=False)
+class Or(Condition):
+    """ترکیب فصلی شرط‌ها"""
+    terms: Tuple[Condition, ...]
+
+    def key(self) -> tuple:
+        return ("or",) + tuple(t.key() for t in self.terms)
+
+    def fields(self) -> FrozenSet[str]:
+        return frozenset().union(*(t.fields() for t in self.terms))
+
+    def evaluate(self, d: Dict) -> bool:
+        return any(t.evaluate(d) for t in self.terms)
+
+    def to_source(self, var: str, names: Dict[str, str], numpy: bool = False) -> str:
+        joiner = " | " if numpy else " or "
+        return "(" + joiner.join(t.to_source(var, names, numpy) for t in self.terms) + ")"
+
+    def to_dict(self) -> Dict:
+        return {"any": [t.to_dict() for t in self.terms]}
+
+
+def _terms(condition: Condition, kind) -> tuple:
+    """صاف کردن And/Or های تو در تو"""
+    return condition.terms if isinstance(condition, kind) else (condition,)
+
+
+# ==================== Cascades ====================
+
+@dataclass(frozen=True, eq=False)
+class Cascade:
+    """
+    زنجیره if/elif/else اعلانی: مقدار اولین شرط برقرار، در غیر این صورت default
+
+    برای تبدیل‌های کیفی (برچسب‌ها) و اجزای امتیازها (امتیاز مثبت/منفی) استفاده می‌شود.
+    """
+    cases: Tuple[Tuple[Condition, Any], ...]
+    default: Any
+
+    def key(self) -> tuple:
+        return ("cascade", tuple((c.key(), v) for c, v in self.cases), self.default)
+
+    def __eq__(self, other):
+        return isinstance(other, Cascade) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def fields(self) -> FrozenSet[str]:
+        return frozenset().union(*(c.fields() for c, _ in self.cases))
+
+    def evaluate(self, d: Dict):
+        for condition, value in self.cases:
+            if condition.evaluate(d):
+                return value
+        return self.default
+
+    def to_source(self, var: str, names: Dict[str, str]) -> str:
+        source = repr(self.default)
+        for condition, value in reversed(self.cases):
+            source = f"({value!r} if {condition.to_source(var, names)} else {source})"
+        return source
+
+    def to_numpy_source(self, var: str) -> str:
+        conditions = ", ".join(c.to_numpy_source(var) for c, _ in self.cases)
+        values = ", ".join(repr(v) for _, v in self.cases)
+        return f"np.select([{conditions}], [{values}], {self.default!r})"
+
+    def to_dict(self) -> Dict:
+        return {
+            "cases": [{"when": c.to_dict(), "then": v} for c, v in self.cases],
+            "default": self.default,
+        }
+
+
+def cascade(*cases, default) -> Cascade:
+    """میانبر ساخت Cascade از جفت‌های (شرط، مقدار)"""
+    return Cascade(tuple(cases), default)
+
+
+# ==================== Serialization ====================
+
+def expr_from_dict(data) -> Expr:
+    """ساخت عبارت از dict"""
+    if not isinstance(data, dict):
+        return Const(data)
+    if "field" in data:
+        return Field(data["field"], data.get("default", MISSING))
+    if "const" in data:
+        return Const(data["const"])
+    if "mul" in data:
+        left, right = data["mul"]
+        return Mul(expr_from_dict(left), expr_from_dict(right))
+    raise ValueError(f"عبارت نامعتبر: {data}")
+
+
+def condition_from_dict(data: Dict) -> Condition:
+    """ساخت شرط از dict (مثلاً خوانده‌شده از JSON)"""
+    if "all" in data:
+        return And(tuple(condition_from_dict(t) for t in data["all"]))
+    if "any" in data:
+        return Or(tuple(condition_from_dict(t) for t in data["any"]))
+    if "value" in data:
+        return Compare(data["op"], expr_from_dict({k: v for k, v in data.items() if k in ("field", "default")}),
+                       Const(data["value"]))
+    if "left" in data:
+        return Compare(data["op"], expr_from_dict(data["left"]), expr_from_dict(data["right"]))
+    raise ValueError(f"شرط نامعتبر: {data}")
+
+
+def cascade_from_dict(data: Dict) -> Cascade:
+    """ساخت Cascade از dict"""
+    return Cascade(
+        tuple((condition_from_dict(case["when"]), case["then"]) for case in data["cases"]),
+        data["default"],
+    )
+
+
+# ==================== Compiler ====================
+
+def field_loads(names: Dict[str, str], nodes, var: str = "d", indent: str = "        ") -> List[str]:
+    """
+    دستورهای خواندن هر فیلد در متغیر محلی خودش (names: فیلد ← نام متغیر)
+
+    فیلدی که در همه ارجاع‌های nodes پیش‌فرض یکسان دارد با get و بقیه با اندیس خوانده می‌شوند.
+    """
+    field_defaults = _field_defaults(nodes)
+    loads = []
+    for field, local in names.items():
+        default = field_defaults.get(field, MISSING)
+        if default is MISSING:
+            loads.append(f"{indent}{local} = {var}[{field!r}]")
+        else:
+            loads.append(f"{indent}{local} = {var}.get({field!r}, {default!r})")
+    return loads
+
+
+def _safe_call(condition: Callable, d: Dict) -> bool:
+    try:
+        return bool(condition(d))
+    except:
+        return False
+
+
+def compile_rules(rules: List, name: str = "evaluate_rules") -> Callable[[Dict], List]:
+    """
+    کامپایل کل مجموعه قوانین به یک تابع پایتون تخصصی
+
+    تابع حاصل قوانین فعال را به همان ترتیب ورودی برمی‌گرداند. فیلدها یک بار
+    در متغیرهای محلی خوانده می‌شوند؛ اگر خواندن یا ارزیابی با خطا مواجه شود،
+    هر قانون جداگانه (با try/except) ارزیابی می‌شود تا رفتار قبلی حفظ شود.
+    """
+    namespace = {"_safe_call": _safe_call}
+    names = {}
+    body = []
+
+    for i, rule in enumerate(rules):
+        namespace[f"_r{i}"] = rule
+        condition = rule.condition
+        if isinstance(condition, Condition):
+            for field in sorted(condition.fields()):
+                if field not in names:
+                    names[field] = f"_v{len(names)}"
+            body.append(f"        if {condition.to_source('d', names)}:")
+        else:
+            # شرط غیر اعلانی: فراخوانی امن
+            namespace[f"_c{i}"] = condition
+            body.append(f"        if _safe_call(_c{i}, d):")
+        body.append(f"            active.append(_r{i})")
+
+    loads = field_loads(names, [r.condition for r in rules if isinstance(r.condition, Condition)])
+
+    fallback = "\n".join(
+        f"    if _safe_call(_r{i}.condition, d):\n        active.append(_r{i})"
+        for i in range(len(rules))
+    )
+    source = (
+        f"def {name}(d):\n"
+        "    active = []\n"
+        "    try:\n"
+        + "\n".join(loads + body or ["        pass"]) + "\n"
+        "        return active\n"
+        "    except Exception:\n"
+        "        pass\n"
+        "    active = []\n"
+        + (fallback or "    pass") + "\n"
+        "    return active\n"
+    )
+    exec(compile(source, f"<compiled {name}>", "exec"), namespace)
+    function = namespace[name]
+    function.__source__ = source
+    return function
+
+
+def compile_numpy_masks(rules: List, name: str = "evaluate_masks") -> Callable[[Dict], List]:
+    """
+    کامپایل قوانین اعلانی به یک تابع ماسک NumPy
+
+    ورودی تابع mapping از نام فیلد به آرایه ستونی است و خروجی لیست ماسک‌ها
+    (برای قوانین غیر اعلانی None برمی‌گردد تا فراخوان رکورد به رکورد ارزیابی کند).
+    """
+    lines = [f"def {name}(d):", "    return ["]
+    for rule in rules:
+        if isinstance(rule.condition, Condition):
+            lines.append(f"        {rule.condition.to_numpy_source('d')},")
+        else:
+            lines.append("        None,")
+    lines.append("    ]")
+    source = "\n".join(lines) + "\n"
+    namespace = {}
+    exec(compile(source, f"<compiled {name}>", "exec"), namespace)
+    function = namespace[name]
+    function.__source__ = source
+    return function
+
+
+def compile_cascades(cascades: Dict[str, Cascade], name: str = "evaluate_cascades") -> Callable[[Dict], Dict]:
+    """
+    کامپایل چند Cascade به یک تابع که dict نام ← مقدار برمی‌گرداند
+
+    در صورت خطا (مثلاً فیلد ناموجود) ارزیابی تفسیری انجام می‌شود تا
+    رفتار خطا دقیقاً همانند کد if/elif معادل باشد.
+    """
+    names = {}
+    for item in cascades.values():
+        for field in sorted(item.fields()):
+            if field not in names:
+                names[field] = f"_v{len(names)}"
+
+    loads = field_loads(names, cascades.values())
+
+    items = [f"            {key!r}: {item.to_source('d', names)}," for key, item in cascades.items()]
+    source = (
+        f"def {name}(d):\n"
+        "    try:\n"
+        + "\n".join(loads) + ("\n" if loads else "")
+        + "        return {\n" + "\n".join(items) + ("\n" if items else "") + "        }\n"
+        "    except Exception:\n"
+        "        return {key: item.evaluate(d) for key, item in _cascades.items()}\n"
+    )
+    namespace = {"_cascades": dict(cascades)}
+    exec(compile(source, f"<compiled {name}>", "exec"), namespace)
+    function = namespace[name]
+    function.__source__ = source
+    return function
+
+
+def compile_numpy_cascades(cascades: Dict[str, Cascade], name: str = "evaluate_cascades") -> Callable[[Dict], Dict]:
+    """کامپایل چند Cascade به یک تابع NumPy (np.select روی آرایه‌های ستونی)"""
+    import numpy as np
+
+    lines = [f"def {name}(d):", "    return {"]
+    for key, item in cascades.items():
+        lines.append(f"        {key!r}: {item.to_numpy_source('d')},")
+    lines.append("    }")
+    source = "\n".join(lines) + "\n"
+    namespace = {"np": np}
+    exec(compile(source, f"<compiled {name}>", "exec"), namespace)
+    function = namespace[name]
+    function.__source__ = source
+    return function
+
+
+def index_by_field(items: Dict[Any, Any]) -> Dict[str, List[Any]]:
+    """شاخص وابستگی: نام فیلد ← کلیدهایی که آن فیلد را می‌خوانند"""
+    index = {}
+    for key, item in items.items():
+        for field in item.fields():
+            index.setdefault(field, []).append(key)
+    return index
+
+
+def compile_condition(condition: Condition) -> Callable[[Dict], bool]:
+    """کامپایل یک شرط منفرد به تابع پایتون"""
+    return eval(f"lambda d: {condition.to_source('d', {})}", {})
+
+
+def _field_defaults(nodes) -> Dict[str, Any]:
+    """مقدار پیش‌فرض هر فیلد (فقط اگر در همه ارجاع‌ها یکسان باشد)"""
+    defaults = {}
+    for node in nodes:
+        _collect_defaults(node, defaults)
+    return {k: v for k, v in defaults.items() if v is not _CONFLICT}
+
+
+def _collect_defaults(node, defaults: Dict):
+    if isinstance(node, Field):
+        previous = defaults.get(node.name, node.default)
+        defaults[node.name] = node.default if previous is node.default else _CONFLICT
+    elif isinstance(node, Mul):
+        _collect_defaults(node.left, defaults)
+        _collect_defaults(node.right, defaults)
+    elif isinstance(node, Compare):
+        _collect_defaults(node.left, defaults)
+        _collect_defaults(node.right, defaults)
+    elif isinstance(node, (And, Or)):
+        for term in node.terms:
+            _collect_defaults(term, defaults)
+    elif isinstance(node, Cascade):
+        for condition, _ in node.cases:
+            _collect_defaults(condition, defaults)
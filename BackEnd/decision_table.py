@@ -0,0 +1,402 @@
+"""
+جدول تصمیم بازه‌ای: کل استنتاج یک ورودی با چند bisect و چند lookup
+
+همه شرط‌ها (تبدیل‌های کیفی، قوانین و اجزای دو امتیاز) مقایسه‌اند، پس نتیجه استنتاج
+(bitmask قوانین، دو امتیاز و برچسب‌های کیفی) فقط به این وابسته است که هر فیلد در
+کدام بازه بین آستانه‌هایش قرار دارد. هر فیلد با bisect روی آستانه‌هایش به یک خانه
+(زیر/روی/بین آستانه‌ها) و خانه به کلاس هم‌ارزی (بردار درستی مقایسه‌های آن فیلد)
+نگاشت می‌شود.
+
+فیلدها بر اساس شرط‌هایی که با هم در آن‌ها می‌آیند در بلوک‌های مستقل گروه می‌شوند
+(مثلاً cta_position_y و scroll_depth در قوانین V1 و M3). سهم هر بلوک (بیت‌های
+قوانین، امتیاز اجزا و کد برچسب‌ها) برای همه ترکیب‌های کلاس فیلدهایش هنگام ساخت
+snapshot از پیش محاسبه و در یک آرایه با اندیس مختلط‌پایه ذخیره می‌شود؛ نتیجه کل
+OR بیت‌ها و جمع امتیازهای بلوک‌هاست. مقایسه‌های چندفیلدی (مساحت CTA در برابر
+بزرگ‌ترین عنصر دیگر) آستانه ثابت ندارند و در زمان اجرا ارزیابی می‌شوند؛ حاصل آن‌ها
+یک بعد دوتایی دیگر در اندیس بلوک است.
+
+ورودی با فیلد ناموجود، مقدار غیرعددی یا NaN جدول را دور می‌زند (None) و موتور
+کامپایل‌شده مرجع آن را تحلیل می‌کند.
+"""
+
+import bisect
+import itertools
+import math
+import operator
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from breakpoints import _compares, _monomial
+from conditions import And, Cascade, Compare, Or
+from facts import Inference
+
+# EXPERT_DECISION_TABLE=0: تحلیل همیشه با موتور کامپایل‌شده
+ENABLED = os.environ.get("EXPERT_DECISION_TABLE", "1") != "0"
+
+# سقف خانه‌های یک بلوک؛ دانش با بلوک بزرگ‌تر جدول نمی‌گیرد
+MAX_BLOCK_CELLS = 1 << 16
+
+
+class DecisionTable:
+    """
+    جدول تصمیم کامپایل‌شده یک موتور استنتاج
+
+    classify(d) یک عدد صحیح برمی‌گرداند که همه نتیجه استنتاج در آن بسته‌بندی شده است
+    (unpack: همان mask، دو امتیاز و برچسب‌های Inference موتور) و کلید پاسخ‌های
+    پیش‌ساخته است. دانشی که قابل جدول کردن نیست
+    (شرط غیر اعلانی، امتیاز غیرصحیح یا بلوک بزرگ‌تر از MAX_BLOCK_CELLS) ValueError می‌دهد.
+    """
+
+    def __init__(self, engine):
+        if engine.kb.opaque_rules:
+            raise ValueError("قوانین با شرط غیر اعلانی")
+
+        self.engine = engine
+        self.labels = engine.converter.labels
+        self.layout = engine.layout
+        self.label_fields = {name: label.fields() for name, label in self.labels.items()}
+
+        # اجزا: (نوع، کلید، گره)؛ بیت قانون i همان ترتیب اولویت موتور است
+        parts = [("label", name, label) for name, label in self.labels.items()]
+        parts += [("rule", 1 << i, rule.condition) for i, rule in enumerate(engine.ordered_rules)]
+        parts += [("visibility", key, c) for key, c in engine.visibility_components.items()]
+        parts += [("clickability", key, c) for key, c in engine.clickability_components.items()]
+        for kind, _, node in parts:
+            if kind in ("visibility", "clickability") and not all(
+                isinstance(v, int) and not isinstance(v, bool) for v in [value for _, value in node.cases] + [node.default]
+            ):
+                raise ValueError("امتیاز اجزا باید عدد صحیح باشد")
+
+        # آستانه‌های تک‌فیلدی و مقایسه‌های چندفیلدی (اتم‌های زمان اجرا)
+        thresholds: Dict[str, set] = {}
+        self.field_atoms: Dict[str, List[Compare]] = {}
+        self.cross_atoms: Dict[tuple, Compare] = {}
+        part_fields = []
+        for kind, _, node in parts:
+            fields = set()
+            for compare in _compares(node):
+                label_names = compare.fields() & set(self.labels) if kind == "rule" else set()
+                if label_names:
+                    for name in label_names:
+                        fields |= self.label_fields[name]
+                    if compare.fields() - label_names:
+                        raise ValueError("مقایسه برچسب کیفی با فیلد کمی")
+                    continue
+
+                fields |= compare.fields()
+                left, right = _monomial(compare.left), _monomial(compare.right)
+                single = (left is not None and right is not None and len(left[1]) + len(right[1]) == 1
+                          and (left[0] if left[1] else right[0]))
+                if single:
+                    (coef, (field,)), other = (left, right) if left[1] else (right, left)
+                    thresholds.setdefault(field.name, set()).add(other[0] / coef)
+                    atoms = self.field_atoms.setdefault(field.name, [])
+                    if compare not in atoms:
+                        atoms.append(compare)
+                else:
+                    self.cross_atoms.setdefault(compare.key(), compare)
+            part_fields.append(fields)
+
+        # کلاس‌های هم‌ارزی هر فیلد: خانه 2i+1 روی آستانه i، خانه 2i بین آستانه i-1 و i
+        self.thresholds = {name: tuple(sorted(values)) for name, values in thresholds.items()}
+        self.codes: Dict[str, List[int]] = {}
+        self.representatives: Dict[str, List[float]] = {}
+        for name, bounds in self.thresholds.items():
+            classes, codes, representatives = {}, [], []
+            for value in self.cell_values(bounds):
+                truth = tuple(atom.evaluate({name: value}) for atom in self.field_atoms[name])
+                if truth not in classes:
+                    classes[truth] = len(classes)
+                    representatives.append(value)
+                codes.append(classes[truth])
+            codes.append(codes[-1])  # مقدار inf برابر نگهبان انتهای آستانه‌ها
+            self.codes[name] = codes
+            self.representatives[name] = representatives
+
+        # بلوک‌ها: مؤلفه‌های همبند فیلدهایی که در یک جزء با هم آمده‌اند
+        parent = {}
+
+        def find(name):
+            while parent.setdefault(name, name) != name:
+                name = parent[name]
+            return name
+
+        for fields in part_fields:
+            fields = sorted(fields)
+            for name in fields[1:]:
+                parent[find(name)] = find(fields[0])
+
+        groups: Dict[str, List[int]] = {}
+        constant = []
+        for index, fields in enumerate(part_fields):
+            if fields:
+                groups.setdefault(find(next(iter(fields))), []).append(index)
+            else:
+                constant.append(index)
+
+        self.blocks = []
+        for indexes in groups.values():
+            fields = sorted(set().union(*(part_fields[i] for i in indexes)))
+            block_parts = [parts[i] for i in indexes]
+            atoms = [atom for key, atom in self.cross_atoms.items() if atom.fields() <= set(fields)]
+            self.blocks.append(self._build_block(fields, atoms, block_parts))
+        self.base = self._contribution([parts[i] for i in constant], {}, {})
+
+        self._classify = self._compile()
+
+    @staticmethod
+    def cell_values(bounds: Tuple[float, ...]) -> List[float]:
+        """یک مقدار نماینده برای هر خانه: زیر، روی و بین آستانه‌ها و بالای آن‌ها"""
+        if not bounds:
+            return [0.0]
+        values = [bounds[0] - 1]
+        for i, bound in enumerate(bounds):
+            if i:
+                values.append((bounds[i - 1] + bound) / 2)
+            values.append(bound)
+        values.append(bounds[-1] + 1)
+        return values
+
+    # ==================== Build ====================
+
+    def _truth(self, node, values: Dict, atoms: Dict) -> bool:
+        """درستی یک شرط با مقادیر نماینده فیلدها و برچسب‌ها و درستی اتم‌های چندفیلدی"""
+        if isinstance(node, And):
+            return all(self._truth(term, values, atoms) for term in node.terms)
+        if isinstance(node, Or):
+            return any(self._truth(term, values, atoms) for term in node.terms)
+        if isinstance(node, Compare):
+            key = node.key()
+            if key in atoms:
+                return atoms[key]
+            return node.evaluate(values)
+        raise ValueError(f"شرط پشتیبانی‌نشده: {type(node).__name__}")
+
+    def _select(self, cascade: Cascade, values: Dict, atoms: Dict):
+        for condition, value in cascade.cases:
+            if self._truth(condition, values, atoms):
+                return value
+        return cascade.default
+
+    def _contribution(self, parts: List, values: Dict, atoms: Dict) -> Tuple[int, int, int, int]:
+        """سهم اجزای یک بلوک: (بیت‌های قوانین، امتیاز دیده‌شدن، امتیاز کلیک‌پذیری، کد برچسب‌ها)"""
+        mask = visibility = clickability = labels = 0
+        label_values = {}
+        for kind, key, node in parts:
+            if kind == "label":
+                value = self._select(node, values, atoms)
+                label_values[key] = value
+                labels |= self.layout.codes[key][value] << self.layout.shifts[key]
+        facts = {**values, **label_values}
+        for kind, key, node in parts:
+            if kind == "rule" and self._truth(node, facts, atoms):
+                mask |= key
+            elif kind == "visibility":
+                visibility += self._select(node, values, atoms)
+            elif kind == "clickability":
+                clickability += self._select(node, values, atoms)
+        return mask, visibility, clickability, labels
+
+    def _build_block(self, fields: List[str], atoms: List[Compare], parts: List) -> Dict:
+        """آرایه سهم همه ترکیب‌های کلاس فیلدها و درستی اتم‌های چندفیلدی یک بلوک"""
+        dimensions = [len(self.representatives.get(name, (None,))) for name in fields] + [2] * len(atoms)
+        cells = math.prod(dimensions)
+        if cells > MAX_BLOCK_CELLS:
+            raise ValueError(f"بلوک {', '.join(fields)} با {cells} خانه از سقف {MAX_BLOCK_CELLS} بزرگ‌تر است")
+
+        strides, stride = [], 1
+        for size in reversed(dimensions):
+            strides.append(stride)
+            stride *= size
+        strides.reverse()
+
+        table = []
+        for combination in itertools.product(*(range(size) for size in dimensions)):
+            values = {
+                name: self.representatives[name][c]
+                for name, c in zip(fields, combination) if name in self.representatives
+            }
+            truth = {atom.key(): bool(bit) for atom, bit in zip(atoms, combination[len(fields):])}
+            table.append(self._contribution(parts, values, truth))
+
+        return {
+            "fields": fields,
+            "atoms": atoms,
+            "strides": dict(zip(fields, strides)),
+            "atom_strides": strides[len(fields):],
+            "table": tuple(table),
+        }
+
+    def _pack_layout(self):
+        """
+        چیدمان بیتی کلید: بیت‌های قوانین، کد برچسب‌ها و دو امتیاز هر کدام در میدان خودش
+
+        بیت‌های قوانین و برچسب‌های بلوک‌ها جدا از هم‌اند و امتیاز هر بلوک با کم کردن
+        کمینه‌اش نامنفی ذخیره می‌شود، پس کلید کل جمع ساده کلیدهای بلوک‌هاست.
+        """
+        entries = [self.base] + [entry for block in self.blocks for entry in block["table"]]
+        self.rule_bits = max(1, max(entry[0] for entry in entries).bit_length())
+        self.label_bits = max(1, max(entry[3] for entry in entries).bit_length())
+
+        # کمینه امتیاز هر بلوک (سطر 0: دیده‌شدن، سطر 1: کلیک‌پذیری)
+        lows = [[min(entry[position] for entry in block["table"]) for block in self.blocks] for position in (1, 2)]
+        highs = [[max(entry[position] for entry in block["table"]) for block in self.blocks] for position in (1, 2)]
+        self.offsets = tuple(self.base[position] + sum(lows[i]) for i, position in enumerate((1, 2)))
+        widths = [max(1, (sum(highs[i]) - sum(lows[i])).bit_length()) for i in (0, 1)]
+        self.score_masks = tuple((1 << width) - 1 for width in widths)
+        self.shifts = (self.rule_bits + self.label_bits, self.rule_bits + self.label_bits + widths[0])
+
+        def pack(entry, b: int) -> int:
+            mask, visibility, clickability, labels = entry
+            return (mask | labels << self.rule_bits | (visibility - lows[0][b]) << self.shifts[0]
+                    | (clickability - lows[1][b]) << self.shifts[1])
+
+        return [tuple(pack(entry, b) for entry in block["table"]) for b, block in enumerate(self.blocks)]
+
+    def _compile(self) -> Callable[[Dict], int]:
+        """تابع تخصصی: خواندن فیلدها، bisect هر فیلد و جمع کلیدهای بلوک‌ها"""
+        packed = self._pack_layout()
+        namespace = {"_bisect": bisect.bisect_left}
+        fields = sorted({name for block in self.blocks for name in block["fields"]})
+        names = {name: f"_v{i}" for i, name in enumerate(fields)}
+        lines = []
+        if len(fields) > 1:
+            namespace["_get"] = operator.itemgetter(*fields)  # همه فیلدها در یک فراخوانی
+            lines.append(f"    {', '.join(names.values())} = _get(d)")
+        elif fields:
+            lines.append(f"    _v0 = d[{fields[0]!r}]")
+        if fields:
+            # NaN با هیچ آستانه‌ای مقایسه درستی ندارد و در هیچ خانه‌ای نمی‌گنجد
+            lines.append(f"    if {' or '.join(f'{local} != {local}' for local in names.values())}:")
+            lines.append("        return None")
+
+        keys = {}
+        for name in fields:
+            if name not in self.thresholds:
+                continue
+            i = len(keys)
+            local = names[name]
+            # خانه 2i یا (روی آستانه i) 2i+1؛ نگهبان inf بررسی انتهای لیست را حذف می‌کند
+            namespace[f"_T{i}"] = list(self.thresholds[name])
+            namespace[f"_S{i}"] = list(self.thresholds[name]) + [math.inf]
+            lines.append(f"    _i = _bisect(_T{i}, {local})")
+            lines.append(f"    _k{i} = _i + _i + (_S{i}[_i] == {local})")
+            keys[name] = f"_k{i}"
+
+        terms = []
+        for b, block in enumerate(self.blocks):
+            if len(block["fields"]) == 1 and not block["atoms"] and block["fields"][0] in keys:
+                # بلوک تک‌فیلدی: خانه مستقیماً اندیس کلید است
+                name = block["fields"][0]
+                namespace[f"_B{b}"] = tuple(packed[b][c] for c in self.codes[name])
+                terms.append(f"_B{b}[{keys[name]}]")
+                continue
+            indexes = []
+            for name in block["fields"]:
+                if name in keys:
+                    # کلاس هر خانه از پیش در گام بلوک ضرب شده است
+                    namespace[f"_C{b}_{name}"] = [c * block["strides"][name] for c in self.codes[name]]
+                    indexes.append(f"_C{b}_{name}[{keys[name]}]")
+            for atom, stride in zip(block["atoms"], block["atom_strides"]):
+                indexes.append(f"({stride} if {atom.to_source('d', names)} else 0)")
+            namespace[f"_B{b}"] = packed[b]
+            terms.append(f"_B{b}[{' + '.join(indexes) or '0'}]")
+
+        lines.append(f"    return {' + '.join(terms) or '0'}")
+        source = "def classify(d):\n" + "\n".join(lines) + "\n"
+        exec(compile(source, "<decision table>", "exec"), namespace)
+        function = namespace["classify"]
+        function.__source__ = source
+        return function
+
+    # ==================== Lookup ====================
+
+    def classify(self, d: Dict) -> Optional[int]:
+        """کلید بسته‌بندی‌شده نتیجه استنتاج ورودی، یا None اگر ورودی باید با موتور مرجع تحلیل شود"""
+        try:
+            return self._classify(d)
+        except (KeyError, TypeError):
+            return None
+
+    def unpack(self, key: int) -> Tuple[int, int, int, int]:
+        """(mask، امتیاز دیده‌شدن، امتیاز کلیک‌پذیری، برچسب‌های بسته‌بندی‌شده) یک کلید"""
+        mask = key & ((1 << self.rule_bits) - 1)
+        labels = key >> self.rule_bits & ((1 << self.label_bits) - 1)
+        visibility = 100 + self.offsets[0] + (key >> self.shifts[0] & self.score_masks[0])
+        clickability = 100 + self.offsets[1] + (key >> self.shifts[1] & self.score_masks[1])
+        return mask, max(0, min(100, visibility)), max(0, min(100, clickability)), labels
+
+    def infer(self, d: Dict) -> Optional[Inference]:
+        key = self.classify(d)
+        return None if key is None else Inference(self.engine, *self.unpack(key))
+
+    def stats(self) -> Dict:
+        return {
+            "fields": len(self.thresholds),
+            "blocks": [
+                {"fields": block["fields"], "cross_terms": len(block["atoms"]), "cells": len(block["table"])}
+                for block in self.blocks
+            ],
+            "cells": sum(len(block["table"]) for block in self.blocks),
+        }
+
+    # ==================== Verification ====================
+
+    def probe_points(self, block: Dict, base: Dict) -> Iterable[Dict]:
+        """
+        همه خانه‌های یک بلوک با مقادیر عددی واقعی (بقیه فیلدها از base)
+
+        برای هر فیلد همه خانه‌هایش (زیر، روی و بین آستانه‌ها و بالای آن‌ها) و برای هر
+        مقایسه حاصل‌ضربی، آستانه هر فیلدش با مقدار بقیه فیلدها و دو طرف آن آزموده می‌شود.
+        """
+        fields = block["fields"]
+        grids = [self.cell_values(self.thresholds[name]) if name in self.thresholds else [base[name]]
+                 for name in fields]
+        for combination in itertools.product(*grids):
+            point = {**base, **dict(zip(fields, combination))}
+            yield point
+            for atom in block["atoms"]:
+                left, right = _monomial(atom.left), _monomial(atom.right)
+                if left is None or right is None:
+                    continue
+                for side, other in ((left, right), (right, left)):
+                    for position, field in enumerate(side[1]):
+                        rest = side[0] * math.prod(point[f.name] for j, f in enumerate(side[1]) if j != position)
+                        target = other[0] * math.prod(point[f.name] for f in other[1])
+                        if not rest or field.name in {f.name for f in other[1]}:
+                            continue
+                        threshold = target / rest
+                        delta = max(abs(threshold) * 1e-9, 1e-9)
+                        for value in (threshold - delta, threshold, threshold + delta):
+                            yield {**point, field.name: value}
+
+    def verify(self, bases: List[Dict]) -> Tuple[int, List[Dict]]:
+        """
+        مقایسه همه خانه‌های همه بلوک‌ها با استنتاج مرحله‌ای مرجع، برای هر ورودی پایه
+
+        سهم بلوک‌ها مستقل است (OR بیت‌ها و جمع امتیازها)، پس آزمودن همه خانه‌های هر
+        بلوک با ثابت بودن بقیه فیلدها کل جدول را پوشش می‌دهد. خروجی: (تعداد نقاط، ناهمخوانی‌ها)
+        """
+        checked, mismatches = 0, []
+        for base in bases:
+            for block in self.blocks:
+                for point in self.probe_points(block, base):
+                    reference = self.engine.infer_staged(point)
+                    expected = (reference.mask, reference.visibility_score,
+                                reference.clickability_score, reference.labels)
+                    key = self.classify(point)
+                    actual = None if key is None else self.unpack(key)
+                    checked += 1
+                    if actual != expected:
+                        mismatches.append({"inputs": point, "expected": expected, "actual": actual})
+        return checked, mismatches
+
+
+def build_table(engine) -> Optional[DecisionTable]:
+    """جدول تصمیم موتور، یا None اگر غیرفعال است یا دانش قابل جدول کردن نیست"""
+    if not ENABLED:
+        return None
+    try:
+        return DecisionTable(engine)
+    except ValueError:
+        return None
@@ -0,0 +1,893 @@
+"""
+هسته سیستم خبره تحلیل UI/UX (مستقل از FastAPI)
+
+سرویس تحلیل، نشست‌های افزایشی، سریال‌سازی و snapshot دانش؛ هم API وب (main.py)
+و هم ابزار خط فرمان (analyze_cli.py) از این ماژول استفاده می‌کنند. هسته استنتاج
+در inference.py است و از اینجا هم در دسترس است؛ مدل‌های Pydantic (models.py) و
+ارزیاب برداری NumPy (vectorized.py) با اولین دسترسی وارد می‌شوند تا وارد کردن این
+ماژول سریع بماند.
+"""
+
+from typing import TYPE_CHECKING, List, Dict, FrozenSet, Optional, Tuple
+from collections import OrderedDict
+from functools import cached_property
+import bisect
+import hashlib
+import importlib
+import json
+import math
+import threading
+import time
+import weakref
+
+try:
+    import orjson
+except ImportError:  # وابستگی اختیاری؛ بدون آن سریال‌سازی با json استاندارد
+    orjson = None
+
+from metrics import Metrics
+from rule_files import RuleFileError, RulesWatcher, load_knowledge
+from breakpoints import BreakpointIndex
+from decision_table import DecisionTable, build_table
+from goals import GoalPlan
+from facts import PATTERN_CACHE_SIZE, Activations, Inference
+from conditions import Cascade, Condition, cascade_from_dict
+from inference import ActivatedRule, ExplanationFacility, InferenceEngine, KnowledgeBase, QualitativeConverter, Rule
+
+if TYPE_CHECKING:
+    from optimizer import DesignOptimizer
+    from uncertainty import MonteCarloAnalyzer
+    from vectorized import VectorizedEvaluator
+
+
+# ==================== Lazy Imports ====================
+
+# نام‌هایی که با اولین دسترسی از ماژول سنگین‌تر خود وارد می‌شوند (Pydantic / NumPy)
+LAZY_NAMES = {
+    **dict.fromkeys((
+        "LandingPageInput", "LandingPageDelta", "FIELD_STEPS", "ActivatedRuleResponse", "AnalysisResponse",
+        "BatchAnalysisRequest", "BatchAnalysisItem", "BatchAnalysisResponse", "EditableField",
+        "OptimizeRequest", "DesignCandidate", "OptimizeResponse", "SensitivityRange", "FieldSensitivity",
+        "SensitivityResponse", "QueryGoal", "QueryPlan", "QueryResponse", "FieldDistribution",
+        "UncertaintyRequest", "ScoreDistribution", "CertaintyDistribution", "UncertaintyResponse",
+    ), "models"),
+    "VectorizedEvaluator": "vectorized",
+}
+
+
+def __getattr__(name: str):
+    """وارد کردن تنبل مدل‌های API و ارزیاب برداری (PEP 562)"""
+    module = LAZY_NAMES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+# بخش‌های اختیاری پاسخ تحلیل (پارامتر include)
+RESPONSE_SECTIONS = frozenset({"rules", "qualitative", "explanation", "summary"})
+
+
+# ==================== Incremental Sessions ====================
+
+class IncrementalSession:
+    """
+    نشست تحلیل افزایشی (what-if)
+    
+    آخرین مجموعه واقعیت‌ها نگه داشته می‌شود و با هر تغییر، فقط تبدیل‌های کیفی،
+    قوانین و اجزای امتیازی که به فیلدهای تغییرکرده وابسته‌اند دوباره ارزیابی می‌شوند.
+    """
+    
+    def __init__(self, engine: InferenceEngine, inputs: Dict):
+        self.lock = threading.Lock()
+        self.rebase(engine, inputs)
+    
+    def rebase(self, engine: InferenceEngine, inputs: Dict):
+        """ارزیابی کامل ورودی با موتور داده‌شده (شروع نشست یا پس از بارگذاری مجدد دانش)"""
+        self.engine = engine
+        self.kb = engine.kb
+        self.last_used = time.monotonic()
+        
+        self.inputs = dict(inputs)
+        self.qualitative = engine.converter.convert_inputs(self.inputs)
+        self.facts = {**self.inputs, **self.qualitative}
+        self.active = {i for i in range(len(self.kb.rules)) if self._test_rule(i)}
+        self.visibility_points = dict(engine._visibility_points(self.inputs))
+        self.clickability_points = dict(engine._clickability_points(self.inputs))
+    
+    def _test_rule(self, i: int) -> bool:
+        try:
+            return bool(self.kb.rule_functions[i](self.facts))
+        except:
+            return False
+    
+    def update(self, delta: Dict) -> Dict:
+        """اعمال تغییرات و ارزیابی مجدد فقط بخش‌های وابسته"""
+        changed = {k: v for k, v in delta.items() if k not in self.inputs or self.inputs[k] != v}
+        self.inputs.update(changed)
+        self.facts.update(changed)
+        changed_facts = set(changed)
+        
+        # تبدیل‌های کیفی وابسته
+        converter = self.engine.converter
+        labels = {label for field in changed for label in converter.labels_by_field.get(field, ())}
+        for label in labels:
+            value = converter.labels[label].evaluate(self.inputs)
+            if value != self.qualitative[label]:
+                self.qualitative[label] = value
+                self.facts[label] = value
+                changed_facts.add(label)
+        
+        # قوانین وابسته به واقعیت‌های تغییرکرده
+        rules = {i for fact in changed_facts for i in self.kb.rules_by_field.get(fact, ())}
+        for i in rules.union(self.kb.opaque_rules):
+            if self._test_rule(i):
+                self.active.add(i)
+            else:
+                self.active.discard(i)
+        
+        # اجزای امتیاز وابسته
+        for points, components, by_field in (
+            (self.visibility_points, self.engine.visibility_components, self.engine.visibility_by_field),
+            (self.clickability_points, self.engine.clickability_components, self.engine.clickability_by_field),
+        ):
+            for key in {key for field in changed for key in by_field.get(field, ())}:
+                points[key] = components[key].evaluate(self.inputs)
+        
+        self.last_used = time.monotonic()
+        return self.results()
+    
+    def results(self) -> Inference:
+        """نتیجه فشرده، همانند خروجی InferenceEngine.infer"""
+        engine = self.engine
+        mask = 0
+        for i in self.active:
+            mask |= engine.rule_bits[i]
+        
+        return Inference(
+            engine, mask,
+            engine.clamp_score(self.visibility_points.values()),
+            engine.clamp_score(self.clickability_points.values()),
+            engine.layout.encode(self.qualitative),
+        )
+
+
+class SessionStore:
+    """نگهداری نشست‌ها با حذف LRU و انقضای زمانی"""
+    
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 1800):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def put(self, session_id: str, session: IncrementalSession):
+        with self._lock:
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+    
+    def get(self, session_id: str) -> Optional[IncrementalSession]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.monotonic() - session.last_used > self.ttl_seconds:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return session
+    
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+# ==================== Response Serialization ====================
+
+def render_json(content) -> bytes:
+    """
+    سریال‌سازی JSON فشرده با خروجی UTF-8 (متن فارسی بدون escape \\u)
+    
+    با orjson در صورت نصب؛ در غیر این صورت json استاندارد با همان بایت‌های خروجی
+    JSONResponse پیش‌فرض FastAPI.
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _rule_entry(rule: Rule, certainty: float) -> Dict:
+    """نمایش یک قانون فعال در پاسخ (ActivatedRuleResponse)"""
+    return {
+        "rule_id": rule.id,
+        "priority": rule.priority,
+        "certainty": certainty,
+        "conclusion": rule.conclusion,
+        "explanation": rule.explanation,
+        "category": rule.category
+    }
+
+
+class ResponseEncoder:
+    """
+    سریال‌سازی پاسخ تحلیل با قطعات JSON از پیش سریال‌شده
+    
+    بخش ثابت هر قانون (شناسه، اولویت، اطمینان، نتیجه، توضیح، دسته) و متن پیشنهادها
+    هنگام بارگذاری پایگاه دانش یک بار سریال می‌شوند؛ در هر پاسخ فقط بخش‌های متغیر
+    سریال و قطعات با join کنار هم گذاشته می‌شوند.
+    """
+    
+    def __init__(self, knowledge_base: KnowledgeBase):
+        counts = {}
+        for rule in knowledge_base.rules:
+            counts[rule.id] = counts.get(rule.id, 0) + 1
+        # شناسه تکراری قطعه ندارد و هر بار سریال می‌شود
+        self.rule_fragments = {
+            rule.id: (rule, render_json(_rule_entry(rule, rule.certainty)))
+            for rule in knowledge_base.rules if counts[rule.id] == 1
+        }
+        self.text_fragments = {rule.conclusion: render_json(rule.conclusion) for rule in knowledge_base.rules}
+        self._keys = {}
+    
+    def rules(self, activated_rules: List[ActivatedRule]) -> bytes:
+        """آرایه JSON قوانین فعال"""
+        fragments = self.rule_fragments
+        parts = []
+        for activated in activated_rules:
+            entry = fragments.get(activated.rule.id)
+            if entry is not None and entry[0] is activated.rule and activated.certainty == activated.rule.certainty:
+                parts.append(entry[1])
+            else:
+                parts.append(render_json(_rule_entry(activated.rule, activated.certainty)))
+        return b"[" + b",".join(parts) + b"]"
+    
+    def activations(self, activations: Activations) -> Tuple[bytes, bytes]:
+        """آرایه‌های JSON قوانین فعال و پیشنهادهای یک الگو (یک بار برای هر الگو)"""
+        encoded = activations.encoded
+        if encoded is None or encoded[0] is not self:
+            encoded = (self, self.rules(activations.activated), self.texts(activations.recommendations))
+            activations.encoded = encoded
+        return encoded[1], encoded[2]
+    
+    def texts(self, texts: List[str]) -> bytes:
+        """آرایه JSON رشته‌ها (پیشنهادها)"""
+        fragments = self.text_fragments
+        return b"[" + b",".join(fragments.get(text) or render_json(text) for text in texts) + b"]"
+    
+    def encode(self, response: Dict) -> bytes:
+        """بایت‌های JSON پاسخ؛ مقادیر bytes (خروجی rules/texts) بدون تغییر درج می‌شوند"""
+        keys = self._keys
+        parts = []
+        for key, value in response.items():
+            prefix = keys.get(key)
+            if prefix is None:
+                prefix = keys.setdefault(key, render_json(key) + b":")
+            parts.append(prefix + (value if isinstance(value, bytes) else render_json(value)))
+        return b"{" + b",".join(parts) + b"}"
+
+
+# ==================== Rules Catalog ====================
+
+
+class RulesCatalog:
+    """فهرست قوانین پایگاه دانش، از پیش سریال‌شده به بایت‌های JSON همراه با ETag"""
+    
+    def __init__(self, knowledge_base: KnowledgeBase):
+        self.kb = knowledge_base
+        self.categories = {rule.category for rule in self.kb.rules}
+        self.priorities = sorted({rule.priority for rule in self.kb.rules})
+        self._rendered = {}  # (category, min_priority) -> (body, etag)
+        self._lock = threading.Lock()
+    
+    def get(self, category: Optional[str] = None, min_priority: Optional[int] = None):
+        """بایت‌های پاسخ و ETag برای فیلتر داده‌شده (هر فیلتر فقط یک بار سریال می‌شود)"""
+        # نرمال‌سازی فیلترها تا تعداد مدخل‌های کش به ترکیب‌های واقعی محدود بماند
+        if category is not None and category not in self.categories:
+            category = ""
+        if min_priority is not None:
+            position = bisect.bisect_left(self.priorities, min_priority)
+            min_priority = self.priorities[position] if position < len(self.priorities) else math.inf
+        key = (category, min_priority)
+        rendered = self._rendered.get(key)
+        if rendered is None:
+            with self._lock:
+                rendered = self._rendered.get(key)
+                if rendered is None:
+                    rendered = self._render(category, min_priority)
+                    self._rendered[key] = rendered
+        return rendered
+    
+    def _render(self, category: Optional[str], min_priority: Optional[int]):
+        rules_list = [
+            {
+                "id": rule.id,
+                "priority": rule.priority,
+                "certainty": rule.certainty,
+                "conclusion": rule.conclusion,
+                "explanation": rule.explanation,
+                "category": rule.category
+            }
+            for rule in self.kb.rules
+            if (category is None or rule.category == category)
+            and (min_priority is None or rule.priority >= min_priority)
+        ]
+        
+        body = render_json({
+            "total_rules": len(rules_list),
+            "rules": rules_list
+        })
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        return body, etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """بررسی هدر If-None-Match (لیست ETag ها یا *)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+# ==================== Knowledge Snapshot ====================
+
+class KnowledgeSnapshot:
+    """
+    دانش کامپایل‌شده تغییرناپذیر: پایگاه دانش، موتور استنتاج، ارزیاب برداری و فهرست قوانین
+    
+    بارگذاری مجدد یک snapshot کامل جدید می‌سازد و با یک انتساب جایگزین می‌کند؛
+    هر درخواست snapshot را یک بار در شروع می‌خواند و با همان به پایان می‌رسد.
+    مسیر تحلیل تک‌ورودی بلافاصله کامپایل می‌شود؛ جدول تصمیم، ارزیاب برداری، شاخص
+    نقاط شکست و بهینه‌ساز (NumPy) با اولین استفاده ساخته می‌شوند.
+    """
+    
+    def __init__(self, rules: Optional[List[Rule]] = None, labels: Optional[Dict[str, Cascade]] = None,
+                 source: Optional[str] = None):
+        self.kb = KnowledgeBase(rules)
+        self.ie = InferenceEngine(self.kb, QualitativeConverter(labels))
+        self.catalog = RulesCatalog(self.kb)
+        self.encoder = ResponseEncoder(self.kb)
+        self.version = self.ie.version
+        self.source = source
+        self.loaded_at = time.time()
+        self.cells = {}  # (کلید جدول تصمیم، بخش‌ها) ← قطعات پیش‌ساخته پاسخ
+        self.goals = {}  # (دسته‌ها، شناسه‌های قوانین) ← GoalPlan
+    
+    @cached_property
+    def table(self) -> Optional[DecisionTable]:
+        return build_table(self.ie)
+    
+    def infer(self, inputs: Dict) -> Inference:
+        """استنتاج با جدول تصمیم در صورت امکان، در غیر این صورت با موتور"""
+        table = self.table
+        inference = table.infer(inputs) if table is not None else None
+        return inference if inference is not None else self.ie.infer(inputs)
+    
+    def goal(self, categories: FrozenSet[str], rule_ids: FrozenSet[str]) -> GoalPlan:
+        """برنامه ارزیابی هدف (یک بار برای هر هدف کامپایل می‌شود)؛ هدف نامعتبر: ValueError"""
+        key = (frozenset(categories), frozenset(rule_ids))
+        plan = self.goals.get(key)
+        if plan is None:
+            plan = GoalPlan(self.ie, *key)
+            if len(self.goals) >= PATTERN_CACHE_SIZE:
+                self.goals.clear()
+            self.goals[key] = plan
+        return plan
+    
+    @cached_property
+    def ve(self) -> "VectorizedEvaluator":
+        from vectorized import VectorizedEvaluator
+        return VectorizedEvaluator(self.ie)
+    
+    @cached_property
+    def breakpoints(self) -> BreakpointIndex:
+        from models import FIELD_STEPS
+        return BreakpointIndex(self.ie, self.ve, FIELD_STEPS)
+    
+    @cached_property
+    def optimizer(self) -> "DesignOptimizer":
+        from optimizer import DesignOptimizer
+        return DesignOptimizer(self.ie, self.ve, self.breakpoints)
+    
+    @cached_property
+    def uncertainty(self) -> "MonteCarloAnalyzer":
+        from uncertainty import MonteCarloAnalyzer
+        return MonteCarloAnalyzer(self.ie, self.ve)
+    
+    def warm(self) -> "KnowledgeSnapshot":
+        """ساخت همه اجزای تنبل (پیش از fork یا وقتی تأخیر اولین درخواست دسته‌ای مهم است)"""
+        self.table
+        self.optimizer  # ارزیاب برداری و شاخص نقاط شکست را هم می‌سازد
+        self.uncertainty
+        return self
+    
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "KnowledgeSnapshot":
+        """ساخت snapshot از فایل‌های دانش (None: دانش پیش‌فرض داخلی)؛ خطا: RuleFileError"""
+        if path is None:
+            return cls()
+        
+        document = load_knowledge(path)
+        rules = None
+        if document["rules"] is not None:
+            rules = []
+            for data in document["rules"]:
+                try:
+                    rules.append(Rule.from_dict(data))
+                except (KeyError, TypeError, ValueError) as e:
+                    raise RuleFileError(f"قانون {data.get('id', '?')} نامعتبر: {type(e).__name__}: {e}") from e
+        
+        labels = QualitativeConverter._create_labels()
+        for name, data in document["labels"].items():
+            try:
+                labels[name] = cascade_from_dict(data)
+            except (KeyError, TypeError, ValueError) as e:
+                raise RuleFileError(f"برچسب {name} نامعتبر: {type(e).__name__}: {e}") from e
+        
+        return cls(rules, labels, source=str(path))
+    
+    def to_document(self) -> Dict:
+        """نمایش داده‌ای دانش با قالب فایل‌های دانش (قابل بارگذاری با load)"""
+        opaque = [rule.id for rule in self.kb.rules if not isinstance(rule.condition, Condition)]
+        if opaque:
+            raise RuleFileError(f"شرط این قوانین اعلانی نیست و قابل صدور نیست: {', '.join(opaque)}")
+        return {
+            "labels": {name: label.to_dict() for name, label in self.ie.converter.labels.items()},
+            "rules": [rule.to_dict() for rule in self.kb.rules],
+        }
+    
+    def info(self) -> Dict:
+        """مشخصات snapshot (برای پاسخ بارگذاری مجدد و ابزار خط فرمان)"""
+        return {
+            "version": self.version,
+            "rules": len(self.kb.rules),
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+        }
+
+
+# ==================== API Service ====================
+
+class ExpertSystemService:
+    """سرویس سیستم خبره"""
+    
+    def __init__(self, metrics: Optional[Metrics] = None, rules_path: Optional[str] = None):
+        self.ef = ExplanationFacility()
+        self.sessions = SessionStore()
+        self.rules_path = rules_path
+        self.metrics = metrics if metrics is not None and metrics.enabled else None
+        self.reloads = 0
+        self.reload_errors = 0
+        self._snapshots = weakref.WeakValueDictionary()  # نسخه ← snapshot های هنوز در استفاده
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[RulesWatcher] = None
+        
+        self._install(KnowledgeSnapshot.load(rules_path))
+        if self.metrics is not None:
+            self._instrument(self.metrics)
+    
+    def _install(self, snapshot: KnowledgeSnapshot):
+        """انتشار snapshot؛ درخواست‌های بعدی آن را می‌بینند و درخواست‌های در جریان قبلی را"""
+        if self.metrics is not None:
+            self._instrument_snapshot(self.metrics, snapshot)
+        self._snapshots[snapshot.version] = snapshot
+        self.snapshot = snapshot
+    
+    def _instrument(self, metrics: Metrics):
+        """
+        نصب زمان‌سنج روی مراحل تحلیل با جایگزینی متدهای همین نمونه
+        
+        منطق هیچ مرحله‌ای تغییر نمی‌کند و در حالت غیرفعال این متد صدا زده نمی‌شود.
+        مراحل بسیار کوتاه (CF و پیشنهادات) جدا زمان‌سنجی نمی‌شوند چون هزینه
+        زمان‌سنج با خودشان برابر است؛ سهمشان در زمان کل analyze دیده می‌شود.
+        """
+        self.ef.generate_explanation = metrics.timed("explanation", self.ef.generate_explanation)
+        self._create_summary = metrics.timed("summary", self._create_summary)
+        self.analyze = metrics.timed("analyze", self.analyze)
+        self.analyze_json = metrics.timed("analyze", self.analyze_json)
+        self.analyze_batch = metrics.timed("analyze_batch", self.analyze_batch)
+        self.optimize = metrics.timed("optimize", self.optimize)
+        self.sensitivity = metrics.timed("sensitivity", self.sensitivity)
+        self.query = metrics.timed("query", self.query)
+        self.uncertainty = metrics.timed("uncertainty", self.uncertainty)
+    
+    @staticmethod
+    def _instrument_snapshot(metrics: Metrics, snapshot: KnowledgeSnapshot):
+        """زمان‌سنج مراحل موتور استنتاج و سریال‌سازی (برای هر snapshot جدید دوباره نصب می‌شود)"""
+        snapshot.encoder.encode = metrics.timed("serialize", snapshot.encoder.encode)
+        ie = snapshot.ie
+        # استنتاج یکپارچه و جدول تصمیم مراحل را جدا نمی‌کنند: با سنجه‌ها مسیر مرحله‌ای اجرا می‌شود
+        ie._kernel = None
+        snapshot.table = None
+        ie.converter.convert_inputs = metrics.timed("convert_inputs", ie.converter.convert_inputs)
+        
+        evaluate_rules = metrics.timed("evaluate_rules", ie.kb.evaluate)
+        count_rules = metrics.count_rules
+        
+        def evaluate_and_count(full_data):
+            activated = evaluate_rules(full_data)
+            count_rules(activated)
+            return activated
+        
+        ie.kb.evaluate = evaluate_and_count
+        ie._calculate_visibility_score = metrics.timed("scores", ie._calculate_visibility_score)
+        ie._calculate_clickability_score = metrics.timed("scores", ie._calculate_clickability_score)
+    
+    @property
+    def kb(self) -> KnowledgeBase:
+        return self.snapshot.kb
+    
+    @property
+    def ie(self) -> InferenceEngine:
+        return self.snapshot.ie
+    
+    @property
+    def ve(self) -> "VectorizedEvaluator":
+        return self.snapshot.ve
+    
+    @property
+    def catalog(self) -> RulesCatalog:
+        return self.snapshot.catalog
+    
+    @property
+    def version(self) -> str:
+        """نسخه پایگاه دانش (برای کلید کش و برچسب پاسخ‌ها)"""
+        return self.snapshot.version
+    
+    def snapshot_for(self, version: Optional[str]) -> KnowledgeSnapshot:
+        """snapshot با نسخه داده‌شده اگر هنوز در استفاده است، در غیر این صورت snapshot جاری"""
+        if version is not None:
+            snapshot = self._snapshots.get(version)
+            if snapshot is not None:
+                return snapshot
+        return self.snapshot
+    
+    def reload(self) -> Dict:
+        """
+        بارگذاری مجدد دانش از rules_path و جایگزینی اتمیک snapshot
+        
+        کامپایل خارج از مسیر درخواست‌ها انجام می‌شود و درخواست‌ها قفلی نمی‌گیرند؛
+        اگر فایل‌ها نامعتبر باشند RuleFileError و snapshot فعلی بدون تغییر می‌ماند.
+        """
+        with self._reload_lock:
+            previous = self.snapshot
+            try:
+                snapshot = KnowledgeSnapshot.load(self.rules_path).warm()
+            except RuleFileError:
+                self.reload_errors += 1
+                raise
+            
+            changed = snapshot.version != previous.version
+            if changed:
+                self._install(snapshot)
+            self.reloads += 1
+            return {**self.snapshot.info(), "changed": changed, "previous_version": previous.version}
+    
+    def watch(self, interval: float = 2.0):
+        """بارگذاری مجدد خودکار پس از تغییر فایل‌های دانش (بدون rules_path اثری ندارد)"""
+        if self.rules_path is None or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._watcher = RulesWatcher(self.rules_path, self.reload, interval).start()
+    
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+    
+    def analyze(self, inputs: Dict, include: Optional[FrozenSet[str]] = None,
+                snapshot: Optional[KnowledgeSnapshot] = None, inferences: Optional[List[Inference]] = None) -> Dict:
+        """
+        تحلیل و استنتاج (include: بخش‌های اختیاری پاسخ؛ None یعنی همه)
+        
+        با inferences، نتیجه استنتاجی که پاسخ از آن ساخته شد به آن افزوده می‌شود (تاریخچه).
+        """
+        snapshot = snapshot or self.snapshot
+        
+        # اجرای Forward Chaining (یا جستجو در جدول تصمیم)
+        inference = snapshot.infer(inputs)
+        if inferences is not None:
+            inferences.append(inference)
+        
+        return self._build_response(inference, inputs, include)
+    
+    def analyze_json(self, inputs: Dict, include: Optional[FrozenSet[str]] = None,
+                     snapshot: Optional[KnowledgeSnapshot] = None,
+                     inferences: Optional[List[Inference]] = None) -> bytes:
+        """تحلیل و سریال‌سازی مستقیم پاسخ به بایت‌های JSON (همان محتوای analyze؛ inferences همانند analyze)"""
+        snapshot = snapshot or self.snapshot
+        table = snapshot.table
+        key = table.classify(inputs) if table is not None else None
+        if key is not None:
+            if inferences is not None:
+                inferences.append(Inference(snapshot.ie, *table.unpack(key)))
+            return self._render_cell(snapshot, key, inputs, include)
+        
+        inference = snapshot.ie.infer(inputs)
+        if inferences is not None:
+            inferences.append(inference)
+        return snapshot.encoder.encode(self._build_response(inference, inputs, include, snapshot.encoder))
+    
+    def _render_cell(self, snapshot: KnowledgeSnapshot, key: int, inputs: Dict,
+                     include: Optional[FrozenSet[str]]) -> bytes:
+        """
+        پاسخ یک خانه جدول تصمیم از قطعات پیش‌ساخته
+        
+        همه پاسخ جز بخش ورودی‌های توضیح فقط به نتیجه استنتاج وابسته است و برای هر
+        کلید و مجموعه بخش‌ها یک بار سریال می‌شود؛ بخش ورودی‌ها (مقادیر دقیق) هر بار
+        رندر و بین دو قطعه درج می‌شود.
+        """
+        cell = snapshot.cells.get((key, include))
+        if cell is None:
+            cell = self._prerender(snapshot, key, include)
+            if len(snapshot.cells) >= PATTERN_CACHE_SIZE:
+                snapshot.cells.clear()
+            snapshot.cells[(key, include)] = cell
+        
+        head, qualitative, tail = cell
+        if tail is None:
+            return head
+        # escape رشته JSON به ازای هر نویسه است، پس الحاق رشته‌های سریال‌شده همان سریال الحاق است
+        return head + render_json(self.ef.explain_inputs(qualitative, inputs))[1:-1] + tail
+    
+    def _prerender(self, snapshot: KnowledgeSnapshot, key: int, include: Optional[FrozenSet[str]]):
+        """(بایت‌های پیش از بخش ورودی‌های توضیح، برچسب‌های کیفی، بایت‌های پس از آن) یک خانه"""
+        sections = RESPONSE_SECTIONS if include is None else include
+        inference = Inference(snapshot.ie, *snapshot.table.unpack(key))
+        response = self._build_response(inference, {}, sections - {"explanation"}, snapshot.encoder)
+        if "explanation" not in sections:
+            return snapshot.encoder.encode(response), None, None
+        
+        summary = response.pop("summary", None)
+        head = snapshot.encoder.encode({**response, "detailed_explanation": ""})[:-2]
+        tail = render_json(self.ef.explain_reasoning(inference.to_dict()))[1:]
+        if summary is not None:
+            tail += b"," + snapshot.encoder.encode({"summary": summary})[1:-1]
+        return head, inference.qualitative_inputs(), tail + b"}"
+    
+    def start_session(self, session_id: str, inputs: Dict,
+                      snapshot: Optional[KnowledgeSnapshot] = None) -> Dict:
+        """شروع (یا بازنشانی) نشست تحلیل افزایشی با ورودی کامل"""
+        session = IncrementalSession((snapshot or self.snapshot).ie, inputs)
+        self.sessions.put(session_id, session)
+        
+        with session.lock:
+            return self._build_response(session.results(), session.inputs)
+    
+    def update_session(self, session_id: str, delta: Dict,
+                       snapshot: Optional[KnowledgeSnapshot] = None) -> Optional[Dict]:
+        """اعمال تغییرات روی نشست و تحلیل افزایشی (None اگر نشست وجود نداشته باشد)"""
+        engine = (snapshot or self.snapshot).ie
+        session = self.sessions.get(session_id)
+        if session is None:
+            return None
+        
+        with session.lock:
+            # دانش پس از شروع نشست بارگذاری مجدد شده است: یک ارزیابی کامل با دانش جدید
+            if session.engine is not engine:
+                session.rebase(engine, session.inputs)
+            results = session.update(delta)
+            return self._build_response(results, session.inputs)
+    
+    def optimize(self, inputs: Dict, fields: Dict[str, Dict], alternatives: int = 5,
+                 snapshot: Optional[KnowledgeSnapshot] = None) -> Dict:
+        """
+        جستجوی کم‌هزینه‌ترین تغییر فیلدهای قابل تغییر با بیشترین میانگین امتیاز
+        
+        fields: نام فیلد ← {"min", "max", "cost", "unit_cost", "step"} (مانند EditableField)؛
+        فیلدهای صحیح LandingPageInput فقط مقادیر صحیح می‌گیرند.
+        """
+        from models import FIELD_STEPS
+        
+        snapshot = snapshot or self.snapshot
+        specs = {}
+        for name, spec in fields.items():
+            integer = isinstance(FIELD_STEPS[name], int)
+            step = spec.get("step") or FIELD_STEPS[name]
+            specs[name] = {
+                "min": spec["min"],
+                "max": spec["max"],
+                "cost": spec.get("cost", 1.0),
+                "unit_cost": spec.get("unit_cost", 0.0),
+                "step": max(1, round(step)) if integer else step,
+                "integer": integer,
+            }
+        return snapshot.optimizer.optimize(inputs, specs, alternatives)
+    
+    def sensitivity(self, inputs: Dict, fields: Optional[List[str]] = None,
+                    snapshot: Optional[KnowledgeSnapshot] = None) -> Dict:
+        """جدول نقاط شکست تک‌فیلدی ورودی (fields: None یعنی همه فیلدهای دارای آستانه)"""
+        return (snapshot or self.snapshot).breakpoints.sensitivity(inputs, fields)
+    
+    def uncertainty(self, inputs: Dict, distributions: Dict[str, Dict], samples: int = 100_000,
+                    seed: Optional[int] = None, percentiles: Optional[List[float]] = None,
+                    snapshot: Optional[KnowledgeSnapshot] = None) -> Dict:
+        """
+        تحلیل Monte Carlo: توزیع امتیازها، احتمال قوانین و CF وقتی فیلدهای distributions نویزی‌اند
+        
+        distributions: نام فیلد ← {"mean", "stddev", "min", "max"} یا {"samples"} (مانند
+        FieldDistribution)؛ نمونه‌های فیلدهای صحیح LandingPageInput گرد می‌شوند.
+        """
+        from models import FIELD_STEPS
+        from uncertainty import DEFAULT_PERCENTILES
+        
+        specs = {
+            name: {**spec, "integer": isinstance(FIELD_STEPS[name], int)}
+            for name, spec in distributions.items()
+        }
+        return (snapshot or self.snapshot).uncertainty.simulate(
+            inputs, specs, samples, seed, DEFAULT_PERCENTILES if percentiles is None else percentiles
+        )
+    
+    def query(self, inputs: Dict, categories: FrozenSet[str] = frozenset(), rule_ids: FrozenSet[str] = frozenset(),
+              snapshot: Optional[KnowledgeSnapshot] = None) -> Dict:
+        """
+        پرسش هدف‌دار: فقط قوانین، برچسب‌ها و امتیازهای لازم برای هدف ارزیابی می‌شوند
+        
+        categories: دسته‌ها (همه قوانین دسته و امتیاز آن)؛ rule_ids: قوانین منفرد که وضعیتشان
+        در fired می‌آید. نتایج همان بخش متناظر analyze است؛ هدف نامعتبر: ValueError.
+        """
+        plan = (snapshot or self.snapshot).goal(categories, rule_ids)
+        inference = plan.infer(inputs)
+        activated = inference.activations.activated
+        
+        response = {"goal": {"categories": sorted(plan.categories), "rules": sorted(plan.rule_ids)}}
+        for name in plan.scores:
+            response[f"{name}_score"] = getattr(inference, f"{name}_score")
+        response["activated_rules"] = [_rule_entry(ar.rule, ar.certainty) for ar in activated]
+        if plan.rule_ids:
+            fired = {ar.rule.id for ar in activated}
+            response["fired"] = {rule_id: rule_id in fired for rule_id in sorted(plan.rule_ids)}
+        response["qualitative_inputs"] = plan.qualitative(inference)
+        response["evaluated"] = plan.describe()
+        return response
+    
+    def evaluation_plan(self, snapshot: Optional[KnowledgeSnapshot] = None) -> Dict:
+        """
+        برنامه فعلی ارزیابی قوانین موتور: گزاره‌های مشترک، احتمال برقراری هر مقایسه و
+        ترتیب جمله‌های هر قانون (بدون برنامه‌ریز وقتی پایگاه دانش شاخص یا شرط غیر اعلانی دارد)
+        
+        serving مسیر پاسخ تحلیل‌هاست: با جدول تصمیم، kernel برنامه‌ریز فقط ورودی‌هایی را
+        تحلیل (و نمونه‌برداری) می‌کند که جدول رد می‌کند؛ برنامه‌ریز روی دانشی اثر دارد که
+        جدول نمی‌گیرد (بلوک بزرگ، EXPERT_DECISION_TABLE=0).
+        """
+        snapshot = snapshot or self.snapshot
+        planner = snapshot.ie.planner
+        serving = "decision_table" if snapshot.table is not None else "kernel"
+        if planner is None:
+            return {"kb_version": snapshot.version, "enabled": False, "serving": serving}
+        return {"kb_version": snapshot.version, "enabled": True, "serving": serving, **planner.plan()}
+    
+    def _build_response(self, inference: Inference, inputs: Dict, include: Optional[FrozenSet[str]] = None,
+                        encoder: Optional[ResponseEncoder] = None) -> Dict:
+        """
+        ساخت پاسخ نهایی از نتیجه فشرده استنتاج (فقط بخش‌های درخواست‌شده محاسبه می‌شوند)
+        
+        با encoder، قوانین و پیشنهادها قطعات JSON آماده هر الگوی فعال‌سازی (برای encoder.encode) هستند.
+        """
+        if include is None:
+            include = RESPONSE_SECTIONS
+        
+        activations = inference.activations
+        response = {
+            "visibility_score": inference.visibility_score,
+            "clickability_score": inference.clickability_score,
+            "overall_certainty": activations.certainty,
+        }
+        
+        if encoder is not None:
+            rules, recommendations = encoder.activations(activations)
+            if "rules" in include:
+                response["activated_rules"] = rules
+            response["recommendations"] = recommendations
+        else:
+            if "rules" in include:
+                response["activated_rules"] = [_rule_entry(ar.rule, ar.certainty) for ar in activations.activated]
+            response["recommendations"] = list(activations.recommendations)
+        
+        if "qualitative" in include:
+            response["qualitative_inputs"] = inference.qualitative_inputs()
+        
+        # تولید توضیحات
+        if "explanation" in include:
+            response["detailed_explanation"] = self.ef.generate_explanation(inference.to_dict(), inputs)
+        
+        # تولید خلاصه
+        if "summary" in include:
+            response["summary"] = self._create_summary(response)
+        
+        return response
+    
+    def analyze_batch(self, inputs_list: List[Dict], snapshot: Optional[KnowledgeSnapshot] = None) -> List[Dict]:
+        """تحلیل دسته‌ای برداری؛ نتایج معادل analyze برای هر رکورد (بدون توضیحات متنی)"""
+        if not inputs_list:
+            return []
+        
+        evaluated = (snapshot or self.snapshot).ve.evaluate(inputs_list)
+        summaries = {}
+        results = []
+        
+        for vis_score, click_score, pattern_i, qualitative in zip(
+            evaluated["visibility_score"],
+            evaluated["clickability_score"],
+            evaluated["pattern_index"],
+            evaluated["qualitative_inputs"],
+        ):
+            pattern = evaluated["patterns"][pattern_i]
+            summary_key = (vis_score, click_score, pattern["overall_certainty"])
+            if summary_key not in summaries:
+                summaries[summary_key] = self._create_summary({
+                    "visibility_score": vis_score,
+                    "clickability_score": click_score,
+                    "overall_certainty": pattern["overall_certainty"],
+                })
+            
+            results.append({
+                "visibility_score": vis_score,
+                "clickability_score": click_score,
+                "overall_certainty": pattern["overall_certainty"],
+                "activated_rules": pattern["activated_rules"],
+                "recommendations": pattern["recommendations"],
+                "qualitative_inputs": qualitative,
+                "summary": summaries[summary_key],
+            })
+        
+        return results
+    
+    def _create_summary(self, results: Dict) -> Dict:
+        """ایجاد خلاصه نتایج"""
+        vis_score = results['visibility_score']
+        click_score = results['clickability_score']
+        cf = results['overall_certainty']
+        
+        # محاسبه وضعیت کلی
+        avg_score = (vis_score + click_score) / 2
+        if avg_score >= 85:
+            overall_status = "عالی - طراحی بهینه است!"
+            status_emoji = "excellent"
+        elif avg_score >= 70:
+            overall_status = "خوب - بهبودهای جزئی لازم است"
+            status_emoji = "good"
+        elif avg_score >= 50:
+            overall_status = "متوسط - نیاز به بهبود دارد"
+            status_emoji = "medium"
+        else:
+            overall_status = "ضعیف - بازطراحی توصیه می‌شود"
+            status_emoji = "weak"
+        
+        return {
+            "visibility_status": self._get_quality_label(vis_score),
+            "clickability_status": self._get_quality_label(click_score),
+            "certainty_level": self._get_cf_label(cf),
+            "overall_status": overall_status,
+            "status_emoji": status_emoji,
+            "average_score": str(round(avg_score, 1))  # تبدیل به string
+        }
+    
+    def _get_quality_label(self, score: int) -> str:
+        """تبدیل امتیاز به برچسب کیفی"""
+        if score >= 85:
+            return "عالی"
+        elif score >= 70:
+            return "خوب"
+        elif score >= 50:
+            return "متوسط"
+        else:
+            return "ضعیف"
+    
+    def _get_cf_label(self, cf: float) -> str:
+        """برچسب برای CF"""
+        if cf >= 0.9:
+            return "بسیار بالا"
+        elif cf >= 0.8:
+            return "بالا"
+        elif cf >= 0.6:
+            return "متوسط"
+        else:
+            return "پایین"
@@ -0,0 +1,232 @@
+"""
+نمایش فشرده واقعیت‌ها و نتایج استنتاج در مسیر داغ تحلیل
+
+هر تحلیل پیش‌تر چند dict می‌ساخت (ورودی کیفی و full_data = {**inputs, **qualitative})،
+هر قانون فعال را در یک ActivatedRule می‌پیچید و همه را دوباره به dict پاسخ تبدیل می‌کرد.
+اینجا:
+
+- برچسب‌های کیفی enum عدد صحیح کوچک‌اند و همه برچسب‌های یک ورودی در یک عدد
+  صحیح بسته‌بندی می‌شوند (FactLayout)؛
+- تبدیل کیفی، قوانین و اجزای امتیاز در یک تابع کامپایل‌شده روی متغیرهای محلی با
+  چیدمان ثابت اجرا می‌شوند (compile_inference)؛ مقایسه برچسب‌ها مقایسه عدد صحیح
+  است و قوانین فعال یک bitmask به ترتیب اولویت‌اند؛
+- نتیجه یک شیء slotted است (Inference) و جزئیات هر الگوی فعال‌سازی (Activations:
+  قوانین، CF، پیشنهادها و قطعات JSON) یک بار برای هر bitmask ساخته می‌شود.
+
+شکل dict عمومی فقط در مرز API ساخته می‌شود (Inference.to_dict و پاسخ سرویس).
+"""
+
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from conditions import And, Cascade, Compare, Condition, Const, Field, Or, field_loads
+
+# حداکثر الگوهای فعال‌سازی / ترکیب برچسب‌های نگه‌داشته‌شده (پس از پر شدن خالی می‌شود)
+PATTERN_CACHE_SIZE = 4096
+
+
+class FactLayout:
+    """چیدمان ثابت برچسب‌های کیفی: هر برچسب یک enum عدد صحیح در بیت‌های جداگانه"""
+
+    def __init__(self, labels: Dict[str, Cascade]):
+        self.names = tuple(labels)
+        self.values: Dict[str, Tuple] = {}  # برچسب ← مقادیر ممکن (کد = اندیس)
+        self.codes: Dict[str, Dict] = {}    # برچسب ← مقدار ← کد
+        self.shifts: Dict[str, int] = {}
+        self.masks: Dict[str, int] = {}
+        shift = 0
+        for name, label in labels.items():
+            values = tuple(dict.fromkeys([value for _, value in label.cases] + [label.default]))
+            width = max(1, (len(values) - 1).bit_length())
+            self.values[name] = values
+            self.codes[name] = {value: code for code, value in enumerate(values)}
+            self.shifts[name] = shift
+            self.masks[name] = (1 << width) - 1
+            shift += width
+        self._decoded: Dict[int, Tuple] = {}
+
+    def encode(self, qualitative: Dict) -> int:
+        """بسته‌بندی برچسب‌های کیفی یک ورودی در یک عدد صحیح"""
+        packed = 0
+        for name in self.names:
+            packed |= self.codes[name][qualitative[name]] << self.shifts[name]
+        return packed
+
+    def decode(self, packed: int) -> Dict:
+        """dict برچسب ← مقدار (نسخه تازه؛ جفت‌ها برای هر ترکیب یک بار ساخته می‌شوند)"""
+        items = self._decoded.get(packed)
+        if items is None:
+            items = tuple(
+                (name, self.values[name][packed >> self.shifts[name] & self.masks[name]])
+                for name in self.names
+            )
+            if len(self._decoded) >= PATTERN_CACHE_SIZE:
+                self._decoded.clear()
+            self._decoded[packed] = items
+        return dict(items)
+
+    def encodable(self, conditions: List[Condition]) -> FrozenSet[str]:
+        """برچسب‌هایی که در شرط‌ها فقط با ==/!= با ثابت مقایسه می‌شوند (قابل مقایسه با کد)"""
+        blocked = set()
+
+        def visit(node):
+            if isinstance(node, (And, Or)):
+                for term in node.terms:
+                    visit(term)
+            elif isinstance(node, Compare):
+                if node.op in ("==", "!=") and _label_const(node, self.codes) is not None:
+                    return
+                blocked.update(node.fields() & set(self.codes))
+
+        for condition in conditions:
+            visit(condition)
+        return frozenset(self.codes) - blocked
+
+    def encode_condition(self, node: Condition, encodable: FrozenSet[str]) -> Condition:
+        """شرط معادل با مقایسه کد برچسب‌ها به جای رشته (مقدار ناشناخته کد -1 می‌گیرد)"""
+        if isinstance(node, (And, Or)):
+            return type(node)(tuple(self.encode_condition(term, encodable) for term in node.terms))
+        if isinstance(node, Compare):
+            match = _label_const(node, self.codes)
+            if match is not None and match[0] in encodable:
+                name, const_on_right = match
+                const = node.right if const_on_right else node.left
+                code = Const(self.codes[name].get(const.value, -1))
+                return Compare(node.op, node.left, code) if const_on_right else Compare(node.op, code, node.right)
+        return node
+
+
+def _label_const(node: Compare, codes: Dict[str, Dict]) -> Optional[Tuple[str, bool]]:
+    """(نام برچسب، ثابت سمت راست است) برای مقایسه برچسب کیفی با ثابت"""
+    left, right = node.left, node.right
+    if isinstance(left, Field) and left.name in codes and isinstance(right, Const):
+        return left.name, True
+    if isinstance(right, Field) and right.name in codes and isinstance(left, Const):
+        return right.name, False
+    return None
+
+
+class Activations:
+    """جزئیات یک الگوی فعال‌سازی قوانین؛ مشترک بین همه نتایج با همان bitmask"""
+
+    __slots__ = ("mask", "activated", "ids", "certainty", "recommendations", "encoded")
+
+    def __init__(self, mask: int, activated: Tuple, certainty: float, recommendations: Tuple):
+        self.mask = mask
+        self.activated = activated  # ActivatedRule ها به ترتیب اولویت
+        self.ids = tuple(item.rule.id for item in activated)
+        self.certainty = certainty
+        self.recommendations = recommendations
+        self.encoded = None  # قطعات JSON قوانین و پیشنهادها (ResponseEncoder.activations)
+
+
+class Inference:
+    """نتیجه فشرده استنتاج یک ورودی: bitmask قوانین فعال، دو امتیاز و برچسب‌های بسته‌بندی‌شده"""
+
+    __slots__ = ("engine", "mask", "visibility_score", "clickability_score", "labels")
+
+    def __init__(self, engine, mask: int, visibility_score: int, clickability_score: int, labels: int):
+        self.engine = engine
+        self.mask = mask
+        self.visibility_score = visibility_score
+        self.clickability_score = clickability_score
+        self.labels = labels
+
+    @property
+    def activations(self) -> Activations:
+        return self.engine.activations(self.mask)
+
+    @property
+    def overall_certainty(self) -> float:
+        return self.engine.activations(self.mask).certainty
+
+    def qualitative_inputs(self) -> Dict:
+        return self.engine.layout.decode(self.labels)
+
+    def to_dict(self) -> Dict:
+        """شکل dict عمومی نتایج (همان خروجی forward_chaining)"""
+        activations = self.engine.activations(self.mask)
+        return {
+            "activated_rules": list(activations.activated),
+            "visibility_score": self.visibility_score,
+            "clickability_score": self.clickability_score,
+            "overall_certainty": activations.certainty,
+            "recommendations": list(activations.recommendations),
+            "qualitative_inputs": self.qualitative_inputs(),
+        }
+
+
+def compile_inference(engine, rules: List, name: str = "infer", bits: Optional[List[int]] = None,
+                      labels: Optional[Dict[str, Cascade]] = None, visibility: Optional[Dict[str, Cascade]] = None,
+                      clickability: Optional[Dict[str, Cascade]] = None, planner=None,
+                      plan=None) -> Callable[[Dict], Inference]:
+    """
+    کامپایل کل استنتاج یک ورودی به یک تابع که Inference برمی‌گرداند
+
+    rules به ترتیب اولویت و همه اعلانی‌اند (بیت i ↔ rules[i])؛ برچسب‌ها، شرط قوانین و
+    اجزای امتیاز از engine.converter.labels و اجزای امتیاز engine خوانده می‌شوند.
+    خطای ارزیابی (مثلاً فیلد ناموجود) به فراخوان می‌رسد تا مسیر مرحله‌ای اجرا شود.
+
+    برای ارزیابی هدف‌دار (goals.py) بیت هر قانون (bits) و زیرمجموعه برچسب‌ها و اجزای
+    امتیاز داده می‌شود؛ برچسب حذف‌شده کد 0 و امتیاز بدون جزء 100 می‌گیرد.
+
+    planner (planner.EvaluationPlanner) و plan (planner.Plan): گزاره‌های مشترک plan یک بار
+    در ابتدای تابع محاسبه و جمله‌های شرط‌ها به ترتیب آن چیده می‌شوند؛ تابع ورودی‌های
+    نمونه را به planner.observe می‌دهد.
+    """
+    layout = engine.layout
+    labels = engine.converter.labels if labels is None else labels
+    visibility = engine.visibility_components if visibility is None else visibility
+    clickability = engine.clickability_components if clickability is None else clickability
+    if bits is None:
+        bits = [1 << i for i in range(len(rules))]
+    conditions = [rule.condition for rule in rules]
+    if planner is not None:
+        labels = {label_name: planner.rewrite(label, plan) for label_name, label in labels.items()}
+        conditions = [planner.rewrite(condition, plan) for condition in conditions]
+        visibility = {key: planner.rewrite(component, plan) for key, component in visibility.items()}
+        clickability = {key: planner.rewrite(component, plan) for key, component in clickability.items()}
+    encodable = layout.encodable(conditions)
+    conditions = [layout.encode_condition(condition, encodable) for condition in conditions]
+
+    namespace = {"_Inference": Inference, "_engine": engine}
+    nodes = list(labels.values()) + conditions + list(visibility.values()) + list(clickability.values())
+    fields = set().union(*(node.fields() for node in nodes)) - set(labels)
+    names = {field: f"_v{i}" for i, field in enumerate(sorted(fields))}
+    lines = field_loads(names, nodes, indent="    ")
+    if planner is not None:
+        lines += planner.preamble(names, plan)
+
+    packed = []
+    for j, (label_name, label) in enumerate(labels.items()):
+        local = f"_q{j}"
+        codes = layout.codes[label_name]
+        shift = layout.shifts[label_name]
+        if label_name in encodable:
+            coded = Cascade(tuple((c, codes[value]) for c, value in label.cases), codes[label.default])
+            lines.append(f"    {local} = {coded.to_source('d', names)}")
+            packed.append(f"({local} << {shift})")
+        else:
+            namespace[f"_codes{j}"] = codes
+            lines.append(f"    {local} = {label.to_source('d', names)}")
+            packed.append(f"(_codes{j}[{local}] << {shift})")
+    names.update({label_name: f"_q{j}" for j, label_name in enumerate(labels)})
+    if planner is not None:
+        namespace.update({"_tick": planner._tick, "_observe": planner.observe})
+        lines += planner.sampler(names, lambda atom: layout.encode_condition(atom, encodable), plan)
+
+    lines.append("    mask = 0")
+    for i, condition in enumerate(conditions):
+        lines.append(f"    if {condition.to_source('d', names)}:")
+        lines.append(f"        mask |= {bits[i]}")
+
+    def total(components):
+        terms = [component.to_source("d", names) for component in components.values()]
+        return f"max(0, min(100, 100 + {' + '.join(terms) or '0'}))"
+
+    lines.append(f"    return _Inference(_engine, mask, {total(visibility)}, {total(clickability)}, "
+                 f"{' | '.join(packed) or '0'})")
+    source = f"def {name}(d):\n" + "\n".join(lines) + "\n"
+    exec(compile(source, f"<compiled {name}>", "exec"), namespace)
+    function = namespace[name]
+    function.__source__ = source
+    return function
@@ -0,0 +1,143 @@
+"""
+ارزیابی هدف‌دار (زنجیره عقب‌رو): فقط آنچه یک پرسش لازم دارد محاسبه می‌شود
+
+forward_chaining همیشه همه برچسب‌های کیفی، همه قوانین هر دو دسته و هر دو امتیاز
+را محاسبه می‌کند. بسیاری از فراخوان‌ها فقط یک چیز می‌خواهند: حکم کلیک‌پذیری یا
+«آیا قانون V1 فعال است». GoalPlan از هدف به عقب حرکت می‌کند:
+
+    هدف ← قوانین (دسته یا شناسه) و اجزای امتیاز دسته
+        ← برچسب‌های کیفی‌ای که شرط آن قوانین می‌خواند
+        ← فیلدهای ورودی
+
+و فقط همین زیرمجموعه را به یک تابع تخصصی کامپایل می‌کند. بیت قوانین همان بیت
+موتور است، پس نتیجه برای زیرمجموعه هدف با تحلیل کامل یکسان است.
+"""
+
+from typing import Dict, Iterable
+
+from conditions import Condition, _safe_call
+from facts import Inference, compile_inference
+
+# دسته‌هایی که امتیاز دارند: دسته ← نام ویژگی اجزای امتیاز در موتور
+SCORES = {
+    "visibility": "visibility_components",
+    "clickability": "clickability_components",
+}
+
+
+class GoalPlan:
+    """
+    برنامه ارزیابی یک هدف روی یک موتور استنتاج
+
+    categories: دسته‌هایی که همه قوانین آن‌ها و امتیازشان (در صورت وجود) لازم است؛
+    rule_ids: قوانین منفرد. شناسه یا دسته ناشناخته ValueError می‌دهد.
+    """
+
+    def __init__(self, engine, categories: Iterable[str] = (), rule_ids: Iterable[str] = ()):
+        self.engine = engine
+        self.categories = frozenset(categories)
+        self.rule_ids = frozenset(rule_ids)
+        if not self.categories and not self.rule_ids:
+            raise ValueError("هدف خالی است: دسته یا شناسه قانون لازم است")
+
+        known_ids = {rule.id for rule in engine.kb.rules}
+        unknown = self.rule_ids - known_ids
+        if unknown:
+            raise ValueError(f"قانون ناشناخته: {', '.join(sorted(unknown))}")
+        known_categories = {rule.category for rule in engine.kb.rules} | set(SCORES)
+        unknown = self.categories - known_categories
+        if unknown:
+            raise ValueError(f"دسته ناشناخته: {', '.join(sorted(unknown))} "
+                             f"(مجاز: {', '.join(sorted(known_categories))})")
+
+        # قوانین لازم به ترتیب اولویت، با همان بیت موتور
+        positions = [
+            i for i, rule in enumerate(engine.ordered_rules)
+            if rule.category in self.categories or rule.id in self.rule_ids
+        ]
+        self.rules = [engine.ordered_rules[i] for i in positions]
+        self.bits = [1 << i for i in positions]
+        self.scores = tuple(name for name in SCORES if name in self.categories)
+        self.components = {
+            name: getattr(engine, attribute) if name in self.scores else {}
+            for name, attribute in SCORES.items()
+        }
+
+        # برچسب‌های کیفی که شرط قوانین لازم می‌خواند (شرط غیر اعلانی: همه برچسب‌ها)
+        labels = engine.converter.labels
+        declarative = all(isinstance(rule.condition, Condition) for rule in self.rules)
+        if declarative:
+            read = set().union(*(rule.condition.fields() for rule in self.rules))
+        else:
+            read = set(labels)
+        self.labels = {name: label for name, label in labels.items() if name in read}
+        layout = engine.layout
+        self._decoders = tuple(
+            (name, layout.values[name], layout.shifts[name], layout.masks[name]) for name in self.labels
+        )
+
+        nodes = [rule.condition for rule in self.rules if isinstance(rule.condition, Condition)]
+        nodes += list(self.labels.values())
+        nodes += [component for name in self.scores for component in self.components[name].values()]
+        self.fields = sorted(set().union(*(node.fields() for node in nodes)) - set(labels))
+
+        order = {id(rule): i for i, rule in enumerate(engine.kb.rules)}
+        self._functions = [engine.kb.rule_functions[order[id(rule)]] for rule in self.rules]
+        self._kernel = None
+        if declarative:
+            self._kernel = compile_inference(
+                engine, self.rules, "infer_goal", self.bits, self.labels,
+                self.components["visibility"], self.components["clickability"],
+            )
+
+    def infer(self, inputs: Dict) -> Inference:
+        """
+        استنتاج فقط برای زیرمجموعه هدف
+
+        mask فقط بیت قوانین هدف را دارد؛ امتیاز خارج از هدف 100 و برچسب خارج از هدف کد 0
+        است (بخش‌های معتبر: rules، scores و labels همین برنامه).
+        """
+        if self._kernel is not None:
+            try:
+                return self._kernel(inputs)
+            except Exception:
+                pass  # همان رفتار خطای مسیر مرحله‌ای موتور
+        return self.infer_staged(inputs)
+
+    def infer_staged(self, inputs: Dict) -> Inference:
+        """استنتاج مرحله‌ای زیرمجموعه هدف با توابع جداگانه (هم‌رفتار با infer_staged موتور)"""
+        engine = self.engine
+        layout = engine.layout
+        qualitative = {name: label.evaluate(inputs) for name, label in self.labels.items()}
+        full_data = {**inputs, **qualitative}
+
+        mask = 0
+        for function, bit in zip(self._functions, self.bits):
+            if _safe_call(function, full_data):
+                mask |= bit
+
+        packed = 0
+        for name, value in qualitative.items():
+            packed |= layout.codes[name][value] << layout.shifts[name]
+
+        return Inference(
+            engine, mask,
+            engine.clamp_score(c.evaluate(inputs) for c in self.components["visibility"].values()),
+            engine.clamp_score(c.evaluate(inputs) for c in self.components["clickability"].values()),
+            packed,
+        )
+
+    def qualitative(self, inference: Inference) -> Dict:
+        """برچسب‌های کیفی هدف از نتیجه فشرده"""
+        packed = inference.labels
+        return {name: values[packed >> shift & mask] for name, values, shift, mask in self._decoders}
+
+    def describe(self) -> Dict:
+        """آنچه برای این هدف ارزیابی می‌شود"""
+        return {
+            "rules": [rule.id for rule in self.rules],
+            "qualitative": list(self.labels),
+            "scores": list(self.scores),
+            "fields": list(self.fields),
+        }
+
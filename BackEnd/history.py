@@ -0,0 +1,335 @@
+"""
+تاریخچه ماندگار تحلیل‌ها برای ممیزی و گزارش روند
+
+ثبت در مسیر درخواست فقط افزودن (زمان، منبع، ورودی، نتیجه) به یک صف حافظه‌ای محدود
+است. نتیجه همان استنتاجی است که پاسخ از آن ساخته شد (نسخه دانش، امتیازها، CF و
+شناسه قوانین فعال)؛ برای پاسخ کش‌شده که استنتاجی نداشت، خود snapshot پاسخ در صف
+نگه داشته می‌شود و thread نویسنده نتیجه را با همان snapshot می‌سازد. thread نویسنده
+هر دسته را در یک تراکنش در SQLite (حالت WAL) می‌نویسد.
+دسته وقتی نوشته می‌شود که batch_size رکورد جمع شود یا flush_seconds بگذرد. اگر صف
+پر باشد سیاست overflow تعیین می‌کند: "drop" رکورد تازه و "drop_oldest" قدیمی‌ترین
+رکورد صف را کنار می‌گذارد (هر دو در dropped شمرده می‌شوند)؛ درخواست هرگز منتظر
+دیسک نمی‌ماند.
+
+پرس‌وجوها صفحه‌بندی keyset دارند (جدیدترین اول، cursor = زمان و شناسه آخرین ردیف)
+و هر فیلتر یک شاخص راننده دارد، پس هزینه هر صفحه به اندازه جدول بستگی ندارد:
+
+- بازه زمانی: analyses(ts)؛
+- شناسه قانون: analysis_rules(rule_id, ts, analysis_id)؛
+- بازه امتیاز: analyses(visibility, ts) / analyses(clickability, ts)؛ امتیاز عدد صحیح
+  0 تا 100 است، پس هر مقدار بازه جداگانه با شاخص خوانده و نتایج ادغام می‌شوند.
+
+با چند فیلتر، شاخص قانون (یا بازه امتیاز) راننده است و بقیه روی همان سطرها بررسی می‌شوند.
+
+اتصال‌ها و thread نویسنده به صورت تنبل و به ازای هر فرایند ساخته می‌شوند (ساخت
+پیش از fork در serve.py بی‌خطر است).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    kb_version TEXT NOT NULL,
+    visibility INTEGER NOT NULL,
+    clickability INTEGER NOT NULL,
+    certainty REAL NOT NULL,
+    rules TEXT NOT NULL,
+    inputs TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_ts ON analyses(ts);
+CREATE INDEX IF NOT EXISTS analyses_visibility ON analyses(visibility, ts);
+CREATE INDEX IF NOT EXISTS analyses_clickability ON analyses(clickability, ts);
+CREATE TABLE IF NOT EXISTS analysis_rules (
+    rule_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    analysis_id INTEGER NOT NULL,
+    PRIMARY KEY (rule_id, ts, analysis_id)
+) WITHOUT ROWID;
+"""
+
+COLUMNS = "id, ts, source, kb_version, visibility, clickability, certainty, rules, inputs"
+SCORES = ("visibility", "clickability")
+OVERFLOW_POLICIES = ("drop", "drop_oldest")
+MAX_PAGE = 1000
+
+# (نسخه دانش، امتیاز دیده‌شدن، امتیاز کلیک‌پذیری، CF، شناسه قوانین فعال)
+Result = Tuple[str, int, int, float, Tuple[str, ...]]
+# (snapshot پاسخ، ورودی) ← Result
+Resolver = Callable[[Any, Dict], Result]
+
+
+def _select(alias: str) -> str:
+    return ", ".join(f"{alias}.{column}" for column in COLUMNS.split(", "))
+
+
+def encode_cursor(ts: float, row_id: int) -> str:
+    return f"{ts!r}:{row_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """(زمان، شناسه) از cursor پاسخ قبلی؛ cursor نامعتبر: ValueError"""
+    ts, _, row_id = cursor.partition(":")
+    try:
+        return float(ts), int(row_id)
+    except ValueError:
+        raise ValueError(f"cursor نامعتبر: {cursor!r}") from None
+
+
+class HistoryStore:
+    """
+    تاریخچه تحلیل‌ها روی یک فایل SQLite با نوشتن دسته‌ای غیرهمزمان
+
+    resolve در thread نویسنده نتیجه رکوردهایی را می‌سازد که به جای نتیجه snapshot دارند.
+    خطای SQLite دسته را کنار می‌گذارد و در failed شمرده می‌شود؛ سرویس تحلیل تحت تأثیر
+    قرار نمی‌گیرد.
+    """
+
+    def __init__(self, path: str, resolve: Resolver, max_queue: int = 100_000, batch_size: int = 512,
+                 flush_seconds: float = 0.5, overflow: str = "drop"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"سیاست overflow نامعتبر: {overflow} (مجاز: {', '.join(OVERFLOW_POLICIES)})")
+        self.path = path
+        self.resolve = resolve
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.overflow = overflow
+
+        self._queue = deque()
+        self._wake = threading.Event()
+        self._done = threading.Condition()
+        self._writing = False
+        self._stopping = False
+        self._writer: Optional[threading.Thread] = None
+        self._pid = None
+        self._local = threading.local()
+
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    # ==================== Recording ====================
+
+    def record(self, source: str, inputs: Dict, result: Union[Result, Any]):
+        """
+        افزودن یک تحلیل به صف نوشتن (بدون I/O؛ با صف پر طبق سیاست overflow)
+
+        result نتیجه محاسبه‌شده پاسخ (Result) یا snapshot پاسخی است که استنتاج نداشت.
+        """
+        if self._pid != os.getpid():
+            self._start()
+        queue = self._queue
+        if len(queue) >= self.max_queue:
+            self.dropped += 1
+            if self.overflow == "drop":
+                return
+            try:
+                queue.popleft()
+            except IndexError:
+                pass
+        queue.append((time.time(), source, inputs, result))
+        self.recorded += 1
+        if len(queue) >= self.batch_size:
+            self._wake.set()
+
+    def _start(self):
+        """thread نویسنده این فرایند (پس از fork صف و thread تازه)"""
+        with self._done:
+            if self._pid == os.getpid():
+                return
+            self._queue = deque()
+            self._stopping = False
+            self._writer = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._writer.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            while self._queue:
+                with self._done:
+                    self._writing = True
+                count = min(self.batch_size, len(self._queue))
+                self._write([self._queue.popleft() for _ in range(count)])
+                with self._done:
+                    self._writing = False
+            with self._done:
+                self._done.notify_all()
+                if self._stopping:
+                    return
+
+    def _write(self, batch):
+        rows, rules = [], []
+        for ts, source, inputs, result in batch:
+            if not isinstance(result, tuple):
+                try:
+                    result = self.resolve(result, inputs)
+                except Exception:
+                    self.failed += 1
+                    continue
+            used_version, visibility, clickability, certainty, rule_ids = result
+            rows.append((ts, source, used_version, visibility, clickability, certainty,
+                         ",".join(rule_ids), json.dumps(inputs, separators=(",", ":"), ensure_ascii=False)))
+            rules.append(rule_ids)
+        if not rows:
+            return
+
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # شناسه‌ها زیر قفل نوشتن تخصیص می‌یابند تا سطرهای analysis_rules همان دسته را ببینند
+                first = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM analyses").fetchone()[0]
+                conn.executemany(
+                    f"INSERT INTO analyses ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(first + i, *row) for i, row in enumerate(rows)],
+                )
+                conn.executemany(
+                    "INSERT INTO analysis_rules VALUES (?, ?, ?)",
+                    [(rule_id, row[0], first + i) for i, (row, ids) in enumerate(zip(rows, rules)) for rule_id in ids],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            self.failed += len(rows)
+            return
+        self.written += len(rows)
+        self.batches += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """نوشتن فوری همه رکوردهای صف؛ True اگر پیش از timeout خالی شد"""
+        if self._pid != os.getpid():
+            return not self._queue
+        self._wake.set()
+        with self._done:
+            return self._done.wait_for(lambda: not self._queue and not self._writing, timeout)
+
+    def close(self, timeout: float = 5.0) -> bool:
+        """نوشتن باقی‌مانده صف و توقف thread نویسنده (پایان برنامه)"""
+        if self._pid != os.getpid():
+            return True
+        with self._done:
+            self._stopping = True
+        self._wake.set()
+        self._writer.join(timeout)
+        drained = not self._writer.is_alive() and not self._queue
+        self._pid = None
+        return drained
+
+    # ==================== Queries ====================
+
+    def _connection(self) -> sqlite3.Connection:
+        """اتصال thread جاری (پس از fork اتصال جدید ساخته می‌شود)"""
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = pid
+        return self._local.conn
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None, rule_id: Optional[str] = None,
+              score: str = "visibility", min_score: Optional[int] = None, max_score: Optional[int] = None,
+              limit: int = 100, cursor: Optional[str] = None) -> Dict:
+        """
+        یک صفحه از تحلیل‌ها، جدیدترین اول
+
+        since/until: بازه زمانی (ثانیه یونیکس، until انحصاری)؛ rule_id: فقط تحلیل‌هایی که
+        این قانون در آن‌ها فعال بوده؛ min_score/max_score: بازه امتیاز score (شامل دو سر).
+        next_cursor برای صفحه بعد (None در صفحه آخر)؛ پارامتر نامعتبر: ValueError.
+        """
+        if score not in SCORES:
+            raise ValueError(f"امتیاز نامعتبر: {score} (مجاز: {', '.join(SCORES)})")
+        limit = max(1, min(limit, MAX_PAGE))
+        low = 0 if min_score is None else max(0, min_score)
+        high = 100 if max_score is None else min(100, max_score)
+        banded = low > 0 or high < 100
+
+        # قیدهای زمان و cursor روی ستون ts جدول راننده (alias: t)
+        bounds, params = [], []
+        if since is not None:
+            bounds.append("t.ts >= ?")
+            params.append(since)
+        if until is not None:
+            bounds.append("t.ts < ?")
+            params.append(until)
+        if cursor is not None:
+            ts, row_id = decode_cursor(cursor)
+            key = "t.analysis_id" if rule_id is not None else "t.id"
+            bounds.append(f"t.ts <= ? AND (t.ts < ? OR {key} < ?)")
+            params += [ts, ts, row_id]
+
+        if rule_id is not None:
+            where = ["t.rule_id = ?", *bounds]
+            if banded:
+                where.append(f"a.{score} BETWEEN ? AND ?")
+            sql = (f"SELECT {_select('a')} FROM analysis_rules t JOIN analyses a ON a.id = t.analysis_id "
+                   f"WHERE {' AND '.join(where)} ORDER BY t.ts DESC, t.analysis_id DESC LIMIT ?")
+            args = [rule_id, *params, *([low, high] if banded else []), limit]
+        elif banded:
+            if low > high:
+                return {"items": [], "next_cursor": None}
+            # یک زیرپرس‌وجوی مرتب روی شاخص برای هر مقدار امتیاز و ادغام (هر کدام حداکثر limit سطر)
+            part = (f"SELECT * FROM (SELECT {_select('t')} FROM analyses t "
+                    f"WHERE {' AND '.join([f't.{score} = ?', *bounds])} ORDER BY t.ts DESC, t.id DESC LIMIT ?)")
+            sql = " UNION ALL ".join([part] * (high - low + 1)) + " ORDER BY ts DESC, id DESC LIMIT ?"
+            args = [arg for value in range(low, high + 1) for arg in (value, *params, limit)] + [limit]
+        else:
+            where = " AND ".join(bounds) or "1"
+            sql = (f"SELECT {_select('t')} FROM analyses t WHERE {where} "
+                   f"ORDER BY t.ts DESC, t.id DESC LIMIT ?")
+            args = [*params, limit]
+
+        rows = self._connection().execute(sql, args).fetchall()
+        items = [
+            {
+                "id": row_id, "timestamp": ts, "source": source, "kb_version": kb_version,
+                "visibility_score": visibility, "clickability_score": clickability, "overall_certainty": certainty,
+                "activated_rules": rules.split(",") if rules else [], "inputs": json.loads(inputs),
+            }
+            for row_id, ts, source, kb_version, visibility, clickability, certainty, rules, inputs in rows
+        ]
+        last = rows[-1] if len(rows) == limit else None
+        return {"items": items, "next_cursor": encode_cursor(last[1], last[0]) if last else None}
+
+    def stats(self) -> Dict:
+        """شمارنده‌های صف و نویسنده این فرایند و آخرین شناسه ذخیره‌شده"""
+        try:
+            last_id = self._connection().execute("SELECT MAX(id) FROM analyses").fetchone()[0] or 0
+        except sqlite3.Error:
+            last_id = None
+        return {
+            "enabled": True,
+            "path": self.path,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_seconds": self.flush_seconds,
+            "overflow": self.overflow,
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_id": last_id,
+        }
@@ -0,0 +1,719 @@
+"""
+هسته استنتاج سیستم خبره: قانون، تبدیل کیفی، پایگاه دانش، موتور استنتاج و امکانات توضیح
+
+فقط به کتابخانه استاندارد و ماژول‌های شرط/واقعیت وابسته است (بدون FastAPI،
+Pydantic و NumPy)، پس ابزارها و workerها آن را در چند میلی‌ثانیه وارد می‌کنند.
+سرویس، سریال‌سازی و مدل‌های API در expert_system هستند.
+"""
+
+from typing import List, Dict, Optional, Callable, Union
+from dataclasses import dataclass
+from functools import lru_cache
+import hashlib
+import json
+import os
+import string
+
+from rule_index import RuleIndex
+from planner import EvaluationPlanner
+from facts import PATTERN_CACHE_SIZE, Activations, FactLayout, Inference
+from conditions import (
+    Cascade, Condition, F, cascade, condition_from_dict, index_by_field,
+    compile_cascades, compile_condition, compile_rules,
+)
+
+
+# ==================== Data Classes ====================
+
+@dataclass
+class Rule:
+    """کلاس قانون در سیستم خبره"""
+    id: str
+    priority: int
+    certainty: float
+    condition: Union[Condition, Callable]
+    conclusion: str
+    explanation: str
+    category: str
+    
+    def to_dict(self) -> Dict:
+        """نمایش داده‌ای قانون (برای نسخه‌گذاری و ذخیره)"""
+        return {
+            "id": self.id,
+            "priority": self.priority,
+            "certainty": self.certainty,
+            "condition": self.condition.to_dict() if isinstance(self.condition, Condition) else repr(self.condition),
+            "conclusion": self.conclusion,
+            "explanation": self.explanation,
+            "category": self.category
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Rule":
+        """ساخت قانون از نمایش داده‌ای (خوانده‌شده از فایل دانش)"""
+        certainty = float(data["certainty"])
+        if not 0 <= certainty <= 1:
+            raise ValueError(f"certainty باید بین 0 و 1 باشد: {certainty}")
+        return cls(
+            id=str(data["id"]),
+            priority=int(data["priority"]),
+            certainty=certainty,
+            condition=condition_from_dict(data["condition"]),
+            conclusion=str(data["conclusion"]),
+            explanation=str(data.get("explanation", "")),
+            category=str(data["category"])
+        )
+
+
+@dataclass
+class ActivatedRule:
+    """قانون فعال‌شده"""
+    rule: Rule
+    certainty: float
+
+
+def fingerprint(data) -> str:
+    """اثر انگشت کوتاه و پایدار یک ساختار داده‌ای (برای نسخه پایگاه دانش)"""
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+# ==================== Qualitative Converter ====================
+
+class QualitativeConverter:
+    """تبدیل داده‌های کمی به کیفی"""
+    
+    def __init__(self, labels: Optional[Dict[str, Cascade]] = None):
+        self.labels = labels if labels is not None else self._create_labels()
+        self._convert = compile_cascades(self.labels, "convert_inputs")
+        # وابستگی هر برچسب کیفی به فیلدهای کمی
+        self.labels_by_field = index_by_field(self.labels)
+    
+    def convert_inputs(self, inputs: Dict) -> Dict:
+        """تبدیل تمام ورودی‌ها به شکل کیفی"""
+        return self._convert(inputs)  # فقط مقادیر کیفی، نه کپی از inputs
+    
+    @staticmethod
+    def _create_labels() -> Dict[str, Cascade]:
+        """تعریف تبدیل‌های کیفی (اولین شرط برقرار، برچسب را تعیین می‌کند)"""
+        words_count = F("content_word_count", 300)
+        text_len = F("cta_text_length", 15)
+        similar_colors = F("similar_color_elements", 0)
+        cta_area = F("cta_width", 200) * F("cta_height", 50)
+        largest_other = F("largest_other_element_size", 150)
+        mobile_width = F("cta_mobile_width", 200)
+        mobile_height = F("cta_mobile_height", 48)
+        has_animation = F("has_loading_animation", 1)
+        
+        return {
+            # تبدیل طول محتوا به کیفی
+            "content_length": cascade(
+                (words_count < 200, "کوتاه"),
+                (words_count < 400, "متوسط"),
+                default="طولانی"
+            ),
+            # تبدیل وضوح متن CTA به کیفی (بر اساس طول)
+            "cta_text_clarity": cascade(
+                ((text_len <= 15) & (text_len > 5), "خوب"),
+                (text_len <= 25, "متوسط"),
+                default="ضعیف"
+            ),
+            # تبدیل تمایز رنگی به کیفی (بر اساس تعداد رنگ‌های مشابه)
+            "cta_color_uniqueness": cascade(
+                (similar_colors == 0, "منحصربفرد"),
+                (similar_colors <= 2, "متوسط"),
+                default="مشابه"
+            ),
+            # تبدیل سلسله‌مراتب بصری (بر اساس اندازه نسبی)
+            "visual_hierarchy": cascade(
+                (cta_area > largest_other * 1.5, "قوی"),
+                (cta_area > largest_other * 1.1, "متوسط"),
+                default="ضعیف"
+            ),
+            # تبدیل موبایل (بر اساس اندازه)
+            "mobile_friendly": cascade(
+                ((mobile_width >= 180) & (mobile_height >= 48), "بله"),
+                default="خیر"
+            ),
+            # تبدیل بازخورد بصری (بر اساس وجود انیمیشن)
+            "loading_feedback": cascade(
+                (has_animation > 0, "بله"),
+                default="خیر"
+            ),
+        }
+
+
+# ==================== Knowledge Base ====================
+
+# شاخص قوانین فقط وقتی از تابع کامپایل‌شده (آزمون خطی) سریع‌تر است که قوانین زیاد و
+# کسر تخمینی قوانین نامزد هر درخواست کم باشد (benchmarks/bench_rule_index.py)
+INDEX_MIN_RULES = int(os.environ.get("EXPERT_INDEX_MIN_RULES", "256"))
+INDEX_MAX_FRACTION = 0.1
+
+
+class KnowledgeBase:
+    """پایگاه دانش سیستم خبره"""
+    
+    def __init__(self, rules: Optional[List[Rule]] = None):
+        self.rules = rules if rules is not None else self._create_rules()
+        
+        # تابع جداگانه هر قانون و شاخص وابستگی فیلد ← قوانین (برای ارزیابی افزایشی)
+        self.rule_functions = [
+            compile_condition(r.condition) if isinstance(r.condition, Condition) else r.condition
+            for r in self.rules
+        ]
+        
+        # پایگاه دانش بزرگ با شرط‌های گزینشی: فقط قوانین نامزد شاخص ارزیابی می‌شوند؛
+        # در غیر این صورت کل مجموعه قوانین یک بار به یک تابع تخصصی کامپایل می‌شود
+        self.index = None
+        if len(self.rules) >= INDEX_MIN_RULES:
+            index = RuleIndex(self.rules, self.rule_functions)
+            if index.expected_fraction <= INDEX_MAX_FRACTION:
+                self.index = index
+        self.evaluate = self.index.evaluate if self.index is not None else compile_rules(self.rules)
+        self.rules_by_field = index_by_field(
+            {i: r.condition for i, r in enumerate(self.rules) if isinstance(r.condition, Condition)}
+        )
+        self.opaque_rules = [i for i, r in enumerate(self.rules) if not isinstance(r.condition, Condition)]
+        # رتبه هر قانون در ترتیب پایدار اولویت
+        priority_order = sorted(range(len(self.rules)), key=lambda i: self.rules[i].priority, reverse=True)
+        self.priority_rank = {i: rank for rank, i in enumerate(priority_order)}
+        self.version = fingerprint([r.to_dict() for r in self.rules])
+    
+    def _create_rules(self) -> List[Rule]:
+        """ایجاد پایگاه دانش (قوانین)"""
+        return [
+            # ============ قوانین CTA Visibility ============
+            Rule(
+                id="V1",
+                priority=10,
+                certainty=0.95,
+                condition=(F("cta_position_y") > 800) & (F("scroll_depth") < 50),
+                conclusion="CTA در موقعیت نامناسب: زیر fold قرار دارد و کاربران به آن نمی‌رسند",
+                explanation="57% کاربران تا عمق 800 پیکسل اسکرول نمی‌کنند. CTA باید در 600 پیکسل اول باشد.",
+                category="visibility"
+            ),
+            Rule(
+                id="V2",
+                priority=9,
+                certainty=0.90,
+                condition=F("contrast_ratio") < 3.0,
+                conclusion="کنتراست رنگی CTA بسیار ضعیف است - قابل مشاهده نیست",
+                explanation="نسبت کنتراست کمتر از 3:1 باعث می‌شود CTA در پس‌زمینه گم شود.",
+                category="visibility"
+            ),
+            Rule(
+                id="V3",
+                priority=8,
+                certainty=0.85,
+                condition=F("whitespace_around_cta") < 30,
+                conclusion="فضای خالی اطراف CTA ناکافی است - دیده نمی‌شود",
+                explanation="فضای خالی کمتر از 40 پیکسل باعث می‌شود CTA در بین عناصر گم شود.",
+                category="visibility"
+            ),
+            Rule(
+                id="V4",
+                priority=7,
+                certainty=0.80,
+                condition=F("number_of_ctas") > 1,
+                conclusion="وجود چند CTA باعث سردرگمی کاربر می‌شود",
+                explanation="تحقیقات نشان می‌دهد وجود بیش از یک CTA، conversion را 26% کاهش می‌دهد.",
+                category="visibility"
+            ),
+            Rule(
+                id="V5",
+                priority=6,
+                certainty=0.75,
+                condition=F("cta_color_uniqueness") == "مشابه",
+                conclusion="رنگ CTA با سایر عناصر مشابه است - تمایز ندارد",
+                explanation="CTA باید رنگی منحصربفرد و متفاوت از سایر عناصر صفحه داشته باشد.",
+                category="visibility"
+            ),
+            Rule(
+                id="V6",
+                priority=5,
+                certainty=0.70,
+                condition=F("visual_hierarchy") == "ضعیف",
+                conclusion="سلسله‌مراتب بصری ضعیف - CTA برجسته نیست",
+                explanation="CTA باید بزرگترین و برجسته‌ترین عنصر کلیک‌پذیر صفحه باشد.",
+                category="visibility"
+            ),
+            
+            # ============ قوانین CTA Clickability ============
+            Rule(
+                id="C1",
+                priority=10,
+                certainty=0.95,
+                condition=(F("cta_width") < 180) | (F("cta_height") < 44),
+                conclusion="اندازه CTA خیلی کوچک است - کلیک مشکل است",
+                explanation="حداقل اندازه توصیه‌شده برای CTA: 200×50 پیکسل (موبایل: 48×48)",
+                category="clickability"
+            ),
+            Rule(
+                id="C2",
+                priority=9,
+                certainty=0.90,
+                condition=F("cta_text_length") > 25,
+                conclusion="متن CTA بیش‌از‌حد طولانی است",
+                explanation="متن CTA باید حداکثر 2-3 کلمه باشد. از فعل امری کوتاه استفاده کنید.",
+                category="clickability"
+            ),
+            Rule(
+                id="C3",
+                priority=8,
+                certainty=0.85,
+                condition=F("cta_text_clarity") == "ضعیف",
+                conclusion="متن CTA واضح و انگیزه‌بخش نیست",
+                explanation="از عبارات ارزش‌محور مثل 'شروع رایگان' به جای 'ثبت‌نام' استفاده کنید.",
+                category="clickability"
+            ),
+            Rule(
+                id="C4",
+                priority=7,
+                certainty=0.80,
+                condition=F("clickable_elements_before_cta") > 5,
+                conclusion="عناصر کلیک‌پذیر زیادی قبل از CTA وجود دارد",
+                explanation="هر عنصر کلیک‌پذیر اضافی، احتمال کلیک روی CTA را 8% کاهش می‌دهد.",
+                category="clickability"
+            ),
+            Rule(
+                id="C5",
+                priority=6,
+                certainty=0.75,
+                condition=F("mobile_friendly") == "خیر",
+                conclusion="CTA برای موبایل بهینه نشده است",
+                explanation="60% ترافیک از موبایل است. اندازه CTA در موبایل باید حداقل 48×48 پیکسل باشد.",
+                category="clickability"
+            ),
+            Rule(
+                id="C6",
+                priority=5,
+                certainty=0.70,
+                condition=F("loading_feedback") == "خیر",
+                conclusion="عدم وجود بازخورد بصری پس از کلیک",
+                explanation="کاربر باید بلافاصله پس از کلیک، بازخورد بصری (loading، تغییر رنگ) ببیند.",
+                category="clickability"
+            ),
+            
+            # ============ قوانین ترکیبی ============
+            Rule(
+                id="M1",
+                priority=9,
+                certainty=0.88,
+                condition=(F("time_to_cta") > 12) & (F("content_length") == "طولانی"),
+                conclusion="زمان رسیدن به CTA بیش‌از‌حد طولانی است",
+                explanation="کاربران در 8-10 ثانیه اول تصمیم می‌گیرند. محتوا را خلاصه کنید.",
+                category="visibility"
+            ),
+            Rule(
+                id="M2",
+                priority=8,
+                certainty=0.82,
+                condition=(F("cta_click_rate") < 2) & (F("contrast_ratio") < 4),
+                conclusion="نرخ کلیک پایین به دلیل کنتراست ضعیف",
+                explanation="افزایش کنتراست به 4.5:1 می‌تواند conversion را تا 35% افزایش دهد.",
+                category="clickability"
+            ),
+            Rule(
+                id="M3",
+                priority=7,
+                certainty=0.78,
+                condition=(F("scroll_depth") > 70) & (F("cta_position_y") < 500),
+                conclusion="موقعیت CTA بهینه است - کاربران به آن می‌رسند",
+                explanation="قرارگیری CTA در 500 پیکسل اول با scroll depth بالا، نشانه طراحی خوب است.",
+                category="visibility"
+            ),
+            Rule(
+                id="M4",
+                priority=6,
+                certainty=0.75,
+                condition=(F("cta_click_rate") > 5) & (F("cta_width") >= 200),
+                conclusion="اندازه CTA مناسب است - نرخ کلیک خوب",
+                explanation="اندازه مناسب CTA منجر به نرخ کلیک بالاتر شده است.",
+                category="clickability"
+            ),
+        ]
+
+
+# ==================== Inference Engine ====================
+
+class InferenceEngine:
+    """موتور استنتاج با Forward Chaining"""
+    
+    def __init__(self, knowledge_base: KnowledgeBase, converter: Optional[QualitativeConverter] = None):
+        self.kb = knowledge_base
+        self.converter = converter if converter is not None else QualitativeConverter()
+        self.visibility_components = self._create_visibility_components()
+        self.clickability_components = self._create_clickability_components()
+        self._visibility_points = compile_cascades(self.visibility_components, "visibility_points")
+        self._clickability_points = compile_cascades(self.clickability_components, "clickability_points")
+        self.visibility_by_field = index_by_field(self.visibility_components)
+        self.clickability_by_field = index_by_field(self.clickability_components)
+        
+        # bitmask قوانین فعال: بیت هر قانون رتبه پایدار آن در ترتیب اولویت است
+        self.ordered_rules = sorted(self.kb.rules, key=lambda r: r.priority, reverse=True)
+        self.rule_bits = [1 << self.kb.priority_rank[i] for i in range(len(self.kb.rules))]
+        self._bit_by_rule = {id(rule): bit for rule, bit in zip(self.kb.rules, self.rule_bits)}
+        self._activations: Dict[int, Activations] = {}
+        self.layout = FactLayout(self.converter.labels)
+        # استنتاج یکپارچه کامپایل‌شده با برنامه‌ریز ارزیابی (گزاره‌های مشترک و ترتیب تطبیقی)؛
+        # با شاخص قوانین یا شرط غیر اعلانی مسیر مرحله‌ای
+        self._kernel = None
+        self.planner = None
+        if self.kb.index is None and not self.kb.opaque_rules:
+            self.planner = EvaluationPlanner(self)
+            self._kernel = self.planner.compile()
+        
+        # نسخه کل دانش استنتاج: قوانین، تبدیل‌های کیفی و اجزای امتیاز
+        self.version = fingerprint({
+            "rules": self.kb.version,
+            "labels": {k: v.to_dict() for k, v in self.converter.labels.items()},
+            "visibility": {k: v.to_dict() for k, v in self.visibility_components.items()},
+            "clickability": {k: v.to_dict() for k, v in self.clickability_components.items()},
+        })
+    
+    def forward_chaining(self, inputs: Dict) -> Dict:
+        """اجرای Forward Chaining (بدون حالت مشترک؛ قابل اجرای همزمان)"""
+        return self.infer(inputs).to_dict()
+    
+    def infer(self, inputs: Dict) -> Inference:
+        """استنتاج با نتیجه فشرده (bitmask قوانین، امتیازها و برچسب‌های کد‌شده)"""
+        if self._kernel is not None:
+            try:
+                return self._kernel(inputs)
+            except Exception:
+                pass  # همان رفتار خطای مراحل جداگانه (مثلاً قانون با فیلد ناموجود غیرفعال)
+        return self.infer_staged(inputs)
+    
+    def infer_staged(self, inputs: Dict) -> Inference:
+        """استنتاج مرحله به مرحله: تبدیل کیفی، قوانین و امتیازها با توابع جداگانه"""
+        # تبدیل ورودی‌ها به کیفی
+        qualitative_inputs = self.converter.convert_inputs(inputs)
+        
+        # اضافه کردن مقادیر عددی اصلی برای استفاده در condition ها
+        full_data = {**inputs, **qualitative_inputs}
+        
+        # فعال‌سازی قوانین با تابع کامپایل‌شده پایگاه دانش
+        mask = 0
+        for rule in self.kb.evaluate(full_data):
+            mask |= self._bit_by_rule[id(rule)]
+        
+        return Inference(
+            self, mask,
+            self._calculate_visibility_score(inputs),
+            self._calculate_clickability_score(inputs),
+            self.layout.encode(qualitative_inputs),
+        )
+    
+    def activations(self, mask: int) -> Activations:
+        """قوانین فعال، CF و پیشنهادهای یک bitmask (یک بار برای هر الگو ساخته می‌شود)"""
+        activations = self._activations.get(mask)
+        if activations is None:
+            activated = []
+            remaining = mask
+            while remaining:
+                low = remaining & -remaining
+                rule = self.ordered_rules[low.bit_length() - 1]
+                activated.append(ActivatedRule(rule=rule, certainty=rule.certainty))
+                remaining ^= low
+            
+            activations = Activations(
+                mask,
+                tuple(activated),
+                self._calculate_combined_certainty(activated),
+                tuple(self._generate_recommendations(activated)),
+            )
+            if len(self._activations) >= PATTERN_CACHE_SIZE:
+                self._activations.clear()
+            self._activations[mask] = activations
+        return activations
+    
+    def _calculate_visibility_score(self, inputs: Dict) -> int:
+        """محاسبه امتیاز دیده‌شدن CTA (0-100)"""
+        return self.clamp_score(self._visibility_points(inputs).values())
+    
+    def _calculate_clickability_score(self, inputs: Dict) -> int:
+        """محاسبه امتیاز قابلیت کلیک CTA (0-100)"""
+        return self.clamp_score(self._clickability_points(inputs).values())
+    
+    @staticmethod
+    def clamp_score(points) -> int:
+        """جمع امتیاز اجزا با پایه 100 و محدودسازی به بازه 0-100"""
+        return max(0, min(100, 100 + sum(points)))
+    
+    def _create_visibility_components(self) -> Dict[str, Cascade]:
+        """اجزای امتیاز دیده‌شدن (کسر/اضافه امتیاز هر جزء)"""
+        position_y = F("cta_position_y")
+        contrast = F("contrast_ratio")
+        whitespace = F("whitespace_around_cta")
+        ctas = F("number_of_ctas")
+        similar_colors = F("similar_color_elements", 0)
+        
+        return {
+            # موقعیت CTA (30 امتیاز)
+            "position": cascade((position_y > 800, -30), (position_y > 600, -15), (position_y <= 400, 5), default=0),
+            # کنتراست رنگی (25 امتیاز)
+            "contrast": cascade((contrast < 3, -25), (contrast < 4.5, -10), (contrast >= 7, 5), default=0),
+            # فضای خالی (20 امتیاز)
+            "whitespace": cascade((whitespace < 30, -20), (whitespace < 40, -10), default=0),
+            # تعداد CTA (15 امتیاز)
+            "cta_count": cascade((ctas > 2, -15), (ctas > 1, -8), default=0),
+            # تمایز رنگی (10 امتیاز)
+            "color_uniqueness": cascade((similar_colors > 2, -10), (similar_colors > 0, -5), default=0),
+        }
+    
+    def _create_clickability_components(self) -> Dict[str, Cascade]:
+        """اجزای امتیاز قابلیت کلیک (کسر/اضافه امتیاز هر جزء)"""
+        width = F("cta_width")
+        height = F("cta_height")
+        text_len = F("cta_text_length")
+        clickables = F("clickable_elements_before_cta")
+        mobile_width = F("cta_mobile_width", 200)
+        mobile_height = F("cta_mobile_height", 48)
+        
+        return {
+            # اندازه CTA (30 امتیاز)
+            "size": cascade(
+                ((width < 180) | (height < 44), -30),
+                ((width < 200) | (height < 50), -15),
+                ((width >= 250) & (height >= 60), 5),
+                default=0
+            ),
+            # طول متن (25 امتیاز)
+            "text_length": cascade(
+                (text_len > 30, -25), (text_len > 25, -15), (text_len > 20, -8),
+                ((text_len <= 15) & (text_len > 5), 5),
+                default=0
+            ),
+            # عناصر قبل از CTA (20 امتیاز)
+            "clickables": cascade((clickables > 7, -20), (clickables > 5, -10), default=0),
+            # موبایل (15 امتیاز)
+            "mobile": cascade(((mobile_width < 180) | (mobile_height < 48), -15), (mobile_width < 200, -8), default=0),
+            # بازخورد بصری (10 امتیاز)
+            "feedback": cascade((F("has_loading_animation", 1) == 0, -10), default=0),
+        }
+    
+    def _calculate_combined_certainty(self, activated_rules: List[ActivatedRule]) -> float:
+        """محاسبه Certainty Factor ترکیبی"""
+        return self.combine_certainties([ar.certainty for ar in activated_rules])
+    
+    @staticmethod
+    def combine_certainties(certainties: List[float]) -> float:
+        """ترکیب CF قوانین فعال‌شده (به ترتیب اولویت)"""
+        if not certainties:
+            return 0.5
+        
+        # استفاده از فرمول ترکیب Certainty Factors
+        cf = certainties[0]
+        
+        for i in range(1, len(certainties)):
+            cf_new = certainties[i]
+            
+            # فرمول ترکیب CF
+            if cf > 0 and cf_new > 0:
+                cf = cf + cf_new * (1 - cf)
+            elif cf < 0 and cf_new < 0:
+                cf = cf + cf_new * (1 + cf)
+            else:
+                cf = (cf + cf_new) / (1 - min(abs(cf), abs(cf_new)))
+        
+        return round(cf, 2)
+    
+    def _generate_recommendations(self, activated_rules: List[ActivatedRule]) -> List[str]:
+        """تولید پیشنهادات نهایی"""
+        recommendations = []
+        
+        # استخراج پیشنهادات از قوانین فعال‌شده
+        for activated in activated_rules[:5]:  # 5 پیشنهاد برتر
+            recommendations.append(activated.rule.conclusion)
+        
+        return recommendations
+
+
+# ==================== Explanation Facility ====================
+
+class ExplanationFacility:
+    """سیستم توضیح استدلال"""
+    
+    SEPARATOR = "=" * 50 + "\n"
+    
+    # قالب‌های از پیش ساخته‌شده؛ توضیح با join قطعات ساخته می‌شود نه الحاق مکرر رشته
+    INPUTS_TEMPLATE = "".join([
+        "🔍 مسیر استدلال سیستم خبره:\n",
+        SEPARATOR + "\n",
+        # ورودی‌های کمی
+        "📊 داده‌های ورودی (کمی):\n",
+        "  • موقعیت CTA: {cta_position_y} پیکسل\n",
+        "  • اندازه CTA: {cta_width}×{cta_height} پیکسل\n",
+        "  • نسبت کنتراست: {contrast_ratio}:1\n",
+        "  • فضای خالی اطراف CTA: {whitespace_around_cta} پیکسل\n",
+        "  • عمق اسکرول: {scroll_depth}%\n",
+        "  • نرخ کلیک: {cta_click_rate}%\n",
+        "  • تعداد CTA: {number_of_ctas}\n",
+        "  • طول متن CTA: {cta_text_length} کاراکتر\n",
+        "  • تعداد کلمات محتوا: {content_word_count}\n",
+        "\n",
+        # ورودی‌های کیفی (تبدیل شده)
+        "🔄 داده‌های تبدیل شده (کیفی):\n",
+        "  • طول محتوا: {content_length}\n",
+        "  • وضوح متن CTA: {cta_text_clarity}\n",
+        "  • تمایز رنگی CTA: {cta_color_uniqueness}\n",
+        "  • سلسله‌مراتب بصری: {visual_hierarchy}\n",
+        "  • سازگاری موبایل: {mobile_friendly}\n",
+        "  • بازخورد بصری: {loading_feedback}\n",
+        "\n",
+        # قوانین فعال‌شده
+        "⚙️ قوانین فعال‌شده (به ترتیب اولویت):\n\n",
+    ])
+    
+    # بدنه ثابت هر قانون یک بار رندر و کش می‌شود؛ فقط شماره ردیف متغیر است
+    RULE_TEMPLATE = "".join([
+        "قانون {id} (اولویت: {priority}, اطمینان: {certainty})\n",
+        "   دسته: {category}\n",
+        "   ➜ {conclusion}\n",
+        "   💡 {explanation}\n\n",
+    ])
+    
+    NO_RULES = "   ✅ هیچ مشکل جدی شناسایی نشد!\n\n"
+    
+    RESULTS_TEMPLATE = "".join([
+        SEPARATOR,
+        "📈 نتایج محاسبه‌شده:\n\n",
+        "  • امتیاز دیده‌شدن (Visibility): {visibility_score}/100\n",
+        "  • امتیاز کلیک‌پذیری (Clickability): {clickability_score}/100\n",
+        "  • درجه اطمینان کلی (CF): {certainty_percent:.0f}%\n\n",
+        # ارزیابی کیفی
+        "🎯 ارزیابی کیفی:\n",
+        "  • دیده‌شدن CTA: {vis_quality}\n",
+        "  • کلیک‌پذیری CTA: {click_quality}\n\n",
+        # پیشنهادات
+        SEPARATOR,
+        "✅ پیشنهادات اولویت‌دار:\n\n",
+    ])
+    
+    RECOMMENDATION_TEMPLATE = "{index}. {recommendation}\n\n"
+    
+    NO_RECOMMENDATIONS = "✨ طراحی شما عالی است! نیازی به بهبود فوری نیست.\n\n"
+    
+    INPUT_DEFAULTS = {
+        "content_word_count": "N/A",
+        "content_length": "N/A",
+        "cta_text_clarity": "N/A",
+        "cta_color_uniqueness": "N/A",
+        "visual_hierarchy": "N/A",
+        "mobile_friendly": "N/A",
+        "loading_feedback": "N/A",
+    }
+    
+    CATEGORY_LABELS = {"visibility": "👁️ دیده‌شدن"}
+    
+    @staticmethod
+    def generate_explanation(results: Dict, inputs: Dict) -> str:
+        """تولید توضیحات کامل"""
+        ef = ExplanationFacility
+        return ef.explain_inputs(results.get("qualitative_inputs", {}), inputs) + ef.explain_reasoning(results)
+    
+    @staticmethod
+    def explain_inputs(qualitative_inputs: Dict, inputs: Dict) -> str:
+        """بخش ورودی‌های توضیح (تنها بخش وابسته به مقادیر دقیق ورودی)"""
+        return _render_inputs({**qualitative_inputs, **inputs})
+    
+    @staticmethod
+    def explain_reasoning(results: Dict) -> str:
+        """قوانین فعال، نتایج و پیشنهادهای توضیح (فقط وابسته به نتیجه استنتاج)"""
+        ef = ExplanationFacility
+        parts = []
+        
+        for i, activated in enumerate(results["activated_rules"], 1):
+            rule = activated.rule
+            parts.append(f"{i}. ")
+            parts.append(_rule_fragment(rule.id, rule.priority, rule.certainty,
+                                        rule.category, rule.conclusion, rule.explanation))
+        
+        if not results["activated_rules"]:
+            parts.append(ef.NO_RULES)
+        
+        # نتایج
+        parts.append(_render_results({
+            "visibility_score": results["visibility_score"],
+            "clickability_score": results["clickability_score"],
+            "certainty_percent": results["overall_certainty"] * 100,
+            "vis_quality": ef._get_quality_label(results["visibility_score"]),
+            "click_quality": ef._get_quality_label(results["clickability_score"]),
+        }))
+        
+        if results["recommendations"]:
+            parts.extend(
+                _render_recommendation({"index": i, "recommendation": rec})
+                for i, rec in enumerate(results["recommendations"], 1)
+            )
+        else:
+            parts.append(ef.NO_RECOMMENDATIONS)
+        
+        return "".join(parts)
+    
+    @staticmethod
+    def _get_quality_label(score: int) -> str:
+        """تبدیل امتیاز به برچسب کیفی"""
+        if score >= 85:
+            return "عالی ✅"
+        elif score >= 70:
+            return "خوب ✓"
+        elif score >= 50:
+            return "متوسط ⚠️"
+        else:
+            return "ضعیف ❌"
+
+
+def compile_template(template: str, defaults: Optional[Dict] = None) -> Callable[[Dict], str]:
+    """
+    کامپایل یک قالب str.format به تابع f-string تخصصی
+    
+    قالب یک بار تجزیه می‌شود؛ هر فراخوانی فقط مقادیر را از mapping می‌خواند
+    (با مقدار پیش‌فرض برای کلیدهای موجود در defaults).
+    """
+    defaults = defaults or {}
+    loads = []
+    pieces = []
+    
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        pieces.append(
+            literal.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            .replace("{", "{{").replace("}", "}}")
+        )
+        if field is not None:
+            local = f"_{len(loads)}"
+            if field in defaults:
+                loads.append(f"    {local} = v.get({field!r}, {defaults[field]!r})")
+            else:
+                loads.append(f"    {local} = v[{field!r}]")
+            pieces.append(
+                "{" + local + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "") + "}"
+            )
+    
+    source = "def render(v):\n" + "\n".join(loads) + ("\n" if loads else "") + f'    return f"{"".join(pieces)}"\n'
+    namespace = {}
+    exec(compile(source, "<template>", "exec"), namespace)
+    return namespace["render"]
+
+
+_render_inputs = compile_template(ExplanationFacility.INPUTS_TEMPLATE, ExplanationFacility.INPUT_DEFAULTS)
+_render_rule = compile_template(ExplanationFacility.RULE_TEMPLATE)
+
+
+@lru_cache(maxsize=4096)
+def _rule_fragment(rule_id: str, priority: int, certainty: float, category: str,
+                   conclusion: str, explanation: str) -> str:
+    """بدنه رندرشده توضیح یک قانون (وابسته فقط به تعریف قانون)"""
+    return _render_rule({
+        "id": rule_id,
+        "priority": priority,
+        "certainty": certainty,
+        "category": ExplanationFacility.CATEGORY_LABELS.get(category, "👆 کلیک‌پذیری"),
+        "conclusion": conclusion,
+        "explanation": explanation,
+    })
+
+
+_render_results = compile_template(ExplanationFacility.RESULTS_TEMPLATE)
+_render_recommendation = compile_template(ExplanationFacility.RECOMMENDATION_TEMPLATE)
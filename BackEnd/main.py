@@ -1,712 +1,343 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Callable
-from dataclasses import dataclass
-import math
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
+from pydantic import ValidationError
+from typing import List, Dict, FrozenSet, Optional, Callable, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import hmac
+import os
+import threading
+
+from cache import ResultCache, SharedResultCache, canonical_key
+from history import HistoryStore, Result as HistoryResult
+from coalesce import MicroBatcher, SingleFlight
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, metrics, render_samples
+from rule_files import RuleFileError
+from expert_system import (
+    RESPONSE_SECTIONS, AnalysisResponse, BatchAnalysisRequest, BatchAnalysisResponse,
+    ExpertSystemService, LandingPageDelta, LandingPageInput, OptimizeRequest, OptimizeResponse,
+    QueryResponse, SensitivityResponse, UncertaintyRequest, UncertaintyResponse, etag_matches, render_json,
+)
+
+# ==================== Analysis Executor ====================
+
+# اجرای تحلیل روی pool تا event loop مسدود نشود
+# EXPERT_EXECUTOR: thread (پیش‌فرض) | process | inline
+EXECUTOR_KIND = os.environ.get("EXPERT_EXECUTOR", "thread")
+EXECUTOR_WORKERS = int(os.environ.get("EXPERT_WORKERS", "0")) or None
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> Optional[Executor]:
+    """ساخت تنبل pool تحلیل (None در حالت inline)"""
+    global _executor
+    if _executor is None and EXECUTOR_KIND != "inline":
+        with _executor_lock:
+            if _executor is None:
+                if EXECUTOR_KIND == "process":
+                    # هر فرایند worker snapshot دانش خودش را دارد و فایل‌ها را خودش بررسی می‌کند
+                    _executor = ProcessPoolExecutor(max_workers=EXECUTOR_WORKERS, initializer=_watch_rules)
+                elif EXECUTOR_KIND == "thread":
+                    _executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="analyze")
+                else:
+                    raise ValueError(f"نوع executor نامعتبر: {EXECUTOR_KIND}")
+    return _executor
+
+
+async def run_in_pool(func: Callable, *args):
+    """
+    اجرای تابع روی pool تحلیل (یا همین‌جا وقتی pool غیرفعال است)
+    
+    func و آرگومان‌ها در process pool با pickle به worker فرستاده می‌شوند، پس func باید
+    تابع سطح ماژول باشد (نه lambda یا متد) و فقط داده ساده بگیرد و برگرداند.
+    """
+    executor = get_executor()
+    if executor is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """چرخه عمر برنامه: کامپایل دانش پیش از پذیرش درخواست‌ها، بررسی فایل‌های دانش و بستن pool تحلیل"""
+    get_service()
+    _watch_rules()
+    yield
+    get_service().stop_watching()
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+    if history is not None:
+        history.close(HISTORY_CLOSE_SECONDS)
+
 
 # ==================== FastAPI App ====================
 
-app = FastAPI(
-    title="سیستم خبره تحلیل UI/UX",
-    description="API برای تحلیل و بهینه‌سازی صفحات لندینگ",
-    version="1.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc"
-)
+class FastJSONResponse(JSONResponse):
+    """JSONResponse با سریال‌ساز render_json (orjson در صورت نصب، خروجی UTF-8)"""
+    
+    def render(self, content) -> bytes:
+        return render_json(content)
 
-# CORS Configuration - اجازه دسترسی از React
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173",  # Vite default
-        "http://localhost:5174",  # Vite alternative
-        "http://127.0.0.1:5173",
-        "http://127.0.0.1:5174",
-        "*"  # برای development - در production حذف کنید
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# ==================== Pydantic Models ====================
-
-class LandingPageInput(BaseModel):
-    """مدل ورودی داده‌های صفحه لندینگ"""
-    cta_position_y: int = Field(default=500, description="موقعیت CTA (پیکسل از بالا)")
-    cta_width: int = Field(default=200, description="عرض CTA (پیکسل)")
-    cta_height: int = Field(default=50, description="ارتفاع CTA (پیکسل)")
-    contrast_ratio: float = Field(default=4.5, description="نسبت کنتراست رنگی")
-    whitespace_around_cta: int = Field(default=40, description="فضای خالی اطراف CTA (پیکسل)")
-    scroll_depth: int = Field(default=60, description="عمق اسکرول کاربران (%)")
-    cta_click_rate: float = Field(default=3.5, description="نرخ کلیک CTA (%)")
-    number_of_ctas: int = Field(default=1, description="تعداد CTA در صفحه")
-    cta_text_length: int = Field(default=15, description="طول متن CTA (کاراکتر)")
-    time_to_cta: int = Field(default=8, description="زمان رسیدن به CTA (ثانیه)")
-    clickable_elements_before_cta: int = Field(default=3, description="تعداد عناصر کلیک‌پذیر قبل از CTA")
-    content_word_count: int = Field(default=300, description="تعداد کلمات محتوای صفحه")
-    similar_color_elements: int = Field(default=0, description="تعداد عناصر با رنگ مشابه CTA")
-    largest_other_element_size: int = Field(default=8000, description="بزرگترین عنصر دیگر (پیکسل مربع)")
-    cta_mobile_width: int = Field(default=200, description="عرض CTA در موبایل (پیکسل)")
-    cta_mobile_height: int = Field(default=48, description="ارتفاع CTA در موبایل (پیکسل)")
-    has_loading_animation: int = Field(default=1, description="وجود انیمیشن loading (0=خیر, 1=بله)")
-
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "cta_position_y": 500,
-                "cta_width": 200,
-                "cta_height": 50,
-                "contrast_ratio": 4.5,
-                "whitespace_around_cta": 40,
-                "scroll_depth": 60,
-                "cta_click_rate": 3.5,
-                "number_of_ctas": 1,
-                "cta_text_length": 15,
-                "time_to_cta": 8,
-                "clickable_elements_before_cta": 3,
-                "content_word_count": 300,
-                "similar_color_elements": 0,
-                "largest_other_element_size": 8000,
-                "cta_mobile_width": 200,
-                "cta_mobile_height": 48,
-                "has_loading_animation": 1
-            }
-        }
+# endpointها در سطح ماژول ثبت و فقط در create_app به برنامه اضافه می‌شوند
+ROUTES: List[Tuple[str, str, Callable, Dict]] = []
 
 
-class ActivatedRuleResponse(BaseModel):
-    """مدل پاسخ قانون فعال‌شده"""
-    rule_id: str
-    priority: int
-    certainty: float
-    conclusion: str
-    explanation: str
-    category: str
+def route(method: str, path: str, **options):
+    """ثبت endpoint (معادل app.get/app.post؛ ساخت مسیرها تا create_app به تعویق می‌افتد)"""
+    def register(endpoint: Callable) -> Callable:
+        ROUTES.append((method, path, endpoint, options))
+        return endpoint
+    return register
 
 
-class AnalysisResponse(BaseModel):
-    """مدل پاسخ تحلیل کامل"""
-    visibility_score: int
-    clickability_score: int
-    overall_certainty: float
-    activated_rules: List[ActivatedRuleResponse]
-    recommendations: List[str]
-    qualitative_inputs: Dict[str, str]
-    detailed_explanation: str
-    summary: Dict[str, str]
+# ==================== Global Service Instance ====================
 
+# EXPERT_RULES_PATH: فایل یا پوشه YAML/JSON قوانین و آستانه‌ها (پیش‌فرض: دانش داخلی)
+# EXPERT_RULES_POLL: فاصله بررسی تغییر فایل‌ها به ثانیه (0 = فقط با /api/admin/reload)
+RULES_PATH = os.environ.get("EXPERT_RULES_PATH") or None
+RULES_POLL_SECONDS = float(os.environ.get("EXPERT_RULES_POLL", "2"))
+ADMIN_TOKEN = os.environ.get("EXPERT_ADMIN_TOKEN") or None
+VERSION_HEADER = "X-KB-Version"
 
-# ==================== Data Classes ====================
+_service: Optional[ExpertSystemService] = None
+_service_lock = threading.Lock()
 
-@dataclass
-class Rule:
-    """کلاس قانون در سیستم خبره"""
-    id: str
-    priority: int
-    certainty: float
-    condition: Callable
-    conclusion: str
-    explanation: str
-    category: str
 
+def get_service() -> ExpertSystemService:
+    """سرویس این فرایند؛ دانش در اولین فراخوانی (شروع برنامه یا اولین استفاده) کامپایل می‌شود"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ExpertSystemService(metrics, RULES_PATH)
+    return _service
 
-@dataclass
-class ActivatedRule:
-    """قانون فعال‌شده"""
-    rule: Rule
-    certainty: float
 
+def _watch_rules():
+    """شروع بارگذاری مجدد خودکار در فرایند جاری (اصلی یا worker)"""
+    if RULES_POLL_SECONDS > 0:
+        get_service().watch(RULES_POLL_SECONDS)
 
-# ==================== Qualitative Converter ====================
+# زمان سریال‌سازی پاسخ‌ها به عنوان یک مرحله جداگانه
+if metrics.enabled:
+    render_json = metrics.timed("serialize", render_json)
 
-class QualitativeConverter:
-    """تبدیل داده‌های کمی به کیفی"""
-    
-    @staticmethod
-    def convert_inputs(inputs: Dict) -> Dict:
-        """تبدیل تمام ورودی‌ها به شکل کیفی"""
-        qualitative = {}  # فقط مقادیر کیفی، نه کپی از inputs
-        
-        # تبدیل طول محتوا به کیفی
-        words_count = inputs.get("content_word_count", 300)
-        if words_count < 200:
-            qualitative["content_length"] = "کوتاه"
-        elif words_count < 400:
-            qualitative["content_length"] = "متوسط"
-        else:
-            qualitative["content_length"] = "طولانی"
-        
-        # تبدیل وضوح متن CTA به کیفی (بر اساس طول)
-        text_len = inputs.get("cta_text_length", 15)
-        if text_len <= 15 and text_len > 5:
-            qualitative["cta_text_clarity"] = "خوب"
-        elif text_len <= 25:
-            qualitative["cta_text_clarity"] = "متوسط"
-        else:
-            qualitative["cta_text_clarity"] = "ضعیف"
-        
-        # تبدیل تمایز رنگی به کیفی (بر اساس تعداد رنگ‌های مشابه)
-        similar_colors = inputs.get("similar_color_elements", 0)
-        if similar_colors == 0:
-            qualitative["cta_color_uniqueness"] = "منحصربفرد"
-        elif similar_colors <= 2:
-            qualitative["cta_color_uniqueness"] = "متوسط"
-        else:
-            qualitative["cta_color_uniqueness"] = "مشابه"
-        
-        # تبدیل سلسله‌مراتب بصری (بر اساس اندازه نسبی)
-        cta_width = inputs.get("cta_width", 200)
-        cta_height = inputs.get("cta_height", 50)
-        largest_other = inputs.get("largest_other_element_size", 150)
-        
-        cta_area = cta_width * cta_height
-        if cta_area > largest_other * 1.5:
-            qualitative["visual_hierarchy"] = "قوی"
-        elif cta_area > largest_other * 1.1:
-            qualitative["visual_hierarchy"] = "متوسط"
-        else:
-            qualitative["visual_hierarchy"] = "ضعیف"
-        
-        # تبدیل موبایل (بر اساس اندازه)
-        mobile_width = inputs.get("cta_mobile_width", 200)
-        mobile_height = inputs.get("cta_mobile_height", 48)
-        if mobile_width >= 180 and mobile_height >= 48:
-            qualitative["mobile_friendly"] = "بله"
-        else:
-            qualitative["mobile_friendly"] = "خیر"
-        
-        # تبدیل بازخورد بصری (بر اساس وجود انیمیشن)
-        has_animation = inputs.get("has_loading_animation", 1)
-        if has_animation > 0:
-            qualitative["loading_feedback"] = "بله"
-        else:
-            qualitative["loading_feedback"] = "خیر"
-        
-        return qualitative
-
-
-# ==================== Knowledge Base ====================
-
-class KnowledgeBase:
-    """پایگاه دانش سیستم خبره"""
-    
-    def __init__(self):
-        self.rules = self._create_rules()
-    
-    def _create_rules(self) -> List[Rule]:
-        """ایجاد پایگاه دانش (قوانین)"""
-        return [
-            # ============ قوانین CTA Visibility ============
-            Rule(
-                id="V1",
-                priority=10,
-                certainty=0.95,
-                condition=lambda d: d["cta_position_y"] > 800 and d["scroll_depth"] < 50,
-                conclusion="CTA در موقعیت نامناسب: زیر fold قرار دارد و کاربران به آن نمی‌رسند",
-                explanation="57% کاربران تا عمق 800 پیکسل اسکرول نمی‌کنند. CTA باید در 600 پیکسل اول باشد.",
-                category="visibility"
-            ),
-            Rule(
-                id="V2",
-                priority=9,
-                certainty=0.90,
-                condition=lambda d: d["contrast_ratio"] < 3.0,
-                conclusion="کنتراست رنگی CTA بسیار ضعیف است - قابل مشاهده نیست",
-                explanation="نسبت کنتراست کمتر از 3:1 باعث می‌شود CTA در پس‌زمینه گم شود.",
-                category="visibility"
-            ),
-            Rule(
-                id="V3",
-                priority=8,
-                certainty=0.85,
-                condition=lambda d: d["whitespace_around_cta"] < 30,
-                conclusion="فضای خالی اطراف CTA ناکافی است - دیده نمی‌شود",
-                explanation="فضای خالی کمتر از 40 پیکسل باعث می‌شود CTA در بین عناصر گم شود.",
-                category="visibility"
-            ),
-            Rule(
-                id="V4",
-                priority=7,
-                certainty=0.80,
-                condition=lambda d: d["number_of_ctas"] > 1,
-                conclusion="وجود چند CTA باعث سردرگمی کاربر می‌شود",
-                explanation="تحقیقات نشان می‌دهد وجود بیش از یک CTA، conversion را 26% کاهش می‌دهد.",
-                category="visibility"
-            ),
-            Rule(
-                id="V5",
-                priority=6,
-                certainty=0.75,
-                condition=lambda d: d["cta_color_uniqueness"] == "مشابه",
-                conclusion="رنگ CTA با سایر عناصر مشابه است - تمایز ندارد",
-                explanation="CTA باید رنگی منحصربفرد و متفاوت از سایر عناصر صفحه داشته باشد.",
-                category="visibility"
-            ),
-            Rule(
-                id="V6",
-                priority=5,
-                certainty=0.70,
-                condition=lambda d: d["visual_hierarchy"] == "ضعیف",
-                conclusion="سلسله‌مراتب بصری ضعیف - CTA برجسته نیست",
-                explanation="CTA باید بزرگترین و برجسته‌ترین عنصر کلیک‌پذیر صفحه باشد.",
-                category="visibility"
-            ),
-            
-            # ============ قوانین CTA Clickability ============
-            Rule(
-                id="C1",
-                priority=10,
-                certainty=0.95,
-                condition=lambda d: d["cta_width"] < 180 or d["cta_height"] < 44,
-                conclusion="اندازه CTA خیلی کوچک است - کلیک مشکل است",
-                explanation="حداقل اندازه توصیه‌شده برای CTA: 200×50 پیکسل (موبایل: 48×48)",
-                category="clickability"
-            ),
-            Rule(
-                id="C2",
-                priority=9,
-                certainty=0.90,
-                condition=lambda d: d["cta_text_length"] > 25,
-                conclusion="متن CTA بیش‌از‌حد طولانی است",
-                explanation="متن CTA باید حداکثر 2-3 کلمه باشد. از فعل امری کوتاه استفاده کنید.",
-                category="clickability"
-            ),
-            Rule(
-                id="C3",
-                priority=8,
-                certainty=0.85,
-                condition=lambda d: d["cta_text_clarity"] == "ضعیف",
-                conclusion="متن CTA واضح و انگیزه‌بخش نیست",
-                explanation="از عبارات ارزش‌محور مثل 'شروع رایگان' به جای 'ثبت‌نام' استفاده کنید.",
-                category="clickability"
-            ),
-            Rule(
-                id="C4",
-                priority=7,
-                certainty=0.80,
-                condition=lambda d: d["clickable_elements_before_cta"] > 5,
-                conclusion="عناصر کلیک‌پذیر زیادی قبل از CTA وجود دارد",
-                explanation="هر عنصر کلیک‌پذیر اضافی، احتمال کلیک روی CTA را 8% کاهش می‌دهد.",
-                category="clickability"
-            ),
-            Rule(
-                id="C5",
-                priority=6,
-                certainty=0.75,
-                condition=lambda d: d["mobile_friendly"] == "خیر",
-                conclusion="CTA برای موبایل بهینه نشده است",
-                explanation="60% ترافیک از موبایل است. اندازه CTA در موبایل باید حداقل 48×48 پیکسل باشد.",
-                category="clickability"
-            ),
-            Rule(
-                id="C6",
-                priority=5,
-                certainty=0.70,
-                condition=lambda d: d["loading_feedback"] == "خیر",
-                conclusion="عدم وجود بازخورد بصری پس از کلیک",
-                explanation="کاربر باید بلافاصله پس از کلیک، بازخورد بصری (loading، تغییر رنگ) ببیند.",
-                category="clickability"
-            ),
-            
-            # ============ قوانین ترکیبی ============
-            Rule(
-                id="M1",
-                priority=9,
-                certainty=0.88,
-                condition=lambda d: d["time_to_cta"] > 12 and d["content_length"] == "طولانی",
-                conclusion="زمان رسیدن به CTA بیش‌از‌حد طولانی است",
-                explanation="کاربران در 8-10 ثانیه اول تصمیم می‌گیرند. محتوا را خلاصه کنید.",
-                category="visibility"
-            ),
-            Rule(
-                id="M2",
-                priority=8,
-                certainty=0.82,
-                condition=lambda d: d["cta_click_rate"] < 2 and d["contrast_ratio"] < 4,
-                conclusion="نرخ کلیک پایین به دلیل کنتراست ضعیف",
-                explanation="افزایش کنتراست به 4.5:1 می‌تواند conversion را تا 35% افزایش دهد.",
-                category="clickability"
-            ),
-            Rule(
-                id="M3",
-                priority=7,
-                certainty=0.78,
-                condition=lambda d: d["scroll_depth"] > 70 and d["cta_position_y"] < 500,
-                conclusion="موقعیت CTA بهینه است - کاربران به آن می‌رسند",
-                explanation="قرارگیری CTA در 500 پیکسل اول با scroll depth بالا، نشانه طراحی خوب است.",
-                category="visibility"
-            ),
-            Rule(
-                id="M4",
-                priority=6,
-                certainty=0.75,
-                condition=lambda d: d["cta_click_rate"] > 5 and d["cta_width"] >= 200,
-                conclusion="اندازه CTA مناسب است - نرخ کلیک خوب",
-                explanation="اندازه مناسب CTA منجر به نرخ کلیک بالاتر شده است.",
-                category="clickability"
-            ),
-        ]
-
-
-# ==================== Inference Engine ====================
-
-class InferenceEngine:
-    """موتور استنتاج با Forward Chaining"""
-    
-    def __init__(self, knowledge_base: KnowledgeBase):
-        self.kb = knowledge_base
-        self.activated_rules = []
-        self.converter = QualitativeConverter()
-    
-    def forward_chaining(self, inputs: Dict) -> Dict:
-        """اجرای Forward Chaining"""
-        # تبدیل ورودی‌ها به کیفی
-        qualitative_inputs = self.converter.convert_inputs(inputs)
-        
-        # اضافه کردن مقادیر عددی اصلی برای استفاده در condition ها
-        full_data = {**inputs, **qualitative_inputs}
-        
-        self.activated_rules = []
-        
-        # فعال‌سازی قوانین با استفاده از داده‌های کامل
-        for rule in self.kb.rules:
-            try:
-                if rule.condition(full_data):
-                    self.activated_rules.append(
-                        ActivatedRule(rule=rule, certainty=rule.certainty)
-                    )
-            except:
-                continue
-        
-        # مرتب‌سازی بر اساس اولویت
-        self.activated_rules.sort(key=lambda x: x.rule.priority, reverse=True)
-        
-        # محاسبه امتیازات
-        visibility_score = self._calculate_visibility_score(inputs)
-        clickability_score = self._calculate_clickability_score(inputs)
-        
-        # محاسبه Certainty Factor کلی
-        overall_certainty = self._calculate_combined_certainty()
-        
-        return {
-            "activated_rules": self.activated_rules,
-            "visibility_score": visibility_score,
-            "clickability_score": clickability_score,
-            "overall_certainty": overall_certainty,
-            "recommendations": self._generate_recommendations(),
-            "qualitative_inputs": qualitative_inputs  # فقط کیفی‌ها
-        }
-    
-    def _calculate_visibility_score(self, inputs: Dict) -> int:
-        """محاسبه امتیاز دیده‌شدن CTA (0-100)"""
-        score = 100
-        
-        # موقعیت CTA (30 امتیاز)
-        if inputs["cta_position_y"] > 800:
-            score -= 30
-        elif inputs["cta_position_y"] > 600:
-            score -= 15
-        elif inputs["cta_position_y"] <= 400:
-            score += 5
-        
-        # کنتراست رنگی (25 امتیاز)
-        if inputs["contrast_ratio"] < 3:
-            score -= 25
-        elif inputs["contrast_ratio"] < 4.5:
-            score -= 10
-        elif inputs["contrast_ratio"] >= 7:
-            score += 5
-        
-        # فضای خالی (20 امتیاز)
-        if inputs["whitespace_around_cta"] < 30:
-            score -= 20
-        elif inputs["whitespace_around_cta"] < 40:
-            score -= 10
-        
-        # تعداد CTA (15 امتیاز)
-        if inputs["number_of_ctas"] > 2:
-            score -= 15
-        elif inputs["number_of_ctas"] > 1:
-            score -= 8
-        
-        # تمایز رنگی (10 امتیاز)
-        similar_colors = inputs.get("similar_color_elements", 0)
-        if similar_colors > 2:
-            score -= 10
-        elif similar_colors > 0:
-            score -= 5
-        
-        return max(0, min(100, score))
+
+# کش نتایج (EXPERT_CACHE_MAX_BYTES=0 برای غیرفعال‌سازی)
+# EXPERT_CACHE_PATH: فایل SQLite کش مشترک بین فرایندهای worker (پیش‌فرض: حافظه همین فرایند)
+CACHE_PATH = os.environ.get("EXPERT_CACHE_PATH") or None
+CACHE_MAX_BYTES = int(os.environ.get("EXPERT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL_SECONDS = float(os.environ.get("EXPERT_CACHE_TTL", "3600"))
+
+if CACHE_PATH is not None:
+    result_cache = SharedResultCache(CACHE_PATH, max_bytes=CACHE_MAX_BYTES, ttl_seconds=CACHE_TTL_SECONDS)
+else:
+    result_cache = ResultCache(max_bytes=CACHE_MAX_BYTES, ttl_seconds=CACHE_TTL_SECONDS)
+
+
+def _history_result(snapshot, inference) -> HistoryResult:
+    """نتیجه تاریخچه از همان استنتاجی که پاسخ از آن ساخته شد"""
+    activations = inference.activations
+    return (snapshot.version, inference.visibility_score, inference.clickability_score,
+            activations.certainty, activations.ids)
+
+
+def _history_row(snapshot, inputs: Dict) -> HistoryResult:
+    """نتیجه تاریخچه پاسخ کش‌شده (در thread نویسنده، با snapshot همان پاسخ)"""
+    return _history_result(snapshot, snapshot.infer(inputs))
+
+
+# تاریخچه تحلیل‌ها (EXPERT_HISTORY_PATH: فایل SQLite؛ پیش‌فرض: غیرفعال)
+# EXPERT_HISTORY_QUEUE: حداکثر رکوردهای در انتظار نوشتن؛ EXPERT_HISTORY_OVERFLOW: drop یا drop_oldest
+# EXPERT_HISTORY_BATCH: رکوردهای هر تراکنش؛ EXPERT_HISTORY_FLUSH_MS: حداکثر تأخیر نوشتن
+HISTORY_PATH = os.environ.get("EXPERT_HISTORY_PATH") or None
+HISTORY_CLOSE_SECONDS = 10.0
+
+history: Optional[HistoryStore] = None
+if HISTORY_PATH is not None:
+    history = HistoryStore(
+        HISTORY_PATH, _history_row,
+        max_queue=int(os.environ.get("EXPERT_HISTORY_QUEUE", "100000")),
+        batch_size=int(os.environ.get("EXPERT_HISTORY_BATCH", "512")),
+        flush_seconds=float(os.environ.get("EXPERT_HISTORY_FLUSH_MS", "500")) / 1000,
+        overflow=os.environ.get("EXPERT_HISTORY_OVERFLOW", "drop"),
+    )
+
+
+def parse_include(include: Optional[str]) -> Optional[FrozenSet[str]]:
+    """تبدیل پارامتر include (لیست جداشده با کاما) به مجموعه بخش‌ها"""
+    if include is None:
+        return None
     
-    def _calculate_clickability_score(self, inputs: Dict) -> int:
-        """محاسبه امتیاز قابلیت کلیک CTA (0-100)"""
-        score = 100
-        
-        # اندازه CTA (30 امتیاز)
-        if inputs["cta_width"] < 180 or inputs["cta_height"] < 44:
-            score -= 30
-        elif inputs["cta_width"] < 200 or inputs["cta_height"] < 50:
-            score -= 15
-        elif inputs["cta_width"] >= 250 and inputs["cta_height"] >= 60:
-            score += 5
-        
-        # طول متن (25 امتیاز)
-        text_len = inputs["cta_text_length"]
-        if text_len > 30:
-            score -= 25
-        elif text_len > 25:
-            score -= 15
-        elif text_len > 20:
-            score -= 8
-        elif text_len <= 15 and text_len > 5:
-            score += 5
-        
-        # عناصر قبل از CTA (20 امتیاز)
-        if inputs["clickable_elements_before_cta"] > 7:
-            score -= 20
-        elif inputs["clickable_elements_before_cta"] > 5:
-            score -= 10
-        
-        # موبایل (15 امتیاز)
-        mobile_width = inputs.get("cta_mobile_width", 200)
-        mobile_height = inputs.get("cta_mobile_height", 48)
-        if mobile_width < 180 or mobile_height < 48:
-            score -= 15
-        elif mobile_width < 200:
-            score -= 8
-        
-        # بازخورد بصری (10 امتیاز)
-        if inputs.get("has_loading_animation", 1) == 0:
-            score -= 10
-        
-        return max(0, min(100, score))
+    sections = frozenset(part.strip() for part in include.split(",") if part.strip())
+    if "all" in sections:
+        return RESPONSE_SECTIONS
     
-    def _calculate_combined_certainty(self) -> float:
-        """محاسبه Certainty Factor ترکیبی"""
-        if not self.activated_rules:
-            return 0.5
-        
-        # استفاده از فرمول ترکیب Certainty Factors
-        cf = self.activated_rules[0].certainty
-        
-        for i in range(1, len(self.activated_rules)):
-            cf_new = self.activated_rules[i].certainty
-            
-            # فرمول ترکیب CF
-            if cf > 0 and cf_new > 0:
-                cf = cf + cf_new * (1 - cf)
-            elif cf < 0 and cf_new < 0:
-                cf = cf + cf_new * (1 + cf)
-            else:
-                cf = (cf + cf_new) / (1 - min(abs(cf), abs(cf_new)))
-        
-        return round(cf, 2)
+    unknown = sections - RESPONSE_SECTIONS - {"scores"}
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"بخش نامعتبر در include: {', '.join(sorted(unknown))} "
+                   f"(مجاز: {', '.join(sorted(RESPONSE_SECTIONS))}, scores, all)"
+        )
+    return sections & RESPONSE_SECTIONS
+
+
+# توابع pool نسخه snapshot درخواست را می‌گیرند و نسخه‌ای که واقعاً استفاده شد را
+# برمی‌گردانند (در process pool ممکن است worker هنوز دانش دیگری داشته باشد)؛ توابع
+# تحلیل نتیجه تاریخچه همان استنتاج را هم برمی‌گردانند (None وقتی تاریخچه غیرفعال است)
+
+def _analyze_json(version: str, inputs: Dict,
+                  include: Optional[FrozenSet[str]] = None) -> Tuple[str, bytes, Optional[HistoryResult]]:
+    """بایت‌های JSON پاسخ تحلیل کامل (AnalysisResponse)"""
+    snapshot = get_service().snapshot_for(version)
+    if history is None:
+        return snapshot.version, get_service().analyze_json(inputs, include, snapshot), None
+    inferences = []
+    body = get_service().analyze_json(inputs, include, snapshot, inferences)
+    return snapshot.version, body, _history_result(snapshot, inferences[0])
+
+
+def _analyze_many_json(version: str, inputs_list: List[Dict], include: Optional[FrozenSet[str]] = None
+                       ) -> Tuple[str, List[bytes], Optional[List[HistoryResult]]]:
+    """تحلیل و سریال‌سازی چند ورودی در یک کار pool (جریان NDJSON و micro-batching)"""
+    snapshot = get_service().snapshot_for(version)
+    if history is None:
+        return snapshot.version, [get_service().analyze_json(inputs, include, snapshot) for inputs in inputs_list], None
+    inferences = []
+    bodies = [get_service().analyze_json(inputs, include, snapshot, inferences) for inputs in inputs_list]
+    return snapshot.version, bodies, [_history_result(snapshot, inference) for inference in inferences]
+
+
+def _analyze_simple_json(version: str, inputs: Dict) -> Tuple[str, bytes, Optional[HistoryResult]]:
+    """بایت‌های JSON پاسخ تحلیل ساده: امتیازها، CF، سه پیشنهاد اول و خلاصه"""
+    snapshot = get_service().snapshot_for(version)
+    inferences = [] if history is not None else None
+    results = get_service().analyze(inputs, frozenset({"summary"}), snapshot, inferences)
     
-    def _generate_recommendations(self) -> List[str]:
-        """تولید پیشنهادات نهایی"""
-        recommendations = []
-        
-        # استخراج پیشنهادات از قوانین فعال‌شده
-        for activated in self.activated_rules[:5]:  # 5 پیشنهاد برتر
-            recommendations.append(activated.rule.conclusion)
-        
-        return recommendations
-
+    return snapshot.version, render_json({
+        "visibility_score": results["visibility_score"],
+        "clickability_score": results["clickability_score"],
+        "overall_certainty": results["overall_certainty"],
+        "recommendations": results["recommendations"][:3],  # فقط 3 پیشنهاد اول
+        "summary": results["summary"]
+    }), None if inferences is None else _history_result(snapshot, inferences[0])
+
+
+# نسخه چندورودی توابع pool برای micro-batching درخواست‌های همزمان
+BATCH_WORKERS = {_analyze_json: _analyze_many_json}
+
+
+async def _dispatch_batch(group: Tuple, inputs_list: List[Dict]) -> List[Tuple[str, bytes, Optional[HistoryResult]]]:
+    """اجرای یک دسته از درخواست‌های همزمان در یک کار pool"""
+    worker, version, args = group
+    used_version, bodies, results = await run_in_pool(BATCH_WORKERS[worker], version, inputs_list, *args)
+    return [(used_version, body, result) for body, result in zip(bodies, results or [None] * len(bodies))]
+
+
+# EXPERT_SINGLE_FLIGHT=0: بدون ادغام درخواست‌های همزمان یکسان
+# EXPERT_BATCH_WINDOW_MS: پنجره گروه‌بندی درخواست‌های همزمان متفاوت (0 = بدون دسته‌بندی)
+# EXPERT_BATCH_MAX: حداکثر درخواست‌های یک دسته
+single_flight = SingleFlight(enabled=os.environ.get("EXPERT_SINGLE_FLIGHT", "1") != "0")
+micro_batcher = MicroBatcher(
+    _dispatch_batch,
+    window=float(os.environ.get("EXPERT_BATCH_WINDOW_MS", "1")) / 1000,
+    max_size=int(os.environ.get("EXPERT_BATCH_MAX", "64")),
+)
 
-# ==================== Explanation Facility ====================
 
-class ExplanationFacility:
-    """سیستم توضیح استدلال"""
+async def _compute(key: str, version: str, worker: Callable, input_dict: Dict, args: Tuple) -> Tuple:
+    """محاسبه پاسخ روی pool (در صورت امکان در دسته‌ای با درخواست‌های همزمان) و ذخیره در کش"""
+    if micro_batcher.enabled and worker in BATCH_WORKERS:
+        result = await micro_batcher.submit((worker, version, args), input_dict)
+    else:
+        result = await run_in_pool(worker, version, input_dict, *args)
     
-    @staticmethod
-    def generate_explanation(results: Dict, inputs: Dict) -> str:
-        """تولید توضیحات کامل"""
-        explanation = "🔍 مسیر استدلال سیستم خبره:\n"
-        explanation += "=" * 50 + "\n\n"
-        
-        # ورودی‌های کمی
-        explanation += "📊 داده‌های ورودی (کمی):\n"
-        explanation += f"  • موقعیت CTA: {inputs['cta_position_y']} پیکسل\n"
-        explanation += f"  • اندازه CTA: {inputs['cta_width']}×{inputs['cta_height']} پیکسل\n"
-        explanation += f"  • نسبت کنتراست: {inputs['contrast_ratio']}:1\n"
-        explanation += f"  • فضای خالی اطراف CTA: {inputs['whitespace_around_cta']} پیکسل\n"
-        explanation += f"  • عمق اسکرول: {inputs['scroll_depth']}%\n"
-        explanation += f"  • نرخ کلیک: {inputs['cta_click_rate']}%\n"
-        explanation += f"  • تعداد CTA: {inputs['number_of_ctas']}\n"
-        explanation += f"  • طول متن CTA: {inputs['cta_text_length']} کاراکتر\n"
-        explanation += f"  • تعداد کلمات محتوا: {inputs.get('content_word_count', 'N/A')}\n"
-        explanation += "\n"
-        
-        # ورودی‌های کیفی (تبدیل شده)
-        qualitative = results.get("qualitative_inputs", {})
-        explanation += "🔄 داده‌های تبدیل شده (کیفی):\n"
-        explanation += f"  • طول محتوا: {qualitative.get('content_length', 'N/A')}\n"
-        explanation += f"  • وضوح متن CTA: {qualitative.get('cta_text_clarity', 'N/A')}\n"
-        explanation += f"  • تمایز رنگی CTA: {qualitative.get('cta_color_uniqueness', 'N/A')}\n"
-        explanation += f"  • سلسله‌مراتب بصری: {qualitative.get('visual_hierarchy', 'N/A')}\n"
-        explanation += f"  • سازگاری موبایل: {qualitative.get('mobile_friendly', 'N/A')}\n"
-        explanation += f"  • بازخورد بصری: {qualitative.get('loading_feedback', 'N/A')}\n"
-        explanation += "\n"
-        
-        # قوانین فعال‌شده
-        explanation += "⚙️ قوانین فعال‌شده (به ترتیب اولویت):\n\n"
-        
-        for i, activated in enumerate(results["activated_rules"], 1):
-            rule = activated.rule
-            explanation += f"{i}. قانون {rule.id} (اولویت: {rule.priority}, اطمینان: {rule.certainty})\n"
-            explanation += f"   دسته: {'👁️ دیده‌شدن' if rule.category == 'visibility' else '👆 کلیک‌پذیری'}\n"
-            explanation += f"   ➜ {rule.conclusion}\n"
-            explanation += f"   💡 {rule.explanation}\n\n"
-        
-        if not results["activated_rules"]:
-            explanation += "   ✅ هیچ مشکل جدی شناسایی نشد!\n\n"
-        
-        # نتایج
-        explanation += "=" * 50 + "\n"
-        explanation += "📈 نتایج محاسبه‌شده:\n\n"
-        explanation += f"  • امتیاز دیده‌شدن (Visibility): {results['visibility_score']}/100\n"
-        explanation += f"  • امتیاز کلیک‌پذیری (Clickability): {results['clickability_score']}/100\n"
-        explanation += f"  • درجه اطمینان کلی (CF): {results['overall_certainty'] * 100:.0f}%\n\n"
-        
-        # ارزیابی کیفی
-        explanation += "🎯 ارزیابی کیفی:\n"
-        
-        vis_quality = ExplanationFacility._get_quality_label(results['visibility_score'])
-        click_quality = ExplanationFacility._get_quality_label(results['clickability_score'])
-        
-        explanation += f"  • دیده‌شدن CTA: {vis_quality}\n"
-        explanation += f"  • کلیک‌پذیری CTA: {click_quality}\n\n"
-        
-        # پیشنهادات
-        explanation += "=" * 50 + "\n"
-        explanation += "✅ پیشنهادات اولویت‌دار:\n\n"
-        
-        if results['recommendations']:
-            for i, rec in enumerate(results['recommendations'], 1):
-                explanation += f"{i}. {rec}\n\n"
-        else:
-            explanation += "✨ طراحی شما عالی است! نیازی به بهبود فوری نیست.\n\n"
-        
-        return explanation
-    
-    @staticmethod
-    def _get_quality_label(score: int) -> str:
-        """تبدیل امتیاز به برچسب کیفی"""
-        if score >= 85:
-            return "عالی ✅"
-        elif score >= 70:
-            return "خوب ✓"
-        elif score >= 50:
-            return "متوسط ⚠️"
-        else:
-            return "ضعیف ❌"
-
+    # پاسخ دانش دیگری (worker هنوز بارگذاری نکرده) با کلید این نسخه ذخیره نمی‌شود
+    used_version, body = result[0], result[1]
+    if result_cache.enabled and used_version == version:
+        result_cache.put(key, body)
+    return result
 
-# ==================== API Service ====================
 
-class ExpertSystemService:
-    """سرویس سیستم خبره"""
-    
-    def __init__(self):
-        self.kb = KnowledgeBase()
-        self.ie = InferenceEngine(self.kb)
-        self.ef = ExplanationFacility()
+async def cached_analysis(namespace: str, worker: Callable, input_dict: Dict, *args,
+                          record: Optional[str] = None) -> Response:
+    """
+    پاسخ از کش در صورت وجود، در غیر این صورت تحلیل روی pool و ذخیره در کش
     
-    def analyze(self, inputs: Dict) -> Dict:
-        """تحلیل و استنتاج"""
-        # اجرای Forward Chaining
-        results = self.ie.forward_chaining(inputs)
-        
-        # تولید توضیحات
-        explanation = self.ef.generate_explanation(results, inputs)
-        
-        # تولید خلاصه
-        summary = self._create_summary(results)
-        
-        return {
-            "visibility_score": results["visibility_score"],
-            "clickability_score": results["clickability_score"],
-            "overall_certainty": results["overall_certainty"],
-            "activated_rules": [
-                {
-                    "rule_id": ar.rule.id,
-                    "priority": ar.rule.priority,
-                    "certainty": ar.certainty,
-                    "conclusion": ar.rule.conclusion,
-                    "explanation": ar.rule.explanation,
-                    "category": ar.rule.category
-                }
-                for ar in results["activated_rules"]
-            ],
-            "recommendations": results["recommendations"],
-            "qualitative_inputs": results["qualitative_inputs"],
-            "detailed_explanation": explanation,
-            "summary": summary
-        }
+    درخواست‌های همزمان با همان کلید canonical منتظر یک محاسبه مشترک می‌مانند.
+    record: منبع ثبت در تاریخچه (فقط برای توابع تحلیل که نتیجه تاریخچه برمی‌گردانند).
+    """
+    snapshot = get_service().snapshot  # تا پایان درخواست نگه داشته می‌شود
+    version = snapshot.version
+    key = canonical_key(namespace, version, input_dict)
+    record = record if history is not None else None
     
-    def _create_summary(self, results: Dict) -> Dict:
-        """ایجاد خلاصه نتایج"""
-        vis_score = results['visibility_score']
-        click_score = results['clickability_score']
-        cf = results['overall_certainty']
-        
-        # محاسبه وضعیت کلی
-        avg_score = (vis_score + click_score) / 2
-        if avg_score >= 85:
-            overall_status = "عالی - طراحی بهینه است!"
-            status_emoji = "excellent"
-        elif avg_score >= 70:
-            overall_status = "خوب - بهبودهای جزئی لازم است"
-            status_emoji = "good"
-        elif avg_score >= 50:
-            overall_status = "متوسط - نیاز به بهبود دارد"
-            status_emoji = "medium"
-        else:
-            overall_status = "ضعیف - بازطراحی توصیه می‌شود"
-            status_emoji = "weak"
-        
-        return {
-            "visibility_status": self._get_quality_label(vis_score),
-            "clickability_status": self._get_quality_label(click_score),
-            "certainty_level": self._get_cf_label(cf),
-            "overall_status": overall_status,
-            "status_emoji": status_emoji,
-            "average_score": str(round(avg_score, 1))  # تبدیل به string
-        }
+    if result_cache.enabled:
+        result_cache.ensure_version(version)
+        body = result_cache.get(key)
+        if body is not None:
+            if record is not None:
+                # پاسخ کش‌شده استنتاجی نداشت: نویسنده نتیجه را با همین snapshot می‌سازد
+                history.record(record, input_dict, snapshot)
+            return Response(content=body, media_type="application/json", headers={VERSION_HEADER: version})
     
-    def _get_quality_label(self, score: int) -> str:
-        """تبدیل امتیاز به برچسب کیفی"""
-        if score >= 85:
-            return "عالی"
-        elif score >= 70:
-            return "خوب"
-        elif score >= 50:
-            return "متوسط"
-        else:
-            return "ضعیف"
-    
-    def _get_cf_label(self, cf: float) -> str:
-        """برچسب برای CF"""
-        if cf >= 0.9:
-            return "بسیار بالا"
-        elif cf >= 0.8:
-            return "بالا"
-        elif cf >= 0.6:
-            return "متوسط"
-        else:
-            return "پایین"
+    result = await single_flight.run(key, lambda: _compute(key, version, worker, input_dict, args))
+    if record is not None:
+        history.record(record, input_dict, result[2] if result[2] is not None else snapshot)
+    return Response(content=result[1], media_type="application/json", headers={VERSION_HEADER: result[0]})
 
 
-# ==================== Global Service Instance ====================
+def _analyze_batch(version: str, inputs_list: List[Dict]) -> Tuple[str, List[Dict]]:
+    """نتایج dict تحلیل چند ورودی به ترتیب ورودی‌ها (برای BatchAnalysisResponse)"""
+    snapshot = get_service().snapshot_for(version)
+    return snapshot.version, get_service().analyze_batch(inputs_list, snapshot)
+
+
+def _optimize_json(version: str, request: Dict) -> Tuple[str, bytes]:
+    """بایت‌های JSON کم‌هزینه‌ترین طرح و گزینه‌های جایگزین (OptimizeResponse)"""
+    snapshot = get_service().snapshot_for(version)
+    result = get_service().optimize(request["inputs"], request["fields"], request["alternatives"], snapshot)
+    return snapshot.version, render_json(result)
 
-expert_service = ExpertSystemService()
+
+def _sensitivity_json(version: str, inputs: Dict, fields: Optional[List[str]] = None) -> Tuple[str, bytes]:
+    """بایت‌های JSON جدول نقاط شکست فیلدها (SensitivityResponse)"""
+    snapshot = get_service().snapshot_for(version)
+    return snapshot.version, render_json(get_service().sensitivity(inputs, fields, snapshot))
+
+
+def _uncertainty_json(version: str, request: Dict) -> Tuple[str, bytes]:
+    """بایت‌های JSON توزیع نتایج Monte Carlo (UncertaintyResponse)"""
+    snapshot = get_service().snapshot_for(version)
+    result = get_service().uncertainty(request["inputs"], request["distributions"], request["samples"],
+                                       request["seed"], request["percentiles"], snapshot)
+    return snapshot.version, render_json(result)
+
+
+def _planner_json(version: str) -> Tuple[str, bytes]:
+    """برنامه ارزیابی موتور (روی pool، تا با process pool آمار همان worker گزارش شود)"""
+    snapshot = get_service().snapshot_for(version)
+    return snapshot.version, render_json(get_service().evaluation_plan(snapshot))
+
+
+def _query_json(version: str, inputs: Dict, categories: FrozenSet[str], rule_ids: FrozenSet[str]) -> Tuple[str, bytes]:
+    """بایت‌های JSON پاسخ پرسش هدف‌دار (QueryResponse)"""
+    snapshot = get_service().snapshot_for(version)
+    return snapshot.version, render_json(get_service().query(inputs, categories, rule_ids, snapshot))
 
 
 # ==================== API Endpoints ====================
 
-@app.get("/")
+@route("GET", "/")
 async def root():
     """صفحه اصلی API"""
     return {
@@ -714,82 +345,534 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "analyze": "/api/analyze",
+            "analyze_batch": "/api/analyze/batch",
+            "analyze_stream": "/api/analyze/stream",
+            "sessions": "/api/sessions/{session_id}",
+            "optimize": "/api/optimize",
+            "sensitivity": "/api/sensitivity",
+            "query": "/api/query",
+            "uncertainty": "/api/uncertainty",
+            "planner": "/api/planner",
             "health": "/api/health",
             "rules": "/api/rules",
+            "cache_stats": "/api/cache/stats",
+            "history": "/api/history",
+            "metrics": "/metrics",
+            "reload": "/api/admin/reload",
             "docs": "/docs"
         }
     }
 
 
-@app.get("/api/health")
+@route("GET", "/api/health")
 async def health_check():
     """بررسی سلامت سرویس"""
     return {
         "status": "healthy",
         "service": "UI/UX Expert System",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "kb_version": get_service().version
     }
 
 
-@app.get("/api/rules")
-async def get_rules():
-    """دریافت لیست قوانین سیستم خبره"""
-    kb = KnowledgeBase()
-    rules_list = []
-    
-    for rule in kb.rules:
-        rules_list.append({
-            "id": rule.id,
-            "priority": rule.priority,
-            "certainty": rule.certainty,
-            "conclusion": rule.conclusion,
-            "explanation": rule.explanation,
-            "category": rule.category
-        })
-    
+@route("GET", "/api/cache/stats")
+async def cache_stats():
+    """آمار کش نتایج (hit/miss/eviction) و ادغام درخواست‌های همزمان"""
     return {
-        "total_rules": len(rules_list),
-        "rules": rules_list
+        **result_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "micro_batch": micro_batcher.stats(),
     }
 
 
-@app.post("/api/analyze", response_model=AnalysisResponse)
-async def analyze_landing_page(input_data: LandingPageInput):
+@route("GET", "/api/history")
+async def analysis_history(
+    since: Optional[float] = Query(None, description="شروع بازه زمانی (ثانیه یونیکس)"),
+    until: Optional[float] = Query(None, description="پایان بازه زمانی (انحصاری)"),
+    rule: Optional[str] = Query(None, description="فقط تحلیل‌هایی که این قانون در آن‌ها فعال بوده"),
+    score: str = Query("visibility", description="امتیاز فیلتر بازه: visibility یا clickability"),
+    min_score: Optional[int] = Query(None, ge=0, le=100),
+    max_score: Optional[int] = Query(None, ge=0, le=100),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor صفحه قبل")
+):
+    """
+    تاریخچه تحلیل‌ها، جدیدترین اول، با صفحه‌بندی cursor (EXPERT_HISTORY_PATH لازم است)
+    
+    هر فیلتر (زمان، قانون، بازه امتیاز) با شاخص خودش خوانده می‌شود، پس زمان هر صفحه
+    به تعداد کل تحلیل‌های ذخیره‌شده بستگی ندارد.
+    """
+    if history is None:
+        raise HTTPException(status_code=404, detail="تاریخچه تحلیل‌ها فعال نیست (EXPERT_HISTORY_PATH)")
+    
+    try:
+        page = await asyncio.to_thread(history.query, since, until, rule, score, min_score, max_score, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return FastJSONResponse(page)
+
+
+@route("GET", "/api/history/stats")
+async def history_stats():
+    """صف نوشتن تاریخچه: ثبت‌شده، نوشته‌شده، کنارگذاشته و ناموفق"""
+    if history is None:
+        return {"enabled": False}
+    return await asyncio.to_thread(history.stats)
+
+
+@route("GET", "/metrics")
+async def prometheus_metrics():
+    """سنجه‌ها در قالب متنی Prometheus (مراحل و قوانین فقط با EXPERT_METRICS=1)"""
+    cache = result_cache.stats()
+    lines = metrics.render() if metrics.enabled else []
+    
+    for name in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        lines += render_samples(f"expert_cache_{name}_total", "counter", f"Result cache {name}.", [({}, cache[name])])
+    lines += render_samples("expert_cache_entries", "gauge", "Entries in the result cache.", [({}, cache["entries"])])
+    lines += render_samples("expert_cache_bytes", "gauge", "Bytes held by the result cache.", [({}, cache["bytes"])])
+    if "errors" in cache:
+        lines += render_samples("expert_cache_errors_total", "counter", "Shared cache errors (lookups bypassed).",
+                                [({}, cache["errors"])])
+        lines += render_samples("expert_cache_skipped_writes_total", "counter",
+                                "Shared cache writes skipped because the writer queue was full.", [({}, cache["skipped"])])
+    lines += render_samples("expert_singleflight_flights_total", "counter", "Computations started by single-flight.",
+                            [({}, single_flight.flights)])
+    lines += render_samples("expert_coalesced_requests_total", "counter",
+                            "Requests that shared an identical in-flight computation.", [({}, single_flight.coalesced)])
+    lines += render_samples("expert_batches_total", "counter", "Micro-batches of more than one request dispatched to the analysis pool.",
+                            [({}, micro_batcher.batches)])
+    lines += render_samples("expert_batched_requests_total", "counter", "Requests dispatched inside micro-batches of more than one request.",
+                            [({}, micro_batcher.batched)])
+    if history is not None:
+        for name in ("recorded", "dropped", "written", "failed"):
+            lines += render_samples(f"expert_history_{name}_total", "counter", f"Analysis history records {name}.",
+                                    [({}, getattr(history, name))])
+        lines += render_samples("expert_history_queued", "gauge", "Analysis history records waiting to be written.",
+                                [({}, history.queued)])
+    lines += render_samples("expert_sessions", "gauge", "Open what-if sessions.", [({}, len(get_service().sessions))])
+    lines += render_samples("expert_kb_reloads_total", "counter", "Knowledge base reload attempts.", [
+        ({"result": "ok"}, get_service().reloads), ({"result": "error"}, get_service().reload_errors)
+    ])
+    lines += render_samples("expert_kb_loaded_timestamp_seconds", "gauge", "When the current knowledge base was compiled.",
+                            [({}, get_service().snapshot.loaded_at)])
+    lines += render_samples("expert_info", "gauge", "Knowledge base version and metrics state.", [(
+        {"kb_version": get_service().version, "metrics_enabled": str(metrics.enabled).lower()}, 1
+    )])
+    
+    return Response(content="\n".join(lines) + "\n", media_type=METRICS_CONTENT_TYPE)
+
+
+@route("GET", "/api/planner")
+async def evaluation_plan():
+    """
+    برنامه ارزیابی قوانین: گزاره‌های مشترک، احتمال مشاهده‌شده هر مقایسه، ترتیب فعلی
+    جمله‌های هر قانون و شمار بازبینی‌ها (با process pool: آمار یکی از workerها)
+    """
+    version, body = await run_in_pool(_planner_json, get_service().version)
+    return Response(content=body, media_type="application/json", headers={VERSION_HEADER: version})
+
+
+@route("GET", "/api/rules")
+async def get_rules(
+    request: Request,
+    category: Optional[str] = Query(None, description="فیلتر دسته: visibility یا clickability"),
+    min_priority: Optional[int] = Query(None, description="حداقل اولویت قوانین")
+):
+    """دریافت لیست قوانین سیستم خبره (از پایگاه دانش مشترک، با پشتیبانی ETag)"""
+    snapshot = get_service().snapshot
+    body, etag = snapshot.catalog.get(category, min_priority)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", VERSION_HEADER: snapshot.version}
+    
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@route("POST", "/api/analyze", response_model=AnalysisResponse, response_model_exclude_none=True)
+async def analyze_landing_page(
+    input_data: LandingPageInput,
+    include: Optional[str] = Query(
+        None,
+        description="بخش‌های اختیاری پاسخ (جداشده با کاما): rules, qualitative, explanation, summary "
+                    "یا scores برای فقط امتیازات؛ پیش‌فرض: همه"
+    )
+):
     """
     تحلیل صفحه لندینگ و ارائه پیشنهادات بهینه‌سازی
     
     این endpoint داده‌های کمی صفحه لندینگ را دریافت کرده و با استفاده از
     سیستم خبره مبتنی بر قواعد، تحلیل جامعی از دیده‌شدن و کلیک‌پذیری CTA ارائه می‌دهد.
     """
+    sections = parse_include(include)
+    
     try:
         # تبدیل Pydantic model به dictionary
         input_dict = input_data.model_dump()
         
-        # اجرای تحلیل
-        results = expert_service.analyze(input_dict)
-        
-        return results
+        # اجرای تحلیل روی pool (یا پاسخ کش‌شده با همان بایت‌ها)
+        if sections is None or sections == RESPONSE_SECTIONS:
+            namespace = "analyze"
+        else:
+            namespace = "analyze:" + ",".join(sorted(sections))
+        return await cached_analysis(namespace, _analyze_json, input_dict, sections, record="analyze")
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"خطا در تحلیل: {str(e)}")
 
 
-@app.post("/api/analyze/simple")
+@route("POST", "/api/analyze/simple")
 async def analyze_simple(input_data: LandingPageInput):
     """
     نسخه ساده تحلیل - فقط امتیازات و پیشنهادات اصلی
     """
     try:
         input_dict = input_data.model_dump()
-        results = expert_service.analyze(input_dict)
+        return await cached_analysis("simple", _analyze_simple_json, input_dict, record="simple")
         
-        return {
-            "visibility_score": results["visibility_score"],
-            "clickability_score": results["clickability_score"],
-            "overall_certainty": results["overall_certainty"],
-            "recommendations": results["recommendations"][:3],  # فقط 3 پیشنهاد اول
-            "summary": results["summary"]
-        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"خطا در تحلیل: {str(e)}")
+
+
+@route("POST", "/api/analyze/batch", response_model=BatchAnalysisResponse)
+async def analyze_batch(request: BatchAnalysisRequest):
+    """
+    تحلیل دسته‌ای چند صفحه لندینگ در یک درخواست
+    
+    ارزیابی به صورت برداری (ستونی) انجام می‌شود و نتایج هر صفحه با
+    /api/analyze یکسان است؛ قوانین فعال‌شده فقط با شناسه برگردانده می‌شوند.
+    """
+    try:
+        input_dicts = [item.model_dump() for item in request.items]
+        version, results = await run_in_pool(_analyze_batch, get_service().version, input_dicts)
+        if history is not None:
+            for input_dict, result in zip(input_dicts, results):
+                history.record("batch", input_dict, (
+                    version, result["visibility_score"], result["clickability_score"],
+                    result["overall_certainty"], tuple(result["activated_rules"]),
+                ))
+        
+        # پاسخ مستقیم (response_model فقط برای مستندات؛ نتایج از قبل با مدل سازگارند)
+        return FastJSONResponse({
+            "count": len(results),
+            "results": results
+        }, headers={VERSION_HEADER: version})
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"خطا در تحلیل: {str(e)}")
+
+
+@route("PUT", "/api/sessions/{session_id}", response_model=AnalysisResponse)
+async def start_session(session_id: str, input_data: LandingPageInput):
+    """
+    شروع یا بازنشانی نشست تحلیل افزایشی (what-if) با ورودی کامل
+    """
+    snapshot = get_service().snapshot
+    try:
+        results = get_service().start_session(session_id, input_data.model_dump(), snapshot)
+        return FastJSONResponse(results, headers={VERSION_HEADER: snapshot.version})
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"خطا در تحلیل: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"خطا در تحلیل: {str(e)}")
+
+
+@route("PATCH", "/api/sessions/{session_id}", response_model=AnalysisResponse)
+async def update_session(session_id: str, delta: LandingPageDelta):
+    """
+    ارسال فقط فیلدهای تغییرکرده؛ تنها قوانین و امتیازهای وابسته دوباره ارزیابی می‌شوند
+    (پس از بارگذاری مجدد دانش، نشست یک بار با دانش جدید کامل ارزیابی می‌شود)
+    """
+    snapshot = get_service().snapshot
+    try:
+        results = get_service().update_session(session_id, delta.model_dump(exclude_none=True), snapshot)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"خطا در تحلیل: {str(e)}")
+    
+    if results is None:
+        raise HTTPException(status_code=404, detail="نشست یافت نشد")
+    
+    return FastJSONResponse(results, headers={VERSION_HEADER: snapshot.version})
+
+
+@route("DELETE", "/api/sessions/{session_id}")
+async def end_session(session_id: str):
+    """پایان نشست تحلیل افزایشی"""
+    if not get_service().sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="نشست یافت نشد")
+    
+    return {"status": "deleted"}
+
+
+@route("POST", "/api/optimize", response_model=OptimizeResponse)
+async def optimize_design(request: OptimizeRequest):
+    """
+    کم‌هزینه‌ترین تغییر فیلدهای قابل تغییر که میانگین امتیاز دیده‌شدن و کلیک‌پذیری را بیشینه می‌کند
+    
+    برای هر فیلد بازه مجاز و هزینه تغییر (ثابت و به ازای هر واحد) داده می‌شود؛ پاسخ
+    بهترین ترکیب، گزینه‌های ارزان‌تر با امتیاز کمتر و وضعیت فعلی را برمی‌گرداند.
+    """
+    try:
+        return await cached_analysis("optimize", _optimize_json, request.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@route("POST", "/api/sensitivity", response_model=SensitivityResponse)
+async def sensitivity_map(
+    input_data: LandingPageInput,
+    fields: Optional[str] = Query(None, description="فیلدهای موردنظر (جداشده با کاما)؛ پیش‌فرض: همه فیلدهای دارای آستانه")
+):
+    """
+    نقشه حساسیت: برای هر فیلد، بازه‌های بین نقاط شکست قوانین، تبدیل‌های کیفی و امتیازها
+    و تغییر امتیازها و قوانین فعال در هر بازه (فقط همان فیلد تغییر می‌کند)
+    """
+    names = None
+    if fields is not None:
+        names = sorted({name.strip() for name in fields.split(",") if name.strip()})
+        unknown = set(names) - set(LandingPageInput.model_fields)
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"فیلد ناشناخته: {', '.join(sorted(unknown))}")
+    
+    namespace = "sensitivity" if names is None else "sensitivity:" + ",".join(names)
+    return await cached_analysis(namespace, _sensitivity_json, input_data.model_dump(), names)
+
+
+@route("POST", "/api/query", response_model=QueryResponse, response_model_exclude_none=True)
+async def goal_query(
+    input_data: LandingPageInput,
+    category: Optional[str] = Query(None, description="دسته‌های هدف (جداشده با کاما): visibility, clickability"),
+    rules: Optional[str] = Query(None, description="شناسه قوانین هدف (جداشده با کاما)، مثلاً V1,C2")
+):
+    """
+    پرسش هدف‌دار (Backward Chaining): فقط قوانین، برچسب‌های کیفی و اجزای امتیاز لازم
+    برای هدف ارزیابی می‌شوند؛ نتایج همان بخش متناظر /api/analyze است
+    """
+    categories = frozenset(part.strip() for part in (category or "").split(",") if part.strip())
+    rule_ids = frozenset(part.strip() for part in (rules or "").split(",") if part.strip())
+    try:
+        get_service().snapshot.goal(categories, rule_ids)  # اعتبارسنجی هدف (و کامپایل برنامه)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    namespace = "query:" + ",".join(sorted(categories)) + ":" + ",".join(sorted(rule_ids))
+    return await cached_analysis(namespace, _query_json, input_data.model_dump(), categories, rule_ids)
+
+
+@route("POST", "/api/uncertainty", response_model=UncertaintyResponse)
+async def uncertainty_analysis(request: UncertaintyRequest):
+    """
+    تحلیل Monte Carlo ورودی‌های نویزی: برای هر فیلد توزیع (mean/stddev یا نمونه‌های تجربی)
+    داده می‌شود و پاسخ صدک‌های امتیازها، احتمال فعال شدن هر قانون و توزیع CF است
+    
+    با seed نتیجه تکرارپذیر است و کش می‌شود؛ بدون seed هر درخواست نمونه‌های تازه می‌کشد
+    (seed به‌کاررفته در پاسخ برمی‌گردد).
+    """
+    request_dict = request.model_dump()
+    if request.seed is not None:
+        return await cached_analysis("uncertainty", _uncertainty_json, request_dict)
+    
+    version, body = await run_in_pool(_uncertainty_json, get_service().version, request_dict)
+    return Response(content=body, media_type="application/json", headers={VERSION_HEADER: version})
+
+
+# ==================== NDJSON Streaming ====================
+
+STREAM_CHUNK_LINES = 64  # حداکثر خطوط هر کار pool
+STREAM_MAX_LINE_BYTES = 64 * 1024  # خطوط بلندتر رد می‌شوند تا حافظه ثابت بماند
+
+
+def _line_error(line_no: int, error: str, detail=None) -> bytes:
+    """رکورد خطای یک خط ورودی"""
+    record = {"line": line_no, "error": error}
+    if detail is not None:
+        record["detail"] = detail
+    return render_json(record)
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    پاسخ جریانی که همزمان با خواندن بدنه درخواست ارسال می‌شود
+    
+    StreamingResponse در ASGI قدیمی‌تر از 2.4 برای تشخیص قطع اتصال receive() را
+    صدا می‌زند و پیام‌های بدنه را مصرف می‌کند؛ اینجا خود خواندن بدنه قطع اتصال را
+    تشخیص می‌دهد.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _ndjson_lines(stream):
+    """
+    تقسیم جریان بایت‌های بدنه به خطوط؛ به ازای هر تکه دریافتی لیست خطوط کامل آن
+    برگردانده می‌شود (خطوط بیش‌ازحد بلند به صورت None و بدون نگهداری در حافظه)
+    """
+    buffer = b""
+    too_long = False
+    
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if lines and too_long:
+            lines[0] = None
+            too_long = False
+        lines = [None if line is not None and len(line) > STREAM_MAX_LINE_BYTES else line for line in lines]
+        if len(buffer) > STREAM_MAX_LINE_BYTES:
+            buffer = b""
+            too_long = True
+        if lines:
+            yield lines
+    
+    if too_long or len(buffer) > STREAM_MAX_LINE_BYTES:
+        yield [None]
+    elif buffer:
+        yield [buffer]
+
+
+async def _stream_analysis(request: Request, include: Optional[FrozenSet[str]], snapshot):
+    """
+    خواندن تدریجی بدنه NDJSON و تولید یک خط خروجی به ازای هر خط ورودی
+    
+    تکه بعدی بدنه فقط پس از ارسال نتایج تکه فعلی خوانده می‌شود (backpressure)؛
+    بنابراین حافظه مستقل از حجم ورودی است. کل جریان با snapshot شروع آن تحلیل
+    می‌شود (در process pool هر worker با دانش فعلی خودش).
+    """
+    line_no = 0
+    
+    try:
+        async for lines in _ndjson_lines(request.stream()):
+            for start in range(0, len(lines), STREAM_CHUNK_LINES):
+                records = []  # به ترتیب ورودی: بایت خطا یا dict ورودی معتبر
+                
+                for line in lines[start:start + STREAM_CHUNK_LINES]:
+                    line_no += 1
+                    if line is None:
+                        records.append(_line_error(line_no, "line_too_long"))
+                        continue
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(LandingPageInput.model_validate_json(line).model_dump())
+                    except ValidationError as e:
+                        records.append(_line_error(line_no, "validation", [
+                            {"loc": list(err["loc"]), "msg": err["msg"], "type": err["type"]}
+                            for err in e.errors()
+                        ]))
+                
+                inputs = [r for r in records if isinstance(r, dict)]
+                try:
+                    _, bodies, results = await run_in_pool(_analyze_many_json, snapshot.version, inputs, include) if inputs else ("", (), None)
+                    bodies = iter(bodies)
+                    if history is not None and results is not None:
+                        for input_dict, result in zip(inputs, results):
+                            history.record("stream", input_dict, result)
+                except Exception as e:
+                    error = _line_error(line_no, f"خطا در تحلیل: {str(e)}")
+                    bodies = iter([error] * len(inputs))
+                
+                if records:
+                    yield b"".join((next(bodies) if isinstance(r, dict) else r) + b"\n" for r in records)
+    except ClientDisconnect:
+        return  # کلاینت اتصال را بست؛ ادامه تحلیل بی‌فایده است
+
+
+@route("POST", "/api/analyze/stream")
+async def analyze_stream(
+    request: Request,
+    compact: bool = Query(False, description="فقط امتیازات و پیشنهادات برای هر خط"),
+    include: Optional[str] = Query(None, description="بخش‌های اختیاری پاسخ، همانند /api/analyze")
+):
+    """
+    تحلیل جریانی NDJSON برای ممیزی انبوه صفحات
+    
+    هر خط بدنه یک LandingPageInput است و برای هر خط یک خط JSON (پاسخ تحلیل
+    یا رکورد خطا با شماره خط) برگردانده می‌شود؛ خطوط خالی نادیده گرفته می‌شوند.
+    """
+    sections = frozenset() if compact else parse_include(include)
+    snapshot = get_service().snapshot
+    return DuplexStreamingResponse(
+        _stream_analysis(request, sections, snapshot), media_type="application/x-ndjson",
+        headers={VERSION_HEADER: snapshot.version}
+    )
+
+
+# ==================== Admin ====================
+
+@route("POST", "/api/admin/reload")
+async def reload_knowledge(x_admin_token: Optional[str] = Header(None)):
+    """
+    بارگذاری مجدد فایل‌های دانش (EXPERT_RULES_PATH) و جایگزینی اتمیک snapshot
+    
+    کامپایل در thread جداگانه انجام می‌شود و درخواست‌های در جریان با دانش قبلی
+    تمام می‌شوند؛ فایل نامعتبر (422) دانش فعلی را تغییر نمی‌دهد. با
+    EXPERT_ADMIN_TOKEN هدر X-Admin-Token الزامی است. در EXPERT_EXECUTOR=process
+    فرایندهای worker تغییر فایل‌ها را با بررسی دوره‌ای خودشان دریافت می‌کنند.
+    """
+    if ADMIN_TOKEN is not None and not hmac.compare_digest(
+        (x_admin_token or "").encode("utf-8"), ADMIN_TOKEN.encode("utf-8")
+    ):
+        raise HTTPException(status_code=403, detail="توکن مدیریت نامعتبر است")
+    
+    try:
+        result = await asyncio.to_thread(get_service().reload)
+    except RuleFileError as e:
+        raise HTTPException(status_code=422, detail=f"فایل دانش نامعتبر؛ دانش قبلی حفظ شد: {e}")
+    
+    return FastJSONResponse(result, headers={VERSION_HEADER: result["version"]})
+
+
+# ==================== App Factory ====================
+
+def create_app() -> FastAPI:
+    """
+    ساخت برنامه FastAPI (میان‌افزارها و endpointها)
+    
+    وارد کردن main فقط تعریف‌ها را می‌سازد؛ دانش در lifespan (یا اولین استفاده) و
+    برنامه با این تابع ساخته می‌شود: uvicorn --factory main:create_app یا main.app.
+    """
+    app = FastAPI(
+        title="سیستم خبره تحلیل UI/UX",
+        description="API برای تحلیل و بهینه‌سازی صفحات لندینگ",
+        version="1.0.0",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        default_response_class=FastJSONResponse,
+        lifespan=lifespan
+    )
+    
+    # CORS Configuration - اجازه دسترسی از React
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[
+            "http://localhost:5173",  # Vite default
+            "http://localhost:5174",  # Vite alternative
+            "http://127.0.0.1:5173",
+            "http://127.0.0.1:5174",
+            "*"  # برای development - در production حذف کنید
+        ],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["ETag", "X-KB-Version"],
+    )
+    
+    # زمان هر درخواست به تفکیک مسیر (فقط با EXPERT_METRICS=1)
+    if metrics.enabled:
+        app.add_middleware(MetricsMiddleware, metrics=metrics)
+    
+    for method, path, endpoint, options in ROUTES:
+        app.add_api_route(path, endpoint, methods=[method], **options)
+    return app
+
+
+def __getattr__(name: str):
+    """main.app و main.expert_service با اولین دسترسی ساخته می‌شوند (uvicorn main:app، ابزارها)"""
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    if name == "expert_service":
+        return get_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,201 @@
+"""
+سنجه‌های کارایی با قالب متنی Prometheus (بدون وابستگی خارجی)
+
+زمان هر مرحله تحلیل در هیستوگرام، تعداد فعال‌سازی هر قانون در شمارنده و زمان
+هر درخواست HTTP (به تفکیک مسیر) ثبت می‌شود. ابزارگذاری فقط وقتی نصب می‌شود که
+EXPERT_METRICS=1 باشد؛ در حالت غیرفعال هیچ wrapper یا middleware در مسیر
+درخواست قرار نمی‌گیرد.
+
+توجه: با EXPERT_EXECUTOR=process سنجه‌های مراحل در فرایندهای worker ثبت می‌شوند
+و در /metrics فرایند اصلی دیده نمی‌شوند (زمان درخواست‌ها همچنان ثبت می‌شود).
+"""
+
+import bisect
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# مرزهای هیستوگرام (ثانیه): از 1 میکروثانیه تا 1 ثانیه
+DEFAULT_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# حداکثر مشاهدات تجمیع‌نشده پیش از تجمیع دسته‌ای
+PENDING_LIMIT = 4096
+
+
+class Histogram:
+    """
+    هیستوگرام با مرزهای ثابت
+    
+    observe فقط مقدار را به یک deque اضافه می‌کند (اتمیک و بدون قفل)؛ تجمیع در
+    سطل‌ها به صورت دسته‌ای، هنگام پر شدن بافر یا هنگام خروجی گرفتن انجام می‌شود.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        self._pending.append(value)
+        if len(self._pending) >= PENDING_LIMIT:
+            self._fold()
+
+    def _fold(self):
+        """انتقال مقادیر بافر به سطل‌ها"""
+        with self._lock:
+            pending, counts, buckets = self._pending, self._counts, self.buckets
+            total = 0.0
+            for _ in range(len(pending)):
+                value = pending.popleft()
+                counts[bisect.bisect_left(buckets, value)] += 1
+                total += value
+            self._sum += total
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """شمارش‌های تجمعی هر مرز (به همراه +Inf) و مجموع"""
+        self._fold()
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def render_samples(name: str, kind: str, help_text: str,
+                   samples: Iterable[Tuple[Dict[str, str], float]]) -> List[str]:
+    """خطوط متنی Prometheus برای یک شمارنده یا gauge"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{_labels(labels)} {_format_value(value)}" for labels, value in samples]
+    return lines
+
+
+def render_histograms(name: str, help_text: str, label: str,
+                      histograms: Dict[str, Histogram]) -> List[str]:
+    """خطوط متنی Prometheus برای خانواده‌ای از هیستوگرام‌ها با یک برچسب"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, histogram in sorted(histograms.items()):
+        cumulative, total = histogram.snapshot()
+        bounds = [repr(b) for b in histogram.buckets] + ["+Inf"]
+        for bound, count in zip(bounds, cumulative):
+            lines.append(f"{name}_bucket{_labels({label: key, 'le': bound})} {count}")
+        lines.append(f"{name}_sum{_labels({label: key})} {total!r}")
+        lines.append(f"{name}_count{_labels({label: key})} {cumulative[-1]}")
+    return lines
+
+
+class Metrics:
+    """رجیستری سنجه‌ها: هیستوگرام مراحل، هیستوگرام درخواست‌ها و شمارنده قوانین"""
+
+    def __init__(self, enabled: bool = False, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.stages: Dict[str, Histogram] = {}
+        self.requests: Dict[str, Histogram] = {}
+        self.rule_activations = Counter()
+        self._activations = deque()
+        self._lock = threading.Lock()
+
+    def _histogram(self, family: Dict[str, Histogram], key: str) -> Histogram:
+        histogram = family.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = family.setdefault(key, Histogram(self.buckets))
+        return histogram
+
+    def stage(self, name: str) -> Histogram:
+        return self._histogram(self.stages, name)
+
+    def request(self, route: str) -> Histogram:
+        return self._histogram(self.requests, route)
+
+    def timed(self, stage: str, func: Callable) -> Callable:
+        """wrapper زمان‌سنج یک مرحله (فقط هنگام ابزارگذاری استفاده می‌شود)"""
+        observe = self.stage(stage).observe
+        clock = time.perf_counter
+
+        def wrapper(*args):
+            start = clock()
+            result = func(*args)
+            observe(clock() - start)
+            return result
+
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def count_rules(self, rules: List):
+        """ثبت قوانین فعال یک تحلیل (شیءهای Rule؛ شمارش هنگام تجمیع)"""
+        self._activations.append(rules)
+        if len(self._activations) >= PENDING_LIMIT:
+            self._fold_activations()
+
+    def _fold_activations(self):
+        with self._lock:
+            pending, counts = self._activations, self.rule_activations
+            for _ in range(len(pending)):
+                counts.update(rule.id for rule in pending.popleft())
+
+    def render(self) -> List[str]:
+        """خطوط متنی Prometheus همه سنجه‌های این رجیستری"""
+        self._fold_activations()
+        with self._lock:
+            activations = sorted(self.rule_activations.items())
+        lines = render_histograms(
+            "expert_stage_duration_seconds", "Time spent in each analysis stage.", "stage", self.stages
+        )
+        lines += render_histograms(
+            "expert_request_duration_seconds", "HTTP request latency by route.", "route", self.requests
+        )
+        lines += render_samples(
+            "expert_rule_activations_total", "counter", "Number of analyses in which each rule fired.",
+            [({"rule_id": rule_id}, count) for rule_id, count in activations]
+        )
+        return lines
+
+
+class MetricsMiddleware:
+    """middleware خام ASGI برای زمان درخواست‌ها (برچسب مسیر از الگوی route، نه URL)"""
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            key = f"{scope['method']} {getattr(route, 'path', 'unmatched')}"
+            self.metrics.request(key).observe(time.perf_counter() - start)
+
+
+# رجیستری سراسری (EXPERT_METRICS=1 برای فعال‌سازی)
+metrics = Metrics(enabled=os.environ.get("EXPERT_METRICS", "0") == "1")
@@ -0,0 +1,301 @@
+"""
+مدل‌های Pydantic ورودی/خروجی API
+
+جدا از هسته استنتاج نگه داشته می‌شوند تا هسته (inference.py) و ابزارهایی که
+اعتبارسنجی ندارند بدون Pydantic وارد شوند؛ expert_system همه این نام‌ها را در
+اولین دسترسی از اینجا برمی‌گرداند.
+"""
+
+from pydantic import BaseModel, Field, create_model, model_validator
+from typing import List, Dict, Optional
+import math
+import time
+
+from breakpoints import FLOAT_STEP
+from metrics import metrics
+
+
+# ==================== Pydantic Models ====================
+
+class LandingPageInput(BaseModel):
+    """مدل ورودی داده‌های صفحه لندینگ"""
+    cta_position_y: int = Field(default=500, description="موقعیت CTA (پیکسل از بالا)")
+    cta_width: int = Field(default=200, description="عرض CTA (پیکسل)")
+    cta_height: int = Field(default=50, description="ارتفاع CTA (پیکسل)")
+    contrast_ratio: float = Field(default=4.5, description="نسبت کنتراست رنگی")
+    whitespace_around_cta: int = Field(default=40, description="فضای خالی اطراف CTA (پیکسل)")
+    scroll_depth: int = Field(default=60, description="عمق اسکرول کاربران (%)")
+    cta_click_rate: float = Field(default=3.5, description="نرخ کلیک CTA (%)")
+    number_of_ctas: int = Field(default=1, description="تعداد CTA در صفحه")
+    cta_text_length: int = Field(default=15, description="طول متن CTA (کاراکتر)")
+    time_to_cta: int = Field(default=8, description="زمان رسیدن به CTA (ثانیه)")
+    clickable_elements_before_cta: int = Field(default=3, description="تعداد عناصر کلیک‌پذیر قبل از CTA")
+    content_word_count: int = Field(default=300, description="تعداد کلمات محتوای صفحه")
+    similar_color_elements: int = Field(default=0, description="تعداد عناصر با رنگ مشابه CTA")
+    largest_other_element_size: int = Field(default=8000, description="بزرگترین عنصر دیگر (پیکسل مربع)")
+    cta_mobile_width: int = Field(default=200, description="عرض CTA در موبایل (پیکسل)")
+    cta_mobile_height: int = Field(default=48, description="ارتفاع CTA در موبایل (پیکسل)")
+    has_loading_animation: int = Field(default=1, description="وجود انیمیشن loading (0=خیر, 1=بله)")
+
+    if metrics.enabled:
+        # فقط با سنجه‌های فعال تعریف می‌شود؛ در حالت عادی اعتبارسنجی بدون هزینه اضافه است
+        @model_validator(mode="wrap")
+        @classmethod
+        def _timed_validation(cls, data, handler):
+            start = time.perf_counter()
+            try:
+                return handler(data)
+            finally:
+                metrics.stage("validation").observe(time.perf_counter() - start)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "cta_position_y": 500,
+                "cta_width": 200,
+                "cta_height": 50,
+                "contrast_ratio": 4.5,
+                "whitespace_around_cta": 40,
+                "scroll_depth": 60,
+                "cta_click_rate": 3.5,
+                "number_of_ctas": 1,
+                "cta_text_length": 15,
+                "time_to_cta": 8,
+                "clickable_elements_before_cta": 3,
+                "content_word_count": 300,
+                "similar_color_elements": 0,
+                "largest_other_element_size": 8000,
+                "cta_mobile_width": 200,
+                "cta_mobile_height": 48,
+                "has_loading_animation": 1
+            }
+        }
+
+
+# کوچک‌ترین گام هر فیلد ورودی (نقاط شکست و جستجوی بهینه‌ساز): 1 برای صحیح، FLOAT_STEP برای اعشاری
+FIELD_STEPS = {
+    name: 1 if info.annotation is int else FLOAT_STEP for name, info in LandingPageInput.model_fields.items()
+}
+
+
+# همه فیلدها اختیاری: فقط فیلدهای تغییرکرده در نشست افزایشی ارسال می‌شوند
+LandingPageDelta = create_model(
+    "LandingPageDelta",
+    __doc__="مدل تغییرات ورودی برای نشست تحلیل افزایشی",
+    **{name: (Optional[info.annotation], None) for name, info in LandingPageInput.model_fields.items()}
+)
+
+
+class ActivatedRuleResponse(BaseModel):
+    """مدل پاسخ قانون فعال‌شده"""
+    rule_id: str
+    priority: int
+    certainty: float
+    conclusion: str
+    explanation: str
+    category: str
+
+
+class AnalysisResponse(BaseModel):
+    """مدل پاسخ تحلیل کامل (بخش‌های حذف‌شده با include در پاسخ نمی‌آیند)"""
+    visibility_score: int
+    clickability_score: int
+    overall_certainty: float
+    activated_rules: Optional[List[ActivatedRuleResponse]] = None
+    recommendations: List[str]
+    qualitative_inputs: Optional[Dict[str, str]] = None
+    detailed_explanation: Optional[str] = None
+    summary: Optional[Dict[str, str]] = None
+
+
+class BatchAnalysisRequest(BaseModel):
+    """مدل ورودی تحلیل دسته‌ای"""
+    items: List[LandingPageInput]
+
+
+class BatchAnalysisItem(BaseModel):
+    """نتیجه تحلیل یک صفحه در پاسخ دسته‌ای"""
+    visibility_score: int
+    clickability_score: int
+    overall_certainty: float
+    activated_rules: List[str]
+    recommendations: List[str]
+    qualitative_inputs: Dict[str, str]
+    summary: Dict[str, str]
+
+
+class BatchAnalysisResponse(BaseModel):
+    """مدل پاسخ تحلیل دسته‌ای"""
+    count: int
+    results: List[BatchAnalysisItem]
+
+
+class EditableField(BaseModel):
+    """فیلد قابل تغییر در بهینه‌سازی: بازه مجاز و هزینه تغییر"""
+    min: float = Field(description="کمترین مقدار مجاز")
+    max: float = Field(description="بیشترین مقدار مجاز")
+    cost: float = Field(default=1.0, ge=0, description="هزینه ثابت تغییر این فیلد")
+    unit_cost: float = Field(default=0.0, ge=0, description="هزینه هر واحد تغییر")
+    step: Optional[float] = Field(default=None, gt=0, description="کوچک‌ترین گام تغییر (پیش‌فرض: 1 برای فیلدهای صحیح، 0.01 برای اعشاری)")
+    
+    @model_validator(mode="after")
+    def _check_bounds(self):
+        if self.min > self.max:
+            raise ValueError("min نباید از max بزرگ‌تر باشد")
+        return self
+
+
+class OptimizeRequest(BaseModel):
+    """مدل ورودی بهینه‌سازی طراحی"""
+    inputs: LandingPageInput
+    fields: Dict[str, EditableField] = Field(description="فیلدهای قابل تغییر ← بازه و هزینه")
+    alternatives: int = Field(default=5, ge=0, le=20, description="تعداد گزینه‌های ارزان‌تر جایگزین")
+    
+    @model_validator(mode="after")
+    def _check_fields(self):
+        unknown = set(self.fields) - set(LandingPageInput.model_fields)
+        if unknown:
+            raise ValueError(f"فیلد ناشناخته: {', '.join(sorted(unknown))}")
+        if not self.fields:
+            raise ValueError("حداقل یک فیلد قابل تغییر لازم است")
+        return self
+
+
+class DesignCandidate(BaseModel):
+    """یک ترکیب طراحی: تغییرات نسبت به ورودی، امتیازها و هزینه"""
+    changes: Dict[str, float]
+    visibility_score: int
+    clickability_score: int
+    average_score: float
+    cost: float
+    overall_certainty: float
+    activated_rules: List[str]
+
+
+class OptimizeResponse(BaseModel):
+    """مدل پاسخ بهینه‌سازی طراحی"""
+    current: DesignCandidate
+    best: DesignCandidate
+    alternatives: List[DesignCandidate]
+    evaluated: int
+
+
+class SensitivityRange(BaseModel):
+    """بازه‌ای از یک فیلد با نتیجه ثابت (from/to برابر None یعنی بی‌کران)"""
+    from_: Optional[float] = Field(alias="from")
+    to: Optional[float]
+    current: bool
+    visibility_score: int
+    clickability_score: int
+    visibility_delta: int
+    clickability_delta: int
+    activated: List[str]
+    deactivated: List[str]
+    qualitative: Dict[str, str]
+
+
+class FieldSensitivity(BaseModel):
+    """جدول نقاط شکست یک فیلد"""
+    current: float
+    affects: List[str]
+    ranges: List[SensitivityRange]
+
+
+class SensitivityResponse(BaseModel):
+    """مدل پاسخ نقشه حساسیت"""
+    visibility_score: int
+    clickability_score: int
+    activated_rules: List[str]
+    fields: Dict[str, FieldSensitivity]
+
+
+class QueryGoal(BaseModel):
+    """هدف پرسش هدف‌دار"""
+    categories: List[str]
+    rules: List[str]
+
+
+class QueryPlan(BaseModel):
+    """آنچه برای هدف ارزیابی شد (حاصل زنجیره عقب‌رو)"""
+    rules: List[str]
+    qualitative: List[str]
+    scores: List[str]
+    fields: List[str]
+
+
+class QueryResponse(BaseModel):
+    """مدل پاسخ پرسش هدف‌دار (امتیاز فقط برای دسته‌های هدف و fired فقط برای قوانین هدف)"""
+    goal: QueryGoal
+    visibility_score: Optional[int] = None
+    clickability_score: Optional[int] = None
+    activated_rules: List[ActivatedRuleResponse]
+    fired: Optional[Dict[str, bool]] = None
+    qualitative_inputs: Dict[str, str]
+    evaluated: QueryPlan
+
+
+class FieldDistribution(BaseModel):
+    """توزیع یک فیلد نویزی: نرمال (mean/stddev با کران اختیاری) یا نمونه‌های تجربی"""
+    mean: Optional[float] = Field(default=None, description="میانگین توزیع نرمال")
+    stddev: float = Field(default=0.0, ge=0, description="انحراف معیار توزیع نرمال")
+    min: Optional[float] = Field(default=None, description="کران پایین نمونه‌ها")
+    max: Optional[float] = Field(default=None, description="کران بالای نمونه‌ها")
+    samples: Optional[List[float]] = Field(default=None, description="نمونه‌های تجربی (بازنمونه‌گیری با جایگذاری)")
+    
+    @model_validator(mode="after")
+    def _check_kind(self):
+        if (self.mean is None) == (self.samples is None):
+            raise ValueError("دقیقاً یکی از mean یا samples لازم است")
+        if self.samples is not None and not self.samples:
+            raise ValueError("samples نباید خالی باشد")
+        values = [self.mean, self.stddev, self.min, self.max, *(self.samples or ())]
+        if not all(math.isfinite(value) for value in values if value is not None):
+            raise ValueError("مقادیر توزیع باید متناهی باشند")
+        if self.min is not None and self.max is not None and self.min > self.max:
+            raise ValueError("min نباید از max بزرگ‌تر باشد")
+        return self
+
+
+class UncertaintyRequest(BaseModel):
+    """مدل ورودی تحلیل Monte Carlo"""
+    inputs: LandingPageInput = Field(default_factory=LandingPageInput, description="مقادیر فیلدهای ثابت")
+    distributions: Dict[str, FieldDistribution] = Field(description="فیلدهای نویزی ← توزیع")
+    samples: int = Field(default=100_000, ge=100, le=1_000_000, description="تعداد نمونه‌ها")
+    seed: Optional[int] = Field(default=None, ge=0, description="seed مولد تصادفی (برای نتیجه تکرارپذیر)")
+    percentiles: List[float] = Field(default=[5, 25, 50, 75, 95], max_length=20, description="صدک‌های گزارش")
+    
+    @model_validator(mode="after")
+    def _check_fields(self):
+        unknown = set(self.distributions) - set(LandingPageInput.model_fields)
+        if unknown:
+            raise ValueError(f"فیلد ناشناخته: {', '.join(sorted(unknown))}")
+        if not self.distributions:
+            raise ValueError("حداقل یک فیلد نویزی لازم است")
+        if any(not 0 <= q <= 100 for q in self.percentiles):
+            raise ValueError("صدک‌ها باید بین 0 و 100 باشند")
+        return self
+
+
+class ScoreDistribution(BaseModel):
+    """خلاصه توزیع یک مقدار روی نمونه‌ها (صدک‌ها مقادیر مشاهده‌شده‌اند)"""
+    mean: float
+    std: float
+    min: float
+    max: float
+    percentiles: Dict[str, float]
+
+
+class CertaintyDistribution(ScoreDistribution):
+    """توزیع CF ترکیبی: خلاصه و احتمال هر مقدار"""
+    distribution: List[Dict[str, float]]
+
+
+class UncertaintyResponse(BaseModel):
+    """مدل پاسخ تحلیل Monte Carlo"""
+    samples: int
+    seed: int
+    visibility_score: ScoreDistribution
+    clickability_score: ScoreDistribution
+    overall_certainty: CertaintyDistribution
+    rule_probabilities: Dict[str, float]
+    qualitative: Dict[str, Dict[str, float]]
@@ -0,0 +1,260 @@
+"""
+جستجوی فضای طراحی: کم‌هزینه‌ترین تغییر ورودی که میانگین امتیاز دیده‌شدن و
+کلیک‌پذیری را بیشینه می‌کند
+
+امتیازها و شرط‌ها نسبت به هر فیلد تکه‌ای ثابت‌اند، پس برای هر فیلد فقط نقاط شکست
+(آستانه‌های BreakpointIndex و ±step آن‌ها) به همراه مقدار فعلی و کران‌ها کاندید می‌شوند؛
+نزدیک‌ترین نقطه هر تکه به مقدار فعلی همیشه در میان کاندیدهاست.
+
+امتیاز کل جمع اجزای مستقل است. فیلدهایی که در یک جزء با هم می‌آیند (مثل عرض و
+ارتفاع CTA) یک گروه‌اند: ضرب دکارتی کاندیدهای هر گروه به صورت برداری ارزیابی و
+فقط گزینه‌های Pareto (امتیاز دیده‌شدن، امتیاز کلیک‌پذیری، هزینه) نگه داشته
+می‌شوند. گروه‌ها یکی‌یکی با جمع امتیازها ادغام می‌شوند و ترکیب‌های برتر با
+VectorizedEvaluator کامل (قوانین فعال و CF) بررسی می‌شوند؛ تعداد قوانین فعال
+(مشکلات) در امتیاز و هزینه برابر تعیین‌کننده است.
+"""
+
+import math
+from typing import Dict, List
+
+import numpy as np
+
+from breakpoints import step_points
+from conditions import compile_numpy_cascades
+
+# حداکثر ترکیب‌های کاندید یک گروه فیلد
+MAX_GROUP_CANDIDATES = 200_000
+
+# تعداد ترکیب‌های برتر که با ارزیاب کامل (قوانین) بررسی می‌شوند
+FINALISTS = 16
+
+
+def _pareto(vis: np.ndarray, click: np.ndarray, cost: np.ndarray, changes: np.ndarray,
+            distance: np.ndarray) -> np.ndarray:
+    """
+    اندیس گزینه‌هایی که هیچ گزینه دیگری در هر دو امتیاز بهتر یا برابر و ارزان‌تر یا برابر نیست
+
+    از گزینه‌های هم‌ارز، آن که فیلدهای کمتری را تغییر می‌دهد و به ورودی نزدیک‌تر است می‌ماند.
+    """
+    order = np.lexsort((distance, changes, -click, -vis, cost))
+    kept_vis, kept_click, kept = [], [], []
+    for i in order.tolist():
+        v, c = vis[i], click[i]
+        if kept and np.any((np.asarray(kept_vis) >= v) & (np.asarray(kept_click) >= c)):
+            continue
+        kept_vis.append(v)
+        kept_click.append(c)
+        kept.append(i)
+    return np.asarray(kept, dtype=np.int64)
+
+
+class DesignOptimizer:
+    """بهینه‌ساز فضای طراحی روی یک موتور استنتاج و ارزیاب برداری آن"""
+
+    def __init__(self, engine, evaluator, breakpoints):
+        self.engine = engine
+        self.evaluator = evaluator
+        self.breakpoints = breakpoints
+        self.components = {
+            "visibility": engine.visibility_components,
+            "clickability": engine.clickability_components,
+        }
+        self._points = {
+            kind: compile_numpy_cascades(components, f"{kind}_points")
+            for kind, components in self.components.items()
+        }
+
+    # ==================== Candidates ====================
+
+    def _candidates(self, name: str, current, spec: Dict, derived: Dict[str, set]) -> np.ndarray:
+        """مقادیر کاندید یک فیلد: مقدار فعلی، کران‌ها و نقاط شکست داخل بازه"""
+        step, integer = spec["step"], spec["integer"]
+        low, high = spec["min"], spec["max"]
+        if integer:
+            low, high = math.ceil(low), math.floor(high)
+
+        thresholds = self.breakpoints.thresholds.get(name, set()) | derived.get(name, set())
+        points = {low, high} | step_points(thresholds, step, integer)
+
+        values = {current}  # بدون تغییر همیشه مجاز است، حتی خارج از بازه
+        for point in points:
+            if low <= point <= high:
+                values.add(int(point) if integer else point)
+        return np.array(sorted(values))
+
+    def _groups(self, fields: List[str]) -> List[List[str]]:
+        """گروه‌بندی فیلدهای قابل تغییر بر اساس اجزای مشترک امتیاز (union-find)"""
+        parent = {name: name for name in fields}
+
+        def find(name):
+            while parent[name] != name:
+                parent[name] = parent[parent[name]]
+                name = parent[name]
+            return name
+
+        for components in self.components.values():
+            for component in components.values():
+                shared = [name for name in component.fields() if name in parent]
+                for name in shared[1:]:
+                    parent[find(name)] = find(shared[0])
+
+        groups = {}
+        for name in fields:
+            groups.setdefault(find(name), []).append(name)
+        return list(groups.values())
+
+    # ==================== Search ====================
+
+    def _group_options(self, group: List[str], inputs: Dict, candidates: Dict[str, np.ndarray],
+                       specs: Dict[str, Dict]) -> Dict[str, np.ndarray]:
+        """ارزیابی برداری همه ترکیب‌های کاندید یک گروه؛ فقط گزینه‌های Pareto"""
+        sizes = [len(candidates[name]) for name in group]
+        if math.prod(sizes) > MAX_GROUP_CANDIDATES:
+            raise ValueError(f"فضای جستجوی فیلدهای {', '.join(group)} بیش از حد بزرگ است؛ "
+                             f"بازه‌ها را محدودتر یا step را بزرگ‌تر کنید")
+
+        grids = np.meshgrid(*(candidates[name] for name in group), indexing="ij")
+        columns = {name: grid.reshape(-1) for name, grid in zip(group, grids)}
+        count = len(columns[group[0]])
+
+        points = {}
+        for kind, components in self.components.items():
+            values = self._points[kind]({**inputs, **columns})
+            touching = [key for key, component in components.items() if component.fields() & set(group)]
+            points[kind] = sum(
+                (np.broadcast_to(values[key], (count,)) for key in touching), np.zeros(count, dtype=np.int64)
+            )
+
+        cost = np.zeros(count)
+        changes = np.zeros(count, dtype=np.int64)
+        distance = np.zeros(count)  # فاصله نسبی از ورودی (کسری از بازه هر فیلد)
+        for name, column in columns.items():
+            spec = specs[name]
+            changed = column != inputs[name]
+            delta = np.abs(column.astype(float) - float(inputs[name]))
+            cost += np.where(changed, spec["cost"] + spec["unit_cost"] * delta, 0.0)
+            changes += changed
+            distance += delta / max(spec["max"] - spec["min"], spec["step"])
+
+        keep = _pareto(points["visibility"], points["clickability"], cost, changes, distance)
+        return {
+            "visibility": points["visibility"][keep],
+            "clickability": points["clickability"][keep],
+            "cost": cost[keep],
+            "changes": changes[keep],
+            "distance": distance[keep],
+            "values": np.stack([columns[name][keep] for name in group], axis=1),
+            "count": count,
+        }
+
+    def optimize(self, inputs: Dict, specs: Dict[str, Dict], alternatives: int = 5) -> Dict:
+        """
+        جستجوی بهترین ترکیب فیلدهای قابل تغییر
+
+        specs: نام فیلد ← {"min", "max", "cost", "unit_cost", "step", "integer"}؛
+        هزینه هر فیلد تغییرکرده cost + unit_cost × |تغییر| است. اولویت انتخاب:
+        بیشترین میانگین امتیاز، کمترین هزینه، کمترین قوانین فعال، کمترین فیلد
+        تغییرکرده و نزدیک‌ترین مقادیر به ورودی.
+        """
+        derived = self.breakpoints.derived(inputs)
+        fields = list(specs)
+        candidates = {name: self._candidates(name, inputs[name], specs[name], derived) for name in fields}
+        groups = self._groups(fields)
+
+        # سهم اجزای مستقل از فیلدهای قابل تغییر
+        base = {
+            kind: 100 + sum(
+                component.evaluate(inputs) for component in components.values()
+                if not component.fields() & set(fields)
+            )
+            for kind, components in self.components.items()
+        }
+
+        # ادغام گروه‌ها: جمع امتیازها و هزینه‌ها با حذف گزینه‌های مغلوب پس از هر گروه
+        frontier = {
+            "visibility": np.zeros(1, dtype=np.int64), "clickability": np.zeros(1, dtype=np.int64),
+            "cost": np.zeros(1), "changes": np.zeros(1, dtype=np.int64), "distance": np.zeros(1),
+            "choice": np.zeros((1, 0), dtype=np.int64),
+        }
+        options = []
+        evaluated = 0
+        for group in groups:
+            group_options = self._group_options(group, inputs, candidates, specs)
+            options.append(group_options)
+            evaluated += group_options["count"]
+
+            n, m = len(frontier["cost"]), len(group_options["cost"])
+            merged = {
+                key: (frontier[key][:, None] + group_options[key][None, :]).reshape(-1)
+                for key in ("visibility", "clickability", "cost", "changes", "distance")
+            }
+            merged["choice"] = np.concatenate(
+                [np.repeat(frontier["choice"], m, axis=0), np.tile(np.arange(m), n)[:, None]], axis=1
+            )
+            keep = _pareto(merged["visibility"], merged["clickability"], merged["cost"],
+                           merged["changes"], merged["distance"])
+            frontier = {key: value[keep] for key, value in merged.items()}
+
+        visibility = np.clip(base["visibility"] + frontier["visibility"], 0, 100)
+        clickability = np.clip(base["clickability"] + frontier["clickability"], 0, 100)
+        average = (visibility + clickability) / 2
+
+        # نردبان Pareto میانگین امتیاز در برابر هزینه (ارزان‌ترین راه رسیدن به هر سطح امتیاز)
+        ladder = []
+        for i in np.lexsort((frontier["distance"], frontier["changes"], -average, frontier["cost"])).tolist():
+            if not ladder or average[i] > average[ladder[-1]]:
+                ladder.append(i)
+        top = np.lexsort((frontier["distance"], frontier["changes"], frontier["cost"], -average))[:FINALISTS].tolist()
+        finalists = list(dict.fromkeys(top + ladder))
+
+        records = [dict(inputs)]
+        for i in finalists:
+            record = dict(inputs)
+            for group, group_options, choice in zip(groups, options, frontier["choice"][i]):
+                for name, value in zip(group, group_options["values"][choice].tolist()):
+                    record[name] = value
+            records.append(record)
+
+        evaluated_records = self.evaluator.evaluate(records)
+        results = [
+            self._result(records[k], inputs, specs, evaluated_records, k)
+            for k in range(len(records))
+        ]
+        current, candidates_results = results[0], dict(zip(finalists, results[1:]))
+
+        best = min(finalists, key=lambda i: (
+            -candidates_results[i]["average_score"], candidates_results[i]["cost"],
+            len(candidates_results[i]["activated_rules"]), frontier["changes"][i], frontier["distance"][i],
+        ))
+        best = candidates_results[best]
+        others = [candidates_results[i] for i in ladder if candidates_results[i] is not best
+                  and candidates_results[i]["average_score"] > current["average_score"]]
+        if len(others) > alternatives:
+            others = [others[round(j)] for j in np.linspace(0, len(others) - 1, alternatives)] if alternatives else []
+
+        return {
+            "current": current,
+            "best": best,
+            "alternatives": others,
+            "evaluated": evaluated,
+        }
+
+    @staticmethod
+    def _result(record: Dict, inputs: Dict, specs: Dict[str, Dict], evaluated: Dict, k: int) -> Dict:
+        """خلاصه یک ترکیب: تغییرات، امتیازها، هزینه و قوانین فعال"""
+        changes = {name: record[name] for name in specs if record[name] != inputs[name]}
+        pattern = evaluated["patterns"][evaluated["pattern_index"][k]]
+        visibility, clickability = evaluated["visibility_score"][k], evaluated["clickability_score"][k]
+        cost = sum(
+            specs[name]["cost"] + specs[name]["unit_cost"] * abs(value - inputs[name])
+            for name, value in changes.items()
+        )
+        return {
+            "changes": changes,
+            "visibility_score": visibility,
+            "clickability_score": clickability,
+            "average_score": (visibility + clickability) / 2,
+            "cost": round(cost, 6),
+            "overall_certainty": pattern["overall_certainty"],
+            "activated_rules": pattern["activated_rules"],
+        }
@@ -0,0 +1,360 @@
+"""
+برنامه‌ریز ارزیابی استنتاج یکپارچه: حذف گزاره‌های مشترک و ترتیب تطبیقی جمله‌ها
+
+چند قانون همان مقایسه‌های اجزای امتیاز را آزمون می‌کنند (C1 و جزء size هر دو
+cta_width < 180 و cta_height < 44؛ V2 و جزء contrast هر دو contrast_ratio < 3 ...).
+EvaluationPlanner پیش از کامپایل compile_inference:
+
+- هر مقایسه روی فیلدهای کمی که بیش از یک بار در برچسب‌ها، قوانین و اجزای امتیاز
+  آمده، یک بار در یک متغیر محلی محاسبه می‌کند (_Hoisted)؛
+- جمله‌های هر And/Or را با مدل هزینه و احتمال برقراری مرتب می‌کند تا اتصال کوتاه
+  بیشترین کار را حذف کند: And ابتدا جمله‌ای که ارزان است و به احتمال زیاد نادرست،
+  Or ابتدا جمله‌ای که ارزان است و به احتمال زیاد درست.
+
+احتمال‌ها از نمونه‌ای از درخواست‌های واقعی (هر sample_every فراخوانی kernel یکی)
+تخمین زده می‌شوند؛ پس از هر replan_every مشاهده اگر ترتیب عوض شود kernel دوباره
+کامپایل و جایگزین می‌شود و شمارنده‌ها نصف می‌شوند تا تغییر توزیع ورودی‌ها دنبال شود.
+بازبینی در thread پس‌زمینه و زیر قفل اجرا می‌شود (نه در مسیر درخواست)؛ هر kernel از یک
+Plan ثابت ساخته می‌شود و همراه آن یک‌جا منتشر می‌شود.
+ترتیب Cascade ها (اولین مورد برقرار) تغییر نمی‌کند. جابه‌جایی جمله‌ها نتیجه را عوض
+نمی‌کند: شرط‌ها عارضه جانبی ندارند و هر خطای kernel به مسیر مرحله‌ای مرجع می‌رسد.
+شمارنده‌ها بین threadها بدون قفل‌اند (تخمینی)؛ قفل فقط بازبینی و کامپایل را یکتا می‌کند.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from conditions import And, Cascade, Compare, Field, Mul, Or
+
+# EXPERT_PLANNER_SAMPLE: از هر چند فراخوانی kernel یکی مشاهده شود (0 = بدون ترتیب تطبیقی)
+SAMPLE_EVERY = int(os.environ.get("EXPERT_PLANNER_SAMPLE", "64"))
+# EXPERT_PLANNER_REPLAN: تعداد مشاهده‌ها بین دو بازبینی ترتیب
+REPLAN_EVERY = int(os.environ.get("EXPERT_PLANNER_REPLAN", "1024"))
+
+# هزینه نسبی ارزیابی (یک مقایسه فیلد با ثابت = 1؛ اندازه‌گیری‌شده روی CPython 3.11)
+COST_HOISTED = 0.5   # خواندن گزاره مشترک از متغیر محلی
+COST_STORE = 0.8     # نگه‌داری گزاره مشترک در متغیر محلی
+COST_COMPARE = 1.0
+COST_MUL = 1.0
+
+
+def _expr_key(expr) -> tuple:
+    """کلید عبارت بدون پیش‌فرض فیلدها (در kernel هر فیلد یک متغیر محلی دارد)"""
+    if isinstance(expr, Field):
+        return ("field", expr.name)
+    if isinstance(expr, Mul):
+        return ("mul", _expr_key(expr.left), _expr_key(expr.right))
+    return expr.key()
+
+
+def atom_key(compare: Compare) -> tuple:
+    return (compare.op, _expr_key(compare.left), _expr_key(compare.right))
+
+
+def _compares(node):
+    if isinstance(node, Compare):
+        yield node
+    elif isinstance(node, (And, Or)):
+        for term in node.terms:
+            yield from _compares(term)
+    elif isinstance(node, Cascade):
+        for condition, _ in node.cases:
+            yield from _compares(condition)
+
+
+def _muls(expr) -> int:
+    if isinstance(expr, Mul):
+        return 1 + _muls(expr.left) + _muls(expr.right)
+    return 0
+
+
+@dataclass(frozen=True, eq=False)
+class _Hoisted(Compare):
+    """
+    مقایسه‌ای که یک بار در ابتدای kernel در متغیر محلی local محاسبه شده است
+
+    زیرکلاس Compare است تا پیمایش‌های موجود (پیش‌فرض فیلدها، کدگذاری برچسب‌ها) آن را ببینند.
+    """
+    local: str = ""
+
+    @classmethod
+    def wrap(cls, compare: Compare, local: str) -> "_Hoisted":
+        return cls(compare.op, compare.left, compare.right, local)
+
+    def to_source(self, var: str, names: Dict[str, str], numpy: bool = False) -> str:
+        return self.local
+
+
+@dataclass(frozen=True)
+class Plan:
+    """
+    برنامه ثابت یک kernel: گزاره‌های مشترک (کلید مقایسه → متغیر محلی) و تصویر آماری
+    که ترتیب جمله‌ها از آن محاسبه می‌شود؛ order امضای برنامه برای تشخیص تغییر است
+    """
+    shared: Dict[tuple, str]
+    counts: Tuple[float, ...]
+    seen: float
+    order: Tuple = ()
+
+
+class EvaluationPlanner:
+    """برنامه ارزیابی kernel یک موتور استنتاج: گزاره‌های مشترک، آمار و ترتیب جمله‌ها"""
+
+    def __init__(self, engine, sample_every: int = SAMPLE_EVERY, replan_every: int = REPLAN_EVERY):
+        self.engine = engine
+        self.sample_every = sample_every
+        self.replan_every = replan_every
+        labels = engine.converter.labels
+        self.nodes = (
+            list(labels.values())
+            + [rule.condition for rule in engine.ordered_rules]
+            + list(engine.visibility_components.values())
+            + list(engine.clickability_components.values())
+        )
+
+        # همه مقایسه‌های یکتا (برای آمار) و تعداد تکرار هر یک
+        self.atoms: Dict[tuple, Compare] = {}
+        uses: Dict[tuple, int] = {}
+        for node in self.nodes:
+            for compare in _compares(node):
+                key = atom_key(compare)
+                self.atoms.setdefault(key, compare)
+                uses[key] = uses.get(key, 0) + 1
+        self.uses = uses
+        self._index = {key: i for i, key in enumerate(self.atoms)}
+
+        # گزاره‌های مشترک قابل محاسبه پیش از برچسب‌ها (فقط فیلدهای کمی)
+        self._hoistable = [
+            key for key, compare in self.atoms.items()
+            if uses[key] > 1 and not compare.fields() & set(labels)
+        ]
+
+        self.observations = 0
+        self.true_counts = [0.0] * len(self.atoms)
+        self.seen = 0.0  # وزن مشاهده‌ها (همه مقایسه‌ها در هر مشاهده ارزیابی می‌شوند)
+        self.replans = 0
+        self.recompiles = 0
+        self._tick = [sample_every]
+        # برنامه و kernel منتشرشده با هم (یک انتساب)؛ قفل بازبینی و کامپایل را یکتا می‌کند
+        self._published: Tuple[Plan, Optional[Callable]] = (Plan({}, tuple(self.true_counts), 0.0), None)
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> Plan:
+        return self._published[0]
+
+    @property
+    def kernel(self) -> Optional[Callable]:
+        return self._published[1]
+
+    @property
+    def shared(self) -> Dict[tuple, str]:
+        return self._published[0].shared
+
+    # ==================== Cost Model ====================
+
+    def probability(self, node, plan: Plan) -> float:
+        """احتمال برقراری تخمینی با آمار plan (جمله‌ها مستقل فرض می‌شوند؛ بدون مشاهده 0.5)"""
+        if isinstance(node, Compare):
+            i = self._index.get(atom_key(node))
+            if i is None or not plan.seen:
+                return 0.5
+            return plan.counts[i] / plan.seen
+        if isinstance(node, And):
+            p = 1.0
+            for term in node.terms:
+                p *= self.probability(term, plan)
+            return p
+        if isinstance(node, Or):
+            q = 1.0
+            for term in node.terms:
+                q *= 1.0 - self.probability(term, plan)
+            return 1.0 - q
+        return 0.5
+
+    def cost(self, node, plan: Plan) -> float:
+        """هزینه مورد انتظار ارزیابی با اتصال کوتاه"""
+        if isinstance(node, _Hoisted):
+            return COST_HOISTED
+        if isinstance(node, Compare):
+            return COST_COMPARE + COST_MUL * (_muls(node.left) + _muls(node.right))
+        if isinstance(node, (And, Or)):
+            total, reach = 0.0, 1.0
+            for term in node.terms:
+                total += reach * self.cost(term, plan)
+                p = self.probability(term, plan)
+                reach *= p if isinstance(node, And) else 1.0 - p
+            return total
+        return COST_COMPARE
+
+    # ==================== Rewriting ====================
+
+    def rewrite(self, node, plan: Plan):
+        """شرط یا Cascade معادل با گزاره‌های مشترک محلی و جمله‌های مرتب‌شده plan"""
+        if isinstance(node, Cascade):
+            return Cascade(tuple((self.rewrite(c, plan), value) for c, value in node.cases), node.default)
+        if isinstance(node, Compare):
+            local = plan.shared.get(atom_key(node))
+            return _Hoisted.wrap(node, local) if local is not None else node
+        if isinstance(node, (And, Or)):
+            terms = [self.rewrite(term, plan) for term in node.terms]
+            if isinstance(node, And):
+                # ترتیب بهینه And: صعودی cost / P(نادرست)
+                rank = [self.cost(t, plan) / max(1.0 - self.probability(t, plan), 1e-6) for t in terms]
+            else:
+                rank = [self.cost(t, plan) / max(self.probability(t, plan), 1e-6) for t in terms]
+            order = sorted(range(len(terms)), key=lambda i: (round(rank[i], 6), i))
+            return type(node)(tuple(terms[i] for i in order))
+        return node
+
+    def preamble(self, names: Dict[str, str], plan: Plan) -> List[str]:
+        """دستورهای محاسبه گزاره‌های مشترک plan (پس از بارگذاری فیلدها)"""
+        return [f"    {local} = {self.atoms[key].to_source('d', names)}" for key, local in plan.shared.items()]
+
+    def sampler(self, names: Dict[str, str], encode, plan: Plan) -> List[str]:
+        """
+        دستورهای نمونه‌برداری پس از محاسبه برچسب‌ها: هر sample_every فراخوانی، درستی همه
+        مقایسه‌ها از متغیرهای محلی kernel به observe داده می‌شود (encode: کدگذاری برچسب‌ها)
+        """
+        if self.sample_every <= 0:
+            return []
+        truths = "".join(
+            f"{self.rewrite(atom, plan).to_source('d', names) if key in plan.shared else encode(atom).to_source('d', names)}, "
+            for key, atom in self.atoms.items()
+        )
+        return [
+            "    _tick[0] -= 1",
+            # دو thread ممکن است هر دو کم کنند و شمارنده از صفر بگذرد؛ observe آن را بازنشانی می‌کند
+            "    if _tick[0] <= 0:",
+            f"        _observe(({truths}))",
+        ]
+
+    # ==================== Adaptation ====================
+
+    def _reach(self, node, reach: float, totals: Dict[tuple, float], plan: Plan):
+        """تعداد مورد انتظار ارزیابی هر مقایسه با اتصال کوتاه (افزوده به totals)"""
+        if isinstance(node, Compare):
+            key = atom_key(node)
+            totals[key] = totals.get(key, 0.0) + reach
+        elif isinstance(node, (And, Or)):
+            for term in node.terms:
+                self._reach(term, reach, totals, plan)
+                p = self.probability(term, plan)
+                reach *= p if isinstance(node, And) else 1.0 - p
+        elif isinstance(node, Cascade):
+            for condition, _ in node.cases:
+                self._reach(condition, reach, totals, plan)
+                reach *= 1.0 - self.probability(condition, plan)
+
+    def _plan(self) -> Plan:
+        """
+        برنامه تازه با تصویر آمار فعلی: گزاره‌های مشترک و امضای ترتیب
+
+        محاسبه از پیش فقط وقتی می‌ارزد که مقایسه در ترتیب فعلی به طور متوسط بیش از
+        (هزینه محاسبه و نگه‌داری) / (صرفه هر استفاده) بار ارزیابی شود؛ مقایسه ساده باید
+        حدود چهار بار و مقایسه با ضرب کمتر تکرار شود. مقایسه‌ای که بیشتر پشت اتصال کوتاه
+        می‌ماند درجا ارزیابی می‌شود.
+        """
+        draft = Plan({}, tuple(self.true_counts), self.seen)
+        totals: Dict[tuple, float] = {}
+        for node in self.nodes:
+            self._reach(self.rewrite(node, draft), 1.0, totals, draft)
+        hoisted = []
+        for key in self._hoistable:
+            cost = self.cost(self.atoms[key], draft)
+            if totals.get(key, 0.0) * (cost - COST_HOISTED) > cost + COST_STORE:
+                hoisted.append(key)
+        shared = {key: f"_h{i}" for i, key in enumerate(hoisted)}
+        plan = Plan(shared, draft.counts, draft.seen)
+        order = (tuple(shared), tuple(self.rewrite(node, plan).key() for node in self.nodes))
+        return Plan(shared, draft.counts, draft.seen, order)
+
+    def _build(self, plan: Plan):
+        from facts import compile_inference
+
+        kernel = compile_inference(self.engine, self.engine.ordered_rules, planner=self, plan=plan)
+        self._published = (plan, kernel)
+        self.recompiles += 1
+        return kernel
+
+    def compile(self):
+        """kernel با برنامه تازه (compile_inference)"""
+        with self._lock:
+            return self._build(self._plan())
+
+    def observe(self, truths: Tuple[bool, ...]):
+        """ثبت درستی همه مقایسه‌ها (به ترتیب atoms) برای یک ورودی نمونه"""
+        self._tick[0] = self.sample_every
+        true_counts = self.true_counts
+        for i, truth in enumerate(truths):
+            if truth:
+                true_counts[i] += 1
+        self.seen += 1
+        self.observations += 1
+        # بازبینی در پس‌زمینه؛ اگر بازبینی دیگری در جریان است این نوبت حذف می‌شود
+        if self.observations % self.replan_every == 0 and self._lock.acquire(blocking=False):
+            threading.Thread(target=self._replan_released, name="planner-replan", daemon=True).start()
+
+    def _replan_released(self):
+        try:
+            self._replan()
+        finally:
+            self._lock.release()
+
+    def replan(self) -> bool:
+        """بازبینی ترتیب با آمار فعلی؛ در صورت تغییر kernel موتور جایگزین می‌شود"""
+        with self._lock:
+            return self._replan()
+
+    def _replan(self) -> bool:
+        self.replans += 1
+        plan = self._plan()
+        changed = plan.order != self.current.order
+        previous = self.kernel
+        if changed and self.engine._kernel is previous:
+            kernel = self._build(plan)
+            # فقط kernel خود برنامه‌ریز جایگزین می‌شود (نه وقتی ابزارگذاری آن را کنار گذاشته)
+            if self.engine._kernel is previous:
+                self.engine._kernel = kernel
+        # کاهش وزن آمار قدیمی تا تغییر توزیع ورودی‌ها دنبال شود
+        self.true_counts = [count / 2 for count in self.true_counts]
+        self.seen /= 2
+        return changed
+
+    # ==================== Inspection ====================
+
+    def plan(self) -> Dict:
+        """برنامه فعلی و آمار: گزاره‌های مشترک، احتمال هر مقایسه و ترتیب جمله‌های هر قانون"""
+        fields = set().union(*(node.fields() for node in self.nodes))
+        readable = {name: name for name in fields}
+
+        def text(node) -> str:
+            if isinstance(node, Compare):
+                return Compare.to_source(node, "d", readable)[1:-1]
+            joiner = " and " if isinstance(node, And) else " or "
+            return "(" + joiner.join(text(term) for term in node.terms) + ")"
+
+        current, kernel = self._published
+        atoms = []
+        for key, compare in self.atoms.items():
+            atoms.append({
+                "predicate": text(compare),
+                "uses": self.uses[key],
+                "shared": key in current.shared,
+                "p_true": round(self.true_counts[self._index[key]] / self.seen, 4) if self.seen else None,
+            })
+        return {
+            "sample_every": self.sample_every,
+            "replan_every": self.replan_every,
+            "observations": self.observations,
+            "replans": self.replans,
+            "recompiles": self.recompiles,
+            "active": kernel is not None and self.engine._kernel is kernel,
+            "shared_predicates": len(current.shared),
+            "rules": {
+                rule.id: text(self.rewrite(rule.condition, current)) for rule in self.engine.ordered_rules
+            },
+            "predicates": atoms,
+        }
@@ -0,0 +1,237 @@
+"""
+فایل‌های خارجی دانش (YAML/JSON): قوانین و آستانه‌های تبدیل کیفی
+
+مسیر می‌تواند یک فایل یا پوشه‌ای از فایل‌های .yaml/.yml/.json باشد (به ترتیب نام
+ادغام می‌شوند). هر فایل نگاشتی با کلیدهای اختیاری زیر است:
+
+    labels:                 # جایگزین برچسب‌های کیفی هم‌نام دانش پیش‌فرض
+      content_length:
+        cases:
+          - when: {field: content_word_count, default: 300, op: "<", value: 200}
+            then: کوتاه
+        default: طولانی
+    rules:                  # اگر در هیچ فایلی نباشد، قوانین پیش‌فرض
+      - id: V1
+        priority: 10
+        certainty: 0.95
+        condition: {all: [{field: cta_position_y, op: ">", value: 800}, {field: scroll_depth, op: "<", value: 50}]}
+        conclusion: ...
+        explanation: ...
+        category: visibility
+
+قالب شرط‌ها همان Rule.to_dict و Cascade.to_dict است؛ برای شروع، دانش پیش‌فرض را
+صادر و پیش از استقرار فایل‌ها را بررسی کنید:
+
+    python rule_files.py export rules.yaml
+    python rule_files.py check rules.yaml
+
+YAML به PyYAML نیاز دارد (pip install pyyaml)؛ JSON بدون وابستگی خارجی.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+SUFFIXES = (".yaml", ".yml", ".json")
+SECTIONS = ("labels", "rules")
+
+# فاصله بررسی دوباره امضای فایل‌ها پیش از بارگذاری (نوشتن نیمه‌تمام ویرایشگرها)
+SETTLE_SECONDS = 0.2
+
+logger = logging.getLogger(__name__)
+
+
+class RuleFileError(ValueError):
+    """فایل دانش نامعتبر یا ناموجود (دانش فعلی بدون تغییر می‌ماند)"""
+
+
+def _require_yaml():
+    """وارد کردن تنبل PyYAML (وابستگی اختیاری فقط برای فایل‌های YAML)"""
+    try:
+        import yaml
+    except ImportError:
+        raise RuleFileError("برای فایل‌های YAML نصب PyYAML لازم است: pip install pyyaml")
+    return yaml
+
+
+# ==================== Reading ====================
+
+def source_files(path) -> List[Path]:
+    """فایل‌های دانش یک مسیر (خود فایل یا فایل‌های پوشه به ترتیب نام)"""
+    path = Path(path)
+    if path.is_dir():
+        files = sorted(p for p in path.iterdir() if p.is_file() and p.suffix.lower() in SUFFIXES)
+        if not files:
+            raise RuleFileError(f"هیچ فایل دانشی ({', '.join(SUFFIXES)}) در پوشه نیست: {path}")
+        return files
+    if not path.is_file():
+        raise RuleFileError(f"فایل دانش یافت نشد: {path}")
+    return [path]
+
+
+def read_file(path: Path) -> Dict:
+    """خواندن و بررسی ساختار کلی یک فایل دانش"""
+    try:
+        text = path.read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError) as e:
+        raise RuleFileError(f"{path.name}: {e}") from e
+
+    if path.suffix.lower() == ".json":
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise RuleFileError(f"{path.name}: {e}") from e
+    else:
+        yaml = _require_yaml()
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise RuleFileError(f"{path.name}: {e}") from e
+
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        raise RuleFileError(f"{path.name}: ریشه فایل باید نگاشت باشد")
+    unknown = set(data) - set(SECTIONS)
+    if unknown:
+        raise RuleFileError(f"{path.name}: کلید ناشناخته {', '.join(sorted(map(str, unknown)))} "
+                            f"(مجاز: {', '.join(SECTIONS)})")
+    if not isinstance(data.get("labels", {}), dict):
+        raise RuleFileError(f"{path.name}: labels باید نگاشت نام ← تبدیل باشد")
+    rules = data.get("rules", [])
+    if not isinstance(rules, list) or not all(isinstance(rule, dict) for rule in rules):
+        raise RuleFileError(f"{path.name}: rules باید لیستی از نگاشت‌ها باشد")
+    return data
+
+
+def load_knowledge(path) -> Dict:
+    """
+    خواندن و ادغام فایل‌های دانش یک مسیر
+
+    خروجی {"rules": لیست dict ها یا None, "labels": نام ← dict}؛ rules=None یعنی
+    هیچ فایلی قانون تعریف نکرده است. شناسه قانون یا نام برچسب تکراری خطاست.
+    """
+    rules, labels = None, {}
+    origins = {}  # شناسه قانون / نام برچسب ← نام فایل
+
+    for file in source_files(path):
+        data = read_file(file)
+        for name in data.get("labels", {}):
+            if ("label", name) in origins:
+                raise RuleFileError(f"{file.name}: برچسب {name} قبلاً در {origins['label', name]} تعریف شده است")
+            origins["label", name] = file.name
+        labels.update(data.get("labels", {}))
+
+        if "rules" in data:
+            for rule in data["rules"]:
+                rule_id = rule.get("id")
+                if ("rule", rule_id) in origins:
+                    raise RuleFileError(f"{file.name}: قانون {rule_id} قبلاً در {origins['rule', rule_id]} تعریف شده است")
+                origins["rule", rule_id] = file.name
+            rules = (rules or []) + data["rules"]
+
+    return {"rules": rules, "labels": labels}
+
+
+def dump(document: Dict, path) -> None:
+    """نوشتن سند دانش در فایل YAML یا JSON (بر اساس پسوند)"""
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        text = json.dumps(document, ensure_ascii=False, indent=2) + "\n"
+    else:
+        text = _require_yaml().safe_dump(document, allow_unicode=True, sort_keys=False, width=120)
+    path.write_text(text, encoding="utf-8")
+
+
+def signature(path) -> Tuple:
+    """امضای تغییر فایل‌ها (نام، mtime، اندازه)؛ مسیر ناموجود امضای خالی دارد"""
+    try:
+        return tuple((file.name, stat.st_mtime_ns, stat.st_size)
+                     for file in source_files(path) for stat in (file.stat(),))
+    except (OSError, RuleFileError):
+        return ()
+
+
+# ==================== Watcher ====================
+
+class RulesWatcher:
+    """
+    بررسی دوره‌ای فایل‌های دانش و فراخوانی callback پس از هر تغییر پایدار
+
+    با مقایسه mtime/اندازه کار می‌کند (بدون وابستگی inotify) و callback در thread
+    خود watcher اجرا می‌شود؛ خطای callback فقط ثبت می‌شود.
+    """
+
+    def __init__(self, path, callback: Callable[[], object], interval: float = 2.0):
+        self.path = path
+        self.callback = callback
+        self.interval = interval
+        self._signature = signature(path)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "RulesWatcher":
+        self._thread = threading.Thread(target=self._run, name="rules-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def is_alive(self) -> bool:
+        # پس از fork فقط thread اصلی در فرایند فرزند زنده است
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            current = signature(self.path)
+            if current == self._signature:
+                continue
+            # نوشتن فایل ممکن است هنوز تمام نشده باشد: فقط امضای پایدار بارگذاری می‌شود
+            if self._stop.wait(SETTLE_SECONDS):
+                break
+            if signature(self.path) != current:
+                continue
+
+            self._signature = current
+            try:
+                self.callback()
+            except RuleFileError as e:
+                logger.error("فایل‌های دانش %s نامعتبر است؛ دانش قبلی حفظ شد: %s", self.path, e)
+            except Exception:
+                logger.exception("بارگذاری مجدد فایل‌های دانش %s ناموفق بود؛ دانش قبلی حفظ شد", self.path)
+
+
+# ==================== CLI ====================
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="صدور دانش پیش‌فرض داخلی به فایل YAML/JSON")
+    export.add_argument("output")
+    check = commands.add_parser("check", help="اعتبارسنجی و کامپایل فایل‌های دانش و چاپ نسخه")
+    check.add_argument("path")
+    args = parser.parse_args(argv)
+
+    from expert_system import KnowledgeSnapshot
+
+    try:
+        if args.command == "export":
+            dump(KnowledgeSnapshot.load().to_document(), args.output)
+            print(f"نوشته شد: {args.output}", file=sys.stderr)
+        else:
+            snapshot = KnowledgeSnapshot.load(args.path)
+            print(json.dumps(snapshot.info(), ensure_ascii=False))
+    except RuleFileError as e:
+        raise SystemExit(f"خطا: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+شاخص قوانین: فقط قوانینی ارزیابی می‌شوند که شرطشان برای داده فعلی امکان برقراری دارد
+
+برای هر قانون اعلانی یک «لنگر» انتخاب می‌شود: بخشی از جملات عطفی شرط که برقراری
+آن لازمه برقراری کل شرط است.
+
+- بازه عددی یک فیلد (مثل cta_position_y > 800 یا 500 < x <= 600): آرایه‌های مرتب
+  آستانه‌ها، جدول قطعات مقدماتی یا درخت بازه‌ای مرکزی همان فیلد؛
+- برابری با برچسب‌های کیفی (مثل visual_hierarchy == "ضعیف"): جدول hash.
+
+شاخص محافظه‌کارانه است: بازه‌ها بسته در نظر گرفته می‌شوند و هر جا مقدار فیلد
+قابل جستجو نباشد (نوع نامعتبر، NaN، مقدار unhashable) همه قوانین آن گروه نامزد
+می‌شوند. نامزدها با تابع کامل شرطشان و به ترتیب ورودی ارزیابی می‌شوند، بنابراین
+خروجی دقیقاً همانند compile_rules است.
+"""
+
+import bisect
+import math
+import numbers
+from typing import Callable, Dict, List, Optional, Tuple
+
+from conditions import MISSING, And, Compare, Condition, Const, Field, compile_condition
+
+# حد پایین تخمین پوشش هر لنگر (برای جلوگیری از تخمین صفر)
+MIN_COVERAGE = 1e-3
+
+# حداکثر میانگین قطعات جدول به ازای هر بازه بسته (بیشتر از آن: درخت بازه‌ای)
+SEGMENT_BUDGET = 32
+
+_FLIPPED = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "==", "!=": "!="}
+
+
+# ==================== Interval Tree ====================
+
+class IntervalTree:
+    """
+    درخت بازه‌ای مرکزی ایستا روی بازه‌های بسته [lo, hi] با lo <= hi (انتهای نامتناهی مجاز)
+
+    مرکز هر گره یکی از انتهای بازه‌هاست، پس دست‌کم یک بازه در همان گره می‌ماند.
+    """
+
+    __slots__ = ("center", "los", "by_lo", "his", "by_hi", "left", "right")
+
+    def __init__(self, intervals: List[Tuple[float, float, int]]):
+        points = sorted(p for lo, hi, _ in intervals for p in (lo, hi) if math.isfinite(p))
+        self.center = points[len(points) // 2] if points else 0.0
+
+        here, left, right = [], [], []
+        for interval in intervals:
+            lo, hi, _ = interval
+            if hi < self.center:
+                left.append(interval)
+            elif lo > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+
+        by_lo = sorted(here, key=lambda i: i[0])
+        by_hi = sorted(here, key=lambda i: i[1])
+        self.los = [i[0] for i in by_lo]
+        self.by_lo = [i[2] for i in by_lo]
+        self.his = [i[1] for i in by_hi]
+        self.by_hi = [i[2] for i in by_hi]
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def stab(self, value: float, out: List[int]):
+        """افزودن شناسه همه بازه‌های شامل value به out"""
+        node = self
+        while node is not None:
+            if value < node.center:
+                out.extend(node.by_lo[:bisect.bisect_right(node.los, value)])
+                node = node.left
+            elif value > node.center:
+                out.extend(node.by_hi[bisect.bisect_left(node.his, value):])
+                node = node.right
+            else:
+                out.extend(node.by_lo)
+                return
+
+
+# ==================== Anchors ====================
+
+def _bounds(term: Condition) -> Optional[Tuple[str, Field, object]]:
+    """تبدیل یک مقایسه فیلد/ثابت به (عملگر، فیلد، مقدار) یا None"""
+    if not isinstance(term, Compare):
+        return None
+    op, left, right = term.op, term.left, term.right
+    if isinstance(left, Const) and isinstance(right, Field):
+        op, left, right = _FLIPPED[op], right, left
+    if not (isinstance(left, Field) and isinstance(right, Const)):
+        return None
+    return op, left, right.value
+
+
+def _is_number(value) -> bool:
+    """عدد حقیقی قابل مقایسه (نه bool و نه NaN)"""
+    kind = type(value)
+    if kind is int or kind is float:
+        return value == value
+    return isinstance(value, numbers.Real) and not isinstance(value, bool) and value == value
+
+
+def decompose(condition) -> Optional[Tuple[Dict, Dict]]:
+    """
+    تجزیه جملات عطفی شرط به برابری‌ها و بازه‌های عددی هر فیلد
+
+    خروجی (equals, ranges): equals از کلید فیلد به مقدار و ranges از کلید فیلد به
+    [lo, hi] بسته؛ کلید فیلد (نام، پیش‌فرض) است. شرط غیر اعلانی None برمی‌گرداند.
+    """
+    if not isinstance(condition, Condition):
+        return None
+    terms = condition.terms if isinstance(condition, And) else (condition,)
+
+    equals: Dict[Tuple[str, object], object] = {}
+    ranges: Dict[Tuple[str, object], List[float]] = {}
+    for term in terms:
+        bounds = _bounds(term)
+        if bounds is None:
+            continue
+        op, field, value = bounds
+        key = (field.name, field.default)
+        if op == "==":
+            try:
+                hash(value)
+            except TypeError:
+                continue
+            equals.setdefault(key, value)
+            continue
+        if op == "!=" or not _is_number(value):
+            continue
+        bound = ranges.setdefault(key, [-math.inf, math.inf])
+        if op in (">", ">="):
+            bound[0] = max(bound[0], value)
+        else:
+            bound[1] = min(bound[1], value)
+
+    return equals, ranges
+
+
+# ==================== Rule Index ====================
+
+class FieldIndex:
+    """
+    نامزدهای بازه‌ای یک فیلد عددی
+
+    - کران فقط پایین [lo, ∞): آرایه مرتب lo ها (پیشوند با یک bisect)
+    - کران فقط بالا (-∞, hi]: آرایه مرتب hi ها (پسوند با یک bisect)
+    - بازه بسته [lo, hi]: جدول قطعات مقدماتی (یک bisect و یک tuple آماده)؛ اگر
+      بازه‌ها آن‌قدر هم‌پوشانی داشته باشند که جدول از بودجه بزرگ‌تر شود، درخت بازه‌ای
+    """
+
+    __slots__ = ("los", "lower", "his", "upper", "points", "regions", "tree", "members")
+
+    def __init__(self, intervals: List[Tuple[float, float, int]]):
+        self.members = [i for _, _, i in intervals]
+
+        lower = sorted((lo, i) for lo, hi, i in intervals if hi == math.inf)
+        upper = sorted((hi, i) for lo, hi, i in intervals if lo == -math.inf)
+        bounded = [(lo, hi, i) for lo, hi, i in intervals if math.isfinite(lo) and math.isfinite(hi)]
+        self.los, self.lower = [lo for lo, _ in lower], [i for _, i in lower]
+        self.his, self.upper = [hi for hi, _ in upper], [i for _, i in upper]
+
+        self.points, self.regions, self.tree = [], [], None
+        if bounded:
+            points = sorted({p for lo, hi, _ in bounded for p in (lo, hi)})
+            position = {p: j for j, p in enumerate(points)}
+            # ناحیه 2j فاصله پیش از points[j] و ناحیه 2j+1 خود نقطه points[j] است
+            spans = [(2 * position[lo] + 1, 2 * position[hi] + 1, i) for lo, hi, i in bounded]
+            if sum(last - first + 1 for first, last, _ in spans) <= SEGMENT_BUDGET * len(bounded):
+                regions = [[] for _ in range(2 * len(points) + 1)]
+                for first, last, i in sorted(spans, key=lambda span: span[2]):
+                    for region in range(first, last + 1):
+                        regions[region].append(i)
+                self.points, self.regions = points, [tuple(r) for r in regions]
+            else:
+                self.tree = IntervalTree(bounded)
+
+    def stab(self, value: float, out: List[int]):
+        """افزودن شناسه قوانینی که بازه‌شان value را شامل می‌شود"""
+        if self.lower:
+            out.extend(self.lower[:bisect.bisect_right(self.los, value)])
+        if self.upper:
+            out.extend(self.upper[bisect.bisect_left(self.his, value):])
+        if self.regions:
+            j = bisect.bisect_left(self.points, value)
+            region = 2 * j + 1 if j < len(self.points) and self.points[j] == value else 2 * j
+            out.extend(self.regions[region])
+        elif self.tree is not None:
+            self.tree.stab(value, out)
+
+
+class RuleIndex:
+    """
+    شاخص نامزدهای قوانین یک پایگاه دانش
+
+    هر قانون اعلانی با گزینشی‌ترین «لنگر» خود ثبت می‌شود:
+    - باریک‌ترین بازه عددی یک فیلد (FieldIndex همان فیلد)، یا
+    - ترکیب همه برابری‌هایش (جدول hash روی امضای فیلدها و مقادیرشان).
+    پوشش بازه با فرض توزیع یکنواخت روی دامنه آستانه‌های همان فیلد و پوشش
+    برابری با تعداد مقادیر متمایز هر فیلد در کل پایگاه دانش تخمین زده می‌شود.
+
+    هزینه هر درخواست O(فیلدها + امضاها + log n + نامزدها) است، نه O(n)؛
+    evaluate(d) همان خروجی compile_rules(rules)(d) را برمی‌گرداند.
+    """
+
+    def __init__(self, rules: List, functions: Optional[List[Callable]] = None):
+        self.rules = rules
+        self.functions = functions if functions is not None else [
+            compile_condition(r.condition) if isinstance(r.condition, Condition) else r.condition
+            for r in rules
+        ]
+
+        parts = [decompose(r.condition) for r in rules]
+        spans, distinct = self._statistics(parts)
+
+        self.always: List[int] = []
+        ranges: Dict[Tuple[str, object], List[Tuple[float, float, int]]] = {}
+        # امضا (کلیدهای فیلدهای برابری) ← (مقادیر ← قوانین، همه اعضا)
+        self.signatures: Dict[Tuple, Tuple[Dict[Tuple, List[int]], List[int]]] = {}
+        coverage_total = 0.0
+
+        for i, part in enumerate(parts):
+            if part is None:
+                self.always.append(i)
+                coverage_total += 1.0
+                continue
+            equals, bounds = part
+            if any(lo > hi for lo, hi in bounds.values()):
+                continue  # کران‌های متناقض: قانون هرگز برقرار نیست
+
+            best_range, range_coverage = None, 1.0
+            for key, bound in bounds.items():
+                coverage = self._coverage(bound, spans.get(key))
+                if coverage < range_coverage:
+                    best_range, range_coverage = key, coverage
+            equals_coverage = math.prod(1.0 / max(2, distinct[key]) for key in equals) if equals else 1.0
+
+            if best_range is None and not equals:
+                self.always.append(i)
+                coverage_total += 1.0
+            elif best_range is not None and range_coverage <= equals_coverage:
+                ranges.setdefault(best_range, []).append((*bounds[best_range], i))
+                coverage_total += range_coverage
+            else:
+                signature = tuple(sorted(equals, key=repr))
+                groups, members = self.signatures.setdefault(signature, ({}, []))
+                groups.setdefault(tuple(equals[k] for k in signature), []).append(i)
+                members.append(i)
+                coverage_total += equals_coverage
+
+        self.fields = {key: FieldIndex(intervals) for key, intervals in ranges.items()}
+        # کسر تخمینی قوانینی که برای یک درخواست نامزد می‌شوند
+        self.expected_fraction = coverage_total / len(rules) if rules else 0.0
+
+    @staticmethod
+    def _statistics(parts):
+        """دامنه آستانه‌های متناهی و تعداد مقادیر برابری متمایز هر فیلد"""
+        points: Dict[Tuple, List[float]] = {}
+        values: Dict[Tuple, set] = {}
+        for part in parts:
+            if part is None:
+                continue
+            equals, bounds = part
+            for key, bound in bounds.items():
+                points.setdefault(key, []).extend(p for p in bound if math.isfinite(p))
+            for key, value in equals.items():
+                values.setdefault(key, set()).add(value)
+        spans = {key: (min(p), max(p)) for key, p in points.items() if p}
+        return spans, {key: len(v) for key, v in values.items()}
+
+    @staticmethod
+    def _coverage(bounds: List[float], span: Optional[Tuple[float, float]]) -> float:
+        """کسر تخمینی داده‌هایی که بازه را برقرار می‌کنند (توزیع یکنواخت روی span)"""
+        lo, hi = bounds
+        if span is None or span[1] <= span[0]:
+            return 0.5
+        overlap = min(hi, span[1]) - max(lo, span[0])
+        return max(MIN_COVERAGE, min(1.0, overlap / (span[1] - span[0])))
+
+    def candidates(self, d: Dict) -> List[int]:
+        """شناسه قوانین نامزد (مرتب به ترتیب ورودی)"""
+        out = list(self.always)
+
+        for (name, default), index in self.fields.items():
+            value = d.get(name, default)
+            if value is MISSING:
+                continue  # ارزیابی این قوانین خطا می‌دهد، یعنی برقرار نیستند
+            if _is_number(value):
+                index.stab(value, out)
+            else:
+                out.extend(index.members)
+
+        for keys, (groups, members) in self.signatures.items():
+            values = tuple(d.get(name, default) for name, default in keys)
+            if any(value is MISSING for value in values):
+                continue
+            try:
+                out.extend(groups.get(values, ()))
+            except TypeError:
+                out.extend(members)
+
+        out.sort()
+        return out
+
+    def evaluate(self, d: Dict) -> List:
+        """قوانین فعال به ترتیب ورودی (معادل compile_rules)"""
+        rules, functions = self.rules, self.functions
+        active = []
+        for i in self.candidates(d):
+            try:
+                if functions[i](d):
+                    active.append(rules[i])
+            except Exception:
+                continue
+        return active
@@ -0,0 +1,195 @@
+"""
+اجرای production با چند فرایند worker (prefork)
+
+پایگاه دانش یک بار در فرایند والد ساخته و کامپایل می‌شود (قوانین، ارزیاب برداری،
+شاخص نقاط شکست و با یک تحلیل گرم‌کننده، الگوهای فعال‌سازی و قطعات JSON)، سپس
+workerها با fork ساخته می‌شوند و همه روی یک سوکت مشترک گوش می‌دهند. صفحات حافظه
+دانش بین workerها به صورت copy-on-write مشترک می‌مانند (gc.freeze مانع کپی شدن
+آن‌ها با جمع‌آوری زباله می‌شود) و راه‌اندازی هر worker فوری است؛ uvicorn --workers
+برعکس هر worker را با spawn از نو اجرا می‌کند و دانش را N بار کامپایل می‌کند.
+
+با بیش از یک worker، کش نتایج به صورت پیش‌فرض یک فایل SQLite روی /dev/shm است
+(SharedResultCache) تا پاسخ کش‌شده یک worker برای بقیه هم hit باشد.
+
+    cd BackEnd
+    python serve.py --workers 4 --host 0.0.0.0 --port 8000
+    python serve.py --workers 8 --rules rules.yaml --cache-path /var/tmp/expert-cache.sqlite
+
+worker ازکارافتاده دوباره fork می‌شود و SIGTERM/SIGINT همه را به آرامی متوقف می‌کند.
+نشست‌های what-if، سنجه‌های /metrics و /api/admin/reload مربوط به هر worker است
+(نشست‌ها به مسیریابی چسبنده نیاز دارند؛ فایل‌های دانش را هر worker خودش بررسی می‌کند).
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+from typing import Callable, Dict, List, Optional
+
+# حداقل فاصله fork دوباره workerی که از کار افتاده است
+RESPAWN_DELAY = 1.0
+
+SIGNALS = {signal.SIGINT, signal.SIGTERM}
+
+
+def default_cache_path(port: int) -> str:
+    """فایل کش مشترک روی /dev/shm (حافظه) در صورت وجود"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, f"expert-cache-{port}.sqlite")
+
+
+def bind(host: str, port: int, backlog: int) -> socket.socket:
+    """سوکت شنونده مشترک همه workerها"""
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    """
+    وارد کردن برنامه (ساخت و کامپایل دانش) و گرم کردن مسیرهای تحلیل در فرایند والد
+
+    کش نتایج اینجا لمس نمی‌شود تا هیچ اتصال SQLite از والد به workerها نرسد.
+    """
+    import main
+    from expert_system import LandingPageInput
+
+    service = main.get_service()
+    service.snapshot.warm()
+    inputs = LandingPageInput().model_dump()
+    service.analyze_json(inputs)
+    service.analyze_batch([inputs])
+    main.app  # ساخت برنامه و مسیرها پیش از fork
+    return main
+
+
+def run_worker(app_module, sock: socket.socket, loaded_signature, uvicorn_options: Dict) -> int:
+    """اجرای uvicorn روی سوکت مشترک در فرایند fork شده"""
+    import uvicorn
+    from rule_files import RuleFileError, signature
+
+    # workerی که دوباره fork شده ممکن است دانش قدیمی والد را داشته باشد
+    service = app_module.expert_service
+    if service.rules_path is not None and signature(service.rules_path) != loaded_signature:
+        try:
+            service.reload()
+        except RuleFileError as e:
+            print(f"فایل‌های دانش نامعتبر است؛ دانش والد حفظ شد: {e}", file=sys.stderr)
+
+    config = uvicorn.Config(app_module.app, lifespan="on", **uvicorn_options)
+    uvicorn.Server(config).run(sockets=[sock])
+    return 0
+
+
+def supervise(count: int, spawn: Callable[[int], int]):
+    """fork کردن workerها، fork دوباره worker ازکارافتاده و توقف همه با SIGTERM/SIGINT"""
+    children: Dict[int, int] = {}  # pid ← شماره worker
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for signum in SIGNALS:
+        signal.signal(signum, stop)
+
+    for index in range(count):
+        children[spawn(index)] = index
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+
+        print(f"worker {index} (pid {pid}) خارج شد با کد {os.waitstatus_to_exitcode(status)}؛ fork دوباره",
+              file=sys.stderr)
+        time.sleep(RESPAWN_DELAY)
+        if not stopping:
+            children[spawn(index)] = index
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="تعداد فرایندهای worker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--rules", help="فایل یا پوشه YAML/JSON قوانین (همان EXPERT_RULES_PATH)")
+    parser.add_argument("--cache-path", help="فایل SQLite کش مشترک (پیش‌فرض با چند worker: روی /dev/shm)")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", action="store_true", help="غیرفعال کردن لاگ هر درخواست")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers باید حداقل 1 باشد")
+
+    # تنظیمات پیش از وارد کردن main خوانده می‌شوند
+    if args.rules:
+        os.environ["EXPERT_RULES_PATH"] = args.rules
+    if args.cache_path:
+        os.environ["EXPERT_CACHE_PATH"] = args.cache_path
+    elif args.workers > 1 and not os.environ.get("EXPERT_CACHE_PATH"):
+        os.environ["EXPERT_CACHE_PATH"] = default_cache_path(args.port)
+
+    from rule_files import signature
+
+    rules_path = os.environ.get("EXPERT_RULES_PATH") or None
+    loaded_signature = signature(rules_path) if rules_path else None
+
+    start = time.perf_counter()
+    app_module = preload()
+    elapsed = time.perf_counter() - start
+    sock = bind(args.host, args.port, args.backlog)
+
+    print(f"دانش {app_module.expert_service.version} در {elapsed * 1000:.0f}ms کامپایل شد؛ "
+          f"{args.workers} worker روی http://{args.host}:{args.port} "
+          f"(کش: {os.environ.get('EXPERT_CACHE_PATH') or 'حافظه'})", file=sys.stderr)
+
+    # اشیای ساخته‌شده تا اینجا از جمع‌آوری زباله خارج می‌شوند تا صفحاتشان کپی نشوند
+    gc.collect()
+    gc.freeze()
+
+    uvicorn_options = {"log_level": args.log_level, "access_log": not args.no_access_log}
+
+    def spawn(index: int) -> int:
+        # سیگنال‌ها تا جایگزینی handler والد در فرزند معلق می‌مانند
+        signal.pthread_sigmask(signal.SIG_BLOCK, SIGNALS)
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                for signum in SIGNALS:
+                    signal.signal(signum, signal.SIG_DFL)
+                signal.pthread_sigmask(signal.SIG_UNBLOCK, SIGNALS)
+                os.setpgid(0, 0)  # SIGINT ترمینال فقط به والد می‌رسد و والد یک بار SIGTERM می‌فرستد
+                code = run_worker(app_module, sock, loaded_signature, uvicorn_options)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, SIGNALS)
+        return pid
+
+    supervise(args.workers, spawn)
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
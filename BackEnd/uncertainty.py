@@ -0,0 +1,157 @@
+"""
+حالت عدم‌قطعیت Monte Carlo: توزیع امتیازها از ورودی‌های نویزی
+
+فیلدهایی مثل scroll_depth، cta_click_rate و time_to_cta از نمونه‌های analytics می‌آیند
+و دقیق نیستند. برای هر فیلد یک توزیع (نرمال با mean/stddev و کران اختیاری، یا
+نمونه‌های تجربی که با جایگذاری بازنمونه‌گیری می‌شوند) داده می‌شود؛ بقیه فیلدها ثابت‌اند.
+همه نمونه‌ها یک‌جا به صورت ستونی از تبدیل کیفی، قوانین و اجزای امتیاز
+VectorizedEvaluator می‌گذرند و خروجی صدک‌های امتیازها، احتمال فعال شدن هر قانون،
+توزیع CF ترکیبی و احتمال هر برچسب کیفی است.
+
+CF فقط به الگوی قوانین فعال بستگی دارد: یک بار برای هر الگوی یکتا محاسبه می‌شود.
+"""
+
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from inference import InferenceEngine
+
+# صدک‌های پیش‌فرض گزارش
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# کران نمونه‌های فیلدهای صحیح پیش از تبدیل به int64 (بزرگ‌ترین عدد صحیحی که float دقیق نگه می‌دارد)
+INTEGER_LIMIT = float(2 ** 53)
+
+
+class _Records:
+    """رکوردهای dict نمونه‌ها، فقط برای قوانین بدون معادل برداری (به صورت تنبل ساخته می‌شوند)"""
+
+    def __init__(self, cols: Dict[str, np.ndarray], n: int):
+        self.cols = cols
+        self.n = n
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(self.n):
+            yield {name: column[i].item() for name, column in self.cols.items()}
+
+
+def _summary(values: np.ndarray, percentiles, digits: int) -> Dict:
+    """میانگین، انحراف معیار، کمینه/بیشینه و صدک‌ها (صدک‌ها مقادیر مشاهده‌شده‌اند)"""
+    points = np.percentile(values, percentiles, method="inverted_cdf") if len(percentiles) else []
+    return {
+        "mean": round(float(values.mean()), digits),
+        "std": round(float(values.std()), digits),
+        "min": round(float(values.min()), digits),
+        "max": round(float(values.max()), digits),
+        "percentiles": {f"p{q:g}": round(float(p), digits) for q, p in zip(percentiles, points)},
+    }
+
+
+def _distribution(values: np.ndarray, counts: np.ndarray, n: int) -> List[Dict]:
+    return [
+        {"value": value, "probability": round(count / n, 4)}
+        for value, count in zip(values.tolist(), counts.tolist()) if count
+    ]
+
+
+class MonteCarloAnalyzer:
+    """نمونه‌گیری از توزیع فیلدها و ارزیابی برداری همه نمونه‌ها روی یک موتور استنتاج"""
+
+    def __init__(self, engine: InferenceEngine, evaluator):
+        self.engine = engine
+        self.evaluator = evaluator
+        self.ordered_rules = evaluator.ordered_rules
+
+    @staticmethod
+    def draw(rng: np.random.Generator, spec: Dict, n: int) -> np.ndarray:
+        """
+        n نمونه از توزیع یک فیلد
+
+        spec: {"samples": [...]} (بازنمونه‌گیری تجربی) یا {"mean", "stddev", "min", "max"}
+        (نرمال بریده‌شده با clip)؛ "integer": گرد کردن به عدد صحیح همانند ورودی API
+        (بریده‌شده به ±INTEGER_LIMIT تا mean/stddev بسیار بزرگ در int64 سرریز نکند).
+        """
+        if spec.get("samples"):
+            values = rng.choice(np.asarray(spec["samples"], dtype=np.float64), size=n)
+        else:
+            values = rng.normal(spec["mean"], spec.get("stddev") or 0.0, size=n)
+        if spec.get("min") is not None or spec.get("max") is not None:
+            values = np.clip(values, spec.get("min"), spec.get("max"))
+        if spec.get("integer"):
+            values = np.rint(np.clip(values, -INTEGER_LIMIT, INTEGER_LIMIT)).astype(np.int64)
+        return values
+
+    def columns(self, inputs: Dict, distributions: Dict[str, Dict], n: int, seed: int) -> Dict[str, np.ndarray]:
+        """آرایه ستونی n نمونه؛ فیلدها به ترتیب inputs کشیده می‌شوند تا یک seed همیشه همان نمونه‌ها را بدهد"""
+        rng = np.random.default_rng(seed)
+        return {
+            name: self.draw(rng, distributions[name], n) if name in distributions else np.full(n, value)
+            for name, value in inputs.items()
+        }
+
+    def simulate(self, inputs: Dict, distributions: Dict[str, Dict], samples: int = 100_000,
+                 seed: Optional[int] = None, percentiles=DEFAULT_PERCENTILES) -> Dict:
+        """
+        توزیع نتایج تحلیل وقتی فیلدهای distributions تصادفی و بقیه برابر inputs هستند
+
+        seed برابر None یعنی seed تازه؛ seed به‌کاررفته در پاسخ برمی‌گردد تا نتیجه تکرارپذیر باشد.
+        """
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy % (1 << 63))
+        n = samples
+        percentiles = list(percentiles)
+        cols = self.columns(inputs, distributions, n, seed)
+
+        ve = self.evaluator
+        qualitative = ve.convert_inputs(cols)
+        masks = ve.evaluate_rules(cols, qualitative, _Records(cols, n))
+        visibility = ve.visibility_scores(cols)
+        clickability = ve.clickability_scores(cols)
+
+        # CF یک بار برای هر الگوی یکتای قوانین فعال
+        if masks.shape[1] <= 62:
+            codes = masks @ (np.int64(1) << np.arange(masks.shape[1], dtype=np.int64))
+            _, first_index, pattern_index = np.unique(codes, return_index=True, return_inverse=True)
+            patterns = masks[first_index]
+        else:
+            patterns, pattern_index = np.unique(masks, axis=0, return_inverse=True)
+        pattern_cf = np.array([
+            InferenceEngine.combine_certainties([rule.certainty for rule, on in zip(self.ordered_rules, row) if on])
+            for row in patterns.tolist()
+        ])
+        pattern_index = pattern_index.reshape(-1)
+        certainty = pattern_cf[pattern_index]
+        # توزیع CF از شمار هر الگو (بدون مرتب‌سازی دوباره همه نمونه‌ها)
+        cf_values, cf_inverse = np.unique(pattern_cf, return_inverse=True)
+        cf_counts = np.bincount(cf_inverse.reshape(-1), weights=np.bincount(pattern_index), minlength=len(cf_values))
+
+        activation = masks.mean(axis=0)
+        return {
+            "samples": n,
+            "seed": seed,
+            "visibility_score": _summary(visibility, percentiles, 2),
+            "clickability_score": _summary(clickability, percentiles, 2),
+            "overall_certainty": {
+                **_summary(certainty, percentiles, 4),
+                "distribution": _distribution(cf_values, cf_counts, n),
+            },
+            "rule_probabilities": {
+                rule.id: round(float(p), 4) for rule, p in zip(self.ordered_rules, activation.tolist())
+            },
+            "qualitative": {
+                name: self._frequencies(name, labels, n) for name, labels in qualitative.items()
+            },
+        }
+
+    def _frequencies(self, name: str, labels: np.ndarray, n: int) -> Dict[str, float]:
+        """احتمال هر مقدار ممکن برچسب (مقادیر با احتمال صفر حذف می‌شوند)"""
+        frequencies = {}
+        for value in self.engine.layout.values[name]:
+            count = int(np.count_nonzero(labels == value))
+            if count:
+                frequencies[value] = round(count / n, 4)
+        return frequencies
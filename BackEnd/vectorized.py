@@ -0,0 +1,110 @@
+"""
+ارزیاب برداری (NumPy) برای تحلیل دسته‌ای، بهینه‌ساز و نقشه حساسیت
+
+NumPy فقط با اولین استفاده از این ماژول وارد می‌شود (KnowledgeSnapshot.ve).
+"""
+
+from typing import List, Dict
+
+import numpy as np
+
+from inference import InferenceEngine
+from conditions import compile_numpy_cascades, compile_numpy_masks
+
+
+# ==================== Vectorized Batch Evaluator ====================
+
+class VectorizedEvaluator:
+    """ارزیابی برداری (NumPy) تبدیل کیفی، قوانین و امتیازات برای تحلیل دسته‌ای"""
+    
+    def __init__(self, engine: InferenceEngine):
+        self.kb = engine.kb
+        self._convert = compile_numpy_cascades(engine.converter.labels, "convert_inputs")
+        self._visibility_points = compile_numpy_cascades(engine.visibility_components, "visibility_points")
+        self._clickability_points = compile_numpy_cascades(engine.clickability_components, "clickability_points")
+        # ترتیب پایدار بر اساس اولویت، همانند مرتب‌سازی در forward_chaining
+        self.ordered_rules = sorted(self.kb.rules, key=lambda r: r.priority, reverse=True)
+        self.rule_masks = compile_numpy_masks(self.ordered_rules)
+    
+    @staticmethod
+    def pack_columns(records: List[Dict]) -> Dict[str, np.ndarray]:
+        """تبدیل لیست رکوردها به آرایه‌های ستونی"""
+        return {name: np.array([r[name] for r in records]) for name in records[0]}
+    
+    def convert_inputs(self, cols: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """معادل برداری QualitativeConverter.convert_inputs"""
+        return self._convert(cols)
+    
+    def evaluate_rules(self, cols: Dict[str, np.ndarray], qualitative: Dict[str, np.ndarray],
+                       records: List[Dict]) -> np.ndarray:
+        """ماتریس فعال‌سازی قوانین (N×R) به ترتیب اولویت"""
+        masks = np.zeros((len(records), len(self.ordered_rules)), dtype=bool)
+        
+        try:
+            vector_masks = self.rule_masks({**cols, **qualitative})
+        except Exception:
+            vector_masks = [None] * len(self.ordered_rules)
+        
+        for j, rule in enumerate(self.ordered_rules):
+            if vector_masks[j] is not None:
+                masks[:, j] = vector_masks[j]
+                continue
+            
+            # قانون بدون معادل برداری: ارزیابی رکورد به رکورد
+            for i, record in enumerate(records):
+                full_data = {**record, **{k: v[i] for k, v in qualitative.items()}}
+                try:
+                    masks[i, j] = bool(rule.condition(full_data))
+                except:
+                    continue
+        
+        return masks
+    
+    def visibility_scores(self, cols: Dict[str, np.ndarray]) -> np.ndarray:
+        """معادل برداری _calculate_visibility_score"""
+        return np.clip(100 + sum(self._visibility_points(cols).values()), 0, 100)
+    
+    def clickability_scores(self, cols: Dict[str, np.ndarray]) -> np.ndarray:
+        """معادل برداری _calculate_clickability_score"""
+        return np.clip(100 + sum(self._clickability_points(cols).values()), 0, 100)
+    
+    def evaluate(self, records: List[Dict]) -> Dict:
+        """اجرای کامل استنتاج برداری روی N رکورد"""
+        cols = self.pack_columns(records)
+        qualitative = self.convert_inputs(cols)
+        masks = self.evaluate_rules(cols, qualitative, records)
+        
+        # CF و پیشنهادات فقط به مجموعه قوانین فعال بستگی دارند:
+        # یک بار برای هر الگوی یکتای فعال‌سازی محاسبه می‌شوند
+        if masks.shape[1] <= 62:
+            # بسته‌بندی هر سطر در یک عدد صحیح؛ unique روی int64 بسیار سریع‌تر است
+            codes = masks @ (np.int64(1) << np.arange(masks.shape[1], dtype=np.int64))
+            _, first_index, pattern_index = np.unique(
+                codes, return_index=True, return_inverse=True
+            )
+            patterns = masks[first_index]
+        else:
+            patterns, pattern_index = np.unique(masks, axis=0, return_inverse=True)
+        pattern_results = []
+        for pattern in patterns:
+            activated = [rule for rule, on in zip(self.ordered_rules, pattern) if on]
+            pattern_results.append({
+                "activated_rules": [rule.id for rule in activated],
+                "overall_certainty": InferenceEngine.combine_certainties(
+                    [rule.certainty for rule in activated]
+                ),
+                "recommendations": [rule.conclusion for rule in activated[:5]],
+            })
+        
+        names = list(qualitative.keys())
+        qualitative_rows = [
+            dict(zip(names, labels)) for labels in zip(*(qualitative[n].tolist() for n in names))
+        ]
+        
+        return {
+            "visibility_score": self.visibility_scores(cols).tolist(),
+            "clickability_score": self.clickability_scores(cols).tolist(),
+            "patterns": pattern_results,
+            "pattern_index": pattern_index.reshape(-1).tolist(),
+            "qualitative_inputs": qualitative_rows,
+        }